@@ -16,14 +16,23 @@ from routes.salary_3d_routes import salary_3d_bp
 from routes.q1_routes import q1_bp
 from routes.industry_stats_routes import industry_stats_bp
 from routes.position_routes import position_bp
+from routes.export_routes import export_bp
+from routes.system_routes import system_bp
+from routes.metrics_routes import metrics_bp
+from config import config
+from database.snapshot import SnapshotMissError
+from utils import metrics, profiling, warmup
 from utils.response import ResponseBuilder
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def create_app():
-    """创建Flask应用实例"""
+def create_app(background_warmup: bool = False):
+    """
+    创建Flask应用实例
+    background_warmup 为 True 时首个请求到达后在后台预热缓存（由 WSGI 入口 wsgi.py 使用）
+    """
     app = Flask(__name__)
     CORS(app)  # 允许跨域请求
     
@@ -35,6 +44,21 @@ def create_app():
     app.register_blueprint(q1_bp)
     app.register_blueprint(industry_stats_bp)
     app.register_blueprint(position_bp)
+    app.register_blueprint(export_bp)
+    app.register_blueprint(system_bp)
+    app.register_blueprint(metrics_bp)
+    
+    # 接口耗时统计（/metrics）
+    if config['default'].ROUTE_METRICS_ENABLED:
+        metrics.init_app(app)
+    
+    # 按需请求剖析（X-Profile 请求头）
+    if config['default'].PROFILING_ENABLED:
+        profiling.init_app(app)
+    
+    # 缓存预热（直接运行本文件时由 warm_up_before_serving 在监听端口前执行，导入本模块时不预热）
+    if background_warmup:
+        warmup.init_app(app)
     
     # 注册错误处理器
     @app.errorhandler(404)
@@ -45,13 +69,21 @@ def create_app():
     def internal_error(error):
         return ResponseBuilder.internal_error("服务器内部错误")
     
+    # 离线快照中没有请求的参数组合（路由不捕获该异常）：并非服务器错误，返回 503
+    @app.errorhandler(SnapshotMissError)
+    def snapshot_miss(error):
+        return ResponseBuilder.error("离线快照中没有该请求的数据", 503,
+                                     {"type": "SNAPSHOT_MISS", "details": str(error)})
+    
     return app
 
-# 创建应用实例
+# 创建应用实例：测试、脚本等导入本模块时不预热；WSGI 部署使用 wsgi.py（gunicorn wsgi:app）
 app = create_app()
 
 if __name__ == '__main__':
     print("启动职数洞见API服务...")
     print("API文档: http://localhost:5001/api/overview")
     print("城市分析: http://localhost:5001/api/charts/city")
+    from utils.warmup import warm_up_before_serving
+    warm_up_before_serving(app, use_reloader=True)
     app.run(debug=True, host='0.0.0.0', port=5001)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+方言改写基准
+在合成数据集上分别以原生改写（默认）和调用 MySQL 函数的 Python 实现（native_functions=False）
+执行 database.backends 中的全部对比查询（DatabaseManager 与各服务），报告每个调用的耗时与加速比；
+两种方式的结果须一致，不一致的调用单独列出
+
+用法：
+    python -m benchmarks.dialect [--rows 100000] [--backend sqlite duckdb] [--iterations 3] [--output report.json]
+"""
+
+import argparse
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from database.backends import (COMPARE_CALLS, SERVICE_COMPARE_CALLS, DuckDBBackend, SQLiteBackend,
+                               _as_comparable, _service, duckdb, results_equivalent)
+from database.dialect import DuckDBDialect, SQLiteDialect
+from utils.cache import bypass_swr_cache
+
+logger = logging.getLogger(__name__)
+
+DIALECT_CLASSES = {'sqlite': SQLiteDialect, 'duckdb': DuckDBDialect}
+
+
+def _create_backend(name: str, path: str, native_functions: bool):
+    backend = SQLiteBackend(path) if name == 'sqlite' else DuckDBBackend(path)
+    backend.dialect = DIALECT_CLASSES[name](native_functions=native_functions)
+    return backend
+
+
+def _timed(target, method: str, args: tuple, iterations: int):
+    """调用 iterations 次，返回 (最短耗时毫秒, 最后一次的结果)"""
+    best, result = float('inf'), None
+    for _ in range(iterations):
+        started = time.perf_counter()
+        result = getattr(target, method)(*args)
+        best = min(best, (time.perf_counter() - started) * 1000)
+    return best, result
+
+
+def run_benchmark(name: str, path: str, iterations: int = 3) -> List[Dict[str, Any]]:
+    """在 path 指向的嵌入式数据库上对比两种改写方式，返回每个调用的结果"""
+    from database.Q3 import DatabaseManager
+    managers = {native: DatabaseManager('default', backend=_create_backend(name, path, native))
+                for native in (True, False)}
+    targets = [(method, args, managers[True], managers[False]) for method, args in COMPARE_CALLS]
+    for service_path, method, args in SERVICE_COMPARE_CALLS:
+        targets.append((f"{service_path.rsplit('.', 1)[1]}.{method}", args,
+                        _service(service_path, managers[True]), _service(service_path, managers[False])))
+
+    report = []
+    with bypass_swr_cache():
+        for label, args, native_target, function_target in targets:
+            method = label.rsplit('.', 1)[-1]
+            if callable(args):
+                args = args(managers[True])
+            native_ms, native_result = _timed(native_target, method, tuple(args), iterations)
+            function_ms, function_result = _timed(function_target, method, tuple(args), iterations)
+            report.append({
+                'method': label,
+                'native_ms': round(native_ms, 2),
+                'functions_ms': round(function_ms, 2),
+                'speedup': round(function_ms / native_ms, 2) if native_ms else None,
+                'equivalent': results_equivalent(_as_comparable(function_result), _as_comparable(native_result)),
+            })
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='方言原生改写与 Python 函数实现的耗时对比')
+    parser.add_argument('--rows', type=int, default=100_000, help='合成数据集行数')
+    parser.add_argument('--seed', type=int, default=42, help='合成数据集随机种子')
+    parser.add_argument('--backend', nargs='*', choices=['sqlite', 'duckdb'], default=['sqlite', 'duckdb'],
+                        help='嵌入式后端，未安装 duckdb 时跳过')
+    parser.add_argument('--iterations', type=int, default=3, help='每个调用的重复次数（取最短耗时）')
+    parser.add_argument('--output', default=None, help='结果写入的 JSON 文件')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    # 合成数据集上大部分查询都会超过慢查询阈值，不输出慢查询日志
+    logging.getLogger('slow_query').setLevel(logging.ERROR)
+    os.environ.setdefault('QUERY_CACHE_TTL', '0')
+    from database.synthetic import SyntheticDataset, load_dataset
+
+    dataset = SyntheticDataset(rows=args.rows, seed=args.seed).generate()
+    results: Dict[str, Any] = {'rows': args.rows, 'seed': args.seed, 'backends': {}}
+    failed = 0
+    with tempfile.TemporaryDirectory(prefix='dialect-bench-') as directory:
+        for name in args.backend:
+            if name == 'duckdb' and duckdb is None:
+                print("未安装 duckdb，跳过 duckdb 后端")
+                continue
+            path = os.path.join(directory, f'synthetic.{name}')
+            load_dataset(dataset, SQLiteBackend(path) if name == 'sqlite' else DuckDBBackend(path, read_only=False))
+            report = run_benchmark(name, path, args.iterations)
+            results['backends'][name] = report
+
+            native_total = sum(entry['native_ms'] for entry in report)
+            function_total = sum(entry['functions_ms'] for entry in report)
+            print(f"\n[{name}] {args.rows} 行，{len(report)} 个调用")
+            print(f"  {'调用':<60} {'原生(ms)':>10} {'函数(ms)':>10} {'加速':>7}")
+            for entry in report:
+                mark = '' if entry['equivalent'] else '  结果不一致'
+                print(f"  {entry['method']:<60} {entry['native_ms']:>10.2f} {entry['functions_ms']:>10.2f} "
+                      f"{entry['speedup'] or 0:>6.2f}x{mark}")
+            print(f"  {'合计':<60} {native_total:>10.2f} {function_total:>10.2f} "
+                  f"{function_total / native_total if native_total else 0:>6.2f}x")
+            failed += sum(1 for entry in report if not entry['equivalent'])
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
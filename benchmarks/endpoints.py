@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+接口基准测试
+在合成数据集的多个规模上依次请求各蓝图的全部接口，记录每个接口的：
+- 延迟 p50 / p95 / p99（毫秒）
+- 每次请求的数据库往返次数与返回行数
+- 响应字节数
+- 请求期间的峰值 RSS（MB）
+结果写入 JSON 基准文件；与已有基准对比时，超过阈值的退化会使命令以非零状态退出
+
+每个规模在独立子进程中测量（数据库后端按规模切换，RSS 互不影响），
+默认关闭响应缓存、查询缓存和聚合快照，测量的是接口的实际计算开销
+
+用法：
+    python -m benchmarks.endpoints run [--scales 10000 100000] [--iterations 5]
+    python -m benchmarks.endpoints run --baseline benchmarks/baseline.json --update-baseline
+    python -m benchmarks.endpoints run --backend mysql   # 直接测量当前 MySQL 数据
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+from config import BASE_DIR, DATA_DIR, config
+
+logger = logging.getLogger(__name__)
+
+settings = config['default']
+
+DEFAULT_SCALES = [10_000, 100_000]
+DEFAULT_BASELINE = os.path.join(BASE_DIR, 'benchmarks', 'baseline.json')
+DATASET_DIR = os.path.join(DATA_DIR, 'bench')
+
+# 基准用例：路径与参数中的 {city} 等占位符由 discover_samples 的取值填充
+BENCHMARK_CASES: List[Dict[str, Any]] = [
+    # 城市
+    {'name': 'overview', 'path': '/api/overview'},
+    {'name': 'city', 'path': '/api/charts/city'},
+    {'name': 'city_detail', 'path': '/api/charts/city/detail/{city}'},
+    {'name': 'city_compare', 'method': 'POST', 'path': '/api/charts/city/compare',
+     'json': {'cities': ['{city}', '{city_2}']}},
+    # 行业
+    {'name': 'industry', 'path': '/api/charts/industry'},
+    {'name': 'industry_detail', 'path': '/api/charts/industry/detail/{industry}'},
+    {'name': 'industry_compare', 'method': 'POST', 'path': '/api/charts/industry/compare',
+     'json': {'industries': ['{industry}', '{industry_2}']}},
+    {'name': 'industry_overview', 'path': '/api/charts/industry/overview'},
+    {'name': 'industry_salary', 'path': '/api/charts/industry/salary'},
+    {'name': 'industry_ranking', 'path': '/api/industry/ranking/jobs'},
+    {'name': 'industry_rose', 'path': '/api/industry/trend/rose'},
+    # 经验
+    {'name': 'experience', 'path': '/api/charts/experience'},
+    {'name': 'experience_detail', 'path': '/api/charts/experience/detail/{experience}'},
+    {'name': 'experience_compare', 'method': 'POST', 'path': '/api/charts/experience/compare',
+     'json': {'experiences': ['{experience}', '{experience_2}']}},
+    {'name': 'experience_overview', 'path': '/api/charts/experience/overview'},
+    {'name': 'experience_salary', 'path': '/api/charts/experience/salary'},
+    # 三维柱状图 / 箱线图 / 雷达气泡图 / 平行坐标图
+    {'name': '3d_salary', 'path': '/api/charts/3d/experience-education-salary'},
+    {'name': 'boxplot', 'path': '/api/charts/boxplot/salary-distribution',
+     'params': {'experience': '{experience_label}', 'education': '{education_label}'}},
+    {'name': 'radar_bubble', 'path': '/api/charts/radar-bubble'},
+    {'name': 'parallel_coordinates', 'path': '/api/charts/parallel-coordinates'},
+    # Q1
+    {'name': 'q1_cities', 'path': '/api/q1/cities'},
+    {'name': 'q1_scatter', 'path': '/api/q1/scatter', 'params': {'city': '{city}'}},
+    {'name': 'q1_job_levels', 'path': '/api/q1/job-levels'},
+    {'name': 'q1_industries', 'path': '/api/q1/industries'},
+    # 职位
+    {'name': 'position_parallel', 'path': '/api/positions/parallel',
+     'params': {'job_titles': ['{job_title}', '{job_title_2}']}},
+    {'name': 'position_nested_bar', 'path': '/api/positions/nested_bar',
+     'params': {'job_titles': ['{job_title}', '{job_title_2}'], 'detail_job': '{job_title}'}},
+    {'name': 'position_sankey', 'path': '/api/positions/sankey'},
+    # 全国行业统计
+    {'name': 'industry_stats', 'path': '/api/industry-stats/national'},
+]
+
+
+def discover_samples(db_manager) -> Dict[str, str]:
+    """从当前数据库取出用例参数：岗位数最多的城市、行业、经验、职位等"""
+    cities = db_manager.get_city_statistics(2, 0)
+    industries = db_manager.get_industry_statistics(2, 0)
+    experiences = db_manager.get_experience_statistics(2, 0)
+    titles = db_manager.execute_query(
+        "SELECT job_title FROM job_summary_by_title ORDER BY records_count DESC LIMIT 2"
+    )
+    labels = db_manager.execute_query("""
+        SELECT exp_mapping.experience_label, edu_mapping.education_label
+        FROM data d
+        JOIN experience_mapping exp_mapping ON d.experience = exp_mapping.experience_code
+        JOIN education_mapping edu_mapping ON d.education = edu_mapping.education_code
+        GROUP BY exp_mapping.experience_label, edu_mapping.education_label
+        ORDER BY COUNT(*) DESC
+        LIMIT 1
+    """, fetch_one=True)
+
+    def pick(rows, index):
+        return str(rows[min(index, len(rows) - 1)][0]) if rows else ''
+
+    return {
+        'city': pick(cities, 0), 'city_2': pick(cities, 1),
+        'industry': pick(industries, 0), 'industry_2': pick(industries, 1),
+        'experience': pick(experiences, 0), 'experience_2': pick(experiences, 1),
+        'job_title': pick(titles, 0), 'job_title_2': pick(titles, 1),
+        'experience_label': labels[0] if labels else '1-3年',
+        'education_label': labels[1] if labels else '本科',
+    }
+
+
+def _fill(value: Any, samples: Dict[str, str]) -> Any:
+    """递归替换占位符"""
+    if isinstance(value, str):
+        for name, sample in samples.items():
+            value = value.replace('{' + name + '}', sample)
+        return value
+    if isinstance(value, list):
+        return [_fill(item, samples) for item in value]
+    if isinstance(value, dict):
+        return {key: _fill(item, samples) for key, item in value.items()}
+    return value
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """线性插值分位数（q 取 0-100）"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+class RSSSampler:
+    """在后台线程中采样当前进程的常驻内存，记录区间内的峰值"""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._page_size = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+    def current(self) -> int:
+        """当前 RSS（字节）；非 Linux 平台退化为进程生命周期内的峰值"""
+        try:
+            with open('/proc/self/statm') as f:
+                return int(f.read().split()[1]) * self._page_size
+        except OSError:
+            import resource
+            usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return usage if sys.platform == 'darwin' else usage * 1024
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self.current())
+
+    def __enter__(self) -> 'RSSSampler':
+        self.peak = self.current()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='rss-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.current())
+
+
+def measure_case(client, case: Dict[str, Any], samples: Dict[str, str], iterations: int) -> Dict[str, Any]:
+    """请求一个用例 iterations 次（另加一次不计入结果的预热请求）"""
+    from database.Q3 import QueryStats, query_stats
+
+    path = _fill(case['path'], samples)
+    method = case.get('method', 'GET')
+    kwargs = {'query_string': _fill(case.get('params') or {}, samples)}
+    if 'json' in case:
+        kwargs['json'] = _fill(case['json'], samples)
+
+    latencies, statuses = [], set()
+    stats = QueryStats()
+    response_bytes = 0
+    client.open(path, method=method, **kwargs)
+    with RSSSampler() as sampler:
+        for _ in range(iterations):
+            request_stats = QueryStats()
+            token = query_stats.set(request_stats)
+            started = time.perf_counter()
+            try:
+                response = client.open(path, method=method, **kwargs)
+                body = response.get_data()
+            finally:
+                query_stats.reset(token)
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses.add(response.status_code)
+            stats.round_trips += request_stats.round_trips
+            stats.rows += request_stats.rows
+            response_bytes = len(body)
+
+    return {
+        'path': path,
+        'method': method,
+        'status': sorted(statuses),
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'mean_ms': round(sum(latencies) / len(latencies), 2),
+        'round_trips': stats.round_trips / iterations,
+        'rows': stats.rows / iterations,
+        'response_bytes': response_bytes,
+        'peak_rss_mb': round(sampler.peak / 1024 / 1024, 1),
+    }
+
+
+def measure(iterations: int = 5, use_caches: bool = False,
+            cases: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """在当前进程中测量全部用例（数据库后端取自当前配置）"""
+    import database.Q3 as q3
+
+    if not use_caches:
+        settings.RESPONSE_CACHE_TTL = 0
+        settings.COLUMN_STORE_ENABLED = False
+        q3.query_cache.ttl = 0
+
+    from app import create_app
+    app = create_app()
+    client = app.test_client()
+    samples = discover_samples(q3.DatabaseManager('default'))
+    results = {}
+    for case in cases or BENCHMARK_CASES:
+        results[case['name']] = measure_case(client, case, samples, iterations)
+        logger.info(f"{case['name']}: p50 {results[case['name']]['p50_ms']}ms")
+    return {'samples': samples, 'cases': results}
+
+
+def dataset_path(rows: int, seed: int) -> str:
+    return os.path.join(DATASET_DIR, f"synthetic_{rows}_{seed}.sqlite3")
+
+
+def ensure_dataset(rows: int, seed: int = 42) -> str:
+    """生成（或复用已生成的）指定规模的合成数据集，返回 SQLite 文件路径"""
+    from database.backends import SQLiteBackend
+    from database.synthetic import SyntheticDataset, load_dataset
+
+    path = dataset_path(rows, seed)
+    if not os.path.exists(path):
+        os.makedirs(DATASET_DIR, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        load_dataset(SyntheticDataset(rows, seed).generate(), SQLiteBackend(tmp_path), replace=True)
+        os.replace(tmp_path, path)
+    return path
+
+
+def _measure_in_subprocess(env: Dict[str, str], iterations: int, use_caches: bool) -> Dict[str, Any]:
+    """在子进程中测量，结果经临时文件返回"""
+    fd, output = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    command = [sys.executable, '-m', 'benchmarks.endpoints', 'measure',
+               '--iterations', str(iterations), '--output', output]
+    if use_caches:
+        command.append('--use-caches')
+    try:
+        subprocess.run(command, cwd=BASE_DIR, env=dict(os.environ, **env), check=True)
+        with open(output, encoding='utf-8') as f:
+            return json.load(f)
+    finally:
+        os.remove(output)
+
+
+def run(scales: Sequence[int], iterations: int = 5, seed: int = 42, backend: str = 'sqlite',
+        use_caches: bool = False) -> Dict[str, Any]:
+    """
+    在各规模上测量全部用例
+
+    Args:
+        scales: 合成数据集的 data 行数列表（backend 为 mysql 时忽略，只测量当前数据库）
+        backend: sqlite 使用合成数据集；mysql 使用当前配置的 MySQL
+    """
+    results: Dict[str, Any] = {}
+    if backend == 'mysql':
+        results['mysql'] = _measure_in_subprocess({'DB_BACKEND': 'mysql'}, iterations, use_caches)
+    else:
+        for rows in scales:
+            path = ensure_dataset(rows, seed)
+            logger.info(f"测量规模 {rows}：{path}")
+            results[str(rows)] = _measure_in_subprocess(
+                {'DB_BACKEND': 'sqlite', 'EMBEDDED_DB_PATH': path}, iterations, use_caches
+            )
+    return {
+        'created_at': datetime.now().isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'backend': backend,
+            'iterations': iterations,
+            'seed': seed,
+            'use_caches': use_caches,
+        },
+        'scales': results,
+    }
+
+
+# 参与退化判断的指标
+REGRESSION_METRICS = ['p50_ms', 'p95_ms', 'p99_ms', 'round_trips', 'rows', 'peak_rss_mb']
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.2,
+            min_latency_ms: float = 5.0) -> List[Dict[str, Any]]:
+    """
+    与基准对比，返回退化列表
+    延迟与峰值 RSS 超过基准的 (1 + threshold) 倍视为退化（延迟还需超出 min_latency_ms，过滤计时噪声）；
+    数据库往返次数与返回行数是确定值，任何增加都视为退化
+    """
+    regressions = []
+    for scale, scale_result in current['scales'].items():
+        base_cases = baseline.get('scales', {}).get(scale, {}).get('cases', {})
+        for name, metrics in scale_result['cases'].items():
+            base = base_cases.get(name)
+            if not base:
+                continue
+            for metric in REGRESSION_METRICS:
+                old, new = base.get(metric), metrics.get(metric)
+                if old is None or new is None:
+                    continue
+                if metric in ('round_trips', 'rows'):
+                    regressed = new > old
+                elif metric.endswith('_ms'):
+                    regressed = new > old * (1 + threshold) and new - old > min_latency_ms
+                else:
+                    regressed = new > old * (1 + threshold)
+                if regressed:
+                    regressions.append({'scale': scale, 'case': name, 'metric': metric,
+                                        'baseline': old, 'current': new})
+    return regressions
+
+
+def format_results(results: Dict[str, Any]) -> str:
+    """将测量结果格式化为便于终端阅读的表格"""
+    lines = []
+    for scale, scale_result in results['scales'].items():
+        lines.append(f"规模 {scale}")
+        lines.append(f"  {'用例':<22}{'p50':>9}{'p95':>9}{'p99':>9}{'往返':>7}{'行数':>10}{'RSS(MB)':>9}  状态")
+        for name, m in scale_result['cases'].items():
+            lines.append(f"  {name:<22}{m['p50_ms']:>9.1f}{m['p95_ms']:>9.1f}{m['p99_ms']:>9.1f}"
+                         f"{m['round_trips']:>7.1f}{m['rows']:>10.0f}{m['peak_rss_mb']:>9.1f}  {m['status']}")
+    return '\n'.join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='接口基准测试')
+    parser.add_argument('command', choices=['run', 'measure'], help='run 测量并对比基准；measure 仅在当前进程测量（内部使用）')
+    parser.add_argument('--scales', type=int, nargs='+', default=DEFAULT_SCALES, help='合成数据集规模（data 行数）')
+    parser.add_argument('--iterations', type=int, default=5, help='每个接口的请求次数')
+    parser.add_argument('--seed', type=int, default=42, help='合成数据集随机种子')
+    parser.add_argument('--backend', choices=['sqlite', 'mysql'], default='sqlite', help='sqlite 使用合成数据集，mysql 使用当前数据库')
+    parser.add_argument('--use-caches', action='store_true', help='保留响应缓存、查询缓存和聚合快照')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='基准文件路径')
+    parser.add_argument('--threshold', type=float, default=0.2, help='允许的相对退化比例')
+    parser.add_argument('--min-latency-ms', type=float, default=5.0, help='延迟增量小于该毫秒数时不视为退化')
+    parser.add_argument('--update-baseline', action='store_true', help='将本次结果写入基准文件')
+    parser.add_argument('--output', default=None, help='结果输出文件')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO if args.command == 'run' else logging.WARNING)
+
+    if args.command == 'measure':
+        result = measure(args.iterations, args.use_caches)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False)
+        return
+
+    results = run(args.scales, args.iterations, args.seed, args.backend, args.use_caches)
+    print(format_results(results))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"基准已更新: {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"基准文件 {args.baseline} 不存在，使用 --update-baseline 生成")
+        return
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare(baseline, results, args.threshold, args.min_latency_ms)
+    for item in regressions:
+        print(f"  ✗ [{item['scale']}] {item['case']} {item['metric']}: {item['baseline']} -> {item['current']}")
+    if regressions:
+        print(f"发现 {len(regressions)} 项性能退化（阈值 {args.threshold:.0%}）")
+        raise SystemExit(1)
+    print("未发现性能退化")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+索引效果验证
+按接口基准用例（覆盖全部路由，即 Q3 与各服务中的查询）请求一遍并截获所有只读语句，
+再由 database.indexes.verify 去掉索引后逐条 EXPLAIN、建立索引后重新 EXPLAIN，
+报告每条语句前后的访问方式与估算行数
+
+验证会删除并重建索引：嵌入式后端（sqlite / duckdb）在数据文件的临时副本上执行，不修改原文件；
+MySQL 直接作用于目标库，需显式指定 --allow-drop
+
+用法：
+    python -m benchmarks.indexes [--backend sqlite|duckdb] [--path ...] [--output report.json]
+    python -m benchmarks.indexes --backend mysql --allow-drop
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+settings = config['default']
+
+
+def capture_workload() -> List[Tuple[str, Any]]:
+    """
+    绕过各级缓存请求全部接口基准用例，截获执行的只读语句，返回去重后的 (语句, 参数) 列表
+    （同一指纹保留第一组参数）；期间修改的缓存配置在返回前恢复
+    """
+    import database.Q3 as q3
+    from app import create_app
+    from benchmarks.endpoints import BENCHMARK_CASES, _fill, discover_samples
+    from database.instrumentation import fingerprint
+    from utils.cache import bypass_swr_cache
+
+    statements: Dict[str, Tuple[str, Any]] = {}
+
+    def record(key: tuple, result: Any) -> None:
+        query, params, _ = key
+        if q3.DatabaseManager._is_read_query(query):
+            statements.setdefault(fingerprint(query), (query, params))
+
+    saved = (settings.RESPONSE_CACHE_TTL, settings.COLUMN_STORE_ENABLED)
+    settings.RESPONSE_CACHE_TTL = 0
+    settings.COLUMN_STORE_ENABLED = False
+    previous, q3.query_recorder = q3.query_recorder, record
+    try:
+        with bypass_swr_cache():
+            client = create_app().test_client()
+            samples = discover_samples(q3.DatabaseManager('default'))
+            for case in BENCHMARK_CASES:
+                kwargs = {'query_string': _fill(case.get('params') or {}, samples)}
+                if 'json' in case:
+                    kwargs['json'] = _fill(case['json'], samples)
+                client.open(_fill(case['path'], samples), method=case.get('method', 'GET'), **kwargs)
+    finally:
+        q3.query_recorder = previous
+        settings.RESPONSE_CACHE_TTL, settings.COLUMN_STORE_ENABLED = saved
+    return list(statements.values())
+
+
+def copy_database(path: str, directory: str) -> str:
+    """将嵌入式数据库文件（及 DuckDB 的 WAL）复制到 directory，返回副本路径"""
+    target = os.path.join(directory, os.path.basename(path))
+    shutil.copyfile(path, target)
+    if os.path.exists(f"{path}.wal"):
+        shutil.copyfile(f"{path}.wal", f"{target}.wal")
+    return target
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='索引效果验证（对比建索引前后的执行计划）')
+    parser.add_argument('--backend', choices=['mysql', 'sqlite', 'duckdb'], default=None,
+                        help='数据库后端，默认 DB_BACKEND')
+    parser.add_argument('--path', default=None, help='嵌入式数据库文件路径，默认 EMBEDDED_DB_PATH')
+    parser.add_argument('--allow-drop', action='store_true',
+                        help='允许删除并重建目标 MySQL 库中的索引（嵌入式后端始终在副本上验证）')
+    parser.add_argument('--output', default=None, help='结果输出 JSON 文件')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    backend = args.backend or settings.DB_BACKEND
+    if backend == 'mysql' and not args.allow_drop:
+        parser.error("MySQL 上的验证会删除并重建目标库的索引，确认后加 --allow-drop")
+
+    with tempfile.TemporaryDirectory(prefix='index-verify-') as directory:
+        # 路由模块导入时按配置创建 DatabaseManager，须在导入前设置后端
+        settings.DB_BACKEND = backend
+        if backend != 'mysql':
+            source = args.path or settings.EMBEDDED_DB_PATH
+            settings.EMBEDDED_DB_PATH = copy_database(source, directory)
+            logger.info(f"在副本 {settings.EMBEDDED_DB_PATH} 上验证（原文件 {source} 不变）")
+        from database.indexes import format_report, verify
+        from database.Q3 import DatabaseManager
+
+        report = verify(DatabaseManager('default'), capture_workload(), allow_drop=True)
+    print(format_report(report))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+
+
+if __name__ == '__main__':
+    main()
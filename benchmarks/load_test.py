@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+看板压测
+虚拟用户按前端各标签页（Dashboard.vue 下的 Q1Tab / Q2Tab / Q3Tab / Q5Tab）的实际请求序列访问接口，
+请求之间按思考时间停顿，参数按真实分布抽取（Q1 的 20 个代表性城市、岗位数靠前的热门职位等）。
+并发用户数分阶段递增，报告每个阶段的吞吐量与延迟曲线，并判定饱和点
+
+饱和判定：某阶段吞吐量相比上一阶段增长不足 10%（用户数翻倍时），且 p95 延迟上升超过 50%，
+或错误率超过 1%；饱和前最后一个阶段的并发数即单节点可承载的并发用户数
+
+用法：
+    python -m benchmarks.load_test --url http://localhost:5001 [--stages 1 2 4 8 16 32 64] [--stage-seconds 30]
+    python -m benchmarks.load_test --in-process --think-scale 0.1   # 进程内请求，思考时间缩短为 1/10
+"""
+
+import argparse
+import gzip
+import http.client
+import json
+import logging
+import math
+import random
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import quote, urlencode, urlsplit
+
+from benchmarks.endpoints import percentile
+from database.synthetic import EDUCATION_LEVELS, EXPERIENCE_LEVELS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STAGES = [1, 2, 4, 8, 16, 32, 64]
+
+# 各标签页被访问的比例
+TAB_WEIGHTS = {'q1': 0.35, 'q2': 0.25, 'q3': 0.25, 'q5': 0.15}
+
+# 思考时间（秒）：对数正态分布的中位数与离散度
+THINK_MEDIAN = 3.0
+THINK_SIGMA = 0.6
+
+
+class HttpTarget:
+    """通过 HTTP 请求运行中的服务，每个线程一个长连接"""
+
+    def __init__(self, base_url: str, timeout: float = 60.0):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == 'https' else 80)
+        self.https = parts.scheme == 'https'
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self) -> http.client.HTTPConnection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            connection = self._local.connection = cls(self.host, self.port, timeout=self.timeout)
+        return connection
+
+    def request(self, method: str, path: str, body: Optional[Dict[str, Any]] = None) -> Tuple[int, bytes]:
+        headers = {'Accept-Encoding': 'gzip', 'Accept': 'application/json'}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        connection = self._connection()
+        try:
+            connection.request(method, path, payload, headers)
+            response = connection.getresponse()
+            data = response.read()
+        except (http.client.HTTPException, OSError):
+            # 连接被服务端关闭等情况：丢弃连接，下次请求重建
+            connection.close()
+            self._local.connection = None
+            raise
+        if response.getheader('Content-Encoding') == 'gzip':
+            data = gzip.decompress(data)
+        return response.status, data
+
+
+class InProcessTarget:
+    """通过 Flask 测试客户端在进程内请求，不经过网络与 WSGI 服务器"""
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def request(self, method: str, path: str, body: Optional[Dict[str, Any]] = None) -> Tuple[int, bytes]:
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.open(path, method=method, json=body)
+        return response.status_code, response.get_data()
+
+
+class Recorder:
+    """线程安全地记录请求结果，按所在阶段汇总"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stage = 0
+        self.records: Dict[int, List[Tuple[str, float, bool]]] = {}
+
+    def record(self, endpoint: str, latency_ms: float, ok: bool) -> None:
+        with self._lock:
+            self.records.setdefault(self.stage, []).append((endpoint, latency_ms, ok))
+
+    def next_stage(self, stage: int) -> None:
+        with self._lock:
+            self.stage = stage
+
+    def stage_records(self, stage: int) -> List[Tuple[str, float, bool]]:
+        with self._lock:
+            return list(self.records.get(stage, []))
+
+
+class ParameterPool:
+    """
+    请求参数来源：首次需要时从接口响应中获取，之后所有虚拟用户共享
+    城市取自 /api/q1/cities（20 个代表性城市），热门职位可由调用方提供，
+    否则取自 /api/industry/ranking/jobs 与 Q1 散点图中的职位
+    """
+
+    def __init__(self, target, job_titles: Optional[List[str]] = None):
+        self.target = target
+        self._lock = threading.Lock()
+        self.cities: List[str] = []
+        self.job_titles: List[str] = list(job_titles or [])
+        self.boxplot_options: Dict[str, List[str]] = {}
+
+    def _get_json(self, path: str) -> Dict[str, Any]:
+        status, body = self.target.request('GET', path)
+        if status != 200:
+            return {}
+        return (json.loads(body) or {}).get('data') or {}
+
+    def representative_cities(self) -> List[str]:
+        with self._lock:
+            if not self.cities:
+                self.cities = list(self._get_json('/api/q1/cities').get('cities') or [])
+            return self.cities
+
+    def popular_job_titles(self) -> List[str]:
+        with self._lock:
+            if not self.job_titles:
+                ranking = self._get_json('/api/industry/ranking/jobs')
+                titles = [item.get('job_title') for item in ranking.get('rankings', ranking.get('jobs', []))
+                          if isinstance(item, dict)]
+                for city in self.cities[:3]:
+                    scatter = self._get_json(f"/api/q1/scatter?city={quote(city)}")
+                    titles.extend(point.get('job_title') for point in scatter.get('points', scatter.get('data', []))
+                                  if isinstance(point, dict))
+                self.job_titles = list(dict.fromkeys(title for title in titles if title))
+            return self.job_titles
+
+
+def _zipf_choice(rng: random.Random, items: List[Any], exponent: float = 1.0) -> Any:
+    """按排名幂律抽取：靠前的取值被访问得更多"""
+    weights = [1.0 / (rank + 1) ** exponent for rank in range(len(items))]
+    return rng.choices(items, weights)[0]
+
+
+class VirtualUser(threading.Thread):
+    """一个看板用户：反复选择标签页并按该页的请求序列访问"""
+
+    def __init__(self, index: int, target, pool: ParameterPool, recorder: Recorder,
+                 stop: threading.Event, think_scale: float, seed: int):
+        super().__init__(name=f'vu-{index}', daemon=True)
+        self.target = target
+        self.pool = pool
+        self.recorder = recorder
+        self.stop_event = stop
+        self.think_scale = think_scale
+        self.rng = random.Random(seed * 100003 + index)
+        self.scenarios: Dict[str, Callable[[], None]] = {
+            'q1': self.q1_tab, 'q2': self.q2_tab, 'q3': self.q3_tab, 'q5': self.q5_tab,
+        }
+
+    # ---- 请求与停顿 -------------------------------------------------------
+
+    def get(self, endpoint: str, path: str, params: Optional[Dict[str, Any]] = None,
+            method: str = 'GET', body: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """发送请求并记录延迟，endpoint 为汇总时使用的接口名"""
+        if self.stop_event.is_set():
+            return {}
+        url = f"{path}?{urlencode(params, doseq=True)}" if params else path
+        started = time.perf_counter()
+        try:
+            status, data = self.target.request(method, url, body)
+            ok = status == 200
+        except Exception as e:
+            logger.debug(f"{url} 请求失败: {e}")
+            status, data, ok = None, b'', False
+        self.recorder.record(endpoint, (time.perf_counter() - started) * 1000, ok)
+        if not ok:
+            return {}
+        try:
+            return (json.loads(data) or {}).get('data') or {}
+        except ValueError:
+            return {}
+
+    def think(self, factor: float = 1.0) -> None:
+        """停顿一段思考时间（可被停止信号打断）"""
+        seconds = self.rng.lognormvariate(math.log(THINK_MEDIAN * factor), THINK_SIGMA) * self.think_scale
+        self.stop_event.wait(seconds)
+
+    # ---- 标签页场景 -------------------------------------------------------
+
+    def q1_tab(self) -> None:
+        """Q1：加载城市与职位层级，查看某城市的散点图与行业，再切换 1-3 次城市"""
+        self.get('q1/cities', '/api/q1/cities')
+        self.get('q1/job-levels', '/api/q1/job-levels')
+        cities = self.pool.representative_cities()
+        if not cities:
+            return
+        for _ in range(1 + self.rng.randrange(3)):
+            city = _zipf_choice(self.rng, cities, 0.8)
+            self.get('q1/scatter', '/api/q1/scatter', {'city': city})
+            self.get('q1/industries', '/api/q1/industries', {'city': city})
+            self.think()
+
+    def q2_tab(self) -> None:
+        """Q2：选择 2-3 个热门职位后一次生成平行坐标、桑基图和嵌套柱状图，再点开其中一个职位"""
+        titles = self.pool.popular_job_titles()
+        if len(titles) < 2:
+            return
+        self.think(1.5)  # 输入职位
+        selected = list(dict.fromkeys(_zipf_choice(self.rng, titles) for _ in range(3)))
+        self.get('positions/parallel', '/api/positions/parallel', {'job_titles': selected})
+        if self.rng.random() < 0.5:
+            self.get('positions/sankey', '/api/positions/sankey',
+                     {'mode': 'compare', 'job_titles': selected})
+        else:
+            self.get('positions/sankey', '/api/positions/sankey', {'mode': 'all'})
+        self.get('positions/nested_bar', '/api/positions/nested_bar', {'job_titles': selected})
+        self.think()
+        self.get('positions/nested_bar', '/api/positions/nested_bar',
+                 {'job_titles': selected, 'detail_job': self.rng.choice(selected)})
+        self.think()
+
+    def q3_tab(self) -> None:
+        """Q3：三维柱状图、箱线图与平行坐标图，随后调整 1-2 次箱线图筛选条件"""
+        self.get('charts/3d', '/api/charts/3d/experience-education-salary')
+        experience = self.rng.choices([level[2] for level in EXPERIENCE_LEVELS],
+                                      [level[3] for level in EXPERIENCE_LEVELS])[0]
+        education = self.rng.choices([level[2] for level in EDUCATION_LEVELS],
+                                     [level[3] for level in EDUCATION_LEVELS])[0]
+        params = {'experience': experience, 'education': education}
+        options = self.get('charts/boxplot', '/api/charts/boxplot/salary-distribution', params)
+        self.get('charts/parallel-coordinates', '/api/charts/parallel-coordinates')
+        for _ in range(1 + self.rng.randrange(2)):
+            self.think()
+            filters = dict(params)
+            cities, company_types = options.get('cities') or [], options.get('company_types') or []
+            if cities and self.rng.random() < 0.6:
+                filters['city'] = self.rng.choice(cities)
+            elif company_types:
+                filters['company_type'] = self.rng.choice(company_types)
+            # 前端先请求未筛选的全量数据以更新选项，再请求筛选后的数据
+            self.get('charts/boxplot', '/api/charts/boxplot/salary-distribution', params)
+            self.get('charts/boxplot', '/api/charts/boxplot/salary-distribution', filters)
+
+    def q5_tab(self) -> None:
+        """Q5：职位综合排名与行业玫瑰图"""
+        self.get('industry/ranking/jobs', '/api/industry/ranking/jobs')
+        self.get('industry/trend/rose', '/api/industry/trend/rose')
+        self.think(2.0)
+
+    def run(self) -> None:
+        tabs, weights = list(TAB_WEIGHTS), list(TAB_WEIGHTS.values())
+        # 错开首个请求，避免所有用户同时到达
+        self.stop_event.wait(self.rng.random() * THINK_MEDIAN * self.think_scale)
+        while not self.stop_event.is_set():
+            self.scenarios[self.rng.choices(tabs, weights)[0]]()
+            self.think()
+
+
+def summarize_stage(users: int, seconds: float, records: List[Tuple[str, float, bool]]) -> Dict[str, Any]:
+    """汇总一个阶段的吞吐量、延迟与错误率"""
+    latencies = [latency for _, latency, _ in records]
+    errors = sum(1 for _, _, ok in records if not ok)
+    endpoints: Dict[str, List[float]] = {}
+    for endpoint, latency, _ in records:
+        endpoints.setdefault(endpoint, []).append(latency)
+    return {
+        'users': users,
+        'requests': len(records),
+        'throughput_rps': round(len(records) / seconds, 2) if seconds else 0.0,
+        'error_rate': round(errors / len(records), 4) if records else 0.0,
+        'p50_ms': round(percentile(latencies, 50), 1),
+        'p95_ms': round(percentile(latencies, 95), 1),
+        'p99_ms': round(percentile(latencies, 99), 1),
+        'endpoints': {
+            name: {'requests': len(values), 'p50_ms': round(percentile(values, 50), 1),
+                   'p95_ms': round(percentile(values, 95), 1)}
+            for name, values in sorted(endpoints.items())
+        },
+    }
+
+
+def find_saturation(stages: List[Dict[str, Any]], min_gain: float = 0.1, max_latency_growth: float = 0.5,
+                    max_error_rate: float = 0.01) -> Optional[Dict[str, Any]]:
+    """
+    判定饱和点，返回饱和前最后一个阶段（未饱和时返回 None）
+    吞吐增长按用户数增长比例折算，即用户数翻倍时要求吞吐至少增长 min_gain
+    """
+    for previous, current in zip(stages, stages[1:]):
+        if current['error_rate'] > max_error_rate:
+            return previous
+        if not previous['throughput_rps']:
+            continue
+        user_growth = current['users'] / previous['users']
+        gain = current['throughput_rps'] / previous['throughput_rps'] - 1
+        latency_growth = current['p95_ms'] / previous['p95_ms'] - 1 if previous['p95_ms'] else 0.0
+        if gain < min_gain * math.log2(user_growth) and latency_growth > max_latency_growth:
+            return previous
+    return None
+
+
+def run_load_test(target, stages: List[int], stage_seconds: float = 30.0, think_scale: float = 1.0,
+                  job_titles: Optional[List[str]] = None, seed: int = 7) -> Dict[str, Any]:
+    """
+    分阶段增加并发用户并测量，已启动的用户在后续阶段继续运行
+
+    Args:
+        target: HttpTarget 或 InProcessTarget
+        stages: 每个阶段的并发用户数（递增）
+        stage_seconds: 每个阶段的持续时间
+        think_scale: 思考时间缩放系数（1.0 为真实节奏）
+    """
+    pool = ParameterPool(target, job_titles)
+    pool.representative_cities()
+    pool.popular_job_titles()
+    recorder = Recorder()
+    stop = threading.Event()
+    users: List[VirtualUser] = []
+    results = []
+    try:
+        for index, concurrency in enumerate(stages):
+            recorder.next_stage(index)
+            while len(users) < concurrency:
+                user = VirtualUser(len(users), target, pool, recorder, stop, think_scale, seed)
+                users.append(user)
+                user.start()
+            started = time.perf_counter()
+            stop.wait(stage_seconds)
+            summary = summarize_stage(concurrency, time.perf_counter() - started, recorder.stage_records(index))
+            results.append(summary)
+            logger.info(f"{concurrency} 个用户：{summary['throughput_rps']} req/s，"
+                        f"p95 {summary['p95_ms']}ms，错误率 {summary['error_rate']:.2%}")
+    finally:
+        stop.set()
+        for user in users:
+            user.join(timeout=60)
+
+    saturation = find_saturation(results)
+    return {
+        'created_at': datetime.now().isoformat(),
+        'stage_seconds': stage_seconds,
+        'think_scale': think_scale,
+        'tab_weights': TAB_WEIGHTS,
+        'parameters': {'cities': len(pool.cities), 'job_titles': len(pool.job_titles)},
+        'stages': results,
+        'saturation': {
+            'saturated': saturation is not None,
+            'max_users': saturation['users'] if saturation else stages[-1],
+            'throughput_rps': saturation['throughput_rps'] if saturation
+            else max(stage['throughput_rps'] for stage in results),
+        },
+    }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """将压测结果格式化为吞吐/延迟曲线表"""
+    lines = [f"{'用户数':>6}{'请求数':>8}{'吞吐(req/s)':>13}{'p50':>9}{'p95':>9}{'p99':>9}{'错误率':>9}"]
+    for stage in report['stages']:
+        lines.append(f"{stage['users']:>6}{stage['requests']:>8}{stage['throughput_rps']:>13.1f}"
+                     f"{stage['p50_ms']:>9.1f}{stage['p95_ms']:>9.1f}{stage['p99_ms']:>9.1f}"
+                     f"{stage['error_rate']:>9.2%}")
+    saturation = report['saturation']
+    if saturation['saturated']:
+        lines.append(f"饱和点：{saturation['max_users']} 个并发用户，吞吐 {saturation['throughput_rps']} req/s")
+    else:
+        lines.append(f"在 {saturation['max_users']} 个并发用户内未达到饱和，最高吞吐 {saturation['throughput_rps']} req/s")
+    return '\n'.join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='看板压测')
+    parser.add_argument('--url', default='http://localhost:5001', help='服务地址')
+    parser.add_argument('--in-process', action='store_true', help='在进程内通过测试客户端请求')
+    parser.add_argument('--stages', type=int, nargs='+', default=DEFAULT_STAGES, help='各阶段并发用户数')
+    parser.add_argument('--stage-seconds', type=float, default=30.0, help='每个阶段的持续时间（秒）')
+    parser.add_argument('--think-scale', type=float, default=1.0, help='思考时间缩放系数')
+    parser.add_argument('--job-titles', nargs='*', default=None, help='Q2 使用的热门职位，默认从接口获取')
+    parser.add_argument('--seed', type=int, default=7, help='随机种子')
+    parser.add_argument('--output', default=None, help='结果输出 JSON 文件')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if args.in_process:
+        from app import create_app
+        target = InProcessTarget(create_app())
+    else:
+        target = HttpTarget(args.url)
+
+    report = run_load_test(target, sorted(args.stages), args.stage_seconds, args.think_scale,
+                           args.job_titles, args.seed)
+    print(format_report(report))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
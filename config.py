@@ -3,6 +3,11 @@
 """
 
 import os
+import tempfile
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# 本地生成的数据文件（嵌入式数据库、聚合快照、离线快照、剖析结果、基准数据集）的默认目录，位于仓库之外
+DATA_DIR = os.getenv('DATA_DIR', os.path.join(os.path.expanduser('~'), '.visual'))
 
 class Config:
     """基础配置类"""
@@ -14,6 +19,10 @@ class Config:
     DB_NAME = os.getenv('DB_NAME', 'vision')
     DB_CHARSET = 'utf8mb4'
     
+    # 数据库后端：mysql、sqlite、duckdb（嵌入式后端读取本地文件，由 python -m database.backends copy 生成）
+    DB_BACKEND = os.getenv('DB_BACKEND', 'mysql')
+    EMBEDDED_DB_PATH = os.getenv('EMBEDDED_DB_PATH', os.path.join(DATA_DIR, 'vision.sqlite3'))
+    
     # API配置
     API_HOST = os.getenv('API_HOST', '0.0.0.0')
     API_PORT = int(os.getenv('API_PORT', 5001))
@@ -22,6 +31,79 @@ class Config:
     # 日志配置
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
     
+    # 响应序列化与压缩配置
+    JSON_ENCODER = os.getenv('JSON_ENCODER', 'auto')  # auto / orjson / json
+    COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))  # 小于该字节数不压缩
+    COMPRESSION_LEVEL = int(os.getenv('COMPRESSION_LEVEL', 6))
+    RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', 300))  # 秒，0 表示关闭响应缓存
+    RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', 256))
+    
+    # 缓存后端：memory（进程内）、sqlite（本机多进程共享）、redis（Redis 或兼容服务）
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memory')
+    CACHE_SQLITE_PATH = os.getenv('CACHE_SQLITE_PATH', os.path.join(tempfile.gettempdir(), 'visual_cache.sqlite3'))
+    CACHE_MAX_BYTES = int(os.getenv('CACHE_MAX_BYTES', 256 * 1024 * 1024))  # 每个命名空间的字节上限（sqlite）
+    CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    SINGLE_FLIGHT_ENABLED = os.getenv('SINGLE_FLIGHT_ENABLED', 'True').lower() == 'true'  # 合并相同的并发查询
+    
+    # 重查询结果缓存（stale-while-revalidate）配置
+    QUERY_CACHE_TTL = int(os.getenv('QUERY_CACHE_TTL', 300))  # 新鲜期（秒），0 表示关闭
+    QUERY_CACHE_STALE_TTL = int(os.getenv('QUERY_CACHE_STALE_TTL', 600))  # 过期后仍可返回旧值的宽限期（秒）
+    QUERY_CACHE_SIZE = int(os.getenv('QUERY_CACHE_SIZE', 128))
+    QUERY_CACHE_REFRESH_INTERVAL = int(os.getenv('QUERY_CACHE_REFRESH_INTERVAL', 30))  # 热点刷新调度周期（秒）
+    QUERY_CACHE_HOT_KEYS = int(os.getenv('QUERY_CACHE_HOT_KEYS', 10))  # 每个周期主动刷新的最热键数量
+    
+    # 启动预热配置
+    WARMUP_ENABLED = os.getenv('WARMUP_ENABLED', 'True').lower() == 'true'
+    WARMUP_WORKERS = int(os.getenv('WARMUP_WORKERS', 4))  # 并行预热线程数
+    WARMUP_TOP_N = int(os.getenv('WARMUP_TOP_N', 10))  # 城市/行业/经验详情预热前N个
+    
+    # 全国数据分析批处理（python data_analysis.py）
+    ANALYSIS_WORKERS = int(os.getenv('ANALYSIS_WORKERS', 4))  # 并行执行分组查询的线程数
+    ANALYSIS_CHUNK_SIZE = int(os.getenv('ANALYSIS_CHUNK_SIZE', 50))  # 每个任务分析的城市数
+    ANALYSIS_RESULTS_PATH = os.getenv('ANALYSIS_RESULTS_PATH', os.path.join(BASE_DIR, 'analysis_results.json'))
+    # 招聘数据导入（python -m database.loader）
+    LOAD_WORKERS = int(os.getenv('LOAD_WORKERS', 4))  # 并行写入的线程数（每个线程一个连接，仅 MySQL）
+    LOAD_CHUNK_SIZE = int(os.getenv('LOAD_CHUNK_SIZE', 50000))  # 每块读取与写入的行数
+    # 增量分析的水位列：data 表中随每次导入单调递增的列（导入批次号或自增 id）
+    ANALYSIS_WATERMARK_COLUMN = os.getenv('ANALYSIS_WATERMARK_COLUMN', 'load_batch')
+    
+    # 聚合快照（mmap 只读共享的列式文件，由 python -m database.column_store build 生成）
+    COLUMN_STORE_ENABLED = os.getenv('COLUMN_STORE_ENABLED', 'True').lower() == 'true'
+    COLUMN_STORE_PATH = os.getenv('COLUMN_STORE_PATH', os.path.join(DATA_DIR, 'aggregates.vcol'))
+    # 核对快照与数据库是否一致（data 表行数与最大导入批次）的最小间隔（秒），不一致时回退到数据库查询
+    COLUMN_STORE_VERIFY_INTERVAL = float(os.getenv('COLUMN_STORE_VERIFY_INTERVAL', 60))
+    # 快照中公司基数草图（HyperLogLog）的精度：寄存器数 2^p，相对标准误差约 1.04/sqrt(2^p)
+    HLL_PRECISION = int(os.getenv('HLL_PRECISION', 14))
+    
+    # 离线快照模式：不连接 MySQL，所有查询由 python -m database.snapshot export 导出的快照应答
+    SNAPSHOT_ONLY = os.getenv('SNAPSHOT_ONLY', 'False').lower() == 'true'
+    SNAPSHOT_PATH = os.getenv('SNAPSHOT_PATH', os.path.join(DATA_DIR, 'api_snapshot.vsnap'))
+    
+    # 接口耗时统计：请求前后钩子按接口记录耗时（db / compute / serialize / compress），由 /metrics 输出
+    ROUTE_METRICS_ENABLED = os.getenv('ROUTE_METRICS_ENABLED', 'True').lower() == 'true'
+    
+    # 按需请求剖析：开启后带 X-Profile: sampling / deterministic 请求头的请求在剖析器下执行
+    PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'False').lower() == 'true'
+    PROFILING_HEADER = os.getenv('PROFILING_HEADER', 'X-Profile')
+    PROFILING_TOKEN = os.getenv('PROFILING_TOKEN', '')  # 非空时请求还须携带相同值的 X-Profile-Token 头
+    PROFILING_MODE = os.getenv('PROFILING_MODE', 'sampling')  # 请求头为 1/true 时使用的模式
+    PROFILING_INTERVAL_MS = float(os.getenv('PROFILING_INTERVAL_MS', 2))  # 采样间隔
+    PROFILING_TOP_N = int(os.getenv('PROFILING_TOP_N', 20))
+    PROFILING_KEEP = int(os.getenv('PROFILING_KEEP', 50))  # 保留的剖析结果份数
+    PROFILING_DIR = os.getenv('PROFILING_DIR', os.path.join(DATA_DIR, 'profiles'))
+    # 报告中单独列出的服务模块（三维薪资、雷达气泡与职位分析的热点循环）
+    PROFILING_FOCUS = [module.strip() for module in os.getenv(
+        'PROFILING_FOCUS',
+        'services.salary_3d_service,services.radar_bubble_service,services.position_service'
+    ).split(',') if module.strip()]
+    
+    # 查询埋点：按语句指纹统计各阶段耗时、行数与字节数；超过阈值的语句写入慢查询日志并附带 EXPLAIN
+    QUERY_METRICS_ENABLED = os.getenv('QUERY_METRICS_ENABLED', 'True').lower() == 'true'
+    SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', 500))  # 0 表示关闭慢查询日志
+    SLOW_QUERY_LOG_SIZE = int(os.getenv('SLOW_QUERY_LOG_SIZE', 100))  # 内存中保留的最近慢查询条数
+    SLOW_QUERY_LOG_PATH = os.getenv('SLOW_QUERY_LOG_PATH', '')  # 非空时同时追加写入该 JSON Lines 文件
+    SLOW_QUERY_EXPLAIN = os.getenv('SLOW_QUERY_EXPLAIN', 'True').lower() == 'true'
+    
     @classmethod
     def get_db_config(cls):
         """获取数据库配置字典"""
@@ -3,15 +3,35 @@
 """
 数据分析脚本
 用于分析招聘数据，按城市分类分析热门职业和薪资水平
+
+全国分析以批处理方式执行：城市按批划分，每批对该批全部城市各执行一次分组查询（热门职位、薪资、行业、
+薪资分布），各批在线程池中并行；完成的城市逐行追加到 <输出文件>.partial.jsonl，全部完成后原子写入结果文件
+
+增量模式（--incremental）按 data 表的水位列（ANALYSIS_WATERMARK_COLUMN，默认导入批次号 load_batch）
+只重算上次水位之后有新行写入的城市，其余城市沿用结果文件中的条目；水位只反映新增导入，
+删除或修改已有行后需执行一次全量分析。结果文件由 /api/charts/city/analysis 接口直接提供
+
+用法：
+    python data_analysis.py [--cities N] [--top-jobs N] [--workers N] [--chunk-size N] [--output 路径]
+    python data_analysis.py --incremental      # 每晚例行执行
 """
 
+import argparse
+import heapq
 import logging
-from typing import Dict, List, Tuple, Any
-from database import DatabaseManager
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Tuple, Any, Optional
+from config import config
+from database.Q3 import DatabaseManager
+from utils.histogram import histogram
 from datetime import datetime
 import json
 from decimal import Decimal
 
+import numpy as np
+
 
 class DecimalEncoder(json.JSONEncoder):
     """处理Decimal类型的JSON编码器"""
@@ -24,24 +44,116 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 logger = logging.getLogger(__name__)
 
 
+settings = config['default']
+
+# 月薪中位数、下限、上限（单位K）
+SALARY_MID = """(CAST(SUBSTRING_INDEX(salary, '-', 1) AS UNSIGNED) + 
+                 CAST(SUBSTRING_INDEX(SUBSTRING_INDEX(salary, '-', 2), '-', -1) AS UNSIGNED)) / 2"""
+SALARY_MIN = "CAST(SUBSTRING_INDEX(salary, '-', 1) AS UNSIGNED)"
+SALARY_MAX = "CAST(SUBSTRING_INDEX(SUBSTRING_INDEX(salary, '-', 2), '-', -1) AS UNSIGNED)"
+
+# 批处理的分组查询：每条对一批城市（{cities} 为占位符列表）执行一次
+BATCH_JOBS_QUERY = f"""
+    SELECT 
+        city,
+        job_title,
+        COUNT(*) as job_count,
+        AVG({SALARY_MID}) as avg_salary,
+        MIN({SALARY_MIN}) as min_salary,
+        MAX({SALARY_MAX}) as max_salary
+    FROM data
+    WHERE city IN ({{cities}})
+    AND job_title IS NOT NULL
+    AND salary IS NOT NULL
+    AND salary REGEXP '^[0-9]+-[0-9]+'
+    GROUP BY city, job_title
+"""
+
+BATCH_SALARY_QUERY = f"""
+    SELECT 
+        city,
+        COUNT(*) as total_jobs,
+        AVG({SALARY_MID}) as avg_salary,
+        MIN({SALARY_MIN}) as min_salary,
+        MAX({SALARY_MAX}) as max_salary,
+        COUNT(DISTINCT company) as company_count
+    FROM data
+    WHERE city IN ({{cities}})
+    AND salary IS NOT NULL
+    AND salary REGEXP '^[0-9]+-[0-9]+'
+    GROUP BY city
+"""
+
+BATCH_SALARY_MID_QUERY = f"""
+    SELECT 
+        city,
+        {SALARY_MID} as salary_mid
+    FROM data
+    WHERE city IN ({{cities}})
+    AND salary IS NOT NULL
+    AND salary REGEXP '^[0-9]+-[0-9]+'
+"""
+
+BATCH_INDUSTRY_QUERY = f"""
+    SELECT 
+        city,
+        company_type,
+        COUNT(*) as job_count,
+        AVG({SALARY_MID}) as avg_salary
+    FROM data
+    WHERE city IN ({{cities}})
+    AND company_type IS NOT NULL
+    AND salary IS NOT NULL
+    AND salary REGEXP '^[0-9]+-[0-9]+'
+    GROUP BY city, company_type
+"""
+
+
+def _top_groups(rows: List[Tuple], top_n: int) -> Dict[str, List[Tuple]]:
+    """按首列（城市）分组，每组取第三列（数量）最大的 top_n 行（数量相同时保持查询返回顺序）"""
+    grouped: Dict[str, List[Tuple]] = {}
+    for row in rows:
+        grouped.setdefault(row[0], []).append(row)
+    return {city: heapq.nlargest(top_n, group, key=lambda row: row[2]) for city, group in grouped.items()}
+
+
+def partial_path_for(filename: str) -> str:
+    """结果文件对应的逐城市中间结果文件"""
+    return f"{filename}.partial.jsonl"
+
+
+def load_results(filename: str) -> Optional[Dict[str, Any]]:
+    """读取上次的结果文件，不存在或无法解析时返回 None"""
+    if not os.path.exists(filename):
+        return None
+    try:
+        with open(filename, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"读取上次分析结果 {filename} 失败: {e}")
+        return None
+
+
 class DataAnalyzer:
     """数据分析器"""
     
-    def __init__(self):
-        self.db_manager = DatabaseManager('default')
+    def __init__(self, db_manager: Optional[DatabaseManager] = None):
+        self.db_manager = db_manager or DatabaseManager('default')
         self.analysis_results = {}
+        # 本次结果对应的水位 {'column': 列名, 'value': 最大值}，data 表没有水位列时为 None
+        self.watermark: Optional[Dict[str, Any]] = None
     
-    def get_city_list(self, limit: int = 50) -> List[str]:
-        """获取主要城市列表"""
-        query = """
+    def get_city_list(self, limit: Optional[int] = 50) -> List[str]:
+        """获取主要城市列表（按职位数降序，limit 为 None 时返回全部城市）"""
+        query = f"""
             SELECT city, COUNT(*) as job_count
             FROM data
             WHERE city IS NOT NULL
             GROUP BY city
             ORDER BY job_count DESC
-            LIMIT %s
+            {'LIMIT %s' if limit is not None else ''}
         """
-        results = self.db_manager.execute_query(query, (limit,))
+        results = self.db_manager.execute_query(query, (limit,) if limit is not None else None)
         return [row[0] for row in results]
     
     def analyze_city_jobs(self, city: str, top_n: int = 10) -> List[Dict[str, Any]]:
@@ -95,39 +207,8 @@ class DataAnalyzer:
         """
         overall_result = self.db_manager.execute_query(overall_query, (city,), fetch_one=True)
         
-        # 薪资分布
-        distribution_query = """
-            SELECT 
-                CASE 
-                    WHEN (CAST(SUBSTRING_INDEX(salary, '-', 1) AS UNSIGNED) + 
-                          CAST(SUBSTRING_INDEX(SUBSTRING_INDEX(salary, '-', 2), '-', -1) AS UNSIGNED)) / 2 < 5 THEN '0-5K'
-                    WHEN (CAST(SUBSTRING_INDEX(salary, '-', 1) AS UNSIGNED) + 
-                          CAST(SUBSTRING_INDEX(SUBSTRING_INDEX(salary, '-', 2), '-', -1) AS UNSIGNED)) / 2 < 10 THEN '5-10K'
-                    WHEN (CAST(SUBSTRING_INDEX(salary, '-', 1) AS UNSIGNED) + 
-                          CAST(SUBSTRING_INDEX(SUBSTRING_INDEX(salary, '-', 2), '-', -1) AS UNSIGNED)) / 2 < 15 THEN '10-15K'
-                    WHEN (CAST(SUBSTRING_INDEX(salary, '-', 1) AS UNSIGNED) + 
-                          CAST(SUBSTRING_INDEX(SUBSTRING_INDEX(salary, '-', 2), '-', -1) AS UNSIGNED)) / 2 < 25 THEN '15-25K'
-                    WHEN (CAST(SUBSTRING_INDEX(salary, '-', 1) AS UNSIGNED) + 
-                          CAST(SUBSTRING_INDEX(SUBSTRING_INDEX(salary, '-', 2), '-', -1) AS UNSIGNED)) / 2 < 35 THEN '25-35K'
-                    ELSE '35K+'
-                END as salary_range,
-                COUNT(*) as count
-            FROM data
-            WHERE city = %s
-            AND salary IS NOT NULL
-            AND salary REGEXP '^[0-9]+-[0-9]+'
-            GROUP BY salary_range
-            ORDER BY 
-                CASE salary_range
-                    WHEN '0-5K' THEN 1
-                    WHEN '5-10K' THEN 2
-                    WHEN '10-15K' THEN 3
-                    WHEN '15-25K' THEN 4
-                    WHEN '25-35K' THEN 5
-                    WHEN '35K+' THEN 6
-                END
-        """
-        distribution_results = self.db_manager.execute_query(distribution_query, (city,))
+        # 薪资分布（按城市分桶计数）
+        distribution_results = self.db_manager.get_salary_histogram('city', city)
         
         total_jobs = overall_result[0] if overall_result else 0
         salary_distribution = []
@@ -178,47 +259,207 @@ class DataAnalyzer:
         
         return industries
     
-    def analyze_all_cities(self, city_limit: int = 20, top_jobs: int = 10) -> Dict[str, Any]:
-        """分析所有主要城市"""
-        logger.info("开始分析城市数据...")
-        cities = self.get_city_list(city_limit)
-        logger.info(f"找到 {len(cities)} 个主要城市")
-        
-        all_city_analysis = {}
+    def _salary_mids(self, cities: List[str]) -> Dict[str, np.ndarray]:
+        """一批城市各自的月薪中位数升序数组（单位K），供薪资分布分桶"""
+        query = BATCH_SALARY_MID_QUERY.format(cities=','.join(['%s'] * len(cities)))
+        parts: Dict[str, List[np.ndarray]] = {}
+        for names, values in self.db_manager.iter_query(query, cities, batch_size=20000,
+                                                        column_types=(None, float), as_numpy=True):
+            for city in np.unique(names).tolist():
+                parts.setdefault(city, []).append(values[names == city])
+        return {city: np.sort(np.concatenate(arrays)) for city, arrays in parts.items()}
+    
+    @staticmethod
+    def _salary_distribution(salaries: np.ndarray, total_jobs: int) -> List[Dict[str, Any]]:
+        return [
+            {
+                'range': salary_range,
+                'count': count,
+                'percentage': round(count / total_jobs * 100, 2) if total_jobs > 0 else 0
+            }
+            for salary_range, count in histogram(salaries)
+        ]
+    
+    def _analyze_city_batch(self, cities: List[str], top_jobs: int) -> Dict[str, Dict[str, Any]]:
+        """对一批城市各执行一次分组查询，返回每个城市的分析结果"""
+        placeholders = ','.join(['%s'] * len(cities))
+        jobs = _top_groups(self.db_manager.execute_query(BATCH_JOBS_QUERY.format(cities=placeholders), cities),
+                           top_jobs)
+        industries = _top_groups(
+            self.db_manager.execute_query(BATCH_INDUSTRY_QUERY.format(cities=placeholders), cities), 5
+        )
+        salaries = {row[0]: row[1:] for row in
+                    self.db_manager.execute_query(BATCH_SALARY_QUERY.format(cities=placeholders), cities)}
+        salary_mids = self._salary_mids(cities)
+        empty = np.empty(0, dtype=np.float64)
         
-        for i, city in enumerate(cities, 1):
-            logger.info(f"正在分析 {city} ({i}/{len(cities)})...")
-            
-            # 分析热门职位
-            top_jobs_list = self.analyze_city_jobs(city, top_jobs)
-            
-            # 分析薪资水平
-            salary_info = self.analyze_city_salary(city)
-            
-            # 分析行业分布
-            industries = self.analyze_city_industry(city, 5)
-            
-            # 获取城市基本信息
-            city_basic = self.db_manager.get_city_detail(city)
-            total_jobs = city_basic['basic'][0] if city_basic['basic'] else 0
-            company_count = city_basic['basic'][2] if city_basic['basic'] else 0
-            
-            all_city_analysis[city] = {
+        results = {}
+        for city in cities:
+            total_jobs, avg_salary, min_salary, max_salary, company_count = salaries.get(city, (0, None, None, None, 0))
+            results[city] = {
                 'total_jobs': total_jobs,
                 'company_count': company_count,
-                'top_jobs': top_jobs_list,
-                'salary_analysis': salary_info,
-                'top_industries': industries
+                'top_jobs': [
+                    {
+                        'job_title': job_title,
+                        'job_count': job_count,
+                        'avg_salary': round(job_avg, 2) if job_avg else 0,
+                        'min_salary': int(job_min) if job_min else 0,
+                        'max_salary': int(job_max) if job_max else 0
+                    }
+                    for _, job_title, job_count, job_avg, job_min, job_max in jobs.get(city, [])
+                ],
+                'salary_analysis': {
+                    'total_jobs': total_jobs,
+                    'avg_salary': round(avg_salary, 2) if avg_salary else 0,
+                    'min_salary': int(min_salary) if min_salary else 0,
+                    'max_salary': int(max_salary) if max_salary else 0,
+                    'distribution': self._salary_distribution(salary_mids.get(city, empty), total_jobs)
+                },
+                'top_industries': [
+                    {
+                        'industry': company_type,
+                        'job_count': job_count,
+                        'avg_salary': round(industry_avg, 2) if industry_avg else 0
+                    }
+                    for _, company_type, job_count, industry_avg in industries.get(city, [])
+                ]
             }
+        return results
+    
+    def _analyze_cities(self, cities: List[str], top_jobs: int, workers: Optional[int] = None,
+                        chunk_size: Optional[int] = None,
+                        partial_path: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        按批并行分析给定城市
         
+        城市按 chunk_size 分批，每批对全部城市各执行一次分组查询，各批在 workers 个线程中并行。
+        partial_path 非空时每完成一批即将其城市结果逐行追加到该文件（JSON Lines），中途失败时已完成的城市不会丢失
+        """
+        workers = workers or settings.ANALYSIS_WORKERS
+        chunk_size = chunk_size or settings.ANALYSIS_CHUNK_SIZE
+        started = time.perf_counter()
+        batches = [cities[i:i + chunk_size] for i in range(0, len(cities), chunk_size)]
+        logger.info(f"分析 {len(cities)} 个城市，分为 {len(batches)} 批，并行度 {workers}")
+        
+        analyzed: Dict[str, Dict[str, Any]] = {}
+        partial = open(partial_path, 'w', encoding='utf-8') if partial_path else None
+        try:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='analysis') as executor:
+                futures = [executor.submit(self._analyze_city_batch, batch, top_jobs) for batch in batches]
+                for future in as_completed(futures):
+                    batch_results = future.result()
+                    if partial:
+                        for city, analysis in batch_results.items():
+                            partial.write(json.dumps({'city': city, 'analysis': analysis},
+                                                     ensure_ascii=False, cls=DecimalEncoder) + '\n')
+                        partial.flush()
+                    analyzed.update(batch_results)
+                    logger.info(f"已完成 {len(analyzed)}/{len(cities)} 个城市"
+                                f"（{len(analyzed) / len(cities):.0%}），"
+                                f"耗时 {time.perf_counter() - started:.1f}s")
+        finally:
+            if partial:
+                partial.close()
+        return analyzed
+    
+    def _set_results(self, cities: List[str], analyses: Dict[str, Dict[str, Any]], city_limit: Optional[int],
+                     top_jobs: int, recomputed: int) -> Dict[str, Any]:
         self.analysis_results = {
             'analysis_date': datetime.now().isoformat(),
             'total_cities_analyzed': len(cities),
-            'cities': all_city_analysis
+            'recomputed_cities': recomputed,
+            'parameters': {'city_limit': city_limit, 'top_jobs': top_jobs},
+            # 与城市列表顺序（职位数降序）一致
+            'cities': {city: analyses[city] for city in cities}
         }
-        
         return self.analysis_results
     
+    def _data_columns(self) -> List[str]:
+        """data 表的列名"""
+        with self.db_manager.get_connection() as connection:
+            cursor = connection.cursor()
+            try:
+                cursor.execute("SELECT * FROM data LIMIT 0")
+                cursor.fetchall()
+                return [column[0] for column in cursor.description]
+            finally:
+                cursor.close()
+    
+    def get_watermark(self) -> Optional[Dict[str, Any]]:
+        """data 表水位列的当前最大值，表中没有该列时返回 None"""
+        column = settings.ANALYSIS_WATERMARK_COLUMN
+        if column not in self._data_columns():
+            return None
+        row = self.db_manager.execute_query(f"SELECT MAX({column}) FROM data", fetch_one=True)
+        return {'column': column, 'value': row[0] if row and row[0] is not None else 0}
+    
+    def get_changed_cities(self, watermark: Dict[str, Any]) -> List[str]:
+        """水位之后有新行写入的城市"""
+        query = f"SELECT DISTINCT city FROM data WHERE {watermark['column']} > %s AND city IS NOT NULL"
+        return [row[0] for row in self.db_manager.execute_query(query, (watermark['value'],))]
+    
+    def analyze_all_cities(self, city_limit: Optional[int] = None, top_jobs: int = 10,
+                           workers: Optional[int] = None, chunk_size: Optional[int] = None,
+                           partial_path: Optional[str] = None) -> Dict[str, Any]:
+        """全量分析全部城市（city_limit 为 None 时）或职位数前 city_limit 个城市"""
+        logger.info("开始分析城市数据...")
+        # 先读取水位再分析：分析期间写入的行在下次增量分析时重算
+        self.watermark = self.get_watermark()
+        cities = self.get_city_list(city_limit)
+        analyses = self._analyze_cities(cities, top_jobs, workers, chunk_size, partial_path)
+        return self._set_results(cities, analyses, city_limit, top_jobs, len(cities))
+    
+    def _full_run_reason(self, previous: Optional[Dict[str, Any]], current: Optional[Dict[str, Any]],
+                         city_limit: Optional[int], top_jobs: int) -> Optional[str]:
+        """增量分析不可行的原因，可行时返回 None"""
+        if current is None:
+            return f"data 表没有水位列 {settings.ANALYSIS_WATERMARK_COLUMN}"
+        if previous is None:
+            return "没有可用的上次分析结果"
+        stored = previous.get('watermark')
+        if not stored or stored.get('column') != current['column']:
+            return "上次分析结果没有记录该水位列"
+        if current['value'] < stored['value']:
+            return "水位回退（data 表已重新导入）"
+        if previous.get('city_analysis', {}).get('parameters') != {'city_limit': city_limit, 'top_jobs': top_jobs}:
+            return "分析参数与上次不同"
+        return None
+    
+    def analyze_incremental(self, previous: Optional[Dict[str, Any]], city_limit: Optional[int] = None,
+                            top_jobs: int = 10, workers: Optional[int] = None, chunk_size: Optional[int] = None,
+                            partial_path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        增量分析：只重算上次水位之后有新行写入的城市（以及新进入前 city_limit 名的城市），其余城市沿用上次结果
+        
+        Args:
+            previous: 上次的结果文件内容（load_results 的返回值）
+        
+        Returns:
+            合并后的城市分析结果；水位未变化时返回 None（结果文件无需更新）。
+            data 表没有水位列、没有可用的上次结果、水位回退或分析参数变化时退回全量分析
+        """
+        current = self.get_watermark()
+        reason = self._full_run_reason(previous, current, city_limit, top_jobs)
+        if reason:
+            logger.info(f"执行全量分析：{reason}")
+            return self.analyze_all_cities(city_limit, top_jobs, workers, chunk_size, partial_path)
+        
+        stored = previous['watermark']
+        if current['value'] == stored['value']:
+            logger.info(f"水位未变化（{current['column']} = {current['value']}），沿用上次分析结果")
+            return None
+        
+        self.watermark = current
+        cities = self.get_city_list(city_limit)
+        cached = previous['city_analysis']['cities']
+        changed = set(self.get_changed_cities(stored))
+        stale = [city for city in cities if city in changed or city not in cached]
+        logger.info(f"水位 {current['column']}: {stored['value']} -> {current['value']}，"
+                    f"重算 {len(stale)}/{len(cities)} 个城市")
+        analyses = self._analyze_cities(stale, top_jobs, workers, chunk_size, partial_path)
+        return self._set_results(cities, {**cached, **analyses}, city_limit, top_jobs, len(stale))
+    
     def get_overall_statistics(self) -> Dict[str, Any]:
         """获取整体统计数据"""
         stats = self.db_manager.get_overview_statistics()
@@ -234,28 +475,61 @@ class DataAnalyzer:
             }
         }
     
-    def save_results(self, filename: str = 'analysis_results.json'):
-        """保存分析结果到JSON文件"""
+    def save_results(self, filename: str = settings.ANALYSIS_RESULTS_PATH):
+        """保存分析结果到JSON文件（先写临时文件再替换，读取方不会看到写了一半的文件）"""
         results = {
             'overall_statistics': self.get_overall_statistics(),
-            'city_analysis': self.analysis_results
+            'city_analysis': self.analysis_results,
+            'watermark': self.watermark
         }
         
-        with open(filename, 'w', encoding='utf-8') as f:
+        tmp_filename = f"{filename}.tmp"
+        with open(tmp_filename, 'w', encoding='utf-8') as f:
             json.dump(results, f, ensure_ascii=False, indent=2, cls=DecimalEncoder)
+        os.replace(tmp_filename, filename)
+        
+        # 结果已完整落盘，逐城市的中间结果不再需要
+        partial_filename = partial_path_for(filename)
+        if os.path.exists(partial_filename):
+            os.remove(partial_filename)
         
         logger.info(f"分析结果已保存到 {filename}")
 
 
-def main():
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='按城市分析招聘数据的热门职位、薪资与行业分布')
+    parser.add_argument('--cities', type=int, default=None, help='只分析职位数前 N 个城市（默认全部城市）')
+    parser.add_argument('--top-jobs', type=int, default=10, help='每个城市的热门职位数')
+    parser.add_argument('--workers', type=int, default=settings.ANALYSIS_WORKERS, help='并行线程数')
+    parser.add_argument('--chunk-size', type=int, default=settings.ANALYSIS_CHUNK_SIZE, help='每批分析的城市数')
+    parser.add_argument('--output', default=settings.ANALYSIS_RESULTS_PATH, help='结果文件路径')
+    parser.add_argument('--incremental', action='store_true',
+                        help='只重算水位之后有新数据的城市，并合并到已有结果文件')
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
     """主函数"""
+    args = parse_args(argv)
     analyzer = DataAnalyzer()
+    options = dict(
+        city_limit=args.cities,
+        top_jobs=args.top_jobs,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        partial_path=partial_path_for(args.output)
+    )
     
-    # 分析所有主要城市（前20个城市，每个城市前10个热门职位）
-    results = analyzer.analyze_all_cities(city_limit=20, top_jobs=10)
+    if args.incremental:
+        results = analyzer.analyze_incremental(load_results(args.output), **options)
+        if results is None:
+            logger.info("数据未变化，结果文件无需更新")
+            return None
+    else:
+        results = analyzer.analyze_all_cities(**options)
     
     # 保存结果
-    analyzer.save_results('analysis_results.json')
+    analyzer.save_results(args.output)
     
     logger.info("数据分析完成！")
     return results
@@ -4,27 +4,97 @@
 数据库操作工具类
 """
 
-import pymysql
 import logging
+import time
 from contextlib import contextmanager
-from typing import List, Tuple, Any, Optional, Dict
+from contextvars import ContextVar
+from typing import List, Tuple, Any, Optional, Dict, Iterator, Sequence, Callable
+
+import numpy as np
+
 from config import config
+from database.backends import Backend, create_backend
+from database.instrumentation import QueryTiming, create_query_metrics
+from utils.cache import create_cache, get_swr_cache, stale_while_revalidate
+from utils.histogram import DEFAULT_SPEC, HistogramSpec, bucket_counts, bucket_expression, histogram
+from utils.singleflight import get_flight
 
 logger = logging.getLogger(__name__)
 
+# 相同的并发只读查询合并为一次数据库访问
+query_flight = get_flight('query')
+
+# 重查询结果缓存：过期后在宽限期内返回旧值并后台刷新，热点键在过期前主动刷新
+_settings = config['default']
+query_cache = get_swr_cache(
+    'query',
+    maxsize=_settings.QUERY_CACHE_SIZE,
+    ttl=_settings.QUERY_CACHE_TTL,
+    stale_ttl=_settings.QUERY_CACHE_STALE_TTL,
+    refresh_interval=_settings.QUERY_CACHE_REFRESH_INTERVAL,
+    hot_keys=_settings.QUERY_CACHE_HOT_KEYS,
+    # 多进程部署时各工作进程通过共享缓存复用彼此计算的聚合结果
+    shared=create_cache('query', _settings.QUERY_CACHE_SIZE, _settings.QUERY_CACHE_TTL)
+    if _settings.CACHE_BACKEND != 'memory' else None
+)
+
+# 按语句指纹汇总的查询埋点与慢查询日志
+query_metrics = create_query_metrics(_settings)
+
+# 查询结果记录器（导出离线快照时设置），以 (查询键, 结果) 调用
+query_recorder: Optional[Callable[[tuple, Any], None]] = None
+
+
+class QueryStats:
+    """一段执行过程中的数据库往返次数与返回行数"""
+    
+    def __init__(self):
+        self.round_trips = 0
+        self.rows = 0
+    
+    def to_dict(self) -> Dict[str, int]:
+        return {'round_trips': self.round_trips, 'rows': self.rows}
+
+
+# 当前上下文的查询计数器（基准测试按请求设置），未设置时不统计
+query_stats: ContextVar[Optional[QueryStats]] = ContextVar('query_stats', default=None)
+
 class DatabaseManager:
     """数据库管理类"""
     
-    def __init__(self, config_name='default'):
+    def __init__(self, config_name='default', backend: Optional[Backend] = None):
         self.config = config[config_name]
         self.db_config = self.config.get_db_config()
+        # 数据库后端（MySQL / 嵌入式 SQLite、DuckDB），查询按后端方言转换后执行
+        self.backend = backend or create_backend(self.config)
+        # 离线快照模式：查询由快照读取器应答，不连接 MySQL
+        self.snapshot = None
+        if self.config.SNAPSHOT_ONLY:
+            from database.snapshot import load_snapshot
+            self.snapshot = load_snapshot(self.config.SNAPSHOT_PATH)
+    
+    def cache_identity(self) -> tuple:
+        """查询缓存键中的数据源标识：后端、主机、端口与库名（快照模式下为快照文件与版本）"""
+        if self.snapshot is not None:
+            return ('snapshot', self.config.SNAPSHOT_PATH, self.snapshot.data_version)
+        target = self.backend.describe()
+        return target['backend'], target['host'], target['port'], target['database']
     
     @contextmanager
     def get_connection(self):
         """获取数据库连接的上下文管理器"""
+        if self.snapshot is not None:
+            raise RuntimeError("SNAPSHOT_ONLY 模式下不连接数据库")
         connection = None
+        connections = query_metrics.connections
         try:
-            connection = pymysql.connect(**self.db_config)
+            started = time.perf_counter()
+            try:
+                connection = self.backend.connect()
+            except Exception:
+                connections.failed()
+                raise
+            connections.connected((time.perf_counter() - started) * 1000)
             yield connection
         except Exception as e:
             logger.error(f"数据库连接失败: {e}")
@@ -34,39 +104,266 @@ class DatabaseManager:
         finally:
             if connection:
                 connection.close()
+                connections.closed()
     
     def execute_query(self, query: str, params: Optional[Tuple] = None, 
                      fetch_one: bool = False, fetch_all: bool = True) -> Any:
-        """执行查询操作"""
+        """
+        执行查询操作
+        SELECT 查询按 (数据库, 规范化语句, 参数) 合并：同一查询正在执行时，其余调用等待并共享结果
+        """
+        if self.config.SINGLE_FLIGHT_ENABLED and (fetch_one or fetch_all) and self._is_read_query(query):
+            target = self.backend.describe()
+            key = (target['backend'], target['host'], target['port'], target['database'],
+                   *self.query_key(query, params, 'one' if fetch_one else 'all'))
+            result, _ = query_flight.do(key, self._execute_query, query, params, fetch_one, fetch_all)
+            return result
+        return self._execute_query(query, params, fetch_one, fetch_all)
+    
+    def _translate(self, query: str, params: Any) -> Tuple[str, Any]:
+        """按后端方言转换语句与参数"""
+        dialect = self.backend.dialect
+        return dialect.translate(query), dialect.translate_params(params)
+    
+    @staticmethod
+    def _is_read_query(query: str) -> bool:
+        """是否为只读查询（结果可在并发调用间共享）"""
+        return query.lstrip().split(None, 1)[0].upper() in ('SELECT', 'WITH', 'SHOW')
+    
+    @staticmethod
+    def _freeze(params: Any) -> Any:
+        """将查询参数转换为可哈希的形式"""
+        if isinstance(params, dict):
+            return tuple(sorted(params.items()))
+        if isinstance(params, list):
+            return tuple(params)
+        return params
+    
+    @classmethod
+    def query_key(cls, query: str, params: Any, mode: str) -> tuple:
+        """
+        查询的规范化键：(空白规范化的语句, 可哈希参数, 读取方式)
+        mode 为 one（fetchone）、all（fetchall）或 batches（fetch_batches）
+        """
+        return ' '.join(query.split()), cls._freeze(params), mode
+    
+    def _execute_query(self, query: str, params: Optional[Tuple] = None,
+                       fetch_one: bool = False, fetch_all: bool = True) -> Any:
+        """执行查询（不合并）"""
+        if self.snapshot is not None:
+            return self.snapshot.execute_query(query, params, fetch_one, fetch_all)
+        timing = QueryTiming() if query_metrics.enabled else None
+        try:
+            with self.get_connection() as connection:
+                if timing:
+                    timing.mark('connect')
+                cursor = connection.cursor()
+                try:
+                    cursor.execute(*self._translate(query, params))
+                    if timing:
+                        timing.mark('execute')
+                    if fetch_one:
+                        result = cursor.fetchone()
+                    elif fetch_all:
+                        result = cursor.fetchall()
+                    else:
+                        result = cursor.rowcount
+                    if timing:
+                        timing.mark('fetch')
+                finally:
+                    cursor.close()
+        except Exception:
+            if timing:
+                self._record_query(query, params, timing, failed=True)
+            raise
+        if timing:
+            if fetch_one or fetch_all:
+                timing.add_rows(result, single=fetch_one)
+            self._record_query(query, params, timing)
+        if not (fetch_one or fetch_all):
+            return result
+        stats = query_stats.get()
+        if stats is not None:
+            stats.round_trips += 1
+            stats.rows += (1 if result else 0) if fetch_one else len(result)
+        if query_recorder is not None:
+            query_recorder(self.query_key(query, params, 'one' if fetch_one else 'all'), result)
+        return result
+    
+    def fetch_batches(self, query: str, params: Optional[Tuple] = None,
+                      batch_size: int = 5000) -> Iterator[List[Tuple]]:
+        """
+        按批次返回查询结果（MySQL 使用服务端游标 SSCursor，fetchmany 分批读取）
+        结果集不在客户端整体缓冲，内存占用只与 batch_size 有关；
+        连接在生成器结束或关闭时释放
+        """
+        if self.snapshot is not None:
+            yield from self.snapshot.fetch_batches(query, params, batch_size)
+            return
+        recorded = [] if query_recorder is not None else None
+        stats = query_stats.get()
+        # 读取阶段只计 fetchmany 的耗时，不含调用方处理每批数据的时间
+        timing = QueryTiming() if query_metrics.enabled else None
+        failed = False
+        try:
+            with self.get_connection() as connection:
+                if timing:
+                    timing.mark('connect')
+                cursor = self.backend.stream_cursor(connection)
+                completed = False
+                try:
+                    cursor.execute(*self._translate(query, params))
+                    if timing:
+                        timing.mark('execute')
+                    if stats is not None:
+                        stats.round_trips += 1
+                    while True:
+                        rows = cursor.fetchmany(batch_size)
+                        if timing:
+                            timing.mark('fetch')
+                            timing.add_rows(rows)
+                        if not rows:
+                            break
+                        if stats is not None:
+                            stats.rows += len(rows)
+                        if recorded is not None:
+                            recorded.extend(rows)
+                        yield rows
+                        if timing:
+                            timing.resume()
+                    completed = True
+                finally:
+                    # 未读完就中止时不关闭游标：SSCursor.close 会读完剩余结果，直接关闭连接即可
+                    if completed:
+                        cursor.close()
+        except Exception:
+            failed = True
+            raise
+        finally:
+            if timing:
+                self._record_query(query, params, timing, failed=failed)
+        if recorded is not None:
+            query_recorder(self.query_key(query, params, 'batches'), tuple(recorded))
+    
+    def _explain(self, query: str, params: Any) -> List[Tuple]:
+        """查看语句在当前后端上的执行计划（慢查询日志使用）"""
+        translated, translated_params = self._translate(query, params)
         with self.get_connection() as connection:
             cursor = connection.cursor()
             try:
-                cursor.execute(query, params)
-                if fetch_one:
-                    return cursor.fetchone()
-                elif fetch_all:
-                    return cursor.fetchall()
-                else:
-                    return cursor.rowcount
+                cursor.execute(f"{self.backend.dialect.explain_prefix} {translated}", translated_params)
+                return cursor.fetchall()
             finally:
                 cursor.close()
     
+    def _record_query(self, query: str, params: Any, timing: QueryTiming, failed: bool = False) -> None:
+        """记录一次语句执行的埋点数据，只读语句超过慢查询阈值时附带执行计划"""
+        explain = self._explain if (self.config.SLOW_QUERY_EXPLAIN and not failed
+                                    and self._is_read_query(query)) else None
+        query_metrics.record(query, params, timing, failed, explain)
+    
+    @staticmethod
+    def _converter(column_type: Optional[type]) -> Callable[[Any], Any]:
+        """返回单列的类型转换函数，NULL 保持为 None"""
+        if column_type is None:
+            return lambda value: value
+        return lambda value: column_type(value) if value is not None else None
+    
+    @staticmethod
+    def _to_numpy_columns(rows: List[Tuple], column_types: Sequence[Optional[type]]) -> List[Any]:
+        """将一批行转置为按列组织的 numpy 数组，float 列中的 NULL 转为 nan"""
+        columns = list(zip(*rows))
+        arrays = []
+        for values, column_type in zip(columns, column_types):
+            if column_type is float:
+                arrays.append(np.fromiter(
+                    (float(v) if v is not None else np.nan for v in values),
+                    dtype=np.float64, count=len(values)
+                ))
+            elif column_type is int and None not in values:
+                arrays.append(np.fromiter((int(v) for v in values), dtype=np.int64, count=len(values)))
+            elif column_type is int:
+                arrays.append(np.fromiter(
+                    (float(v) if v is not None else np.nan for v in values),
+                    dtype=np.float64, count=len(values)
+                ))
+            else:
+                arrays.append(np.array(values, dtype=object))
+        return arrays
+    
+    def iter_query(self, query: str, params: Optional[Tuple] = None, batch_size: int = 5000,
+                   column_types: Optional[Sequence[Optional[type]]] = None,
+                   as_numpy: bool = False) -> Iterator[Any]:
+        """
+        以服务端游标分批迭代查询结果，便于调用方增量聚合、控制内存
+        
+        Args:
+            query: SQL语句
+            params: 查询参数
+            batch_size: 每批 fetchmany 的行数
+            column_types: 每列的目标类型（str/int/float，None 表示不转换），
+                          例如将 Decimal 转为 float
+            as_numpy: 为 True 时每批返回按列组织的 numpy 数组列表，否则返回行元组列表
+        """
+        converters = [self._converter(t) for t in column_types] if column_types else None
+        for rows in self.fetch_batches(query, params, batch_size):
+            if as_numpy:
+                yield self._to_numpy_columns(rows, column_types or [None] * len(rows[0]))
+            elif converters:
+                yield [tuple(convert(value) for convert, value in zip(converters, row)) for row in rows]
+            else:
+                yield rows
+    
     def execute_many(self, query: str, params_list: List[Tuple]) -> int:
         """批量执行操作"""
+        timing = QueryTiming() if query_metrics.enabled else None
         with self.get_connection() as connection:
+            if timing:
+                timing.mark('connect')
             cursor = connection.cursor()
+            dialect = self.backend.dialect
             try:
-                cursor.executemany(query, params_list)
+                cursor.executemany(dialect.translate(query),
+                                   [dialect.translate_params(params) for params in params_list])
                 connection.commit()
+                if timing:
+                    timing.mark('execute')
+                    self._record_query(query, params_list[:1], timing)
                 return cursor.rowcount
             except Exception as e:
                 connection.rollback()
+                if timing:
+                    timing.mark('execute')
+                    self._record_query(query, params_list[:1], timing, failed=True)
                 raise
             finally:
                 cursor.close()
     
-    def get_city_statistics(self, limit: int = 20, min_jobs: int = 0) -> List[Tuple]:
-        """获取城市统计数据"""
+    @staticmethod
+    def _distinct_sketches(approx: bool):
+        """approx 为 True 且聚合快照含基数草图时返回去重草图，否则返回 None（使用精确的 COUNT(DISTINCT)）"""
+        if not approx:
+            return None
+        from database.sketches import get_distinct_sketches
+        return get_distinct_sketches()
+
+    def _experience_labels(self) -> Dict[str, str]:
+        """经验编码 -> 标签（聚合快照中经验维度使用映射表标签）"""
+        return dict(self.execute_query("SELECT experience_code, experience_label FROM experience_mapping"))
+
+    def _experience_codes(self) -> Dict[str, str]:
+        """标签 -> 经验编码（只含一一对应的标签；不在映射表中的值在快照中保持原值）"""
+        codes: Dict[str, List[str]] = {}
+        for code, label in self._experience_labels().items():
+            codes.setdefault(label, []).append(code)
+        return {label: values[0] for label, values in codes.items() if len(values) == 1}
+
+    def get_city_statistics(self, limit: int = 20, min_jobs: int = 0, approx: bool = False) -> List[Tuple]:
+        """获取城市统计数据（approx 为 True 时由聚合快照汇总，公司数由基数草图估计，不查询 data 表）"""
+        sketches = self._distinct_sketches(approx)
+        if sketches:
+            return [(value, job_count, avg_salary, sketches.companies(city=[value]))
+                    for value, job_count, avg_salary in sketches.groups('city') if job_count >= min_jobs][:limit]
         query = """
             SELECT 
                 city,
@@ -80,13 +377,15 @@ class DatabaseManager:
             AND salary REGEXP '^[0-9]+-[0-9]+'
             GROUP BY city 
             HAVING job_count >= %s
-            ORDER BY job_count DESC 
+            ORDER BY job_count DESC, city
             LIMIT %s
         """
         return self.execute_query(query, (min_jobs, limit))
     
-    def get_city_detail(self, city_name: str) -> Dict[str, Any]:
-        """获取城市详细信息"""
+    def get_city_detail(self, city_name: str, approx: bool = False,
+                        salary_bins: Optional[HistogramSpec] = None) -> Dict[str, Any]:
+        """获取城市详细信息（approx 为 True 时基本信息由聚合快照汇总（公司数为估计值）；salary_bins 为薪资分布的分桶方式）"""
+        sketches = self._distinct_sketches(approx)
         # 基本信息
         basic_query = """
             SELECT 
@@ -101,39 +400,6 @@ class DatabaseManager:
             AND salary REGEXP '^[0-9]+-[0-9]+'
         """
         
-        # 薪资分布
-        salary_query = """
-            SELECT 
-                CASE 
-                    WHEN (CAST(SUBSTRING_INDEX(salary, '-', 1) AS UNSIGNED) + 
-                          CAST(SUBSTRING_INDEX(SUBSTRING_INDEX(salary, '-', 2), '-', -1) AS UNSIGNED)) / 2 < 5 THEN '0-5K'
-                    WHEN (CAST(SUBSTRING_INDEX(salary, '-', 1) AS UNSIGNED) + 
-                          CAST(SUBSTRING_INDEX(SUBSTRING_INDEX(salary, '-', 2), '-', -1) AS UNSIGNED)) / 2 < 10 THEN '5-10K'
-                    WHEN (CAST(SUBSTRING_INDEX(salary, '-', 1) AS UNSIGNED) + 
-                          CAST(SUBSTRING_INDEX(SUBSTRING_INDEX(salary, '-', 2), '-', -1) AS UNSIGNED)) / 2 < 15 THEN '10-15K'
-                    WHEN (CAST(SUBSTRING_INDEX(salary, '-', 1) AS UNSIGNED) + 
-                          CAST(SUBSTRING_INDEX(SUBSTRING_INDEX(salary, '-', 2), '-', -1) AS UNSIGNED)) / 2 < 25 THEN '15-25K'
-                    WHEN (CAST(SUBSTRING_INDEX(salary, '-', 1) AS UNSIGNED) + 
-                          CAST(SUBSTRING_INDEX(SUBSTRING_INDEX(salary, '-', 2), '-', -1) AS UNSIGNED)) / 2 < 35 THEN '25-35K'
-                    ELSE '35K+'
-                END as salary_range,
-                COUNT(*) as count
-            FROM data 
-            WHERE city = %s 
-            AND salary IS NOT NULL 
-            AND salary REGEXP '^[0-9]+-[0-9]+'
-            GROUP BY salary_range
-            ORDER BY 
-                CASE salary_range
-                    WHEN '0-5K' THEN 1
-                    WHEN '5-10K' THEN 2
-                    WHEN '10-15K' THEN 3
-                    WHEN '15-25K' THEN 4
-                    WHEN '25-35K' THEN 5
-                    WHEN '35K+' THEN 6
-                END
-        """
-        
         # 行业分布
         industry_query = """
             SELECT 
@@ -147,7 +413,7 @@ class DatabaseManager:
             AND salary IS NOT NULL 
             AND salary REGEXP '^[0-9]+-[0-9]+'
             GROUP BY company_type
-            ORDER BY count DESC
+            ORDER BY count DESC, company_type
             LIMIT 10
         """
         
@@ -167,15 +433,26 @@ class DatabaseManager:
             ORDER BY count DESC
         """
         
+        if sketches:
+            basic = (*sketches.totals(city=[city_name]), sketches.companies(city=[city_name]),
+                     sketches.distinct('company_type', city=[city_name]))
+        else:
+            basic = self.execute_query(basic_query, (city_name,), fetch_one=True)
+        
         return {
-            'basic': self.execute_query(basic_query, (city_name,), fetch_one=True),
-            'salary': self.execute_query(salary_query, (city_name,)),
+            'basic': basic,
+            'salary': self.get_salary_histogram('city', city_name, salary_bins),
             'industry': self.execute_query(industry_query, (city_name,)),
             'experience': self.execute_query(experience_query, (city_name,))
         }
     
-    def get_city_comparison(self, cities: List[str]) -> List[Tuple]:
-        """获取城市比较数据"""
+    def get_city_comparison(self, cities: List[str], approx: bool = False) -> List[Tuple]:
+        """获取城市比较数据（approx 为 True 时由聚合快照汇总，公司数由基数草图估计，不查询 data 表）"""
+        sketches = self._distinct_sketches(approx)
+        if sketches:
+            return [(city, job_count, avg_salary, sketches.companies(city=[city]),
+                     sketches.distinct('company_type', city=[city]))
+                    for city, job_count, avg_salary in sketches.groups('city', city=cities)]
         placeholders = ','.join(['%s'] * len(cities))
         query = f"""
             SELECT 
@@ -194,8 +471,9 @@ class DatabaseManager:
         """
         return self.execute_query(query, cities)
     
-    def get_overview_statistics(self) -> Dict[str, Any]:
-        """获取概览统计数据"""
+    def get_overview_statistics(self, approx: bool = False) -> Dict[str, Any]:
+        """获取概览统计数据（approx 为 True 时城市数、公司数由聚合快照得出）"""
+        sketches = self._distinct_sketches(approx)
         queries = {
             'total_records': "SELECT COUNT(*) FROM data",
             'total_cities': "SELECT COUNT(DISTINCT city) FROM data WHERE city IS NOT NULL",
@@ -213,13 +491,21 @@ class DatabaseManager:
         }
         
         results = {}
+        if sketches:
+            results['total_cities'] = (sketches.total_distinct('city'),)
+            results['total_companies'] = (sketches.total_companies(),)
         for key, query in queries.items():
-            results[key] = self.execute_query(query, fetch_one=True)
+            if key not in results:
+                results[key] = self.execute_query(query, fetch_one=True)
         
         return results
     
-    def get_industry_statistics(self, limit: int = 20, min_jobs: int = 0) -> List[Tuple]:
-        """获取行业统计数据"""
+    def get_industry_statistics(self, limit: int = 20, min_jobs: int = 0, approx: bool = False) -> List[Tuple]:
+        """获取行业统计数据（approx 为 True 时由聚合快照汇总，公司数由基数草图估计，不查询 data 表）"""
+        sketches = self._distinct_sketches(approx)
+        if sketches:
+            return [(value, job_count, avg_salary, sketches.companies(company_type=[value]))
+                    for value, job_count, avg_salary in sketches.groups('company_type') if job_count >= min_jobs][:limit]
         query = """
             SELECT 
                 company_type,
@@ -233,13 +519,15 @@ class DatabaseManager:
             AND salary REGEXP '^[0-9]+-[0-9]+'
             GROUP BY company_type 
             HAVING job_count >= %s
-            ORDER BY job_count DESC 
+            ORDER BY job_count DESC, company_type
             LIMIT %s
         """
         return self.execute_query(query, (min_jobs, limit))
     
-    def get_industry_detail(self, industry_name: str) -> Dict[str, Any]:
-        """获取行业详细信息"""
+    def get_industry_detail(self, industry_name: str, approx: bool = False,
+                            salary_bins: Optional[HistogramSpec] = None) -> Dict[str, Any]:
+        """获取行业详细信息（approx 为 True 时基本信息由聚合快照汇总（公司数为估计值）；salary_bins 为薪资分布的分桶方式）"""
+        sketches = self._distinct_sketches(approx)
         # 基本信息
         basic_query = """
             SELECT 
@@ -254,39 +542,6 @@ class DatabaseManager:
             AND salary REGEXP '^[0-9]+-[0-9]+'
         """
         
-        # 薪资分布
-        salary_query = """
-            SELECT 
-                CASE 
-                    WHEN (CAST(SUBSTRING_INDEX(salary, '-', 1) AS UNSIGNED) + 
-                          CAST(SUBSTRING_INDEX(SUBSTRING_INDEX(salary, '-', 2), '-', -1) AS UNSIGNED)) / 2 < 5 THEN '0-5K'
-                    WHEN (CAST(SUBSTRING_INDEX(salary, '-', 1) AS UNSIGNED) + 
-                          CAST(SUBSTRING_INDEX(SUBSTRING_INDEX(salary, '-', 2), '-', -1) AS UNSIGNED)) / 2 < 10 THEN '5-10K'
-                    WHEN (CAST(SUBSTRING_INDEX(salary, '-', 1) AS UNSIGNED) + 
-                          CAST(SUBSTRING_INDEX(SUBSTRING_INDEX(salary, '-', 2), '-', -1) AS UNSIGNED)) / 2 < 15 THEN '10-15K'
-                    WHEN (CAST(SUBSTRING_INDEX(salary, '-', 1) AS UNSIGNED) + 
-                          CAST(SUBSTRING_INDEX(SUBSTRING_INDEX(salary, '-', 2), '-', -1) AS UNSIGNED)) / 2 < 25 THEN '15-25K'
-                    WHEN (CAST(SUBSTRING_INDEX(salary, '-', 1) AS UNSIGNED) + 
-                          CAST(SUBSTRING_INDEX(SUBSTRING_INDEX(salary, '-', 2), '-', -1) AS UNSIGNED)) / 2 < 35 THEN '25-35K'
-                    ELSE '35K+'
-                END as salary_range,
-                COUNT(*) as count
-            FROM data 
-            WHERE company_type = %s 
-            AND salary IS NOT NULL 
-            AND salary REGEXP '^[0-9]+-[0-9]+'
-            GROUP BY salary_range
-            ORDER BY 
-                CASE salary_range
-                    WHEN '0-5K' THEN 1
-                    WHEN '5-10K' THEN 2
-                    WHEN '10-15K' THEN 3
-                    WHEN '15-25K' THEN 4
-                    WHEN '25-35K' THEN 5
-                    WHEN '35K+' THEN 6
-                END
-        """
-        
         # 城市分布
         city_query = """
             SELECT 
@@ -300,7 +555,7 @@ class DatabaseManager:
             AND salary IS NOT NULL 
             AND salary REGEXP '^[0-9]+-[0-9]+'
             GROUP BY city
-            ORDER BY count DESC
+            ORDER BY count DESC, city
             LIMIT 15
         """
         
@@ -320,15 +575,26 @@ class DatabaseManager:
             ORDER BY count DESC
         """
         
+        if sketches:
+            basic = (*sketches.totals(company_type=[industry_name]), sketches.companies(company_type=[industry_name]),
+                     sketches.distinct('city', company_type=[industry_name]))
+        else:
+            basic = self.execute_query(basic_query, (industry_name,), fetch_one=True)
+        
         return {
-            'basic': self.execute_query(basic_query, (industry_name,), fetch_one=True),
-            'salary': self.execute_query(salary_query, (industry_name,)),
+            'basic': basic,
+            'salary': self.get_salary_histogram('company_type', industry_name, salary_bins),
             'city': self.execute_query(city_query, (industry_name,)),
             'experience': self.execute_query(experience_query, (industry_name,))
         }
     
-    def get_industry_comparison(self, industries: List[str]) -> List[Tuple]:
-        """获取行业比较数据"""
+    def get_industry_comparison(self, industries: List[str], approx: bool = False) -> List[Tuple]:
+        """获取行业比较数据（approx 为 True 时由聚合快照汇总，公司数由基数草图估计，不查询 data 表）"""
+        sketches = self._distinct_sketches(approx)
+        if sketches:
+            return [(industry, job_count, avg_salary, sketches.companies(company_type=[industry]),
+                     sketches.distinct('city', company_type=[industry]))
+                    for industry, job_count, avg_salary in sketches.groups('company_type', company_type=industries)]
         placeholders = ','.join(['%s'] * len(industries))
         query = f"""
             SELECT 
@@ -347,8 +613,9 @@ class DatabaseManager:
         """
         return self.execute_query(query, industries)
     
-    def get_industry_overview(self) -> Dict[str, Any]:
-        """获取行业概览数据"""
+    def get_industry_overview(self, approx: bool = False) -> Dict[str, Any]:
+        """获取行业概览数据（approx 为 True 时行业数由聚合快照得出）"""
+        sketches = self._distinct_sketches(approx)
         queries = {
             'total_industries': "SELECT COUNT(DISTINCT company_type) FROM data WHERE company_type IS NOT NULL",
             'total_jobs': "SELECT COUNT(*) FROM data WHERE company_type IS NOT NULL",
@@ -371,13 +638,17 @@ class DatabaseManager:
                 AND salary IS NOT NULL 
                 AND salary REGEXP '^[0-9]+-[0-9]+'
                 GROUP BY company_type
-                ORDER BY job_count DESC
+                ORDER BY job_count DESC, company_type
                 LIMIT 10
             """
         }
         
         results = {}
+        if sketches:
+            results['total_industries'] = (sketches.total_distinct('company_type'),)
         for key, query in queries.items():
+            if key in results:
+                continue
             if key == 'top_industries':
                 results[key] = self.execute_query(query)
             else:
@@ -385,8 +656,13 @@ class DatabaseManager:
         
         return results
     
-    def get_experience_statistics(self, limit: int = 1000, min_jobs: int = 0) -> List[Tuple]:
-        """获取经验统计数据"""
+    def get_experience_statistics(self, limit: int = 1000, min_jobs: int = 0, approx: bool = False) -> List[Tuple]:
+        """获取经验统计数据（approx 为 True 时由聚合快照汇总，公司数由基数草图估计，不查询 data 表）"""
+        sketches = self._distinct_sketches(approx)
+        if sketches:
+            codes = self._experience_codes()
+            return [(codes.get(label, label), job_count, avg_salary, sketches.companies(experience=[label]))
+                    for label, job_count, avg_salary in sketches.groups('experience') if job_count >= min_jobs][:limit]
         query = """
             SELECT 
                 experience,
@@ -400,13 +676,15 @@ class DatabaseManager:
             AND salary REGEXP '^[0-9]+-[0-9]+'
             GROUP BY experience 
             HAVING job_count >= %s
-            ORDER BY job_count DESC 
+            ORDER BY job_count DESC, experience
             LIMIT %s
         """
         return self.execute_query(query, (min_jobs, limit))
     
-    def get_experience_detail(self, experience_name: str) -> Dict[str, Any]:
-        """获取经验详细信息"""
+    def get_experience_detail(self, experience_name: str, approx: bool = False,
+                              salary_bins: Optional[HistogramSpec] = None) -> Dict[str, Any]:
+        """获取经验详细信息（approx 为 True 时基本信息由聚合快照汇总（公司数为估计值）；salary_bins 为薪资分布的分桶方式）"""
+        sketches = self._distinct_sketches(approx)
         # 基本信息
         basic_query = """
             SELECT 
@@ -422,39 +700,6 @@ class DatabaseManager:
             AND salary REGEXP '^[0-9]+-[0-9]+'
         """
         
-        # 薪资分布
-        salary_query = """
-            SELECT 
-                CASE 
-                    WHEN (CAST(SUBSTRING_INDEX(salary, '-', 1) AS UNSIGNED) + 
-                          CAST(SUBSTRING_INDEX(SUBSTRING_INDEX(salary, '-', 2), '-', -1) AS UNSIGNED)) / 2 < 5 THEN '0-5K'
-                    WHEN (CAST(SUBSTRING_INDEX(salary, '-', 1) AS UNSIGNED) + 
-                          CAST(SUBSTRING_INDEX(SUBSTRING_INDEX(salary, '-', 2), '-', -1) AS UNSIGNED)) / 2 < 10 THEN '5-10K'
-                    WHEN (CAST(SUBSTRING_INDEX(salary, '-', 1) AS UNSIGNED) + 
-                          CAST(SUBSTRING_INDEX(SUBSTRING_INDEX(salary, '-', 2), '-', -1) AS UNSIGNED)) / 2 < 15 THEN '10-15K'
-                    WHEN (CAST(SUBSTRING_INDEX(salary, '-', 1) AS UNSIGNED) + 
-                          CAST(SUBSTRING_INDEX(SUBSTRING_INDEX(salary, '-', 2), '-', -1) AS UNSIGNED)) / 2 < 25 THEN '15-25K'
-                    WHEN (CAST(SUBSTRING_INDEX(salary, '-', 1) AS UNSIGNED) + 
-                          CAST(SUBSTRING_INDEX(SUBSTRING_INDEX(salary, '-', 2), '-', -1) AS UNSIGNED)) / 2 < 35 THEN '25-35K'
-                    ELSE '35K+'
-                END as salary_range,
-                COUNT(*) as count
-            FROM data 
-            WHERE experience = %s 
-            AND salary IS NOT NULL 
-            AND salary REGEXP '^[0-9]+-[0-9]+'
-            GROUP BY salary_range
-            ORDER BY 
-                CASE salary_range
-                    WHEN '0-5K' THEN 1
-                    WHEN '5-10K' THEN 2
-                    WHEN '10-15K' THEN 3
-                    WHEN '15-25K' THEN 4
-                    WHEN '25-35K' THEN 5
-                    WHEN '35K+' THEN 6
-                END
-        """
-        
         # 城市分布
         city_query = """
             SELECT 
@@ -468,7 +713,7 @@ class DatabaseManager:
             AND salary IS NOT NULL 
             AND salary REGEXP '^[0-9]+-[0-9]+'
             GROUP BY city
-            ORDER BY count DESC
+            ORDER BY count DESC, city
             LIMIT 15
         """
         
@@ -485,19 +730,33 @@ class DatabaseManager:
             AND salary IS NOT NULL 
             AND salary REGEXP '^[0-9]+-[0-9]+'
             GROUP BY company_type
-            ORDER BY count DESC
+            ORDER BY count DESC, company_type
             LIMIT 10
         """
         
+        if sketches:
+            label = [self._experience_labels().get(experience_name, experience_name)]
+            basic = (*sketches.totals(experience=label), sketches.companies(experience=label),
+                     sketches.distinct('city', experience=label), sketches.distinct('company_type', experience=label))
+        else:
+            basic = self.execute_query(basic_query, (experience_name,), fetch_one=True)
+        
         return {
-            'basic': self.execute_query(basic_query, (experience_name,), fetch_one=True),
-            'salary': self.execute_query(salary_query, (experience_name,)),
+            'basic': basic,
+            'salary': self.get_salary_histogram('experience', experience_name, salary_bins),
             'city': self.execute_query(city_query, (experience_name,)),
             'industry': self.execute_query(industry_query, (experience_name,))
         }
     
-    def get_experience_comparison(self, experiences: List[str]) -> List[Tuple]:
-        """获取经验比较数据"""
+    def get_experience_comparison(self, experiences: List[str], approx: bool = False) -> List[Tuple]:
+        """获取经验比较数据（approx 为 True 时由聚合快照汇总，公司数由基数草图估计，不查询 data 表）"""
+        sketches = self._distinct_sketches(approx)
+        if sketches:
+            labels, codes = self._experience_labels(), self._experience_codes()
+            return [(codes.get(label, label), job_count, avg_salary, sketches.companies(experience=[label]),
+                     sketches.distinct('city', experience=[label]), sketches.distinct('company_type', experience=[label]))
+                    for label, job_count, avg_salary in sketches.groups(
+                        'experience', experience=[labels.get(value, value) for value in experiences])]
         placeholders = ','.join(['%s'] * len(experiences))
         query = f"""
             SELECT 
@@ -541,7 +800,7 @@ class DatabaseManager:
                 AND salary IS NOT NULL 
                 AND salary REGEXP '^[0-9]+-[0-9]+'
                 GROUP BY experience
-                ORDER BY job_count DESC
+                ORDER BY job_count DESC, experience
                 LIMIT 10
             """,
             'experience_distribution': """
@@ -564,6 +823,67 @@ class DatabaseManager:
         
         return results
     
+    # 薪资分布可按其分组的列
+    SALARY_GROUP_COLUMNS = ('city', 'company_type', 'experience')
+    
+    def _salary_mid_query(self, column: str, value: Any = None) -> Tuple[str, Optional[Tuple]]:
+        """
+        column 取值为 value（None 时为 column 非空的全部记录）的月薪中位数（单位K，薪资区间上下限的均值）子查询。
+        按 value 的筛选在 SQL 中进行，与其他详情查询一样使用数据库的比较规则
+        （MySQL 排序规则下不区分大小写、忽略尾随空格），详情请求只读取该组的记录
+        """
+        if column not in self.SALARY_GROUP_COLUMNS:
+            raise ValueError(f"不支持按 {column} 统计薪资分布")
+        condition, params = (f"{column} = %s", (value,)) if value is not None else (f"{column} IS NOT NULL", None)
+        query = f"""
+            SELECT 
+                (CAST(SUBSTRING_INDEX(salary, '-', 1) AS UNSIGNED) + 
+                 CAST(SUBSTRING_INDEX(SUBSTRING_INDEX(salary, '-', 2), '-', -1) AS UNSIGNED)) / 2 as salary_mid
+            FROM data 
+            WHERE {condition} 
+            AND salary IS NOT NULL 
+            AND salary REGEXP '^[0-9]+-[0-9]+'
+        """
+        return query, params
+    
+    @stale_while_revalidate(query_cache)
+    def get_salary_values(self, column: str, value: Any = None) -> np.ndarray:
+        """
+        某组的月薪中位数升序数组，供分位数分桶（边界取决于全部取值）；
+        结果缓存并在调用方之间共享，调用方不应修改
+        """
+        query, params = self._salary_mid_query(column, value)
+        chunks = [salary_mid for (salary_mid,) in self.iter_query(query, params, batch_size=20000,
+                                                                   column_types=(float,), as_numpy=True)]
+        values = np.concatenate(chunks) if chunks else np.empty(0, dtype=np.float64)
+        values.sort()
+        return values
+    
+    @stale_while_revalidate(query_cache)
+    def get_salary_bucket_counts(self, column: str, value: Any = None,
+                                 edges: Tuple[float, ...] = DEFAULT_SPEC.edges) -> List[Tuple[str, int]]:
+        """某组按固定边界 edges 分桶的薪资分布 [(区间, 数量)]，在数据库中按桶序号 GROUP BY 计数"""
+        subquery, params = self._salary_mid_query(column, value)
+        query = f"""
+            SELECT {bucket_expression('salary_mid', edges)} as bucket, COUNT(*) as count
+            FROM ({subquery}) salary_mids
+            GROUP BY bucket
+        """
+        rows = self.execute_query(query, params=tuple(edges) + (params or ()))
+        return bucket_counts(rows, edges)
+    
+    def get_salary_histogram(self, column: str, value: Any = None,
+                             spec: Optional[HistogramSpec] = None) -> List[Tuple[str, int]]:
+        """
+        某组（value 为 None 时为 column 非空的全部记录）的薪资分布 [(区间, 数量)]，默认按 0-5K … 35K+ 分桶；
+        固定边界在数据库中计数，只有分位数分桶需要读取该组的全部薪资
+        """
+        spec = spec or DEFAULT_SPEC
+        if spec.quantiles is not None:
+            return histogram(self.get_salary_values(column, value), spec)
+        return self.get_salary_bucket_counts(column, value, spec.edges)
+    
+    @stale_while_revalidate(query_cache)
     def get_experience_education_salary(self) -> List[Tuple]:
         """
         获取经验-学历-薪资组合数据，用于三维柱状图
@@ -597,6 +917,23 @@ class DatabaseManager:
         根据经验、学历、城市、公司类型筛选，返回薪资分布数据
         注意：experience和education参数应该是映射后的中文标签，需要先转换为编码进行筛选
         """
+        query, params = self._build_boxplot_query(experience, education, city, company_type)
+        return self.execute_query(query, params=params)
+    
+    def iter_boxplot_data(self, experience: str = None, education: str = None,
+                          city: str = None, company_type: str = None,
+                          batch_size: int = 5000) -> Iterator[List[Any]]:
+        """
+        分批获取箱线图数据
+        每批为 [城市数组, 公司类型数组, 薪资数组(float64)] 三个 numpy 列
+        """
+        query, params = self._build_boxplot_query(experience, education, city, company_type)
+        return self.iter_query(query, params, batch_size=batch_size,
+                               column_types=(str, str, float), as_numpy=True)
+    
+    def _build_boxplot_query(self, experience: str = None, education: str = None,
+                             city: str = None, company_type: str = None) -> Tuple[str, Optional[Tuple]]:
+        """构建箱线图薪资数据查询语句"""
         # 构建WHERE条件
         conditions = []
         params = []
@@ -663,8 +1000,9 @@ class DatabaseManager:
         # 如果params是列表，转换为元组（MySQL连接器需要）
         if params and isinstance(params, list):
             params = tuple(params)
-        return self.execute_query(query, params=params if params else None)
+        return query, params if params else None
     
+    @stale_while_revalidate(query_cache)
     def get_radar_bubble_data(self) -> List[Tuple]:
         """
         获取雷达气泡图数据
@@ -686,10 +1024,11 @@ class DatabaseManager:
             AND (median_annual_salary IS NOT NULL OR 
                  (salary IS NOT NULL AND salary REGEXP '^[0-9]+-[0-9]+'))
             GROUP BY experience, city
-            ORDER BY experience, job_count DESC
+            ORDER BY experience, job_count DESC, city
         """
         return self.execute_query(query)
     
+    @stale_while_revalidate(query_cache)
     def get_parallel_coordinates_data(self) -> List[Tuple]:
         """
         获取平行坐标图数据
@@ -699,7 +1038,20 @@ class DatabaseManager:
         
         注意：直接使用数据表中的 shannon_entropy 字段，不再计算
         """
-        query = """
+        return self.execute_query(self._parallel_coordinates_query())
+    
+    def iter_parallel_coordinates_data(self, batch_size: int = 500) -> Iterator[List[Tuple]]:
+        """
+        分批获取平行坐标图数据
+        每批为已转换类型的行元组：(城市, 经验, 学历, 公司类型, 平均薪资, 平均香农熵, 岗位数)
+        """
+        return self.iter_query(self._parallel_coordinates_query(), batch_size=batch_size,
+                               column_types=(str, str, str, str, float, float, int))
+    
+    @staticmethod
+    def _parallel_coordinates_query() -> str:
+        """平行坐标图聚合查询语句"""
+        return """
             SELECT 
                 COALESCE(d.city, '未知') as city,
                 COALESCE(exp_mapping.experience_label, d.experience, '未知') as experience,
@@ -719,7 +1071,6 @@ class DatabaseManager:
                      COALESCE(exp_mapping.experience_label, d.experience, '未知'), 
                      COALESCE(edu_mapping.education_label, d.education, '未知'), 
                      COALESCE(d.company_type, '未知')
-            ORDER BY job_count DESC
+            ORDER BY job_count DESC, city, experience, education, company_type
             LIMIT 1000
-        """
-        return self.execute_query(query)
\ No newline at end of file
+        """
\ No newline at end of file
@@ -0,0 +1,516 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据库后端
+DatabaseManager 通过后端获取连接、流式游标和 SQL 方言，查询语句本身保持 MySQL 写法：
+- mysql: pymysql 连接 MySQL（默认）
+- sqlite: 本地 SQLite 文件，方言将 SUBSTRING_INDEX / REGEXP / CAST 等改写为原生表达式，
+  无法改写的写法调用注册的 Python 实现
+- duckdb: 本地 DuckDB 文件（需安装 duckdb，版本见 requirements-test.txt），列式执行，适合单机聚合查询
+
+嵌入式后端的数据文件由 copy 命令从 MySQL 复制，compare 命令对比两个后端的查询结果（含各服务的查询）：
+    python -m database.backends copy --backend sqlite [--path 文件]
+    python -m database.backends compare --backend sqlite [--path 文件]
+方言改写与服务查询在嵌入式后端上的等价性由 python -m pytest tests 检查，不需要 MySQL
+"""
+
+import argparse
+import dataclasses
+import importlib
+import logging
+import math
+import os
+import re
+import sqlite3
+from abc import ABC, abstractmethod
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, List, Optional, Tuple
+
+import pymysql
+
+from config import config
+from database.dialect import Dialect, get_dialect
+from utils.cache import bypass_swr_cache
+
+try:
+    import duckdb
+except ImportError:  # pragma: no cover - 可选依赖
+    duckdb = None
+
+logger = logging.getLogger(__name__)
+
+# 嵌入式后端需要的数据表
+TABLES = [
+    'data',
+    'job_summary_by_title',
+    'job_summary',
+    'national_industry_stats',
+    'job_city_distribution',
+    'experience_mapping',
+    'education_mapping',
+]
+
+
+# ---------------------------------------------------------------------------
+# MySQL 函数的 Python 实现（SQLite / DuckDB 注册为自定义函数，方言无法原生改写时使用，
+# 也是 native_functions=False 时的 MySQL 语义参照）
+# ---------------------------------------------------------------------------
+
+_LEADING_NUMBER_RE = re.compile(r'^\s*([+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)')
+
+
+def _leading_number(value: Any) -> Optional[Decimal]:
+    """按 MySQL 隐式转换规则取字符串的前导数字，无数字时为 0，NULL 保持为 None"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float, Decimal)):
+        return Decimal(str(value))
+    if isinstance(value, bytes):
+        value = value.decode('utf-8', 'replace')
+    match = _LEADING_NUMBER_RE.match(str(value))
+    if not match:
+        return Decimal(0)
+    try:
+        return Decimal(match.group(1))
+    except InvalidOperation:
+        return Decimal(0)
+
+
+def mysql_unsigned(value: Any) -> Optional[int]:
+    """CAST(x AS UNSIGNED)：截取前导数字并向零取整（负数与 MySQL 一样按 0 处理）"""
+    number = _leading_number(value)
+    if number is None:
+        return None
+    return max(int(number), 0)
+
+
+def mysql_signed(value: Any) -> Optional[int]:
+    """CAST(x AS SIGNED)"""
+    number = _leading_number(value)
+    return None if number is None else int(number)
+
+
+def mysql_decimal(value: Any, scale: int) -> Optional[float]:
+    """CAST(x AS DECIMAL(p,s))：按 s 位小数四舍五入（ROUND_HALF_UP，与 MySQL 一致）"""
+    number = _leading_number(value)
+    if number is None:
+        return None
+    return float(number.quantize(Decimal(1).scaleb(-int(scale)), rounding='ROUND_HALF_UP'))
+
+
+def substring_index(value: Any, delimiter: Any, count: Any) -> Optional[str]:
+    """SUBSTRING_INDEX(str, delim, count)"""
+    if value is None or delimiter is None or count is None:
+        return None
+    value, delimiter, count = str(value), str(delimiter), int(count)
+    if not delimiter or count == 0:
+        return ''
+    parts = value.split(delimiter)
+    if count > 0:
+        return delimiter.join(parts[:count])
+    return delimiter.join(parts[count:])
+
+
+_regex_cache: Dict[str, 're.Pattern'] = {}
+
+
+def regexp(pattern: Any, value: Any) -> Optional[int]:
+    """SQLite 的 x REGEXP p 调用 regexp(p, x)，与 MySQL 一样不区分大小写"""
+    if pattern is None or value is None:
+        return None
+    compiled = _regex_cache.get(pattern)
+    if compiled is None:
+        compiled = _regex_cache[pattern] = re.compile(pattern, re.IGNORECASE)
+    return 1 if compiled.search(str(value)) else 0
+
+
+class GroupConcat:
+    """GROUP_CONCAT([DISTINCT] x ORDER BY y [DESC] SEPARATOR s) 的 SQLite 聚合实现"""
+
+    def __init__(self):
+        self.items: List[Tuple[Any, str]] = []
+        self.separator = ','
+        self.distinct = False
+        self.descending = False
+
+    def step(self, value, order_value, separator, distinct, descending):
+        self.separator, self.distinct, self.descending = separator, bool(distinct), bool(descending)
+        if value is not None:
+            self.items.append((order_value, str(value)))
+
+    def finalize(self):
+        if not self.items:
+            return None
+        items = self.items
+        if self.distinct:
+            items = list({value: (order, value) for order, value in items}.values())
+        items.sort(key=lambda item: (item[0] is None, item[0]), reverse=self.descending)
+        return self.separator.join(value for _, value in items)
+
+
+# ---------------------------------------------------------------------------
+# 后端
+# ---------------------------------------------------------------------------
+
+class Backend(ABC):
+    """后端基类"""
+
+    name = 'base'
+
+    def __init__(self):
+        self.dialect: Dialect = get_dialect(self.name)
+
+    @abstractmethod
+    def connect(self):
+        """创建一个新连接"""
+
+    def stream_cursor(self, connection):
+        """用于分批读取大结果集的游标"""
+        return connection.cursor()
+
+    @abstractmethod
+    def describe(self) -> Dict[str, Any]:
+        """后端信息（用于单飞键与日志）"""
+
+
+class MySQLBackend(Backend):
+    """pymysql 连接 MySQL"""
+
+    name = 'mysql'
+
+    def __init__(self, db_config: Dict[str, Any]):
+        super().__init__()
+        self.db_config = db_config
+
+    def connect(self):
+        return pymysql.connect(**self.db_config)
+
+    def stream_cursor(self, connection):
+        # 服务端游标：结果集不在客户端整体缓冲
+        return connection.cursor(pymysql.cursors.SSCursor)
+
+    def describe(self) -> Dict[str, Any]:
+        return {'backend': self.name, 'host': self.db_config['host'],
+                'port': self.db_config['port'], 'database': self.db_config['database']}
+
+
+class SQLiteBackend(Backend):
+    """本地 SQLite 文件，每次查询使用独立连接（与 MySQL 后端的连接方式一致）"""
+
+    name = 'sqlite'
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+
+    def connect(self):
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.create_function('substring_index', 3, substring_index, deterministic=True)
+        connection.create_function('regexp', 2, regexp, deterministic=True)
+        connection.create_function('mysql_unsigned', 1, mysql_unsigned, deterministic=True)
+        connection.create_function('mysql_signed', 1, mysql_signed, deterministic=True)
+        connection.create_function('mysql_decimal', 2, mysql_decimal, deterministic=True)
+        connection.create_aggregate('mysql_group_concat', 5, GroupConcat)
+        connection.execute('PRAGMA cache_size = -65536')  # 64MB 页缓存
+        return connection
+
+    def describe(self) -> Dict[str, Any]:
+        return {'backend': self.name, 'host': '', 'port': 0, 'database': os.path.abspath(self.path)}
+
+
+class DuckDBBackend(Backend):
+    """本地 DuckDB 文件（需安装 duckdb）"""
+
+    name = 'duckdb'
+
+    def __init__(self, path: str, read_only: bool = True):
+        if duckdb is None:
+            raise RuntimeError("DB_BACKEND=duckdb 需要安装 duckdb")
+        super().__init__()
+        self.path = path
+        self.read_only = read_only
+
+    def connect(self):
+        connection = duckdb.connect(self.path, read_only=self.read_only)
+        _set_session_options(connection)
+        connection.create_function('substring_index', substring_index,
+                                   ['VARCHAR', 'VARCHAR', 'BIGINT'], 'VARCHAR', null_handling='special')
+        connection.create_function('mysql_unsigned', mysql_unsigned, ['VARCHAR'], 'BIGINT',
+                                   null_handling='special')
+        connection.create_function('mysql_signed', mysql_signed, ['VARCHAR'], 'BIGINT',
+                                   null_handling='special')
+        connection.create_function('mysql_decimal', mysql_decimal, ['VARCHAR', 'INTEGER'], 'DOUBLE',
+                                   null_handling='special')
+        return _DuckDBConnection(connection)
+
+    def describe(self) -> Dict[str, Any]:
+        return {'backend': self.name, 'host': '', 'port': 0, 'database': os.path.abspath(self.path)}
+
+
+def _set_session_options(connection) -> None:
+    """DuckDB 会话设置（每个游标是独立的会话，需分别设置）：除数为 0 时与 MySQL 一样返回 NULL"""
+    connection.execute('SET ieee_floating_point_ops = false')
+
+
+class _DuckDBConnection:
+    """DuckDB 连接的 DB-API 适配：cursor() 返回独立游标，其余方法直接转发"""
+
+    def __init__(self, connection):
+        self._connection = connection
+
+    def cursor(self):
+        cursor = self._connection.cursor()
+        _set_session_options(cursor)
+        return cursor
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+
+def create_backend(settings=None) -> Backend:
+    """按配置 DB_BACKEND 创建后端"""
+    settings = settings or config['default']
+    name = settings.DB_BACKEND
+    if name == 'mysql':
+        return MySQLBackend(settings.get_db_config())
+    if name == 'sqlite':
+        return SQLiteBackend(settings.EMBEDDED_DB_PATH)
+    if name == 'duckdb':
+        return DuckDBBackend(settings.EMBEDDED_DB_PATH)
+    raise ValueError(f"未知的数据库后端: {name}")
+
+
+# ---------------------------------------------------------------------------
+# 数据复制与结果对比
+# ---------------------------------------------------------------------------
+
+def _column_type(mysql_type: str) -> str:
+    mysql_type = mysql_type.lower()
+    if 'int' in mysql_type:
+        return 'BIGINT'
+    if any(name in mysql_type for name in ('decimal', 'float', 'double', 'numeric')):
+        return 'DOUBLE'
+    return 'TEXT'
+
+
+def copy_tables(source: MySQLBackend, target: Backend, tables: Optional[List[str]] = None,
+                batch_size: int = 5000) -> Dict[str, int]:
+    """
+    将 MySQL 中的数据表复制到嵌入式后端（目标表存在时先删除）
+
+    Returns:
+        {表名: 行数}
+    """
+    counts: Dict[str, int] = {}
+    source_connection = source.connect()
+    target_connection = target.connect()
+    placeholder = '?'
+    try:
+        for table in tables or TABLES:
+            with source_connection.cursor() as cursor:
+                cursor.execute(f"SHOW COLUMNS FROM `{table}`")
+                columns = [(row[0], _column_type(row[1])) for row in cursor.fetchall()]
+            names = ', '.join(f'"{name}"' for name, _ in columns)
+            definitions = ', '.join(f'"{name}" {column_type}' for name, column_type in columns)
+            target_connection.execute(f'DROP TABLE IF EXISTS "{table}"')
+            target_connection.execute(f'CREATE TABLE "{table}" ({definitions})')
+            insert = (f'INSERT INTO "{table}" ({names}) '
+                      f'VALUES ({", ".join([placeholder] * len(columns))})')
+
+            count = 0
+            cursor = source.stream_cursor(source_connection)
+            try:
+                cursor.execute(f"SELECT {', '.join(f'`{name}`' for name, _ in columns)} FROM `{table}`")
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    target_connection.executemany(insert, [
+                        tuple(float(v) if isinstance(v, Decimal) else v for v in row) for row in rows
+                    ])
+                    count += len(rows)
+            finally:
+                cursor.close()
+            target_connection.commit()
+            counts[table] = count
+            logger.info(f"已复制 {table}: {count} 行")
+    finally:
+        source_connection.close()
+        target_connection.close()
+    return counts
+
+
+def _top_values(manager, column: str, limit: int) -> List[str]:
+    """参考库中出现次数最多的若干个取值（详情、对比等查询的参数随数据集而定）"""
+    rows = manager.execute_query(
+        f"SELECT {column}, COUNT(*) AS c FROM data WHERE {column} IS NOT NULL "
+        f"GROUP BY {column} ORDER BY c DESC, {column} LIMIT %s", (limit,))
+    return [row[0] for row in rows]
+
+
+def _top_value(column: str):
+    return lambda manager: tuple(_top_values(manager, column, 1))
+
+
+def _top_list(column: str, limit: int = 3):
+    return lambda manager: (_top_values(manager, column, limit),)
+
+
+# 对比用的查询：(方法名, 参数)，参数为可调用对象时以参考库的 DatabaseManager 求值
+COMPARE_CALLS: List[Tuple[str, Any]] = [
+    ('get_overview_statistics', ()),
+    ('get_city_statistics', (20, 0)),
+    ('get_city_detail', _top_value('city')),
+    ('get_city_comparison', _top_list('city')),
+    ('get_industry_statistics', (20, 0)),
+    ('get_industry_detail', _top_value('company_type')),
+    ('get_industry_comparison', _top_list('company_type')),
+    ('get_experience_statistics', (1000, 0)),
+    ('get_experience_detail', _top_value('experience')),
+    ('get_experience_comparison', _top_list('experience')),
+    ('get_industry_overview', ()),
+    ('get_experience_overview', ()),
+    ('get_experience_education_salary', ()),
+    ('get_boxplot_data', ()),
+    ('get_radar_bubble_data', ()),
+    ('get_parallel_coordinates_data', ()),
+]
+
+
+# 服务层查询：(服务类路径, 方法名, 参数)，参数为可调用对象时以参考库的 DatabaseManager 求值
+SERVICE_COMPARE_CALLS: List[Tuple[str, str, Any]] = [
+    ('services.city_service.CityService', 'get_city_detail', _top_value('city')),
+    ('services.city_service.CityService', 'compare_cities', _top_list('city')),
+    ('services.industry_service.IndustryService', 'get_industry_detail', _top_value('company_type')),
+    ('services.industry_service.IndustryService', 'compare_industries', _top_list('company_type')),
+    ('services.industry_service.IndustryService', 'get_industry_overview', ()),
+    ('services.experience_service.ExperienceService', 'get_experience_detail', _top_value('experience')),
+    ('services.experience_service.ExperienceService', 'compare_experiences', _top_list('experience')),
+    ('services.experience_service.ExperienceService', 'get_experience_overview', ()),
+    ('services.position_service.PositionService', 'get_sankey_data', ()),
+    ('services.position_service.PositionService', 'get_parallel_coordinates_data', _top_list('job_title')),
+    ('services.position_service.PositionService', 'get_nested_bar_data', _top_list('job_title')),
+    ('services.q1_service.Q1Service', 'get_representative_cities', (20,)),
+    ('services.q1_service.Q1Service', 'get_scatter_data', _top_value('city')),
+    ('services.q1_service.Q1Service', 'get_job_levels', ()),
+    ('services.q1_service.Q1Service', 'get_industries', ()),
+    ('services.trend_service.TrendService', 'get_job_ranking', (5,)),
+    ('services.trend_service.TrendService', 'get_industry_trend_rose', ()),
+    ('services.radar_bubble_service.RadarBubbleService', 'get_radar_bubble_statistics', ()),
+    ('services.radar_bubble_service.RadarBubbleService', 'get_parallel_coordinates_statistics', ()),
+]
+
+
+def _normalize(value: Any, places: int) -> Any:
+    """将结果规范化为可比较的形式：数值统一为按精度四舍五入的 float，容器递归处理"""
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (int, float, Decimal)):
+        number = float(value)
+        return None if math.isnan(number) else round(number, places)
+    if isinstance(value, bytes):
+        return value.decode('utf-8', 'replace')
+    if isinstance(value, dict):
+        return {key: _normalize(item, places) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item, places) for item in value]
+    return value
+
+
+def results_equivalent(expected: Any, actual: Any, places: int = 2, ordered: bool = False) -> bool:
+    """
+    判断两个后端的查询结果是否等价
+    数值按 places 位小数比较；ordered 为 False 时行的先后顺序不影响结果
+    （排序键相同的行在不同引擎中顺序可能不同）
+    """
+    expected, actual = _normalize(expected, places), _normalize(actual, places)
+    if ordered or not isinstance(expected, list) or not isinstance(actual, list):
+        return expected == actual
+    return sorted(map(repr, expected)) == sorted(map(repr, actual))
+
+
+def _service(path: str, manager):
+    """按 "模块.类名" 创建以 manager 为数据源的服务实例"""
+    module, name = path.rsplit('.', 1)
+    return getattr(importlib.import_module(module), name)(manager)
+
+
+def _as_comparable(value: Any) -> Any:
+    """服务返回的 dataclass 转换为字典后再比较"""
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+    if isinstance(value, list):
+        return [_as_comparable(item) for item in value]
+    return value
+
+
+def compare_backends(reference, candidate, calls: Optional[List[Tuple[str, Any]]] = None,
+                     places: int = 2,
+                     service_calls: Optional[List[Tuple[str, str, Any]]] = None) -> List[Dict[str, Any]]:
+    """
+    在两个 DatabaseManager 上调用相同的查询方法（及以其为数据源的服务方法）并对比结果
+    对比期间绕过 SWR 查询缓存，两侧的结果均来自实际执行的查询
+
+    Returns:
+        每个调用的对比结果列表
+    """
+    targets = [(method, args, reference, candidate) for method, args in (calls or COMPARE_CALLS)]
+    for path, method, args in (SERVICE_COMPARE_CALLS if service_calls is None else service_calls):
+        targets.append((f"{path.rsplit('.', 1)[1]}.{method}", args,
+                        _service(path, reference), _service(path, candidate)))
+
+    report = []
+    with bypass_swr_cache():
+        for name, args, expected_target, actual_target in targets:
+            method = name.rsplit('.', 1)[-1]
+            entry: Dict[str, Any] = {'method': name}
+            try:
+                if callable(args):
+                    args = args(reference)
+                entry['args'] = list(args)
+                expected = _as_comparable(getattr(expected_target, method)(*args))
+                actual = _as_comparable(getattr(actual_target, method)(*args))
+                entry['equivalent'] = results_equivalent(expected, actual, places)
+                entry['rows'] = len(expected) if isinstance(expected, (list, tuple)) else 1
+            except Exception as e:
+                entry['equivalent'] = False
+                entry['error'] = str(e)
+            report.append(entry)
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='嵌入式数据库后端工具')
+    parser.add_argument('command', choices=['copy', 'compare'], help='copy 从 MySQL 复制数据，compare 对比查询结果')
+    parser.add_argument('--backend', choices=['sqlite', 'duckdb'], default='sqlite', help='嵌入式后端类型')
+    parser.add_argument('--path', default=None, help='嵌入式数据库文件路径，默认 EMBEDDED_DB_PATH')
+    parser.add_argument('--tables', nargs='*', default=None, help='要复制的数据表，默认全部')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    settings = config['default']
+    path = args.path or settings.EMBEDDED_DB_PATH
+    source = MySQLBackend(settings.get_db_config())
+
+    if args.command == 'copy':
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        target = SQLiteBackend(path) if args.backend == 'sqlite' else DuckDBBackend(path, read_only=False)
+        for table, count in copy_tables(source, target, args.tables).items():
+            print(f"{table:<28} {count:>10} 行")
+        return
+
+    from database.Q3 import DatabaseManager
+    reference = DatabaseManager('default', backend=source)
+    candidate_backend = SQLiteBackend(path) if args.backend == 'sqlite' else DuckDBBackend(path)
+    candidate = DatabaseManager('default', backend=candidate_backend)
+    report = compare_backends(reference, candidate)
+    for entry in report:
+        mark = '✓' if entry['equivalent'] else '✗'
+        print(f"  {mark} {entry['method']:<56} {entry.get('error', '')}")
+    failed = sum(1 for entry in report if not entry['equivalent'])
+    print(f"{len(report) - failed}/{len(report)} 个查询结果一致")
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,469 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+data 表聚合快照（列式二进制文件）
+一次性将 data 表的字典编码列、按城市/公司类型排序的薪资数组、多维聚合立方体及其公司基数草图
+（见 database.sketches）写入带版本的二进制文件，
+各工作进程以只读 mmap 方式打开：数组直接映射自文件页缓存，进程间共享物理内存，新进程无需加载即可使用
+
+文件格式（小端）：
+    8 字节魔数 | uint32 格式版本 | uint32 头部长度 | JSON 头部 | 按 64 字节对齐的各数组数据
+JSON 头部记录数据版本、行数、构建时的数据签名、字典以及每个数组的 dtype / 偏移 / 长度
+进程定期将数据签名与数据库当前的签名核对，不一致（快照过期）时不使用快照
+
+用法：
+    python -m database.column_store build [--output 路径]
+    python -m database.column_store info [--output 路径]
+"""
+
+import argparse
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+settings = config['default']
+
+MAGIC = b'VISCOLS\x00'
+FORMAT_VERSION = 2
+ALIGNMENT = 64
+_PREAMBLE = struct.Struct('<8sII')
+
+# 字典编码列（NULL 编码为 -1）
+DICTIONARY_COLUMNS = ('city', 'company_type', 'experience', 'education')
+
+# 立方体维度
+CUBE_DIMENSIONS = DICTIONARY_COLUMNS
+
+# 经验、学历使用映射表中的中文标签；薪资为中位数（单位K），无效薪资为 NULL；
+# range_salary 为统计接口使用的区间中值，只对 salary 为区间格式的记录（与统计查询的过滤条件相同）非 NULL
+SNAPSHOT_QUERY = """
+    SELECT
+        d.city,
+        d.company_type,
+        COALESCE(exp_mapping.experience_label, d.experience) as experience,
+        COALESCE(edu_mapping.education_label, d.education) as education,
+        CASE WHEN d.median_annual_salary IS NOT NULL OR
+                  (d.salary IS NOT NULL AND d.salary REGEXP '^[0-9]+-[0-9]+')
+             THEN COALESCE(d.median_annual_salary,
+                  (CAST(SUBSTRING_INDEX(d.salary, '-', 1) AS UNSIGNED) +
+                   CAST(SUBSTRING_INDEX(SUBSTRING_INDEX(d.salary, '-', 2), '-', -1) AS UNSIGNED)) / 2)
+        END as salary,
+        CASE WHEN d.salary IS NOT NULL AND d.salary REGEXP '^[0-9]+-[0-9]+'
+             THEN (CAST(SUBSTRING_INDEX(d.salary, '-', 1) AS UNSIGNED) +
+                   CAST(SUBSTRING_INDEX(SUBSTRING_INDEX(d.salary, '-', 2), '-', -1) AS UNSIGNED)) / 2
+        END as range_salary,
+        d.shannon_entropy,
+        d.company
+    FROM data d
+    LEFT JOIN experience_mapping exp_mapping ON d.experience = exp_mapping.experience_code
+    LEFT JOIN education_mapping edu_mapping ON d.education = edu_mapping.education_code
+"""
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def write_snapshot(path: str, arrays: Dict[str, np.ndarray], dictionaries: Dict[str, List[Any]],
+                   meta: Dict[str, Any]) -> str:
+    """
+    写入快照文件：先写临时文件再原子替换，正在读取旧版本的进程不受影响（旧映射保持有效）
+
+    Args:
+        path: 目标文件路径
+        arrays: 数组名 -> 一维 numpy 数组
+        dictionaries: 字典编码列的取值列表
+        meta: 其他写入头部的信息（如 data_version、rows）
+    """
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+    layout: Dict[str, Dict[str, Any]] = {}
+    offset = 0
+    for name, array in arrays.items():
+        layout[name] = {'dtype': array.dtype.str, 'offset': offset, 'length': int(array.size)}
+        offset = _align(offset + array.nbytes)
+
+    header = dict(meta, format_version=FORMAT_VERSION, arrays=layout, dictionaries=dictionaries)
+    header_bytes = json.dumps(header, ensure_ascii=False, default=str).encode('utf-8')
+    data_start = _align(_PREAMBLE.size + len(header_bytes))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name]['offset'])
+            f.write(array.tobytes())
+        f.truncate(data_start + offset)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return path
+
+
+class ColumnStore:
+    """只读 mmap 打开的聚合快照，数组为指向文件映射的零拷贝视图"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, header_length = _PREAMBLE.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} 不是聚合快照文件")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"快照格式版本 {version} 与当前版本 {FORMAT_VERSION} 不兼容")
+        self.header: Dict[str, Any] = json.loads(
+            self._mmap[_PREAMBLE.size:_PREAMBLE.size + header_length].decode('utf-8')
+        )
+        self._data_start = _align(_PREAMBLE.size + header_length)
+        self._arrays: Dict[str, np.ndarray] = {}
+        self._codes: Dict[str, Dict[Any, int]] = {}
+
+    @property
+    def data_version(self) -> str:
+        return self.header.get('data_version', '')
+
+    @property
+    def source_signature(self) -> Optional[List[int]]:
+        """构建时 data 表的数据签名，旧版本快照没有记录时为 None"""
+        return self.header.get('source_signature')
+
+    @property
+    def rows(self) -> int:
+        return self.header.get('rows', 0)
+
+    @property
+    def dictionaries(self) -> Dict[str, List[Any]]:
+        return self.header['dictionaries']
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.header['arrays']
+
+    def array(self, name: str) -> np.ndarray:
+        """按名称获取只读数组"""
+        array = self._arrays.get(name)
+        if array is None:
+            spec = self.header['arrays'][name]
+            array = np.frombuffer(self._mmap, dtype=np.dtype(spec['dtype']), count=spec['length'],
+                                  offset=self._data_start + spec['offset'])
+            self._arrays[name] = array
+        return array
+
+    def code_of(self, column: str, value: Any) -> int:
+        """取值对应的字典编码，不存在时返回 -2（不会与任何行匹配）"""
+        codes = self._codes.get(column)
+        if codes is None:
+            codes = self._codes[column] = {v: i for i, v in enumerate(self.dictionaries[column])}
+        return codes.get(value, -2)
+
+    def _group_sorted(self, column: str, rows: np.ndarray, salaries: np.ndarray) -> Dict[str, np.ndarray]:
+        """按列分组，组内薪资升序"""
+        codes = self.array(column)[rows]
+        order = np.lexsort((salaries, codes))
+        codes, salaries = codes[order], salaries[order]
+        uniques, starts = np.unique(codes, return_index=True)
+        names = self.dictionaries[column]
+        return {names[code]: part for code, part in zip(uniques.tolist(), np.split(salaries, starts[1:]))}
+
+    def _presorted_groups(self, column: str) -> Dict[str, np.ndarray]:
+        """直接使用快照中预排序的薪资数组（无筛选条件时）"""
+        salaries = self.array(f'{column}_sorted_salary')
+        offsets = self.array(f'{column}_sorted_offsets')
+        names = self.dictionaries[column]
+        return {
+            names[code]: salaries[offsets[code]:offsets[code + 1]]
+            for code in range(len(names)) if offsets[code + 1] > offsets[code]
+        }
+
+    def boxplot_groups(self, experience: str = None, education: str = None, city: str = None,
+                       company_type: str = None) -> Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]]:
+        """
+        箱线图分组薪资：返回 (城市 -> 升序薪资数组, 公司类型 -> 升序薪资数组)
+        只包含城市、公司类型非空且薪资有效（非NULL、非0）的记录
+        """
+        if not any((experience, education, city, company_type)):
+            return self._presorted_groups('city'), self._presorted_groups('company_type')
+
+        mask = self.array('boxplot_valid').view(np.bool_).copy()
+        for column, value in (('experience', experience), ('education', education),
+                              ('city', city), ('company_type', company_type)):
+            if value:
+                mask &= self.array(column) == self.code_of(column, value)
+        rows = np.flatnonzero(mask)
+        salaries = self.array('salary')[rows]
+        return self._group_sorted('city', rows, salaries), self._group_sorted('company_type', rows, salaries)
+
+    def close(self) -> None:
+        self._arrays.clear()
+        try:
+            self._mmap.close()
+        except BufferError:
+            # 仍有数组视图被外部引用时由垃圾回收释放映射
+            pass
+
+
+class _DictionaryEncoder:
+    """增量字典编码器"""
+
+    def __init__(self):
+        self.values: List[Any] = []
+        self._codes: Dict[Any, int] = {}
+
+    def encode(self, values: Iterable[Any]) -> np.ndarray:
+        codes = []
+        for value in values:
+            if value is None:
+                codes.append(-1)
+                continue
+            code = self._codes.get(value)
+            if code is None:
+                code = self._codes[value] = len(self.values)
+                self.values.append(value)
+            codes.append(code)
+        return np.asarray(codes, dtype=np.int32)
+
+
+def _sorted_groups(codes: np.ndarray, salary: np.ndarray, valid: np.ndarray,
+                   group_count: int) -> Tuple[np.ndarray, np.ndarray]:
+    """按编码分组、组内薪资升序的薪资数组及每组起止偏移（长度为组数+1）"""
+    rows = np.flatnonzero(valid)
+    order = np.lexsort((salary[rows], codes[rows]))
+    sorted_codes = codes[rows][order]
+    counts = np.bincount(sorted_codes, minlength=group_count)
+    offsets = np.zeros(group_count + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return salary[rows][order], offsets
+
+
+def _build_cube(codes: Dict[str, np.ndarray], salary: np.ndarray, entropy: np.ndarray,
+                company: np.ndarray, company_pairs: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    按 (城市, 公司类型, 经验, 学历) 聚合薪资为区间格式的记录（salary 为 range_salary，其余为 NaN）的
+    岗位数、区间中值之和、香农熵和，统计范围与城市 / 行业 / 经验统计查询的过滤条件一致；
+    并为每个单元格保存其公司集合的稀疏基数草图（company 为公司编码，company_pairs 为各公司的草图项）
+    """
+    valid = ~np.isnan(salary)
+    keys = np.stack([codes[name][valid] for name in CUBE_DIMENSIONS], axis=1)
+    if keys.size == 0:
+        cells = np.empty((0, len(CUBE_DIMENSIONS)), dtype=np.int32)
+        inverse = np.empty(0, dtype=np.int64)
+    else:
+        cells, inverse = np.unique(keys, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+    cube = {f'cube_{name}': cells[:, i].astype(np.int32) for i, name in enumerate(CUBE_DIMENSIONS)}
+    cube['cube_count'] = np.bincount(inverse, minlength=len(cells)).astype(np.int64)
+    cube['cube_salary_sum'] = np.bincount(inverse, weights=salary[valid], minlength=len(cells))
+    cube['cube_entropy_sum'] = np.bincount(inverse, weights=np.nan_to_num(entropy[valid]),
+                                           minlength=len(cells))
+
+    # 单元格内去重后的 (单元格, 公司)，按单元格排序；草图总长度不超过有效记录数
+    company_count = max(len(company_pairs), 1)
+    known = company[valid] >= 0
+    cell_company = np.unique(inverse[known].astype(np.int64) * company_count + company[valid][known])
+    cell_of, company_of = np.divmod(cell_company, company_count)
+    offsets = np.zeros(len(cells) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(cell_of, minlength=len(cells)), out=offsets[1:])
+    cube['cube_company_hll'] = company_pairs[company_of].astype(np.uint32)
+    cube['cube_company_hll_offsets'] = offsets
+    return cube
+
+
+def source_signature(db_manager) -> List[int]:
+    """
+    data 表的数据签名：[行数, 水位列最大值]（水位列见 ANALYSIS_WATERMARK_COLUMN，每次导入递增）
+    表中没有水位列时只使用行数
+    """
+    from database.loader import table_columns
+
+    watermark = settings.ANALYSIS_WATERMARK_COLUMN
+    if watermark in (table_columns(db_manager, 'data') or []):
+        row = db_manager.execute_query(f"SELECT COUNT(*), MAX({watermark}) FROM data", fetch_one=True)
+    else:
+        row = db_manager.execute_query("SELECT COUNT(*) FROM data", fetch_one=True)
+    return [int(value) if value is not None else None for value in row]
+
+
+def build_column_store(db_manager, path: Optional[str] = None, batch_size: int = 20000,
+                       data_version: Optional[str] = None) -> str:
+    """
+    从数据库流式读取 data 表并写入聚合快照
+
+    Args:
+        db_manager: DatabaseManager 实例
+        path: 输出路径，默认 COLUMN_STORE_PATH
+        batch_size: 每批读取行数
+        data_version: 数据版本标识，默认为构建时间
+    """
+    from database.sketches import HyperLogLog, register_pairs
+
+    path = path or settings.COLUMN_STORE_PATH
+    started = time.perf_counter()
+    # 读取前取签名：构建期间数据变化时签名不再一致，快照按过期处理
+    signature = source_signature(db_manager)
+    encoders = {name: _DictionaryEncoder() for name in DICTIONARY_COLUMNS + ('company',)}
+    chunks: Dict[str, List[np.ndarray]] = {
+        name: [] for name in DICTIONARY_COLUMNS + ('company', 'salary', 'range_salary', 'shannon_entropy')
+    }
+
+    for city, company_type, experience, education, salary, range_salary, entropy, company in db_manager.iter_query(
+        SNAPSHOT_QUERY, batch_size=batch_size, column_types=(None, None, None, None, float, float, float, None),
+        as_numpy=True
+    ):
+        for name, values in zip(DICTIONARY_COLUMNS + ('company',),
+                                (city, company_type, experience, education, company)):
+            chunks[name].append(encoders[name].encode(values))
+        chunks['salary'].append(salary)
+        chunks['range_salary'].append(range_salary)
+        chunks['shannon_entropy'].append(entropy)
+
+    def concat(name: str, dtype) -> np.ndarray:
+        return np.concatenate(chunks[name]).astype(dtype) if chunks[name] else np.empty(0, dtype=dtype)
+
+    codes = {name: concat(name, np.int32) for name in DICTIONARY_COLUMNS}
+    company = concat('company', np.int32)
+    salary = concat('salary', np.float64)
+    range_salary = concat('range_salary', np.float64)
+    entropy = concat('shannon_entropy', np.float64)
+    dictionaries = {name: encoders[name].values for name in DICTIONARY_COLUMNS}
+
+    # 箱线图有效记录：城市、公司类型非空（非NULL、非空字符串），薪资非NULL且非0
+    def non_empty(name: str) -> np.ndarray:
+        empty = np.array([value == '' for value in dictionaries[name]] + [True], dtype=bool)
+        return ~empty[codes[name]]  # -1（NULL）索引到末尾的 True
+    boxplot_valid = non_empty('city') & non_empty('company_type') & ~np.isnan(salary) & (salary != 0)
+
+    arrays: Dict[str, np.ndarray] = dict(codes)
+    arrays['salary'] = salary
+    arrays['shannon_entropy'] = entropy
+    arrays['boxplot_valid'] = boxplot_valid.astype(np.uint8)
+    for name in ('city', 'company_type'):
+        sorted_salary, offsets = _sorted_groups(codes[name], salary, boxplot_valid, len(dictionaries[name]))
+        arrays[f'{name}_sorted_salary'] = sorted_salary
+        arrays[f'{name}_sorted_offsets'] = offsets
+    # 公司名不写入字典（体积大），只保存其草图项：每个单元格一份，另有一份全表（不限薪资）的稠密寄存器
+    precision = settings.HLL_PRECISION
+    company_pairs = register_pairs(encoders['company'].values, precision)
+    arrays.update(_build_cube(codes, range_salary, entropy, company, company_pairs))
+    arrays['company_hll_registers'] = HyperLogLog.from_pairs(company_pairs, precision).registers
+
+    meta = {
+        'data_version': data_version or datetime.now().strftime('%Y%m%d%H%M%S'),
+        'created_at': datetime.now().isoformat(),
+        'rows': int(salary.size),
+        'source_signature': signature,
+        'hll_precision': precision,
+    }
+    write_snapshot(path, arrays, dictionaries, meta)
+    logger.info(f"聚合快照已写入 {path}：{meta['rows']} 行，版本 {meta['data_version']}，"
+                f"耗时 {time.perf_counter() - started:.1f}s")
+    return path
+
+
+# 当前进程打开的快照；文件被原子替换后在下次检查时重新映射
+_store: Optional[ColumnStore] = None
+_store_stat: Optional[Tuple[int, int]] = None
+_checked_at = 0.0
+_store_lock = threading.Lock()
+# 快照与数据库的核对结果及时间
+_store_fresh = False
+_verified_at = float('-inf')
+_source_manager = None
+
+# 检查快照文件是否更新的最小间隔（秒）
+CHECK_INTERVAL = 5.0
+
+
+def _verify_store(store: ColumnStore) -> bool:
+    """快照的数据签名是否与数据库当前一致（离线快照模式下没有数据库可比较，视为一致）"""
+    global _source_manager
+    if _source_manager is None:
+        from database.Q3 import DatabaseManager
+        _source_manager = DatabaseManager('default')
+    if _source_manager.snapshot is not None:
+        return True
+    if store.source_signature is None:
+        logger.warning(f"聚合快照 {store.path} 未记录数据签名，无法确认与数据库一致，请重新构建")
+        return False
+    try:
+        current = source_signature(_source_manager)
+    except Exception as e:
+        logger.error(f"读取数据签名失败，暂不使用聚合快照: {e}")
+        return False
+    if current != store.source_signature:
+        logger.warning(f"聚合快照已过期（快照 {store.source_signature}，数据库 {current}），"
+                       f"回退到数据库查询，请重新构建快照")
+        return False
+    return True
+
+
+def get_column_store() -> Optional[ColumnStore]:
+    """获取当前聚合快照，未启用、文件不存在或与数据库不一致时返回 None"""
+    global _store, _store_stat, _checked_at, _store_fresh, _verified_at
+    path = settings.COLUMN_STORE_PATH
+    if not settings.COLUMN_STORE_ENABLED or not path:
+        return None
+    now = time.monotonic()
+    if now - _checked_at < CHECK_INTERVAL:
+        return _store if _store_fresh else None
+    with _store_lock:
+        if now - _checked_at < CHECK_INTERVAL:
+            return _store if _store_fresh else None
+        _checked_at = now
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            _store, _store_stat = None, None
+            return None
+        signature = (stat.st_ino, stat.st_mtime_ns)
+        if signature != _store_stat:
+            try:
+                _store = ColumnStore(path)
+                _store_stat = signature
+                _verified_at = float('-inf')
+                logger.info(f"已映射聚合快照 {path}（版本 {_store.data_version}）")
+            except Exception as e:
+                logger.error(f"打开聚合快照失败: {e}")
+                _store, _store_stat = None, None
+        if _store is not None and now - _verified_at >= settings.COLUMN_STORE_VERIFY_INTERVAL:
+            _store_fresh = _verify_store(_store)
+            _verified_at = now
+        return _store if _store_fresh else None
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='data 表聚合快照工具')
+    parser.add_argument('command', choices=['build', 'info'], help='build 构建快照，info 查看快照信息')
+    parser.add_argument('--output', default=settings.COLUMN_STORE_PATH, help='快照文件路径')
+    parser.add_argument('--batch-size', type=int, default=20000, help='每批读取行数')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == 'build':
+        from database.Q3 import DatabaseManager
+        build_column_store(DatabaseManager('default'), args.output, args.batch_size)
+
+    store = ColumnStore(args.output)
+    print(f"文件: {args.output}")
+    print(f"数据版本: {store.data_version}  行数: {store.rows}  数据签名: {store.source_signature}  "
+          f"创建时间: {store.header.get('created_at')}")
+    for name, spec in store.header['arrays'].items():
+        print(f"  {name:<28} {spec['dtype']:<5} {spec['length']:>12}")
+    store.close()
+
+
+if __name__ == '__main__':
+    main()
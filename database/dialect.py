@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SQL 方言转换
+项目中的查询按 MySQL 语法编写，这里将其转换为嵌入式引擎（SQLite / DuckDB）可执行的形式：
+- %s 占位符：SQLite 转为 ?，DuckDB 转为 ?
+- CAST(x AS UNSIGNED / SIGNED / DECIMAL(p,s))：转为引擎原生的截取前导数字的表达式
+- SUBSTRING_INDEX(x, 'd', n)：SQLite 转为 instr/substr/rtrim 表达式，DuckDB 转为 string_split 列表切片
+- x REGEXP 'pattern'：DuckDB 转为 regexp_matches；SQLite 没有原生正则，
+  薪资区间格式（'^[0-9]+-[0-9]+' 这类"数字串 + 分隔符 + 数字"开头）转为 instr/substr/GLOB 表达式
+- GROUP_CONCAT([DISTINCT] x [ORDER BY y] [SEPARATOR 's'])：DuckDB 转为 string_agg，
+  SQLite 3.44 之前的聚合函数不支持 ORDER BY，转为自定义聚合
+- 整数除法：SQLite 的 / 在两个整数间为整除，改写为 * 1.0 / 以与 MySQL 的小数除法一致
+无法原生表达的写法（含占位符的表达式、其余正则等）调用后端注册的同名自定义函数（Python 实现，逐行执行）；
+native_functions=False 时全部使用自定义函数，作为 MySQL 语义的参照（见 tests 与 benchmarks.dialect）
+"""
+
+import re
+from abc import ABC, abstractmethod
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, List, Optional, Sequence, Tuple
+
+# 词法单元：字符串字面量、标识符/关键字、数字、占位符、空白、其余单个符号
+_TOKEN_RE = re.compile(r"""
+    (?P<string>'(?:[^'\\]|\\.|'')*'|"(?:[^"\\]|\\.|"")*")
+  | (?P<placeholder>%s)
+  | (?P<word>[A-Za-z_][A-Za-z_0-9]*)
+  | (?P<number>\d+(?:\.\d+)?)
+  | (?P<space>\s+)
+  | (?P<symbol>.)
+""", re.VERBOSE | re.DOTALL)
+
+
+def tokenize(query: str) -> List[str]:
+    """将SQL拆分为词法单元（保留空白，拼接后与原文一致）"""
+    return [match.group(0) for match in _TOKEN_RE.finditer(query)]
+
+
+def _is_word(token: str, word: str) -> bool:
+    return token.upper() == word
+
+
+def _next_significant(tokens: List[str], start: int) -> int:
+    """从 start 起第一个非空白单元的下标"""
+    while start < len(tokens) and tokens[start].isspace():
+        start += 1
+    return start
+
+
+def _matching_paren(tokens: List[str], open_index: int) -> int:
+    """与 tokens[open_index] 处左括号匹配的右括号下标"""
+    depth = 0
+    for index in range(open_index, len(tokens)):
+        if tokens[index] == '(':
+            depth += 1
+        elif tokens[index] == ')':
+            depth -= 1
+            if depth == 0:
+                return index
+    raise ValueError("SQL 括号不匹配")
+
+
+def _split_arguments(tokens: List[str]) -> List[List[str]]:
+    """按顶层逗号切分函数参数（去掉首尾空白）"""
+    arguments: List[List[str]] = [[]]
+    depth = 0
+    for token in tokens:
+        if token == '(':
+            depth += 1
+        elif token == ')':
+            depth -= 1
+        if token == ',' and depth == 0:
+            arguments.append([])
+        else:
+            arguments[-1].append(token)
+    return [_strip(argument) for argument in arguments]
+
+
+def _split_top_level(tokens: List[str], keywords: Sequence[str]) -> List[Tuple[Optional[str], List[str]]]:
+    """按顶层（不在括号内）的关键字切分，返回 [(关键字, 片段)]，首个片段关键字为 None"""
+    parts: List[Tuple[Optional[str], List[str]]] = [(None, [])]
+    depth = 0
+    index = 0
+    while index < len(tokens):
+        token = tokens[index]
+        if token == '(':
+            depth += 1
+        elif token == ')':
+            depth -= 1
+        if depth == 0 and token.upper() in keywords:
+            keyword = token.upper()
+            # ORDER BY 为两个词
+            if keyword == 'ORDER':
+                by_index = _next_significant(tokens, index + 1)
+                index = by_index
+            parts.append((keyword, []))
+        else:
+            parts[-1][1].append(token)
+        index += 1
+    return parts
+
+
+class Dialect:
+    """方言基类：MySQL 语句原样执行"""
+
+    name = 'mysql'
+    # 查看执行计划的语句前缀
+    explain_prefix = 'EXPLAIN'
+
+    def translate(self, query: str) -> str:
+        return query
+
+    def translate_params(self, params: Any) -> Any:
+        return params
+
+
+class EmbeddedDialect(Dialect, ABC):
+    """嵌入式引擎方言的公共转换"""
+
+    placeholder = '?'
+    integer_division = False
+
+    def __init__(self, native_functions: bool = True):
+        self.native_functions = native_functions
+
+    def translate(self, query: str) -> str:
+        return _translate_cached(self, query)
+
+    def translate_params(self, params: Any) -> Any:
+        if params is None:
+            return ()
+        if isinstance(params, dict):
+            raise ValueError(f"{self.name} 方言不支持命名参数")
+        return tuple(float(value) if isinstance(value, Decimal) else value for value in params)
+
+    def rewrite(self, tokens: List[str]) -> List[str]:
+        """递归改写词法单元序列"""
+        output: List[str] = []
+        index = 0
+        while index < len(tokens):
+            token = tokens[index]
+            upper = token.upper()
+            if token == '%s':
+                output.append(self.placeholder)
+            elif upper in ('CAST', 'GROUP_CONCAT', 'SUBSTRING_INDEX'):
+                open_index = _next_significant(tokens, index + 1)
+                if open_index < len(tokens) and tokens[open_index] == '(':
+                    close_index = _matching_paren(tokens, open_index)
+                    inner = self.rewrite(tokens[open_index + 1:close_index])
+                    if upper == 'CAST':
+                        output.extend(self.rewrite_cast(inner))
+                    elif upper == 'GROUP_CONCAT':
+                        output.extend(self.rewrite_group_concat(inner))
+                    else:
+                        output.extend(self.rewrite_substring_index(token, inner))
+                    index = close_index + 1
+                    continue
+                output.append(token)
+            elif upper == 'REGEXP':
+                index = self.rewrite_regexp(output, tokens, index)
+                continue
+            elif token == '/' and self.integer_division:
+                output.extend(['*', ' ', '1.0', ' ', '/'])
+            else:
+                output.append(token)
+            index += 1
+        return output
+
+    def rewrite_cast(self, inner: List[str]) -> List[str]:
+        """
+        CAST(x AS UNSIGNED / SIGNED / DECIMAL(p,s))：原生表达式（native_cast），
+        否则为 mysql_unsigned(x) / mysql_signed(x) / mysql_decimal(x, s)
+        """
+        parts = _split_top_level(inner, ('AS',))
+        if len(parts) != 2:
+            return ['CAST', '('] + inner + [')']
+        expression, target = _strip(parts[0][1]), [t for t in parts[1][1] if not t.isspace()]
+        kind = target[0].upper() if target else ''
+        if kind not in ('UNSIGNED', 'SIGNED', 'DECIMAL'):
+            return ['CAST', '('] + inner + [')']
+        scale = target[4] if kind == 'DECIMAL' and len(target) >= 6 and target[3] == ',' else '0'
+        if self.native_functions:
+            native = self.native_cast(kind, expression, scale)
+            if native is not None:
+                return native
+        expression = self.function_argument(expression)
+        if kind == 'UNSIGNED':
+            return ['mysql_unsigned', '('] + expression + [')']
+        if kind == 'SIGNED':
+            return ['mysql_signed', '('] + expression + [')']
+        return ['mysql_decimal', '('] + expression + [',', ' ', scale, ')']
+
+    def native_cast(self, kind: str, expression: List[str], scale: str) -> Optional[List[str]]:
+        """CAST 的原生表达式，无法原生表达时返回 None"""
+        return None
+
+    def function_argument(self, expression: List[str]) -> List[str]:
+        """传给 mysql_* 自定义函数的参数"""
+        return expression
+
+    def rewrite_substring_index(self, name: str, inner: List[str]) -> List[str]:
+        """SUBSTRING_INDEX(x, 'd', n)：分隔符与 n 为字面量时使用原生表达式，否则调用自定义函数"""
+        arguments = _split_arguments(inner)
+        if self.native_functions and len(arguments) == 3:
+            expression, delimiter, count = arguments
+            if (len(delimiter) == 1 and _is_string(delimiter[0]) and len(delimiter[0]) > 2
+                    and _is_integer(count) and _duplicable(expression, self.placeholder)):
+                native = self.native_substring_index(expression, delimiter[0], int(''.join(count)))
+                if native is not None:
+                    return native
+        return [name, '('] + inner + [')']
+
+    def native_substring_index(self, expression: List[str], delimiter: str, count: int) -> Optional[List[str]]:
+        """SUBSTRING_INDEX 的原生表达式（delimiter 为非空字符串字面量），无法原生表达时返回 None"""
+        return None
+
+    @abstractmethod
+    def rewrite_group_concat(self, inner: List[str]) -> List[str]:
+        """改写 GROUP_CONCAT(...) 括号内的词法单元（已递归改写），返回替换整个调用的词法单元"""
+
+    def rewrite_regexp(self, output: List[str], tokens: List[str], index: int) -> int:
+        """改写 tokens[index] 处的 REGEXP 运算（直接修改 output），返回下一个待处理单元的下标"""
+        output.append(tokens[index])
+        return index + 1
+
+
+class SQLiteDialect(EmbeddedDialect):
+    """
+    SQLite：CAST 利用 SQLite 文本转数值时取最长数字前缀的规则，SUBSTRING_INDEX 改写为 instr/substr，
+    薪资区间格式的 REGEXP 改写为 instr/substr/GLOB；其余 REGEXP 由注册的 regexp(pattern, value) 函数实现，
+    GROUP_CONCAT 改写为自定义聚合
+    """
+
+    name = 'sqlite'
+    explain_prefix = 'EXPLAIN QUERY PLAN'
+    integer_division = True
+
+    def native_cast(self, kind: str, expression: List[str], scale: str) -> Optional[List[str]]:
+        # MySQL 的 UNSIGNED 对负数按 0 处理；多参数 max 在任一参数为 NULL 时返回 NULL
+        if kind == 'UNSIGNED':
+            return ['max', '(', 'CAST', '('] + expression + [' ', 'AS', ' ', 'INTEGER', ')', ', ', '0', ')']
+        if kind == 'SIGNED':
+            return ['CAST', '('] + expression + [' ', 'AS', ' ', 'INTEGER', ')']
+        return ['round', '(', 'CAST', '('] + expression + [' ', 'AS', ' ', 'REAL', ')', ', ', scale, ')']
+
+    def native_substring_index(self, expression: List[str], delimiter: str, count: int) -> Optional[List[str]]:
+        # 在 x || d 中查找 d：x 不含分隔符时位置为 length(x) + 1，取整个 x
+        first = ['instr', '('] + expression + [' ', '||', ' ', delimiter, ', ', delimiter, ')']
+        if count == 1:
+            return ['substr', '('] + expression + [', ', '1', ', '] + first + [' ', '-', ' ', '1', ')']
+        if count == 2:
+            width = str(len(delimiter) - 2 - delimiter.count("''"))
+            rest = ['substr', '('] + expression + [', '] + first + [' ', '+', ' ', width, ')']
+            second = ['instr', '('] + rest + [' ', '||', ' ', delimiter, ', ', delimiter, ')']
+            return (['substr', '('] + expression + [', ', '1', ', '] + first + [' ', '+', ' ', width, ' ', '+', ' ']
+                    + second + [' ', '-', ' ', '2', ')'])
+        if count == -1 and len(delimiter) == 3:
+            # rtrim 去掉末尾所有非分隔符字符，剩余部分的长度即最后一个分隔符的位置
+            others = ['replace', '('] + expression + [', ', delimiter, ', ', "''", ')']
+            head = ['rtrim', '('] + expression + [', '] + others + [')']
+            return ['substr', '('] + expression + [', ', 'length', '('] + head + [')', ' ', '+', ' ', '1', ')']
+        return None
+
+    def rewrite_regexp(self, output: List[str], tokens: List[str], index: int) -> int:
+        """x REGEXP '^[0-9]+-[0-9]+' -> 首个分隔符前为非空数字串且其后为数字；其余模式调用 regexp 函数"""
+        pattern_index = _next_significant(tokens, index + 1)
+        match = _NUMBER_RANGE_RE.match(tokens[pattern_index]) if pattern_index < len(tokens) else None
+        if not self.native_functions or match is None:
+            return super().rewrite_regexp(output, tokens, index)
+        operand = _pop_operand(output)
+        separator = f"'{match.group(1)}'"
+        position = ['instr', '('] + operand + [', ', separator, ')']
+        output.extend(['(', *position, ' ', '>', ' ', '1',
+                       ' ', 'AND', ' ', 'substr', '(', *operand, ', ', '1', ', ', *position, ' ', '-', ' ', '1', ')',
+                       ' ', 'NOT', ' ', 'GLOB', ' ', "'*[^0-9]*'",
+                       ' ', 'AND', ' ', 'substr', '(', *operand, ', ', *position, ' ', '+', ' ', '1', ', ', '1', ')',
+                       ' ', 'GLOB', ' ', "'[0-9]'", ')'])
+        return pattern_index + 1
+
+    def rewrite_group_concat(self, inner: List[str]) -> List[str]:
+        expression, order, separator, distinct, descending = _parse_group_concat(inner)
+        return (['mysql_group_concat', '('] + expression + [', '] + (order or expression)
+                + [', ', separator, ', ', str(int(distinct)), ', ', str(int(descending)), ')'])
+
+
+class DuckDBDialect(EmbeddedDialect):
+    """
+    DuckDB：/ 为小数除法；CAST 改写为 regexp_extract 取前导数字，SUBSTRING_INDEX 改写为 string_split 列表切片，
+    REGEXP 改写为 regexp_matches，GROUP_CONCAT 改写为 string_agg
+    """
+
+    name = 'duckdb'
+
+    def native_cast(self, kind: str, expression: List[str], scale: str) -> Optional[List[str]]:
+        if not _duplicable(expression, self.placeholder):
+            return None
+        text = ['CAST', '('] + expression + [' ', 'AS', ' ', 'VARCHAR', ')']
+        if kind == 'DECIMAL':
+            # 先转为定点小数再舍入，与 MySQL 一样按十进制四舍五入（2.345 -> 2.35）
+            number = (['TRY_CAST', '(', 'regexp_extract', '('] + text
+                      + [', ', r"'^\s*([+-]?([0-9]+\.?[0-9]*|\.[0-9]+))'", ', ', '1', ')',
+                         ' ', 'AS', ' ', 'DECIMAL', '(', '38', ', ', '10', ')', ')'])
+            value = ['CAST', '(', 'round', '(', 'coalesce', '('] + number + [', ', '0', ')', ', ', scale, ')',
+                                                                          ' ', 'AS', ' ', 'DOUBLE', ')']
+        else:
+            number = (['TRY_CAST', '(', 'regexp_extract', '('] + text
+                      + [', ', r"'^\s*([+-]?[0-9]+)'", ', ', '1', ')', ' ', 'AS', ' ', 'BIGINT', ')'])
+            value = ['coalesce', '('] + number + [', ', '0', ')']
+            if kind == 'UNSIGNED':
+                value = ['greatest', '('] + value + [', ', '0', ')']
+        # 非数字文本按 0 处理，NULL 保持为 NULL（greatest 会忽略 NULL，因此单独判断）
+        return (['CASE', ' ', 'WHEN', ' '] + expression + [' ', 'IS', ' ', 'NULL', ' ', 'THEN', ' ', 'NULL',
+                                                           ' ', 'ELSE', ' '] + value + [' ', 'END'])
+
+    def function_argument(self, expression: List[str]) -> List[str]:
+        # 自定义函数只注册了 VARCHAR 参数，DuckDB 不会把数值隐式转换为 VARCHAR
+        return ['CAST', '('] + expression + [' ', 'AS', ' ', 'VARCHAR', ')']
+
+    def native_substring_index(self, expression: List[str], delimiter: str, count: int) -> Optional[List[str]]:
+        if count == 0:
+            return ["''"]
+        bounds = ['1', ':', str(count)] if count > 0 else [str(count), ':']
+        parts = ['string_split', '('] + expression + [', ', delimiter, ')', '['] + bounds + [']']
+        return ['array_to_string', '('] + parts + [', ', delimiter, ')']
+
+    def rewrite_group_concat(self, inner: List[str]) -> List[str]:
+        expression, order, separator, distinct, descending = _parse_group_concat(inner)
+        result = ['string_agg', '('] + (['DISTINCT', ' '] if distinct else []) + expression + [', ', separator]
+        if order:
+            result += [' ', 'ORDER', ' ', 'BY', ' '] + order + ([' ', 'DESC'] if descending else [])
+        return result + [')']
+
+    def rewrite_regexp(self, output: List[str], tokens: List[str], index: int) -> int:
+        """x REGEXP 'p' -> regexp_matches(x, 'p', 'i')（与 MySQL 一样不区分大小写），左操作数为（可带表前缀的）列名"""
+        operand = _pop_operand(output)
+        pattern_index = _next_significant(tokens, index + 1)
+        output.extend(['regexp_matches', '('] + operand + [', ', tokens[pattern_index], ", 'i'", ')'])
+        return pattern_index + 1
+
+
+# 薪资区间格式的正则：开头为数字串、单个分隔符（非字母、非正则元字符、非引号）、数字
+_NUMBER_RANGE_RE = re.compile(r"^'\^\[0-9\]\+([^A-Za-z\\'\[\](){}.*+?^$|])\[0-9\]\+'$")
+
+
+def _pop_operand(output: List[str]) -> List[str]:
+    """从已输出的词法单元末尾取出 REGEXP 的左操作数（可带表前缀的列名）"""
+    while output and output[-1].isspace():
+        output.pop()
+    operand = [output.pop()]
+    while len(output) >= 2 and output[-1] == '.':
+        operand[:0] = [output.pop(), output.pop()][::-1]
+    return operand
+
+
+def _is_string(token: str) -> bool:
+    return token.startswith("'") and token.endswith("'")
+
+
+def _is_integer(tokens: List[str]) -> bool:
+    return bool(re.fullmatch(r'-?\d+', ''.join(tokens)))
+
+
+def _duplicable(expression: List[str], placeholder: str) -> bool:
+    """表达式可在改写结果中出现多次（不含占位符，重复出现会改变参数个数）"""
+    return placeholder not in expression
+
+
+def _parse_group_concat(inner: List[str]) -> Tuple[List[str], List[str], str, bool, bool]:
+    """解析 GROUP_CONCAT 参数，返回 (表达式, 排序表达式, 分隔符字面量, 是否去重, 是否降序)"""
+    tokens = list(inner)
+    first = _next_significant(tokens, 0)
+    distinct = first < len(tokens) and _is_word(tokens[first], 'DISTINCT')
+    if distinct:
+        tokens = tokens[first + 1:]
+    expression, order, separator = [], [], "','"
+    for keyword, part in _split_top_level(tokens, ('ORDER', 'SEPARATOR')):
+        if keyword is None:
+            expression = part
+        elif keyword == 'ORDER':
+            order = part
+        else:
+            separator = next(t for t in part if not t.isspace())
+    descending = False
+    significant = [t for t in order if not t.isspace()]
+    if significant and significant[-1].upper() in ('ASC', 'DESC'):
+        descending = significant[-1].upper() == 'DESC'
+        last = max(i for i, t in enumerate(order) if t.upper() in ('ASC', 'DESC'))
+        order = order[:last]
+    return _strip(expression), _strip(order), separator, distinct, descending
+
+
+def _strip(tokens: List[str]) -> List[str]:
+    start, end = 0, len(tokens)
+    while start < end and tokens[start].isspace():
+        start += 1
+    while end > start and tokens[end - 1].isspace():
+        end -= 1
+    return tokens[start:end]
+
+
+DIALECTS = {
+    'mysql': Dialect(),
+    'sqlite': SQLiteDialect(),
+    'duckdb': DuckDBDialect(),
+}
+
+
+@lru_cache(maxsize=1024)
+def _translate_cached(dialect: EmbeddedDialect, query: str) -> str:
+    return ''.join(dialect.rewrite(tokenize(query)))
+
+
+def get_dialect(name: str) -> Dialect:
+    """按名称获取方言"""
+    try:
+        return DIALECTS[name]
+    except KeyError:
+        raise ValueError(f"未知的SQL方言: {name}") from None
@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+索引建议与迁移
+INDEXES 列出 data 表及汇总表按现有查询的过滤、分组列设计的组合索引与覆盖索引；
+verify 对给定的语句集（由 python -m benchmarks.indexes 按接口基准用例截获）先去掉这些索引
+逐条取得 EXPLAIN，再建立索引后重新 EXPLAIN，报告每条语句前后的访问方式与估算行数
+
+用法：
+    python -m database.indexes plan   [--backend mysql|sqlite|duckdb] [--path ...]   # 输出 DDL
+    python -m database.indexes apply  [...]                                          # 建立缺失的索引
+    python -m database.indexes drop   [...]                                          # 删除这些索引
+    python -m benchmarks.indexes      [...] [--output report.json]                   # 在副本上建索引并对比执行计划
+"""
+
+import argparse
+import logging
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from config import config
+from database.instrumentation import fingerprint, fingerprint_id
+from database.synthetic import SCHEMAS
+
+logger = logging.getLogger(__name__)
+
+# MySQL 中 TEXT/BLOB 列只能建前缀索引，前缀长度（字符）
+TEXT_PREFIX_LENGTH = 64
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    """
+    一个索引：所在表、名称、列（按顺序）与针对的访问模式
+    covering 为 True 时查询只读索引不回表，要求各列完整入索引：MySQL 中 TEXT/BLOB 列只能建前缀索引，
+    前缀索引无法覆盖查询，因此这类索引要求相关列为 VARCHAR（列类型见 database.synthetic.SCHEMAS）
+    """
+    table: str
+    name: str
+    columns: Tuple[str, ...]
+    purpose: str
+    covering: bool = False
+
+
+INDEXES: List[IndexSpec] = [
+    # 城市维度：城市详情（WHERE city = ? GROUP BY company_type / experience）、城市统计与对比、
+    # Q1 代表性城市与行业列表、箱线图城市筛选；薪资列放在末尾使聚合可只读索引
+    IndexSpec('data', 'idx_data_city_type_exp',
+              ('city', 'company_type', 'experience', 'education', 'salary', 'median_annual_salary'),
+              '城市详情 / 城市统计 / Q1 城市与行业 / 箱线图城市筛选'),
+    # 行业维度：行业详情（WHERE company_type = ? GROUP BY city / experience）、行业统计与对比
+    IndexSpec('data', 'idx_data_type_city_exp',
+              ('company_type', 'city', 'experience', 'salary', 'median_annual_salary'),
+              '行业详情 / 行业统计 / 箱线图行业筛选'),
+    # 经验、学历维度：经验详情与统计、箱线图经验+学历筛选、三维柱状图、雷达气泡图（GROUP BY experience, city）
+    IndexSpec('data', 'idx_data_exp_edu_city',
+              ('experience', 'education', 'city', 'company_type', 'salary', 'median_annual_salary'),
+              '经验详情 / 经验统计 / 箱线图经验学历筛选 / 三维柱状图 / 雷达气泡图'),
+    # Q1 散点图：WHERE city = ? AND is_in_top200 = 1 ORDER BY job_in_city_cnt DESC LIMIT 200
+    # 等值列在前、排序列紧随其后，按索引逆序读取即为结果顺序（无需排序，读满 200 行即停）；
+    # 其余列为查询返回与 IS NOT NULL 过滤的全部列，整个查询只读索引不回表；
+    # MySQL 中相关列须为 VARCHAR，TEXT 列需先按 plan 输出的 ALTER TABLE 语句迁移，否则 apply 跳过该索引
+    IndexSpec('data', 'idx_data_q1_scatter',
+              ('city', 'is_in_top200', 'job_in_city_cnt', 'experience', 'salary', 'job_level',
+               'experience_rank', 'education_rank', 'job_title', 'education', 'company_type', 'city_level'),
+              'Q1 散点图（城市内 TOP200 职位按岗位数排序，覆盖索引）', covering=True),
+    # Q1 职位层级列表：SELECT DISTINCT job_level
+    IndexSpec('data', 'idx_data_job_level', ('job_level',), 'Q1 职位层级'),
+    # 职位汇总表：按职位查询（WHERE job_title = ? / IN (...)）
+    IndexSpec('job_summary_by_title', 'idx_jsbt_job_title', ('job_title',), '职位详情 / 平行坐标 / 桑基图对比'),
+    # 职位汇总表：按中位薪资排序与范围筛选
+    IndexSpec('job_summary_by_title', 'idx_jsbt_median_salary', ('median_salary', 'job_title'),
+              '职位薪资排名与薪资区间'),
+    # 职位城市分布：WHERE job_title = ?，包含查询的全部列
+    IndexSpec('job_city_distribution', 'idx_jcd_job_title', ('job_title', 'city', 'count', 'percent'),
+              '职位城市分布'),
+    # 经验、学历映射表：关联（ON code）与标签查找（WHERE label = ?）
+    IndexSpec('experience_mapping', 'idx_exp_mapping_code', ('experience_code', 'experience_label'),
+              '经验编码关联'),
+    IndexSpec('experience_mapping', 'idx_exp_mapping_label', ('experience_label', 'experience_code'),
+              '经验标签查找编码'),
+    IndexSpec('education_mapping', 'idx_edu_mapping_code', ('education_code', 'education_label'),
+              '学历编码关联'),
+    IndexSpec('education_mapping', 'idx_edu_mapping_label', ('education_label', 'education_code'),
+              '学历标签查找编码'),
+]
+
+# 已被替代的索引（替代索引名 -> 旧索引），apply 在替代索引存在后删除
+RETIRED_INDEXES: Dict[str, IndexSpec] = {
+    'idx_data_q1_scatter': IndexSpec('data', 'idx_data_city_top200_cnt', ('city', 'is_in_top200', 'job_in_city_cnt'),
+                                     '由 idx_data_q1_scatter 覆盖索引替代'),
+}
+
+
+# ---------------------------------------------------------------------------
+# 迁移
+# ---------------------------------------------------------------------------
+
+def _fetch(db_manager, query: str, params: Any = None) -> List[Tuple]:
+    """在目标库上直接执行（按方言转换，不经过合并与缓存）"""
+    with db_manager.get_connection() as connection:
+        cursor = connection.cursor()
+        try:
+            cursor.execute(*db_manager._translate(query, params))
+            return list(cursor.fetchall()) if cursor.description else []
+        finally:
+            cursor.close()
+
+
+def _execute(db_manager, statement: str) -> None:
+    with db_manager.get_connection() as connection:
+        cursor = connection.cursor()
+        try:
+            cursor.execute(statement)
+            connection.commit()
+        finally:
+            cursor.close()
+
+
+def existing_indexes(db_manager, table: str) -> Set[str]:
+    """表上已有的索引名"""
+    dialect = db_manager.backend.dialect.name
+    if dialect == 'mysql':
+        rows = _fetch(db_manager, """
+            SELECT DISTINCT index_name FROM information_schema.statistics
+            WHERE table_schema = DATABASE() AND table_name = %s
+        """, (table,))
+    elif dialect == 'sqlite':
+        rows = _fetch(db_manager, "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = %s", (table,))
+    else:
+        rows = _fetch(db_manager, "SELECT index_name FROM duckdb_indexes() WHERE table_name = %s", (table,))
+    return {row[0] for row in rows}
+
+
+def _text_columns(db_manager, table: str) -> Set[str]:
+    """MySQL 中需要前缀索引的 TEXT/BLOB 列"""
+    if db_manager.backend.dialect.name != 'mysql':
+        return set()
+    rows = _fetch(db_manager, """
+        SELECT column_name, data_type FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = %s
+    """, (table,))
+    return {name for name, data_type in rows if 'text' in data_type.lower() or 'blob' in data_type.lower()}
+
+
+def index_ddl(spec: IndexSpec, text_columns: Set[str] = frozenset()) -> str:
+    """建立索引的语句，TEXT/BLOB 列使用前缀长度（覆盖索引不使用前缀，相关列须先迁移为 VARCHAR）"""
+    prefixed = set() if spec.covering else text_columns
+    columns = ', '.join(f"{column}({TEXT_PREFIX_LENGTH})" if column in prefixed else column
+                        for column in spec.columns)
+    return f"CREATE INDEX {spec.name} ON {spec.table} ({columns})"
+
+
+def column_migrations(spec: IndexSpec, text_columns: Set[str] = frozenset()) -> List[str]:
+    """覆盖索引中 TEXT/BLOB 列改为 VARCHAR 的语句（类型取自 SCHEMAS），无需迁移时返回空列表"""
+    if not spec.covering:
+        return []
+    types = dict(SCHEMAS.get(spec.table, []))
+    return [f"ALTER TABLE {spec.table} MODIFY {column} {types[column]}"
+            for column in spec.columns if column in text_columns and column in types]
+
+
+def _analyze(db_manager, tables: Sequence[str]) -> None:
+    """更新优化器统计信息，使新索引参与代价估算"""
+    dialect = db_manager.backend.dialect.name
+    if dialect == 'mysql':
+        for table in tables:
+            _fetch(db_manager, f"ANALYZE TABLE {table}")
+    else:
+        _execute(db_manager, 'ANALYZE')
+
+
+def apply_indexes(db_manager, specs: Sequence[IndexSpec] = INDEXES) -> List[str]:
+    """
+    建立尚不存在的索引并更新统计信息，删除替代索引已建立的旧索引，返回新建的索引名
+    相关列仍为 TEXT/BLOB 的覆盖索引跳过（前缀索引无法覆盖查询），其旧索引保留
+    """
+    created, available = [], set()
+    for table in dict.fromkeys(spec.table for spec in specs):
+        existing = existing_indexes(db_manager, table)
+        text_columns = _text_columns(db_manager, table)
+        for spec in specs:
+            if spec.table != table:
+                continue
+            if spec.name in existing:
+                available.add(spec.name)
+                continue
+            migrations = column_migrations(spec, text_columns)
+            if migrations:
+                logger.warning(f"跳过覆盖索引 {spec.name}：{spec.table} 的 "
+                               f"{', '.join(sorted(set(spec.columns) & text_columns))} 为 TEXT/BLOB 列，"
+                               f"前缀索引无法覆盖查询，请先执行 plan 输出的 ALTER TABLE 语句改为 VARCHAR")
+                continue
+            logger.info(f"建立索引 {spec.name}（{spec.purpose}）")
+            _execute(db_manager, index_ddl(spec, text_columns))
+            created.append(spec.name)
+            available.add(spec.name)
+    retired = [spec for name, spec in RETIRED_INDEXES.items() if name in available]
+    for name in drop_indexes(db_manager, retired):
+        logger.info(f"删除已被替代的索引 {name}")
+    if created:
+        _analyze(db_manager, list(dict.fromkeys(spec.table for spec in specs)))
+    return created
+
+
+def drop_indexes(db_manager, specs: Sequence[IndexSpec] = INDEXES) -> List[str]:
+    """删除已存在的这些索引，返回删除的索引名"""
+    dropped = []
+    mysql = db_manager.backend.dialect.name == 'mysql'
+    for table in dict.fromkeys(spec.table for spec in specs):
+        existing = existing_indexes(db_manager, table)
+        for spec in specs:
+            if spec.table == table and spec.name in existing:
+                _execute(db_manager, f"DROP INDEX {spec.name} ON {table}" if mysql else f"DROP INDEX {spec.name}")
+                dropped.append(spec.name)
+    return dropped
+
+
+# ---------------------------------------------------------------------------
+# 执行计划
+# ---------------------------------------------------------------------------
+
+_SQLITE_ACCESS = re.compile(
+    r"^(SCAN|SEARCH) (?:TABLE )?(\w+)(?: AS \w+)?(?: USING (?:(COVERING|AUTOMATIC (?:PARTIAL )?COVERING) )?INDEX (\w+)"
+    r"(?: \((.*)\))?| USING INTEGER PRIMARY KEY.*)?"
+)
+_DUCKDB_ESTIMATE = re.compile(r"(?:EC:\s*|~)(\d+)")
+_TABLE_ALIAS = re.compile(r"\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", re.IGNORECASE)
+_NOT_ALIASES = {'where', 'left', 'right', 'inner', 'join', 'on', 'group', 'order', 'limit', 'having', 'union'}
+
+
+def _aliases(query: str) -> Dict[str, str]:
+    """语句中 表别名 -> 表名（SQLite 执行计划中以别名指代表）"""
+    aliases = {}
+    for table, alias in _TABLE_ALIAS.findall(query):
+        aliases[table] = table
+        if alias and alias.lower() not in _NOT_ALIASES:
+            aliases[alias] = table
+    return aliases
+
+
+def _sqlite_rows(db_manager, table: str, index: Optional[str], constraints: str,
+                 cache: Dict[str, Any]) -> Optional[int]:
+    """
+    由 sqlite_stat1 估算一次表访问的行数：
+    全表扫描为表行数；按索引查找时为索引统计中前 k 列（k 为等值条件数）对应的平均行数；
+    范围条件（含 IS NOT NULL，计划中显示为 col>?）选择性未知，不再折算
+    """
+    stats = cache.get('stat1')
+    if stats is None:
+        try:
+            stats = {(tbl, idx): stat for tbl, idx, stat in _fetch(db_manager, "SELECT tbl, idx, stat FROM sqlite_stat1")}
+        except Exception:
+            stats = {}
+        cache['stat1'] = stats
+    if index is None or not constraints:
+        counts = cache.setdefault('counts', {})
+        if table not in counts:
+            counts[table] = _fetch(db_manager, f"SELECT COUNT(*) FROM {table}")[0][0]
+        return counts[table]
+    stat = stats.get((table, index))
+    if not stat:
+        return None
+    numbers = [int(value) for value in stat.split() if value.isdigit()]
+    terms = [term.strip() for term in constraints.split(' AND ')]
+    equalities = sum(1 for term in terms if term.endswith('=?') and not term.endswith(('>=?', '<=?')))
+    return numbers[min(equalities, len(numbers) - 1)]
+
+
+def explain(db_manager, query: str, params: Any, cache: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    取得语句的执行计划摘要
+    access 为各表的访问方式，rows 为估算访问行数（MySQL 取 EXPLAIN rows，同一 id 内相乘、不同 id 相加；
+    SQLite 由 sqlite_stat1 估算后相加；DuckDB 取计划中最大的基数估计）
+    """
+    cache = {} if cache is None else cache
+    dialect = db_manager.backend.dialect
+    translated, translated_params = db_manager._translate(query, params)
+    with db_manager.get_connection() as connection:
+        cursor = connection.cursor()
+        try:
+            cursor.execute(f"{dialect.explain_prefix} {translated}", translated_params)
+            names = [column[0].lower() for column in cursor.description]
+            rows = [dict(zip(names, row)) for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+    if dialect.name == 'mysql':
+        access, groups = [], {}
+        for row in rows:
+            extra = row.get('extra') or ''
+            flags = [flag for flag in ('Using index', 'Using filesort', 'Using temporary') if flag in extra]
+            access.append(f"{row.get('table')}: {row.get('type')} {row.get('key') or '-'}"
+                          + (f" ({', '.join(flags)})" if flags else ''))
+            estimate = int(row.get('rows') or 1) * float(row.get('filtered') or 100) / 100
+            groups[row.get('id')] = groups.get(row.get('id'), 1) * max(estimate, 1)
+        return {'access': access, 'rows': int(sum(groups.values()))}
+
+    if dialect.name == 'sqlite':
+        access, total = [], 0
+        aliases = _aliases(query)
+        for row in rows:
+            detail = row.get('detail', '')
+            match = _SQLITE_ACCESS.match(detail)
+            if match is None:
+                if 'TEMP B-TREE' in detail:
+                    access.append(detail)
+                continue
+            access.append(detail)
+            _, table, _, index, constraints = match.groups()
+            estimate = _sqlite_rows(db_manager, aliases.get(table, table), index, constraints, cache)
+            if estimate is None:
+                total = None
+            elif total is not None:
+                total += estimate
+        return {'access': access, 'rows': total}
+
+    text = '\n'.join(str(value) for row in rows for value in row.values())
+    estimates = [int(value) for value in _DUCKDB_ESTIMATE.findall(text)]
+    scans = [line.strip('│ ') for line in text.splitlines() if 'SCAN' in line]
+    return {'access': scans, 'rows': max(estimates) if estimates else None}
+
+
+# ---------------------------------------------------------------------------
+# 验证
+# ---------------------------------------------------------------------------
+
+def verify(db_manager, workload: Sequence[Tuple[str, Any]], specs: Sequence[IndexSpec] = INDEXES,
+           allow_drop: bool = False) -> Dict[str, Any]:
+    """
+    去掉索引后 EXPLAIN 全部语句，建立索引后再次 EXPLAIN，返回逐条对比
+    验证会删除并重建 db_manager 所指数据库中的这些索引，须在副本上执行或显式传入 allow_drop=True
+    """
+    if not allow_drop:
+        raise RuntimeError("verify 会删除目标库中的索引，请在数据库副本上执行或指定 allow_drop=True")
+    dropped = drop_indexes(db_manager, specs)
+    if dropped:
+        _analyze(db_manager, list(dict.fromkeys(spec.table for spec in specs)))
+    cache: Dict[str, Any] = {}
+    before = [explain(db_manager, query, params, cache) for query, params in workload]
+    created = apply_indexes(db_manager, specs)
+    cache = {}
+    after = [explain(db_manager, query, params, cache) for query, params in workload]
+
+    names = {spec.name for spec in specs}
+    used: Set[str] = set()
+    statements = []
+    for (query, params), plan_before, plan_after in zip(workload, before, after):
+        used.update(name for name in names if any(name in line for line in plan_after['access']))
+        rows_before, rows_after = plan_before['rows'], plan_after['rows']
+        if rows_before is None or rows_after is None:
+            change = 'unknown'
+        elif rows_after < rows_before:
+            change = 'improved'
+        elif rows_after > rows_before:
+            change = 'regressed'
+        else:
+            change = 'plan-changed' if plan_after['access'] != plan_before['access'] else 'unchanged'
+        statements.append({
+            'id': fingerprint_id(fingerprint(query)),
+            'query': ' '.join(query.split())[:240],
+            'before': plan_before,
+            'after': plan_after,
+            'change': change,
+        })
+    summary: Dict[str, int] = {}
+    for entry in statements:
+        summary[entry['change']] = summary.get(entry['change'], 0) + 1
+    return {
+        'backend': db_manager.backend.describe(),
+        'created': created,
+        'unused_indexes': sorted(names - used),
+        'summary': summary,
+        'statements': statements,
+    }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    lines = []
+    for entry in report['statements']:
+        lines.append(f"[{entry['change']:<9}] {entry['id']} 估算行数 {entry['before']['rows']} -> {entry['after']['rows']}")
+        lines.append(f"    {entry['query'][:120]}")
+        for line in entry['after']['access']:
+            lines.append(f"      {line}")
+    lines.append(f"汇总：{report['summary']}")
+    if report['unused_indexes']:
+        lines.append(f"未被任何语句使用的索引：{', '.join(report['unused_indexes'])}")
+    return '\n'.join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='索引建议与迁移')
+    parser.add_argument('command', choices=['plan', 'apply', 'drop'])
+    parser.add_argument('--backend', choices=['mysql', 'sqlite', 'duckdb'], default=None,
+                        help='数据库后端，默认 DB_BACKEND')
+    parser.add_argument('--path', default=None, help='嵌入式数据库文件路径，默认 EMBEDDED_DB_PATH')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    settings = config['default']
+    # 路由模块导入时按配置创建 DatabaseManager，须在导入前设置后端
+    if args.backend:
+        settings.DB_BACKEND = args.backend
+    if args.path:
+        settings.EMBEDDED_DB_PATH = args.path
+    from database.Q3 import DatabaseManager
+    db_manager = DatabaseManager('default')
+
+    if args.command == 'plan':
+        for table in dict.fromkeys(spec.table for spec in INDEXES):
+            text_columns = _text_columns(db_manager, table)
+            for spec in INDEXES:
+                if spec.table == table:
+                    print(f"-- {spec.purpose}")
+                    for statement in column_migrations(spec, text_columns):
+                        print(f"{statement};  -- 覆盖索引要求完整列，TEXT 列改为 VARCHAR")
+                    print(f"{index_ddl(spec, text_columns)};")
+    elif args.command == 'apply':
+        created = apply_indexes(db_manager)
+        print(f"新建索引 {len(created)} 个：{', '.join(created) or '无'}")
+    else:
+        dropped = drop_indexes(db_manager)
+        print(f"删除索引 {len(dropped)} 个：{', '.join(dropped) or '无'}")
+
+
+if __name__ == '__main__':
+    main()
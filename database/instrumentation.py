@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+查询埋点与慢查询日志
+DatabaseManager 执行的每条语句按指纹（字面量替换为 ? 后的规范化语句）汇总：
+调用方（服务方法）、连接 / 执行 / 读取各阶段耗时、返回行数与传输字节数（估算），
+总耗时记入进程内直方图；超过阈值的语句写入慢查询日志，并附带 EXPLAIN 输出
+"""
+
+import copy
+import hashlib
+import json
+import logging
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+from utils.metrics import Histogram, add_phase
+
+logger = logging.getLogger(__name__)
+slow_logger = logging.getLogger('slow_query')
+
+# 指纹数量上限，超出后归入同一个溢出项，防止动态拼接的语句占满内存
+MAX_FINGERPRINTS = 500
+OVERFLOW_FINGERPRINT = 'other'
+
+# 估算传输字节数时最多采样的行数
+BYTES_SAMPLE_ROWS = 100
+
+# 同一指纹两次 EXPLAIN 的最小间隔（秒），避免慢查询频发时反复查看执行计划加重负载
+EXPLAIN_INTERVAL = 60.0
+
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|\?")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+# 定位调用方时跳过的函数：DatabaseManager 的通用执行方法与缓存、合并等中间层
+_INTERNAL_FUNCTIONS = {
+    'execute_query', '_execute_query', 'fetch_batches', 'iter_query', 'execute_many',
+    '_record_query', 'do', 'wrapper', 'get', 'refresh', '_refresh', 'load', '__exit__', '__next__',
+}
+_INTERNAL_MODULES = ('utils/singleflight.py', 'utils/cache.py', 'contextlib.py', 'threading.py',
+                     'database/instrumentation.py')
+
+
+def fingerprint(query: str) -> str:
+    """语句指纹：字符串与数字字面量、占位符统一为 ?，IN 列表折叠，空白规范化"""
+    text = _STRING_LITERAL.sub('?', query)
+    text = _NUMBER_LITERAL.sub('?', text)
+    text = _PLACEHOLDER.sub('?', text)
+    text = _IN_LIST.sub('(?+)', text)
+    return ' '.join(text.split())
+
+
+def fingerprint_id(normalized: str) -> str:
+    """指纹的短标识，便于在日志与接口中引用"""
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:12]
+
+
+def find_caller(depth: int = 2) -> str:
+    """返回发起查询的方法（模块.限定名），跳过通用执行方法与中间层"""
+    frame = sys._getframe(depth)
+    while frame is not None:
+        code = frame.f_code
+        filename = code.co_filename.replace('\\', '/')
+        if code.co_name not in _INTERNAL_FUNCTIONS and not filename.endswith(_INTERNAL_MODULES):
+            module = frame.f_globals.get('__name__', '?')
+            return f"{module}.{getattr(code, 'co_qualname', code.co_name)}"
+        frame = frame.f_back
+    return '?'
+
+
+def _value_bytes(value: Any) -> int:
+    if value is None:
+        return 1
+    if isinstance(value, str):
+        return len(value.encode('utf-8'))
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    return 8
+
+
+def estimate_bytes(rows: Sequence[Sequence[Any]]) -> int:
+    """估算结果集的传输字节数：采样前若干行按行数外推"""
+    if not rows:
+        return 0
+    sample = rows[:BYTES_SAMPLE_ROWS]
+    total = sum(_value_bytes(value) for row in sample for value in (row if isinstance(row, (tuple, list)) else (row,)))
+    return int(total * len(rows) / len(sample))
+
+
+class QueryTiming:
+    """一次语句执行的分阶段计时：connect（取得连接）、execute（执行）、fetch（读取结果）"""
+
+    __slots__ = ('started', 'last', 'phases', 'rows', 'bytes')
+
+    def __init__(self):
+        self.started = self.last = time.perf_counter()
+        self.phases = {'connect': 0.0, 'execute': 0.0, 'fetch': 0.0}
+        self.rows = 0
+        self.bytes = 0
+
+    def mark(self, phase: str) -> None:
+        """将上一次标记至今的耗时计入 phase"""
+        now = time.perf_counter()
+        self.phases[phase] += (now - self.last) * 1000
+        self.last = now
+
+    def resume(self) -> None:
+        """从现在起重新计时（跳过调用方处理结果的时间）"""
+        self.last = time.perf_counter()
+
+    def add_rows(self, rows: Any, single: bool = False) -> None:
+        """累计返回的行数与估算字节数，single 为 True 时 rows 是单行（fetchone）"""
+        if single:
+            rows = [rows] if rows else []
+        if rows:
+            self.rows += len(rows)
+            self.bytes += estimate_bytes(rows)
+
+    @property
+    def total_ms(self) -> float:
+        return sum(self.phases.values())
+
+
+class StatementStats:
+    """一个语句指纹的累计统计"""
+
+    def __init__(self, normalized: str, sample: str):
+        self.fingerprint = normalized
+        self.id = fingerprint_id(normalized)
+        self.sample = sample
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.bytes = 0
+        self.max_ms = 0.0
+        self.phases = {'connect': 0.0, 'execute': 0.0, 'fetch': 0.0}
+        self.histogram = Histogram()
+        self.callers: Counter = Counter()
+
+    def observe(self, timing: QueryTiming, caller: str, failed: bool) -> None:
+        total = timing.total_ms
+        self.calls += 1
+        self.errors += failed
+        self.rows += timing.rows
+        self.bytes += timing.bytes
+        self.max_ms = max(self.max_ms, total)
+        for phase, value in timing.phases.items():
+            self.phases[phase] += value
+        self.histogram.observe(total)
+        self.callers[caller] += 1
+
+    def to_dict(self, include_histogram: bool = False) -> Dict[str, Any]:
+        result = {
+            'id': self.id,
+            'fingerprint': self.fingerprint,
+            'callers': dict(self.callers.most_common(5)),
+            'calls': self.calls,
+            'errors': self.errors,
+            'total_ms': round(self.histogram.sum, 3),
+            'avg_ms': round(self.histogram.sum / self.calls, 3) if self.calls else 0.0,
+            'p50_ms': round(min(self.histogram.quantile(0.5), self.max_ms), 3),
+            'p95_ms': round(min(self.histogram.quantile(0.95), self.max_ms), 3),
+            'p99_ms': round(min(self.histogram.quantile(0.99), self.max_ms), 3),
+            'max_ms': round(self.max_ms, 3),
+            'phases_ms': {phase: round(value, 3) for phase, value in self.phases.items()},
+            'rows': self.rows,
+            'bytes': self.bytes,
+        }
+        if include_histogram:
+            result['histogram'] = self.histogram.to_dict()
+        return result
+
+
+class SlowQueryLog:
+    """
+    慢查询日志：保留最近 maxlen 条超过阈值的语句，并写入 slow_query 日志（可选追加到 JSON Lines 文件）
+    explain 为取得执行计划的回调 (语句, 参数) -> 计划行列表，同一指纹在 EXPLAIN_INTERVAL 内只查看一次
+    """
+
+    def __init__(self, threshold_ms: float = 500, maxlen: int = 100, path: str = ''):
+        self.threshold_ms = threshold_ms
+        self.path = path
+        self.entries: Deque[Dict[str, Any]] = deque(maxlen=maxlen)
+        self.recorded = 0
+        self._explained: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold_ms > 0
+
+    def _should_explain(self, statement_id: str) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            if now - self._explained.get(statement_id, -EXPLAIN_INTERVAL) < EXPLAIN_INTERVAL:
+                return False
+            self._explained[statement_id] = now
+            return True
+
+    def record(self, stats: StatementStats, query: str, params: Any, timing: QueryTiming, caller: str,
+               explain: Optional[Callable[[str, Any], List[Any]]] = None) -> None:
+        plan = None
+        if explain is not None and self._should_explain(stats.id):
+            try:
+                plan = [list(row) if isinstance(row, (tuple, list)) else row for row in explain(query, params)]
+            except Exception as e:
+                plan = f"EXPLAIN 失败: {e}"
+        entry = {
+            'at': datetime.now().isoformat(),
+            'id': stats.id,
+            'caller': caller,
+            'total_ms': round(timing.total_ms, 3),
+            'phases_ms': {phase: round(value, 3) for phase, value in timing.phases.items()},
+            'rows': timing.rows,
+            'bytes': timing.bytes,
+            'query': ' '.join(query.split()),
+            'params': [str(value) for value in params] if isinstance(params, (tuple, list)) else params,
+            'explain': plan,
+        }
+        with self._lock:
+            self.entries.append(entry)
+            self.recorded += 1
+        slow_logger.warning(f"慢查询 {entry['total_ms']}ms [{caller}] {stats.fingerprint[:200]}")
+        if self.path:
+            try:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(entry, ensure_ascii=False, default=str) + '\n')
+            except OSError as e:
+                logger.error(f"写入慢查询日志失败: {e}")
+
+    def recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self.entries)[-limit:][::-1]
+
+
+class ConnectionStats:
+    """数据库连接统计：每次查询新建连接，记录建立次数、当前占用数、峰值与失败次数"""
+
+    def __init__(self):
+        self.opened = 0
+        self.active = 0
+        self.max_active = 0
+        self.failures = 0
+        self.connect_ms = 0.0
+        self._lock = threading.Lock()
+
+    def connected(self, elapsed_ms: float) -> None:
+        with self._lock:
+            self.opened += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            self.connect_ms += elapsed_ms
+
+    def failed(self) -> None:
+        with self._lock:
+            self.failures += 1
+
+    def closed(self) -> None:
+        with self._lock:
+            self.active -= 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'opened': self.opened,
+                'active': self.active,
+                'max_active': self.max_active,
+                'failures': self.failures,
+                'avg_connect_ms': round(self.connect_ms / self.opened, 3) if self.opened else 0.0,
+            }
+
+
+class QueryMetrics:
+    """按语句指纹汇总的查询统计（进程内）"""
+
+    def __init__(self, enabled: bool = True, slow_log: Optional[SlowQueryLog] = None):
+        self.enabled = enabled
+        self.slow_log = slow_log or SlowQueryLog(threshold_ms=0)
+        self.statements: Dict[str, StatementStats] = {}
+        self.connections = ConnectionStats()
+        self._fingerprints: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _statement(self, query: str) -> StatementStats:
+        normalized = self._fingerprints.get(query)
+        if normalized is None:
+            normalized = fingerprint(query)
+            if len(self._fingerprints) < MAX_FINGERPRINTS * 4:
+                self._fingerprints[query] = normalized
+        stats = self.statements.get(normalized)
+        if stats is None:
+            if len(self.statements) >= MAX_FINGERPRINTS:
+                normalized = OVERFLOW_FINGERPRINT
+                stats = self.statements.get(normalized)
+            if stats is None:
+                stats = self.statements[normalized] = StatementStats(normalized, ' '.join(query.split())[:500])
+        return stats
+
+    def record(self, query: str, params: Any, timing: QueryTiming, failed: bool = False,
+               explain: Optional[Callable[[str, Any], List[Any]]] = None) -> None:
+        """记录一次语句执行；超过慢查询阈值时写入慢查询日志"""
+        add_phase('db', timing.total_ms)
+        caller = find_caller(3)
+        with self._lock:
+            stats = self._statement(query)
+            stats.observe(timing, caller, failed)
+        if self.slow_log.enabled and timing.total_ms >= self.slow_log.threshold_ms:
+            self.slow_log.record(stats, query, params, timing, caller, explain)
+
+    def snapshot(self, limit: int = 50, sort_by: str = 'total_ms',
+                 include_histogram: bool = False) -> List[Dict[str, Any]]:
+        """按 sort_by（total_ms / avg_ms / p95_ms / calls / rows / bytes）降序返回前 limit 个指纹的统计"""
+        with self._lock:
+            items = [stats.to_dict(include_histogram) for stats in self.statements.values()]
+        items.sort(key=lambda item: item.get(sort_by, 0), reverse=True)
+        return items[:limit]
+
+    def histograms(self) -> Dict[str, Tuple[str, Histogram]]:
+        """返回 {指纹标识: (主要调用方, 耗时直方图)}"""
+        with self._lock:
+            return {stats.id: (stats.callers.most_common(1)[0][0] if stats.callers else '?',
+                               copy.deepcopy(stats.histogram))
+                    for stats in self.statements.values()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self.statements.clear()
+
+
+def create_query_metrics(settings) -> QueryMetrics:
+    """按配置创建查询统计与慢查询日志"""
+    slow_log = SlowQueryLog(
+        threshold_ms=settings.SLOW_QUERY_THRESHOLD_MS,
+        maxlen=settings.SLOW_QUERY_LOG_SIZE,
+        path=settings.SLOW_QUERY_LOG_PATH
+    )
+    return QueryMetrics(enabled=settings.QUERY_METRICS_ENABLED, slow_log=slow_log)
@@ -0,0 +1,637 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+招聘数据导入
+将数据源（JobWanted.xlsx，或列相同的 CSV）分块流式读取，解析出规范化列后批量写入 data 表，
+再重算汇总表并更新数据版本：
+
+1. 统计：第一遍只取 city / job_title / company_type，统计职位在城市内的招聘数与职位的行业分布
+   （追加导入时叠加表中已有数据），据此得到 job_in_city_cnt、is_in_top200 与 shannon_entropy；
+2. 写入：第二遍逐块解析薪资（年薪中位数、职位层级）、经验与学历等级、城市等级，
+   由 workers 个线程并行解析与写入，每个线程持有一个连接；MySQL 使用 LOAD DATA LOCAL INFILE
+   （服务端未开启 local_infile 时退回 executemany），嵌入式后端单线程 executemany；
+   全量导入写入暂存表，全部写入成功后与 data 表交换（MySQL 为 RENAME TABLE），导入期间 data 表不受影响；
+   写入失败时删除暂存表，追加导入则删除本批已写入的行；
+3. 追加导入时更新已有行中取值变化的派生列；
+4. 由 data 表重算汇总表（job_summary_by_title、job_summary、national_industry_stats、
+   job_city_distribution、experience_mapping、education_mapping），建立缺失的索引；
+5. 重建聚合快照（新的 data_version），清空跨进程共享的查询与响应缓存
+
+每次导入写入新的导入批次号 load_batch（增量分析 python data_analysis.py --incremental 的水位）
+
+用法：
+    python -m database.loader JobWanted.xlsx --replace                    # 全量导入（重建 data 表）
+    python -m database.loader new_jobs.csv                                # 追加一批
+    python -m database.loader JobWanted.xlsx --replace --workers 8 --chunk-size 50000 [--method executemany]
+"""
+
+import argparse
+import bisect
+import csv
+import logging
+import math
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+import pymysql
+
+from config import config
+from database.backends import Backend, DuckDBBackend, MySQLBackend, SQLiteBackend
+from database.synthetic import (EDUCATION_LEVELS, EXPERIENCE_LEVELS, JOB_LEVELS, SCHEMAS, _create_table,
+                                _insert, _read_reference, build_summary_tables)
+
+logger = logging.getLogger(__name__)
+
+settings = config['default']
+
+# 数据源的列（JobWanted_description.docx）
+SOURCE_COLUMNS = ('job_title', 'city', 'salary', 'experience', 'education', 'company', 'company_type')
+
+DATA_COLUMNS = [name for name, _ in SCHEMAS['data']]
+
+SUMMARY_TABLES = ('job_summary_by_title', 'job_summary', 'national_industry_stats',
+                  'job_city_distribution', 'experience_mapping', 'education_mapping')
+
+# 月薪区间（K）与可选的年薪月数，如 10-15K、12-20K·13薪；面议等无法解析的薪资不计年薪
+SALARY_RE = re.compile(r'^\s*(\d+)\s*-\s*(\d+)\s*[Kk](?:\s*·\s*(\d+)\s*薪)?')
+
+EXPERIENCE_RANKS = {code: rank for code, rank, _, _ in EXPERIENCE_LEVELS}
+EDUCATION_RANKS = {code: rank for code, rank, _, _ in EDUCATION_LEVELS}
+JOB_LEVEL_THRESHOLDS = [threshold for threshold, _ in JOB_LEVELS[:-1]]
+JOB_LEVEL_NAMES = [name for _, name in JOB_LEVELS]
+
+# 城市内按招聘数排名前 N 的职位标记为 is_in_top200
+TOP_TITLES_IN_CITY = 200
+
+# 未出现在城市等级表中的城市
+DEFAULT_CITY_LEVEL = 'D'
+
+# 全量导入先写入暂存表，写入完成后与 data 表交换
+STAGING_TABLE = 'data_staging'
+
+LOAD_DATA_STATEMENT = (
+    "LOAD DATA LOCAL INFILE %s INTO TABLE {table} CHARACTER SET utf8mb4 "
+    "FIELDS TERMINATED BY '\\t' LINES TERMINATED BY '\\n' "
+    f"({', '.join(DATA_COLUMNS)})"
+)
+
+
+# ---------------------------------------------------------------------------
+# 数据源读取与解析
+# ---------------------------------------------------------------------------
+
+def _iter_xlsx(path: str) -> Iterator[Sequence[Any]]:
+    """以只读模式逐行读取首个工作表（不将整个工作簿载入内存）"""
+    from openpyxl import load_workbook
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        yield from workbook.worksheets[0].iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _iter_csv(path: str) -> Iterator[Sequence[Any]]:
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        yield from csv.reader(f)
+
+
+def _clean(value: Any) -> Optional[str]:
+    """单元格取值统一为去除首尾空白的字符串，空值为 None"""
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    text = str(value).strip()
+    return text or None
+
+
+def iter_source_chunks(path: str, chunk_size: int,
+                       columns: Sequence[str] = SOURCE_COLUMNS) -> Iterator[List[Tuple[Optional[str], ...]]]:
+    """按块读取数据源的指定列（xlsx 或 csv，首行为列名），每块为行元组列表"""
+    rows = _iter_xlsx(path) if os.path.splitext(path)[1].lower() in ('.xlsx', '.xlsm') else _iter_csv(path)
+    header = [_clean(name) for name in next(rows, [])]
+    missing = [name for name in columns if name not in header]
+    if missing:
+        raise ValueError(f"数据源 {path} 缺少列: {', '.join(missing)}")
+    positions = [header.index(name) for name in columns]
+
+    chunk = []
+    for row in rows:
+        chunk.append(tuple(_clean(row[position]) if position < len(row) else None for position in positions))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def annual_salary(salary: Optional[str]) -> Optional[float]:
+    """薪资字符串的年薪中位数（单位K）：月薪区间均值 × 月数（默认 12），无法解析时为 None"""
+    match = SALARY_RE.match(salary) if salary else None
+    if not match:
+        return None
+    low, high = int(match.group(1)), int(match.group(2))
+    if high < low:
+        return None
+    return (low + high) / 2 * int(match.group(3) or 12)
+
+
+def job_level(annual: Optional[float]) -> Optional[str]:
+    """按年薪中位数划分的职位层级（见 dataset/dataset/职位分类的解释.txt）"""
+    if annual is None:
+        return None
+    return JOB_LEVEL_NAMES[bisect.bisect_right(JOB_LEVEL_THRESHOLDS, annual)]
+
+
+def reference_city_levels() -> Dict[str, str]:
+    """城市等级表（dataset/dataset/第一题/city_summary.xlsx），不存在时为空"""
+    summary = _read_reference(os.path.join('第一题', 'city_summary.xlsx'))
+    if summary is None:
+        return {}
+    return {str(city): str(level) for city, level in zip(summary['city'], summary['city_level'])}
+
+
+class LoadStatistics:
+    """职位在城市内的招聘数与职位的行业分布，决定 job_in_city_cnt、is_in_top200 与 shannon_entropy"""
+
+    def __init__(self):
+        self.city_titles: Counter = Counter()
+        self.title_industries: Counter = Counter()
+        self.job_in_city_cnt: Dict[Tuple[Optional[str], Optional[str]], int] = {}
+        self.top_titles: Set[Tuple[Optional[str], Optional[str]]] = set()
+        self.entropy: Dict[Optional[str], float] = {}
+
+    def add(self, city: Optional[str], title: Optional[str], industry: Optional[str], count: int = 1) -> None:
+        self.city_titles[(city, title)] += count
+        if industry is not None:
+            self.title_industries[(title, industry)] += count
+
+    def copy(self) -> 'LoadStatistics':
+        other = LoadStatistics()
+        other.city_titles = self.city_titles.copy()
+        other.title_industries = self.title_industries.copy()
+        return other
+
+    def finalize(self) -> 'LoadStatistics':
+        """由计数得到各派生列的取值"""
+        self.job_in_city_cnt = dict(self.city_titles)
+        by_city: Dict[Optional[str], List[Tuple[int, Optional[str]]]] = {}
+        for (city, title), count in self.city_titles.items():
+            by_city.setdefault(city, []).append((count, title))
+        self.top_titles = set()
+        for city, titles in by_city.items():
+            titles.sort(key=lambda item: (-item[0], item[1] or ''))
+            self.top_titles.update((city, title) for _, title in titles[:TOP_TITLES_IN_CITY])
+
+        totals: Counter = Counter()
+        for (title, _), count in self.title_industries.items():
+            totals[title] += count
+        entropy: Dict[Optional[str], float] = {}
+        for (title, _), count in self.title_industries.items():
+            p = count / totals[title]
+            entropy[title] = entropy.get(title, 0.0) - p * math.log2(p)
+        self.entropy = {title: round(value, 4) for title, value in entropy.items()}
+        return self
+
+    def derived(self, city: Optional[str], title: Optional[str]) -> Tuple[Optional[float], int, Optional[int]]:
+        """(shannon_entropy, is_in_top200, job_in_city_cnt)"""
+        return (self.entropy.get(title, 0.0 if title is not None else None),
+                int((city, title) in self.top_titles), self.job_in_city_cnt.get((city, title)))
+
+
+def normalize_rows(rows: Sequence[Tuple[Optional[str], ...]], stats: LoadStatistics, city_levels: Dict[str, str],
+                   load_batch: int) -> List[Tuple]:
+    """数据源的行转换为 data 表的行（列顺序同 SCHEMAS['data']）"""
+    result = []
+    for title, city, salary, experience, education, company, company_type in rows:
+        annual = annual_salary(salary)
+        entropy, top, count = stats.derived(city, title)
+        result.append((
+            city, company, company_type, title, experience, EXPERIENCE_RANKS.get(experience),
+            education, EDUCATION_RANKS.get(education), salary, annual, entropy, job_level(annual),
+            city_levels.get(city, DEFAULT_CITY_LEVEL) if city is not None else None, top, count, load_batch,
+        ))
+    return result
+
+
+# ---------------------------------------------------------------------------
+# 并行写入
+# ---------------------------------------------------------------------------
+
+def _tsv_field(value: Any) -> str:
+    """LOAD DATA 默认格式的字段：NULL 为 \\N，反斜杠、制表符与换行转义"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, float):
+        return repr(value)
+    return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+class ChunkWriter:
+    """
+    并行写入 data 表（或结构相同的暂存表 table）：每个写入线程在首次写入时建立一个连接并一直复用（线程数即连接数）
+    method 为 load-data（仅 MySQL，失败时退回 executemany）或 executemany
+    """
+
+    def __init__(self, backend: Backend, method: str, table: str = 'data'):
+        self.backend = backend
+        self.method = method if backend.name == 'mysql' else 'executemany'
+        self.table = table
+        self.insert = backend.dialect.translate(
+            f"INSERT INTO {table} ({', '.join(DATA_COLUMNS)}) VALUES ({', '.join(['%s'] * len(DATA_COLUMNS))})"
+        )
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            if self.backend.name == 'mysql':
+                connection = pymysql.connect(**self.backend.db_config, local_infile=self.method == 'load-data')
+            else:
+                connection = self.backend.connect()
+                if self.backend.name == 'sqlite':
+                    # 批量写入期间不等待落盘，写入完成后由 commit 持久化
+                    connection.execute('PRAGMA synchronous = OFF')
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def write(self, rows: List[Tuple]) -> int:
+        connection = self._connection()
+        if self.method == 'load-data':
+            try:
+                self._load_data(connection, rows, self.table)
+                return len(rows)
+            except pymysql.MySQLError as e:
+                connection.rollback()
+                with self._lock:
+                    if self.method == 'load-data':
+                        logger.warning(f"LOAD DATA LOCAL INFILE 不可用，改用 executemany: {e}")
+                        self.method = 'executemany'
+        cursor = connection.cursor()
+        try:
+            cursor.executemany(self.insert, rows)
+        finally:
+            cursor.close()
+        connection.commit()
+        return len(rows)
+
+    @staticmethod
+    def _load_data(connection, rows: List[Tuple], table: str) -> None:
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', suffix='.tsv', newline='', delete=False) as f:
+            for row in rows:
+                f.write('\t'.join(_tsv_field(value) for value in row) + '\n')
+            path = f.name
+        try:
+            cursor = connection.cursor()
+            try:
+                cursor.execute(LOAD_DATA_STATEMENT.format(table=table), (path,))
+            finally:
+                cursor.close()
+            connection.commit()
+        finally:
+            os.remove(path)
+
+    def close(self) -> None:
+        for connection in self._connections:
+            connection.close()
+        self._connections.clear()
+
+
+# ---------------------------------------------------------------------------
+# 导入流程
+# ---------------------------------------------------------------------------
+
+def _execute(db_manager, statement: str, params_list: Optional[List[Tuple]] = None) -> None:
+    """在目标库上执行写语句（params_list 非空时 executemany）"""
+    with db_manager.get_connection() as connection:
+        cursor = connection.cursor()
+        try:
+            statement = db_manager.backend.dialect.translate(statement)
+            if params_list is None:
+                cursor.execute(statement)
+            elif params_list:
+                cursor.executemany(statement, params_list)
+            connection.commit()
+        finally:
+            cursor.close()
+
+
+def table_columns(db_manager, table: str) -> Optional[List[str]]:
+    """表的列名，表不存在时返回 None"""
+    try:
+        with db_manager.get_connection() as connection:
+            cursor = connection.cursor()
+            try:
+                cursor.execute(f"SELECT * FROM {table} LIMIT 0")
+                cursor.fetchall()
+                return [column[0] for column in cursor.description]
+            finally:
+                cursor.close()
+    except Exception:
+        return None
+
+
+def _prepare_data_table(db_manager, replace: bool) -> Tuple[int, bool]:
+    """
+    准备写入目标，返回 (本次导入的批次号, 是否追加到已有数据)
+    全量导入（或 data 表不存在）时新建空的暂存表，data 表保持原样直到 _swap_staging_table；
+    追加导入时为 data 表补齐 load_batch 列
+    """
+    columns = table_columns(db_manager, 'data')
+    if replace or columns is None:
+        connection = db_manager.backend.connect()
+        try:
+            _create_table(connection, db_manager.backend, 'data', replace=True, name=STAGING_TABLE)
+            connection.commit()
+        finally:
+            connection.close()
+        return 1, False
+    if 'load_batch' not in columns:
+        logger.info("data 表没有 load_batch 列，已有数据记为第 0 批")
+        _execute(db_manager, "ALTER TABLE data ADD COLUMN load_batch INT")
+        _execute(db_manager, "UPDATE data SET load_batch = 0")
+    row = db_manager.execute_query("SELECT MAX(load_batch) FROM data", fetch_one=True)
+    return (row[0] or 0) + 1 if row else 1, True
+
+
+def _swap_staging_table(db_manager) -> None:
+    """
+    用暂存表替换 data 表：MySQL 为一条 RENAME TABLE（原子交换），
+    嵌入式后端在一个事务中重命名（SQLite / DuckDB 的 DDL 可回滚），查询不会读到空表或写了一半的表
+    """
+    exists = table_columns(db_manager, 'data') is not None
+    if db_manager.backend.name == 'mysql':
+        if exists:
+            _execute(db_manager, f"RENAME TABLE data TO data_old, {STAGING_TABLE} TO data")
+            _execute(db_manager, "DROP TABLE data_old")
+        else:
+            _execute(db_manager, f"RENAME TABLE {STAGING_TABLE} TO data")
+        return
+    connection = db_manager.backend.connect()
+    try:
+        cursor = connection.cursor()
+        try:
+            cursor.execute("BEGIN")
+            if exists:
+                cursor.execute("DROP TABLE IF EXISTS data_old")
+                cursor.execute("ALTER TABLE data RENAME TO data_old")
+            cursor.execute(f"ALTER TABLE {STAGING_TABLE} RENAME TO data")
+            if exists:
+                cursor.execute("DROP TABLE data_old")
+            cursor.execute("COMMIT")
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+        finally:
+            cursor.close()
+    finally:
+        connection.close()
+
+
+def _discard_failed_load(db_manager, load_batch: int, appending: bool) -> None:
+    """写入失败时撤销本次导入：删除暂存表，或从 data 表删除本批已写入的行"""
+    try:
+        if appending:
+            _execute(db_manager, "DELETE FROM data WHERE load_batch = %s", [(load_batch,)])
+            logger.info(f"已删除第 {load_batch} 批已写入的行")
+        else:
+            _execute(db_manager, f"DROP TABLE IF EXISTS {STAGING_TABLE}")
+            logger.info("已删除暂存表，data 表保持不变")
+    except Exception as e:
+        logger.error(f"撤销第 {load_batch} 批导入失败，请手动清理: {e}")
+
+
+def _existing_statistics(db_manager) -> LoadStatistics:
+    """表中已有数据的计数（追加导入时作为统计的起点）"""
+    stats = LoadStatistics()
+    for city, title, count in db_manager.execute_query(
+            "SELECT city, job_title, COUNT(*) FROM data GROUP BY city, job_title"):
+        stats.city_titles[(city, title)] += int(count)
+    for title, industry, count in db_manager.execute_query(
+            "SELECT job_title, company_type, COUNT(*) FROM data WHERE company_type IS NOT NULL "
+            "GROUP BY job_title, company_type"):
+        stats.title_industries[(title, industry)] += int(count)
+    return stats
+
+
+def _refresh_existing_rows(db_manager, before: LoadStatistics, after: LoadStatistics) -> int:
+    """追加导入后，已有行中取值变化的派生列（城市内招聘数、前 200 标记、行业熵）按新统计更新"""
+    before.finalize()
+    pairs = [
+        (after.job_in_city_cnt[key], int(key in after.top_titles), key[0], key[1])
+        for key in before.city_titles
+        if key[0] is not None and key[1] is not None
+        and (before.job_in_city_cnt[key] != after.job_in_city_cnt[key]
+             or (key in before.top_titles) != (key in after.top_titles))
+    ]
+    titles = [
+        (after.entropy.get(title, 0.0), title)
+        for title in {title for _, title in before.city_titles if title is not None}
+        if before.entropy.get(title, 0.0) != after.entropy.get(title, 0.0)
+    ]
+    _execute(db_manager, "UPDATE data SET job_in_city_cnt = %s, is_in_top200 = %s "
+                         "WHERE city = %s AND job_title = %s", pairs)
+    _execute(db_manager, "UPDATE data SET shannon_entropy = %s WHERE job_title = %s", titles)
+    return len(pairs) + len(titles)
+
+
+def rebuild_summary_tables(db_manager, batch_size: int = 20000) -> Dict[str, int]:
+    """由 data 表重算各汇总表（删除重建），返回 {表名: 行数}"""
+    columns: List[List[np.ndarray]] = [[] for _ in range(7)]
+    for batch in db_manager.iter_query(
+            "SELECT job_title, company_type, city, experience_rank, education_rank, "
+            "median_annual_salary, shannon_entropy FROM data",
+            batch_size=batch_size, column_types=(None, None, None, float, float, float, float), as_numpy=True):
+        for values, column in zip(batch, columns):
+            column.append(values)
+    if not columns[0]:
+        raise ValueError("data 表为空，无法重算汇总表")
+    title_values, industry_values, city_values, exp, edu, annual, entropy = (np.concatenate(c) for c in columns)
+
+    def encode(values: np.ndarray) -> Tuple[List[Optional[str]], np.ndarray]:
+        """字典编码，NULL 编为最后一个取值 None"""
+        present = values != None  # noqa: E711  对象数组逐元素比较
+        names, codes = np.unique(values[present].astype(str), return_inverse=True)
+        result = np.full(len(values), len(names), dtype=np.int64)
+        result[present] = codes
+        return names.tolist() + [None], result
+
+    titles, title = encode(title_values)
+    industries, industry = encode(industry_values)
+    cities, city = encode(city_values)
+    title_entropy = np.full(len(titles), np.nan)
+    title_entropy[title] = entropy
+    keys, counts = np.unique(city * len(titles) + title, return_counts=True)
+
+    def ranks(values: np.ndarray, size: int) -> np.ndarray:
+        values = np.nan_to_num(values).astype(np.int64)
+        return np.where((values >= 0) & (values <= size), values, 0)
+
+    tables = build_summary_tables(titles, industries, cities, title, industry,
+                                  ranks(exp, len(EXPERIENCE_LEVELS)), ranks(edu, len(EDUCATION_LEVELS)),
+                                  annual, title_entropy, keys, counts)
+    counts_by_table = {}
+    connection = db_manager.backend.connect()
+    try:
+        for table in SUMMARY_TABLES:
+            rows = tables[table]
+            insert = _create_table(connection, db_manager.backend, table, replace=True)
+            for start in range(0, len(rows), batch_size):
+                _insert(connection, db_manager.backend, insert, rows[start:start + batch_size])
+            connection.commit()
+            counts_by_table[table] = len(rows)
+            logger.info(f"已重算 {table}: {len(rows)} 行")
+    finally:
+        connection.close()
+    return counts_by_table
+
+
+def _invalidate_shared_caches() -> None:
+    """清空跨进程共享的查询与响应缓存（进程内缓存由各服务进程按 TTL 过期）"""
+    if settings.CACHE_BACKEND == 'memory':
+        return
+    from database.Q3 import query_cache
+    from utils.response import response_cache
+    if query_cache.shared is not None:
+        query_cache.shared.clear()
+    response_cache.clear()
+    logger.info("已清空共享查询缓存与响应缓存")
+
+
+def load_source(db_manager, path: str, replace: bool = False, workers: Optional[int] = None,
+                chunk_size: Optional[int] = None, method: str = 'load-data', indexes: bool = True,
+                snapshot: bool = True) -> Dict[str, Any]:
+    """
+    导入数据源到 data 表并重算汇总表、更新数据版本
+
+    Args:
+        replace: 为 True 时重建 data 表，否则作为新的一批追加
+        workers: 并行写入的线程数（嵌入式后端只支持单个写入者，固定为 1）
+        chunk_size: 每块读取与写入的行数
+        method: MySQL 的写入方式，load-data 或 executemany
+        indexes: 导入后建立缺失的索引（全量导入时索引在写入完成后建立）
+        snapshot: 导入后重建聚合快照（启用 COLUMN_STORE_ENABLED 时）
+
+    Returns:
+        导入摘要：批次号、行数、各汇总表行数、数据版本与耗时
+    """
+    workers = workers or settings.LOAD_WORKERS
+    chunk_size = chunk_size or settings.LOAD_CHUNK_SIZE
+    if db_manager.backend.name != 'mysql':
+        workers = 1
+    started = time.perf_counter()
+
+    load_batch, appending = _prepare_data_table(db_manager, replace)
+    before = _existing_statistics(db_manager) if appending else LoadStatistics()
+    stats = before.copy()
+    for chunk in iter_source_chunks(path, chunk_size, ('city', 'job_title', 'company_type')):
+        for city, title, industry in chunk:
+            stats.add(city, title, industry)
+    stats.finalize()
+    logger.info(f"统计完成：{len(stats.city_titles)} 个城市-职位组合，耗时 {time.perf_counter() - started:.1f}s")
+
+    city_levels = reference_city_levels()
+    writer = ChunkWriter(db_manager.backend, method, 'data' if appending else STAGING_TABLE)
+    loaded = 0
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='loader') as executor:
+            pending = set()
+
+            def collect(done):
+                nonlocal loaded
+                for future in done:
+                    loaded += future.result()
+                elapsed = time.perf_counter() - started
+                logger.info(f"已写入 {loaded} 行，耗时 {elapsed:.1f}s（{loaded / max(elapsed, 1e-9):.0f} 行/秒）")
+
+            for chunk in iter_source_chunks(path, chunk_size):
+                pending.add(executor.submit(
+                    lambda rows: writer.write(normalize_rows(rows, stats, city_levels, load_batch)), chunk
+                ))
+                # 读取领先写入至多 2 * workers 块，控制内存
+                if len(pending) >= 2 * workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+            if pending:
+                collect(wait(pending)[0])
+    except BaseException:
+        writer.close()
+        _discard_failed_load(db_manager, load_batch, appending)
+        raise
+    finally:
+        writer.close()
+    if not appending:
+        _swap_staging_table(db_manager)
+
+    refreshed = _refresh_existing_rows(db_manager, before, stats) if appending else 0
+    if refreshed:
+        logger.info(f"已更新已有行的派生列：{refreshed} 组")
+    summary_counts = rebuild_summary_tables(db_manager)
+    if indexes:
+        from database.indexes import apply_indexes
+        apply_indexes(db_manager)
+
+    data_version = f"{datetime.now().strftime('%Y%m%d%H%M%S')}-b{load_batch}"
+    if snapshot and settings.COLUMN_STORE_ENABLED and settings.COLUMN_STORE_PATH:
+        from database.column_store import build_column_store
+        build_column_store(db_manager, data_version=data_version)
+    _invalidate_shared_caches()
+
+    return {
+        'load_batch': load_batch,
+        'rows': loaded,
+        'summary_tables': summary_counts,
+        'data_version': data_version,
+        'elapsed_seconds': round(time.perf_counter() - started, 1),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='招聘数据导入（JobWanted.xlsx 或同列 CSV）')
+    parser.add_argument('source', help='数据源文件（.xlsx / .csv）')
+    parser.add_argument('--replace', action='store_true', help='重建 data 表（全量导入），默认追加为新的一批')
+    parser.add_argument('--backend', choices=['mysql', 'sqlite', 'duckdb'], default=None,
+                        help='数据库后端，默认 DB_BACKEND')
+    parser.add_argument('--path', default=None, help='嵌入式数据库文件路径，默认 EMBEDDED_DB_PATH')
+    parser.add_argument('--workers', type=int, default=settings.LOAD_WORKERS, help='并行写入线程数（仅 MySQL）')
+    parser.add_argument('--chunk-size', type=int, default=settings.LOAD_CHUNK_SIZE, help='每块行数')
+    parser.add_argument('--method', choices=['load-data', 'executemany'], default='load-data',
+                        help='MySQL 写入方式')
+    parser.add_argument('--skip-indexes', action='store_true', help='导入后不建立索引')
+    parser.add_argument('--skip-snapshot', action='store_true', help='导入后不重建聚合快照')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    backend_name = args.backend or settings.DB_BACKEND
+    path = args.path or settings.EMBEDDED_DB_PATH
+    if backend_name == 'mysql':
+        backend = MySQLBackend(settings.get_db_config())
+    else:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        backend = SQLiteBackend(path) if backend_name == 'sqlite' else DuckDBBackend(path, read_only=False)
+    from database.Q3 import DatabaseManager
+    db_manager = DatabaseManager('default', backend=backend)
+
+    summary = load_source(db_manager, args.source, args.replace, args.workers, args.chunk_size, args.method,
+                          indexes=not args.skip_indexes, snapshot=not args.skip_snapshot)
+    print(f"导入批次 {summary['load_batch']}：{summary['rows']} 行，数据版本 {summary['data_version']}，"
+          f"耗时 {summary['elapsed_seconds']}s")
+    for table, count in summary['summary_tables'].items():
+        print(f"  {table:<28} {count:>10} 行")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+近似去重计数（HyperLogLog 基数草图）
+聚合快照为立方体（城市, 公司类型, 经验, 学历）的每个单元格保存其公司集合的稀疏草图，
+任意上卷（某城市、某行业、若干经验等级……）只需按寄存器取最大值合并所选单元格的草图，
+无需再对 data 表执行 COUNT(DISTINCT company)
+
+草图以 (寄存器下标 << 8 | 秩) 的 uint32 数组存储：单元格内每家公司一项，
+合并时对同一寄存器取秩的最大值。公司类型、城市本身是立方体维度，其去重数由单元格键精确得到；
+岗位数与平均薪资由单元格的计数与区间中值之和汇总，与快照构建时的数据一致
+
+立方体只包含薪资为区间格式（salary REGEXP '^[0-9]+-[0-9]+'）的记录，与精确统计查询的范围相同
+"""
+
+import hashlib
+import math
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import config
+from database.column_store import ColumnStore, get_column_store
+
+settings = config['default']
+
+HASH_BITS = 64
+
+
+def _hash64(value: Any) -> int:
+    """稳定的 64 位哈希（跨进程、跨版本一致，不受 PYTHONHASHSEED 影响）"""
+    return int.from_bytes(hashlib.blake2b(str(value).encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def register_pairs(values: Iterable[Any], precision: int) -> np.ndarray:
+    """每个取值对应的 (寄存器下标 << 8 | 秩)：高 p 位选寄存器，其余位的前导零个数加一为秩"""
+    rest_bits = HASH_BITS - precision
+    rest_mask = (1 << rest_bits) - 1
+    pairs = []
+    for value in values:
+        hashed = _hash64(value)
+        rank = rest_bits - (hashed & rest_mask).bit_length() + 1
+        pairs.append((hashed >> rest_bits) << 8 | rank)
+    return np.asarray(pairs, dtype=np.uint32)
+
+
+def relative_error(precision: int) -> float:
+    """HyperLogLog 估计值的相对标准误差"""
+    return 1.04 / math.sqrt(1 << precision)
+
+
+class HyperLogLog:
+    """稠密寄存器的 HyperLogLog 草图"""
+
+    def __init__(self, precision: int = settings.HLL_PRECISION, registers: Optional[np.ndarray] = None):
+        self.precision = precision
+        self.registers = (np.zeros(1 << precision, dtype=np.uint8) if registers is None
+                          else np.array(registers, dtype=np.uint8))
+
+    @classmethod
+    def from_pairs(cls, pairs: np.ndarray, precision: int) -> 'HyperLogLog':
+        sketch = cls(precision)
+        sketch.add_pairs(pairs)
+        return sketch
+
+    def add(self, value: Any) -> None:
+        self.add_pairs(register_pairs([value], self.precision))
+
+    def add_pairs(self, pairs: np.ndarray) -> None:
+        if len(pairs):
+            np.maximum.at(self.registers, (pairs >> 8).astype(np.int64), (pairs & 0xFF).astype(np.uint8))
+
+    def merge(self, other: 'HyperLogLog') -> 'HyperLogLog':
+        if other.precision != self.precision:
+            raise ValueError(f"草图精度不一致：{self.precision} 与 {other.precision}")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self) -> float:
+        """基数估计：调和平均估计，小基数时改用线性计数（64 位哈希无需大基数修正）"""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / float(np.sum(np.ldexp(1.0, -self.registers.astype(np.int32))))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            return m * math.log(m / zeros)
+        return raw
+
+    def __len__(self) -> int:
+        return int(round(self.estimate()))
+
+    @property
+    def relative_error(self) -> float:
+        return relative_error(self.precision)
+
+
+class DistinctSketches:
+    """基于聚合快照的去重计数：公司数由单元格草图合并估计，公司类型 / 城市数由单元格键精确统计"""
+
+    def __init__(self, store: ColumnStore):
+        self.store = store
+        self.precision = int(store.header['hll_precision'])
+
+    def _cell_mask(self, filters: Dict[str, Optional[Sequence[Any]]]) -> np.ndarray:
+        """满足筛选条件（列 -> 取值列表）的立方体单元格"""
+        mask = np.ones(len(self.store.array('cube_count')), dtype=bool)
+        for column, values in filters.items():
+            if values is not None:
+                codes = [self.store.code_of(column, value) for value in values]
+                mask &= np.isin(self.store.array(f'cube_{column}'), codes)
+        return mask
+
+    def _companies(self, cells: np.ndarray) -> HyperLogLog:
+        pairs = self.store.array('cube_company_hll')
+        offsets = self.store.array('cube_company_hll_offsets')
+        if len(cells) == 0:
+            return HyperLogLog(self.precision)
+        return HyperLogLog.from_pairs(
+            np.concatenate([pairs[offsets[cell]:offsets[cell + 1]] for cell in cells]), self.precision
+        )
+
+    def companies(self, **filters: Optional[Sequence[Any]]) -> int:
+        """区间薪资记录中满足筛选条件的公司数（估计值）"""
+        return len(self._companies(np.flatnonzero(self._cell_mask(filters))))
+
+    def distinct(self, column: str, **filters: Optional[Sequence[Any]]) -> int:
+        """区间薪资记录中满足筛选条件的某个立方体维度的去重数（精确值，不含 NULL）"""
+        codes = self.store.array(f'cube_{column}')[self._cell_mask(filters)]
+        return int(np.count_nonzero(np.unique(codes) >= 0))
+
+    def totals(self, **filters: Optional[Sequence[Any]]) -> Tuple[int, Optional[float]]:
+        """区间薪资记录中满足筛选条件的岗位数与平均薪资（区间中值的平均，无记录时为 None）"""
+        mask = self._cell_mask(filters)
+        count = int(self.store.array('cube_count')[mask].sum())
+        total = float(self.store.array('cube_salary_sum')[mask].sum())
+        return count, (total / count if count else None)
+
+    def groups(self, column: str, **filters: Optional[Sequence[Any]]) -> List[Tuple[Any, int, float]]:
+        """
+        按立方体维度分组的 (取值, 岗位数, 平均薪资)，范围同 totals，按岗位数降序，不含 NULL
+        相当于 GROUP BY column 的 COUNT(*) 与 AVG(区间中值)
+        """
+        mask = self._cell_mask(filters)
+        codes = self.store.array(f'cube_{column}')[mask]
+        known = codes >= 0
+        size = len(self.store.dictionaries[column])
+        counts = np.bincount(codes[known], weights=self.store.array('cube_count')[mask][known], minlength=size)
+        sums = np.bincount(codes[known], weights=self.store.array('cube_salary_sum')[mask][known], minlength=size)
+        present = np.flatnonzero(counts > 0)
+        order = present[np.argsort(-counts[present], kind='stable')]
+        values = self.store.dictionaries[column]
+        return [(values[code], int(counts[code]), float(sums[code] / counts[code])) for code in order]
+
+    def total_companies(self) -> int:
+        """全表（不限薪资）公司数（估计值）"""
+        return len(HyperLogLog(self.precision, self.store.array('company_hll_registers')))
+
+    def total_distinct(self, column: str) -> int:
+        """全表某个字典编码列的去重数（精确值，不含 NULL）"""
+        return sum(1 for value in self.store.dictionaries[column] if value is not None)
+
+    def describe(self) -> Dict[str, Any]:
+        error = relative_error(self.precision)
+        return {
+            'approximate': True,
+            'method': 'hyperloglog',
+            'precision': self.precision,
+            'data_version': self.store.data_version,
+            'relative_standard_error': round(error, 5),
+            # 约 95% 的估计值落在真实值的 ±2 倍标准误差内
+            'error_bound_95': round(2 * error, 5),
+            # 公司数为草图估计值；岗位数、平均薪资、城市数、行业数由快照精确汇总（截至 data_version）
+            'estimated_fields': ['company_count', 'total_companies'],
+            'snapshot_fields': ['job_count', 'total_jobs', 'avg_salary', 'city_count', 'industry_count',
+                                'total_cities', 'total_industries'],
+        }
+
+
+_sketches: Optional[DistinctSketches] = None
+_sketches_lock = threading.Lock()
+
+
+def get_distinct_sketches() -> Optional[DistinctSketches]:
+    """当前聚合快照上的去重草图；快照未启用、不存在或不含草图（旧版本快照）时返回 None"""
+    global _sketches
+    store = get_column_store()
+    if store is None or 'cube_company_hll' not in store:
+        return None
+    with _sketches_lock:
+        if _sketches is None or _sketches.store is not store:
+            _sketches = DistinctSketches(store)
+        return _sketches
+
+
+def describe_distinct_counts(approx: bool) -> Dict[str, Any]:
+    """响应中的去重计数说明：近似模式给出误差界，草图不可用时说明已回退为精确计数"""
+    sketches = get_distinct_sketches() if approx else None
+    return sketches.describe() if sketches else {'approximate': False}
+
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+离线快照
+导出：通过应用自身的接口（与预热计划相同，详情展开到全部取值）请求一遍所有图表接口，
+记录期间执行的每条查询及其结果，写入一个带版本的快照文件；
+服务：SNAPSHOT_ONLY=True 时 DatabaseManager 的查询由快照应答，不需要 MySQL，只读
+
+快照只包含导出时实际执行过的查询，因此支持的请求参数为：
+- 各接口的默认参数，以及预热计划展开的全部详情取值；
+- 以 LIMIT %s [OFFSET %s] 结尾的查询（城市/行业/经验分布等列表接口的 limit 参数）：
+  导出时按默认 limit 记录了完整的分组结果，读取时按请求的 limit / offset 截取；
+- 其他参数组合（如 min_jobs、自定义筛选）不在快照中，接口返回 503（SNAPSHOT_MISS）。
+
+文件格式：
+    8 字节魔数 | uint32 格式版本 | uint32 头部长度 | JSON 头部 | zlib 压缩的 pickle 查询结果表
+
+用法：
+    python -m database.snapshot export [--output 路径] [--workers N]
+    python -m database.snapshot info [--output 路径]
+"""
+
+import argparse
+import json
+import logging
+import os
+import pickle
+import re
+import struct
+import threading
+import time
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+settings = config['default']
+
+MAGIC = b'VISSNAP\x00'
+FORMAT_VERSION = 1
+_PREAMBLE = struct.Struct('<8sII')
+
+
+# 规范化语句末尾的分页子句
+_PAGING_RE = re.compile(r' LIMIT %s( OFFSET %s)?$', re.IGNORECASE)
+
+
+class SnapshotMissError(LookupError):
+    """快照中没有该查询的结果"""
+
+
+class QuerySnapshot:
+    """快照读取器：按规范化查询键返回导出时记录的结果，分页查询可由记录的较大结果截取"""
+
+    def __init__(self, header: Dict[str, Any], results: Dict[tuple, Any]):
+        self.header = header
+        self.results = results
+        # (语句, 分页前的参数) -> (记录的最大 limit, 结果)，只收录 offset 为 0 的分页查询
+        self._paged: Dict[tuple, Tuple[int, Any]] = {}
+        for (statement, params, mode), rows in results.items():
+            paging = self._paging(statement, params, mode)
+            if paging is None:
+                continue
+            base, limit, offset = paging
+            if offset == 0 and limit > self._paged.get(base, (-1, None))[0]:
+                self._paged[base] = (limit, rows)
+
+    @property
+    def data_version(self) -> str:
+        return self.header.get('data_version', '')
+
+    @staticmethod
+    def _paging(statement: str, params: Any, mode: str) -> Optional[Tuple[tuple, int, int]]:
+        """以 LIMIT %s [OFFSET %s] 结尾的 fetchall 查询返回 ((语句, 分页前的参数), limit, offset)"""
+        match = _PAGING_RE.search(statement)
+        if mode != 'all' or match is None or not isinstance(params, tuple):
+            return None
+        count = 2 if match.group(1) else 1
+        if len(params) < count or not all(isinstance(value, int) for value in params[-count:]):
+            return None
+        limit, offset = (params[-2], params[-1]) if count == 2 else (params[-1], 0)
+        return (statement[:match.start()], params[:-count]), limit, offset
+
+    def _lookup(self, query: str, params: Any, mode: str) -> Any:
+        from database.Q3 import DatabaseManager
+        key = DatabaseManager.query_key(query, params, mode)
+        try:
+            return self.results[key]
+        except KeyError:
+            pass
+        paging = self._paging(*key)
+        if paging is not None:
+            base, limit, offset = paging
+            recorded_limit, rows = self._paged.get(base, (-1, None))
+            # 记录的结果覆盖请求的范围，或记录时已取到全部行（行数少于记录的 limit）
+            if rows is not None and (offset + limit <= recorded_limit or len(rows) < recorded_limit):
+                return rows[offset:offset + limit]
+        raise SnapshotMissError(f"离线快照（版本 {self.data_version}）中没有该查询的结果，"
+                                f"仅支持导出时请求过的参数组合")
+
+    def execute_query(self, query: str, params: Optional[Tuple] = None,
+                      fetch_one: bool = False, fetch_all: bool = True) -> Any:
+        if not (fetch_one or fetch_all):
+            raise RuntimeError("离线快照为只读，不支持写操作")
+        return self._lookup(query, params, 'one' if fetch_one else 'all')
+
+    def fetch_batches(self, query: str, params: Optional[Tuple] = None,
+                      batch_size: int = 5000) -> Iterator[List[Tuple]]:
+        rows = self._lookup(query, params, 'batches')
+        for start in range(0, len(rows), batch_size):
+            yield list(rows[start:start + batch_size])
+
+
+def write_query_snapshot(path: str, results: Dict[tuple, Any], meta: Dict[str, Any]) -> str:
+    """写入快照文件（临时文件 + 原子替换）"""
+    payload = zlib.compress(pickle.dumps(results, protocol=pickle.HIGHEST_PROTOCOL), 6)
+    header = dict(meta, format_version=FORMAT_VERSION, queries=len(results), payload_bytes=len(payload))
+    header_bytes = json.dumps(header, ensure_ascii=False, default=str).encode('utf-8')
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_header(path: str) -> Tuple[Dict[str, Any], int]:
+    """读取快照头部，返回 (头部, 数据起始偏移)"""
+    with open(path, 'rb') as f:
+        magic, version, header_length = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} 不是离线快照文件")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"快照格式版本 {version} 与当前版本 {FORMAT_VERSION} 不兼容")
+        header = json.loads(f.read(header_length).decode('utf-8'))
+    return header, _PREAMBLE.size + header_length
+
+
+_snapshots: Dict[str, QuerySnapshot] = {}
+_snapshots_lock = threading.Lock()
+
+
+def load_snapshot(path: str) -> QuerySnapshot:
+    """加载快照（同一进程内按路径只加载一次）"""
+    with _snapshots_lock:
+        snapshot = _snapshots.get(path)
+        if snapshot is None:
+            header, offset = read_header(path)
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                results = pickle.loads(zlib.decompress(f.read()))
+            snapshot = _snapshots[path] = QuerySnapshot(header, results)
+            logger.info(f"已加载离线快照 {path}：{len(results)} 条查询，版本 {snapshot.data_version}")
+        return snapshot
+
+
+class SnapshotRecorder:
+    """线程安全地收集查询结果，作为 database.Q3.query_recorder 使用"""
+
+    def __init__(self):
+        self.results: Dict[tuple, Any] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, key: tuple, result: Any) -> None:
+        with self._lock:
+            self.results[key] = result
+
+
+def export_plan() -> List[Dict[str, Any]]:
+    """导出计划：预热计划中的详情展开到全部取值，并补充无参数即可请求的其他接口"""
+    from utils.warmup import WARMUP_PLAN
+    plan = [
+        dict(step, expand=dict(step['expand'], top=None)) if 'expand' in step else step
+        for step in WARMUP_PLAN
+    ]
+    plan.append({'name': '桑基图', 'path': '/api/positions/sankey'})
+    return plan
+
+
+def export_snapshot(path: Optional[str] = None, workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    请求所有图表接口并将期间执行的查询结果写入快照
+    导出期间关闭响应缓存、查询缓存和聚合快照，确保每个接口都实际执行查询
+
+    Returns:
+        导出报告（快照路径、查询数、接口请求情况）
+    """
+    import database.Q3 as q3
+    from utils.warmup import run_warmup
+
+    path = path or settings.SNAPSHOT_PATH
+    if settings.SNAPSHOT_ONLY:
+        raise RuntimeError("SNAPSHOT_ONLY 模式下无法导出快照")
+
+    recorder = SnapshotRecorder()
+    saved = (settings.RESPONSE_CACHE_TTL, settings.COLUMN_STORE_ENABLED, q3.query_cache.ttl)
+    settings.RESPONSE_CACHE_TTL = 0
+    settings.COLUMN_STORE_ENABLED = False
+    q3.query_cache.ttl = 0
+    q3.query_recorder = recorder
+    started = time.perf_counter()
+    try:
+        from app import create_app
+        report = run_warmup(create_app(), export_plan(), workers)
+    finally:
+        q3.query_recorder = None
+        settings.RESPONSE_CACHE_TTL, settings.COLUMN_STORE_ENABLED, q3.query_cache.ttl = saved
+
+    meta = {
+        'data_version': datetime.now().strftime('%Y%m%d%H%M%S'),
+        'created_at': datetime.now().isoformat(),
+        'requests': report['requests'],
+        'failed_requests': report['failed'],
+    }
+    write_query_snapshot(path, recorder.results, meta)
+    elapsed = time.perf_counter() - started
+    logger.info(f"离线快照已写入 {path}：{len(recorder.results)} 条查询，耗时 {elapsed:.1f}s")
+    return {'path': path, 'queries': len(recorder.results), 'elapsed_s': round(elapsed, 1), 'report': report}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='离线快照工具')
+    parser.add_argument('command', choices=['export', 'info'], help='export 导出快照，info 查看快照信息')
+    parser.add_argument('--output', default=settings.SNAPSHOT_PATH, help='快照文件路径')
+    parser.add_argument('--workers', type=int, default=None, help='并行请求线程数')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == 'export':
+        from utils.warmup import format_report
+        result = export_snapshot(args.output, args.workers)
+        print(format_report(result['report']))
+
+    header, _ = read_header(args.output)
+    print(f"文件: {args.output}")
+    print(f"数据版本: {header.get('data_version')}  查询数: {header.get('queries')}  "
+          f"创建时间: {header.get('created_at')}  失败请求: {header.get('failed_requests')}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,532 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+合成数据集生成器
+在没有生产 MySQL 数据的环境中生成与真实数据分布相近的全部数据表，用于基准测试与压测：
+data、job_summary_by_title、job_summary、national_industry_stats、job_city_distribution、
+experience_mapping、education_mapping
+
+分布参照仓库自带的汇总文件（dataset/dataset 下的城市规模、城市等级与全国行业统计），
+文件不存在时使用内置的近似分布：
+- 城市：少数一线城市集中大部分岗位，其余城市岗位数接近；城市等级 A-D
+- 行业：按全国行业岗位数加权，行业平均薪资影响岗位薪资
+- 薪资：月薪区间字符串（如 "10-15K"、"12-20K·13薪"），少量 "面议"；年薪中位数单位为K
+- 经验/学历：编码与等级同真实映射表
+- is_in_top200 / job_in_city_cnt：按生成结果中职位在城市内的招聘数计算
+- load_batch：导入批次号（增量分析的水位），合成数据整体为第 1 批
+汇总表由生成的 data 行统计得到，与 data 表自洽
+
+用法：
+    python -m database.synthetic --rows 100000 --backend sqlite [--path 文件] [--replace]
+    python -m database.synthetic --rows 1000000 --backend mysql --replace
+"""
+
+import argparse
+import logging
+import math
+import os
+import time
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import BASE_DIR, config
+from database.backends import Backend, DuckDBBackend, MySQLBackend, SQLiteBackend
+
+logger = logging.getLogger(__name__)
+
+ROWS_MIN = 10_000
+ROWS_MAX = 10_000_000
+
+REFERENCE_DIR = os.path.join(BASE_DIR, 'dataset', 'dataset')
+
+# 经验映射：(编码, 等级, 标签, 抽样权重)
+EXPERIENCE_LEVELS = [
+    ('ESu', 1, '无经验', 0.04),
+    ('Eby', 2, '1年以下', 0.05),
+    ('EKk', 3, '应届毕业生', 0.08),
+    ('EdD', 4, '1-3年', 0.31),
+    ('Eas', 5, '3-5年', 0.26),
+    ('Eqh', 6, '5-7年', 0.12),
+    ('EzN', 7, '7-10年', 0.08),
+    ('EaZ', 8, '10年以上', 0.06),
+]
+
+# 学历映射：(编码, 等级, 标签, 抽样权重)
+EDUCATION_LEVELS = [
+    ('GW', 1, '小学以下', 0.005),
+    ('GJ', 2, '小学', 0.005),
+    ('GH', 3, '初中', 0.02),
+    ('GY', 4, '高中/中专', 0.08),
+    ('GO', 5, '大专', 0.29),
+    ('GP', 6, '本科', 0.45),
+    ('GI', 7, '硕士', 0.11),
+    ('GX', 8, '博士', 0.03),
+    ('GZ', 9, '博士后', 0.01),
+]
+
+# 职位层级按年薪中位数（K）划分，见 dataset/dataset/职位分类的解释.txt
+JOB_LEVELS = [(94.0, '基薪普及'), (200.0, '平薪新人'), (500.0, '优薪技能'), (math.inf, '高薪管理')]
+
+# 城市梯队对薪资的影响
+CITY_TIER_FACTORS = {'一线': 1.35, '二线': 1.1, '三线': 0.95, '其他': 0.88}
+
+# 职位名称由 资历 + 方向 + 岗位 组合而成
+TITLE_SENIORITY = ['', '高级', '资深', '初级']
+TITLE_DOMAINS = [
+    'Java', 'Python', 'C++', '前端', '测试', '运维', '数据分析', '算法', '产品', 'UI设计',
+    '新媒体运营', '电商运营', '销售', '客服', '财务', '会计', '人力资源', '行政', '法务', '采购',
+    '物流', '质量', '机械', '电气', '土木', '建筑设计', '市场营销', '品牌', '平面设计', '视频剪辑',
+    '房产', '保险', '投资', '审计', '翻译', '游戏策划', '嵌入式', '硬件', '供应链', '招聘',
+]
+TITLE_ROLES = ['工程师', '经理', '专员', '主管', '助理', '顾问']
+
+# 各表结构（MySQL 类型，嵌入式后端同样可用）
+SCHEMAS: Dict[str, List[Tuple[str, str]]] = {
+    'data': [
+        ('city', 'VARCHAR(32)'), ('company', 'VARCHAR(64)'), ('company_type', 'VARCHAR(64)'),
+        ('job_title', 'VARCHAR(128)'), ('experience', 'VARCHAR(16)'), ('experience_rank', 'INT'),
+        ('education', 'VARCHAR(16)'), ('education_rank', 'INT'), ('salary', 'VARCHAR(32)'),
+        ('median_annual_salary', 'DOUBLE'), ('shannon_entropy', 'DOUBLE'), ('job_level', 'VARCHAR(16)'),
+        ('city_level', 'VARCHAR(8)'), ('is_in_top200', 'INT'), ('job_in_city_cnt', 'INT'),
+        ('load_batch', 'INT'),
+    ],
+    'job_summary_by_title': [
+        ('job_title', 'VARCHAR(128)'), ('records_count', 'INT'), ('min_salary', 'DOUBLE'),
+        ('q1_salary', 'DOUBLE'), ('median_salary', 'DOUBLE'), ('q3_salary', 'DOUBLE'),
+        ('max_salary', 'DOUBLE'), ('avg_experience_rank', 'DOUBLE'), ('avg_education_rank', 'DOUBLE'),
+        ('skill_score', 'DOUBLE'), ('total_shannon_entropy', 'DOUBLE'), ('skill_level', 'VARCHAR(8)'),
+        ('industry_spread', 'VARCHAR(8)'), ('market_demand', 'VARCHAR(8)'), ('salary_level', 'VARCHAR(8)'),
+    ],
+    'job_summary': [
+        ('job_title', 'VARCHAR(128)'), ('records_count', 'INT'), ('records_count_norm', 'DOUBLE'),
+        ('avg_experience_rank', 'DOUBLE'), ('avg_education_rank', 'DOUBLE'),
+    ],
+    'national_industry_stats': [
+        ('company_type', 'VARCHAR(64)'), ('national_job_count', 'INT'), ('avg_median_salary', 'DOUBLE'),
+        ('avg_experience_rank', 'DOUBLE'), ('avg_education_rank', 'DOUBLE'),
+    ],
+    'job_city_distribution': [
+        ('job_title', 'VARCHAR(128)'), ('city', 'VARCHAR(32)'), ('count', 'INT'), ('percent', 'DOUBLE'),
+    ],
+    'experience_mapping': [
+        ('experience_code', 'VARCHAR(16)'), ('experience_rank', 'INT'),
+        ('experience_label', 'VARCHAR(32)'), ('avg_annual_salary', 'DOUBLE'),
+    ],
+    'education_mapping': [
+        ('education_code', 'VARCHAR(16)'), ('education_rank', 'INT'),
+        ('education_label', 'VARCHAR(32)'), ('avg_annual_salary', 'DOUBLE'),
+    ],
+}
+
+
+def _read_reference(name: str):
+    """读取仓库自带的汇总文件，不存在或无法读取时返回 None"""
+    path = os.path.join(REFERENCE_DIR, name)
+    if not os.path.exists(path):
+        return None
+    try:
+        import pandas as pd
+        return pd.read_excel(path)
+    except Exception as e:
+        logger.warning(f"读取参考分布 {path} 失败，使用内置分布: {e}")
+        return None
+
+
+def reference_cities(rng: np.random.Generator) -> Tuple[List[str], np.ndarray, List[str], List[str]]:
+    """城市列表及 (编码, 抽样权重, 梯队, 等级)"""
+    tiers = _read_reference(os.path.join('第四题', 'city_tier.xlsx'))
+    summary = _read_reference(os.path.join('第一题', 'city_summary.xlsx'))
+    if tiers is not None:
+        levels = dict(zip(summary['city'], summary['city_level'])) if summary is not None else {}
+        codes = [str(city) for city in tiers['city']]
+        weights = tiers['total_jobs_in_city'].to_numpy(dtype=np.float64)
+        city_tiers = [str(tier) for tier in tiers['city_tier']]
+        city_levels = [str(levels.get(city, 'D')) for city in codes]
+        return codes, weights / weights.sum(), city_tiers, city_levels
+
+    # 内置分布：18 个一线城市按幂律分布，其余城市规模相近
+    count = 371
+    letters = np.array(list('ABCDEFGHIJKLMNOPQRSTUVWXYZ'))
+    codes = sorted({f"{letters[rng.integers(26)]}{rng.integers(1000):03d}" for _ in range(count * 2)})[:count]
+    weights = np.full(count, 300.0)
+    weights[:18] = 25000.0 / np.arange(1, 19) ** 0.15
+    city_tiers = ['一线'] * 18 + ['二线'] * 55 + ['三线'] * 111 + ['其他'] * (count - 184)
+    city_levels = ['A'] * 14 + ['D'] * (count - 31) + ['B'] * 5 + ['C'] * 12
+    return codes, weights / weights.sum(), city_tiers, city_levels
+
+
+def reference_industries(rng: np.random.Generator) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """行业列表及 (编码, 抽样权重, 薪资系数)"""
+    stats = _read_reference(os.path.join('第四题', 'national_industry_stats.xlsx'))
+    if stats is not None:
+        codes = [str(code) for code in stats['company_type']]
+        weights = stats['national_job_count'].to_numpy(dtype=np.float64)
+        salaries = stats['avg_median_salary'].to_numpy(dtype=np.float64)
+    else:
+        count = 158
+        alphabet = np.array(list('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'))
+        codes = sorted({'type_' + ''.join(rng.choice(alphabet, 6)) for _ in range(count)})
+        weights = 20000.0 / np.arange(1, len(codes) + 1) ** 1.3
+        salaries = rng.lognormal(math.log(100.0), 0.35, len(codes))
+    return codes, weights / weights.sum(), salaries / np.average(salaries, weights=weights)
+
+
+def job_titles(count: int, rng: np.random.Generator) -> List[str]:
+    """生成 count 个互不相同的职位名称（按出现频率从高到低）"""
+    combos = [f"{seniority}{domain}{role}"
+              for seniority in TITLE_SENIORITY for domain in TITLE_DOMAINS for role in TITLE_ROLES]
+    if count > len(combos):
+        raise ValueError(f"职位数不能超过 {len(combos)}")
+    # 无资历前缀的职位更常见，排在前面
+    plain = len(TITLE_DOMAINS) * len(TITLE_ROLES)
+    ordered = ([combos[i] for i in rng.permutation(plain)]
+               + [combos[plain + i] for i in rng.permutation(len(combos) - plain)])
+    return ordered[:count]
+
+
+def _entropy(probabilities: np.ndarray) -> float:
+    p = probabilities[probabilities > 0]
+    return float(-(p * np.log2(p)).sum())
+
+
+def _tertile_labels(values: np.ndarray, labels: Sequence[str]) -> List[str]:
+    """按分位数将取值划分为 len(labels) 档"""
+    edges = np.quantile(values, np.linspace(0, 1, len(labels) + 1)[1:-1]) if len(values) else []
+    return [labels[int(index)] for index in np.searchsorted(edges, values, side='right')]
+
+
+class SyntheticDataset:
+    """
+    合成数据集
+    generate() 先以 numpy 数组生成 data 表的各列编码（每行约 20 字节），
+    data 行按批次转换为元组输出，汇总表由这些数组统计得到
+    """
+
+    def __init__(self, rows: int = 100_000, seed: int = 42, titles: int = 600):
+        if not ROWS_MIN <= rows <= ROWS_MAX:
+            raise ValueError(f"行数需在 {ROWS_MIN} 到 {ROWS_MAX} 之间")
+        self.rows = rows
+        self.seed = seed
+        self.title_count = titles
+        self.generated = False
+
+    def generate(self) -> 'SyntheticDataset':
+        rng = np.random.default_rng(self.seed)
+        n = self.rows
+
+        self.cities, city_weights, self.city_tiers, self.city_levels = reference_cities(rng)
+        self.industries, industry_weights, industry_factors = reference_industries(rng)
+        self.titles = job_titles(self.title_count, rng)
+        n_titles, n_industries = len(self.titles), len(self.industries)
+
+        # 城市、职位（幂律热度）
+        self.city = rng.choice(len(self.cities), n, p=city_weights).astype(np.int16)
+        title_weights = 1.0 / np.arange(1, n_titles + 1) ** 1.05
+        self.title = rng.choice(n_titles, n, p=title_weights / title_weights.sum()).astype(np.int16)
+
+        # 每个职位有自己的行业分布（以全国行业占比为先验），行业熵即职位的香农熵
+        concentration = rng.uniform(0.3, 30.0, n_titles)
+        self.title_industry_p = np.vstack([
+            rng.dirichlet(industry_weights * n_industries * c + 1e-3) for c in concentration
+        ])
+        self.title_entropy = np.array([_entropy(p) for p in self.title_industry_p])
+        self.industry = np.empty(n, dtype=np.int16)
+        order = np.argsort(self.title, kind='stable')
+        bounds = np.searchsorted(self.title[order], np.arange(n_titles + 1))
+        for t in range(n_titles):
+            rows = order[bounds[t]:bounds[t + 1]]
+            if len(rows):
+                self.industry[rows] = rng.choice(n_industries, len(rows), p=self.title_industry_p[t])
+
+        # 公司：每个公司只属于一个行业，行业内公司规模偏斜
+        companies = np.maximum(1, np.round(industry_weights * max(n // 8, n_industries))).astype(np.int64)
+        offsets = np.concatenate([[0], np.cumsum(companies)[:-1]])
+        local = np.floor(companies[self.industry] * rng.random(n) ** 2).astype(np.int64)
+        self.company = (offsets[self.industry] + local).astype(np.int32)
+
+        # 经验与学历（0 表示缺失）
+        exp_weights = np.array([level[3] for level in EXPERIENCE_LEVELS])
+        edu_weights = np.array([level[3] for level in EDUCATION_LEVELS])
+        self.experience = (rng.choice(len(exp_weights), n, p=exp_weights / exp_weights.sum()) + 1).astype(np.int8)
+        self.education = (rng.choice(len(edu_weights), n, p=edu_weights / edu_weights.sum()) + 1).astype(np.int8)
+        self.experience[rng.random(n) < 0.005] = 0
+        self.education[rng.random(n) < 0.005] = 0
+
+        # 月薪（K）：城市梯队、行业、经验、学历、职位系数叠加对数正态噪声
+        tier_factor = np.array([CITY_TIER_FACTORS.get(tier, 1.0) for tier in self.city_tiers])
+        title_factor = rng.lognormal(0.0, 0.3, n_titles)
+        exp_factor = np.concatenate([[1.0], 1.18 ** (np.arange(1, 9) - 4)])
+        edu_factor = np.concatenate([[1.0], 1.12 ** (np.arange(1, 10) - 6)])
+        mid = (7.5 * tier_factor[self.city] * industry_factors[self.industry] ** 0.5 * title_factor[self.title]
+               * exp_factor[self.experience] * edu_factor[self.education] * rng.lognormal(0.0, 0.25, n))
+        mid = np.clip(mid, 1.5, 150.0)
+        self.salary_low = np.maximum(1, np.round(mid * rng.uniform(0.65, 0.85, n))).astype(np.int16)
+        self.salary_high = np.maximum(self.salary_low + 1, np.round(mid * rng.uniform(1.15, 1.5, n))).astype(np.int16)
+        self.months = rng.choice([12, 13, 14, 15, 16], n, p=[0.7, 0.15, 0.1, 0.03, 0.02]).astype(np.int8)
+        self.negotiable = rng.random(n) < 0.02
+        self.annual = (self.salary_low + self.salary_high.astype(np.float64)) / 2 * self.months
+        self.annual[self.negotiable] = np.nan
+
+        # 职位在城市内的招聘数与城市内前200标记
+        key = self.city.astype(np.int64) * n_titles + self.title
+        unique_keys, inverse, counts = np.unique(key, return_inverse=True, return_counts=True)
+        key_city = unique_keys // n_titles
+        ranked = np.lexsort((-counts, key_city))
+        first = np.searchsorted(key_city[ranked], key_city[ranked])
+        rank = np.empty(len(unique_keys), dtype=np.int64)
+        rank[ranked] = np.arange(len(unique_keys)) - first
+        self.job_in_city_cnt = counts[inverse].astype(np.int32)
+        self.is_in_top200 = (rank[inverse] < 200).astype(np.int8)
+        self.city_title_keys, self.city_title_counts = unique_keys, counts
+
+        self.generated = True
+        return self
+
+    def _require_generated(self) -> None:
+        if not self.generated:
+            self.generate()
+
+    def iter_data_rows(self, batch_size: int = 10000, load_batch: int = 1) -> Iterator[List[Tuple]]:
+        """按批次输出 data 表的行，load_batch 为写入的导入批次号（增量分析的水位）"""
+        self._require_generated()
+        exp_codes = [None] + [level[0] for level in EXPERIENCE_LEVELS]
+        exp_ranks = [None] + [level[1] for level in EXPERIENCE_LEVELS]
+        edu_codes = [None] + [level[0] for level in EDUCATION_LEVELS]
+        edu_ranks = [None] + [level[1] for level in EDUCATION_LEVELS]
+        thresholds = np.array([threshold for threshold, _ in JOB_LEVELS[:-1]])
+        level_names = [name for _, name in JOB_LEVELS]
+        entropy = np.round(self.title_entropy, 4).tolist()
+
+        for start in range(0, self.rows, batch_size):
+            end = min(start + batch_size, self.rows)
+            annual = self.annual[start:end]
+            levels = np.searchsorted(thresholds, np.nan_to_num(annual, nan=0.0), side='right')
+            rows = []
+            for (city, title, industry, company, exp, edu, low, high, months, negotiable,
+                 annual_value, level, cnt, top) in zip(
+                    self.city[start:end].tolist(), self.title[start:end].tolist(),
+                    self.industry[start:end].tolist(), self.company[start:end].tolist(),
+                    self.experience[start:end].tolist(), self.education[start:end].tolist(),
+                    self.salary_low[start:end].tolist(), self.salary_high[start:end].tolist(),
+                    self.months[start:end].tolist(), self.negotiable[start:end].tolist(),
+                    annual.tolist(), levels.tolist(), self.job_in_city_cnt[start:end].tolist(),
+                    self.is_in_top200[start:end].tolist()):
+                if negotiable:
+                    salary, annual_value = '面议', None
+                elif months > 12:
+                    salary = f"{low}-{high}K·{months}薪"
+                else:
+                    salary = f"{low}-{high}K"
+                rows.append((
+                    self.cities[city], f"company_{company:07d}", self.industries[industry],
+                    self.titles[title], exp_codes[exp], exp_ranks[exp], edu_codes[edu], edu_ranks[edu],
+                    salary, annual_value, entropy[title], level_names[level] if annual_value is not None else None,
+                    self.city_levels[city], top, cnt, load_batch,
+                ))
+            yield rows
+
+    def summary_tables(self) -> Dict[str, List[Tuple]]:
+        """由 data 数组统计得到其余各表的行"""
+        self._require_generated()
+        return build_summary_tables(
+            self.titles, self.industries, self.cities, self.title, self.industry, self.experience,
+            self.education, self.annual, self.title_entropy, self.city_title_keys, self.city_title_counts,
+        )
+
+
+def grouped_mean(groups: np.ndarray, values: np.ndarray, size: int) -> np.ndarray:
+    """按组求均值（忽略 nan 与缺失值 0），空组为 nan"""
+    valid = ~np.isnan(values) & (values != 0)
+    sums = np.bincount(groups[valid], weights=values[valid], minlength=size)
+    counts = np.bincount(groups[valid], minlength=size)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return sums / counts
+
+
+def build_summary_tables(titles: Sequence[Optional[str]], industries: Sequence[Optional[str]],
+                         cities: Sequence[Optional[str]], title: np.ndarray, industry: np.ndarray,
+                         experience: np.ndarray, education: np.ndarray, annual: np.ndarray,
+                         title_entropy: np.ndarray, city_title_keys: np.ndarray,
+                         city_title_counts: np.ndarray) -> Dict[str, List[Tuple]]:
+    """
+    由 data 表各列统计得到其余各表的行（合成数据集与数据导入共用）
+
+    Args:
+        titles / industries / cities: 编码对应的取值，None 表示该列为 NULL（不计入对应的汇总行）
+        title / industry: 每行的职位、行业编码
+        experience / education: 每行的经验、学历等级（0 表示缺失）
+        annual: 每行的年薪中位数（单位K，无效薪资为 nan）
+        title_entropy: 每个职位的行业香农熵
+        city_title_keys / city_title_counts: (城市编码 * 职位数 + 职位编码) 及其行数
+    """
+    n_titles, n_industries = len(titles), len(industries)
+    exp_rank = experience.astype(np.float64)
+    edu_rank = education.astype(np.float64)
+    title = title.astype(np.int64)
+    industry = industry.astype(np.int64)
+
+    def rounded(value: float, places: int = 2) -> Optional[float]:
+        return None if value is None or math.isnan(value) else round(float(value), places)
+
+    # 职位汇总：年薪分位数、平均经验/学历等级、技能分、行业熵及分档标签
+    records = np.bincount(title, minlength=n_titles)
+    avg_exp = grouped_mean(title, exp_rank, n_titles)
+    avg_edu = grouped_mean(title, edu_rank, n_titles)
+    valid = ~np.isnan(annual)
+    order = np.lexsort((annual[valid], title[valid]))
+    sorted_salary, sorted_title = annual[valid][order], title[valid][order]
+    bounds = np.searchsorted(sorted_title, np.arange(n_titles + 1))
+    quantiles = np.full((n_titles, 5), np.nan)
+    for t in range(n_titles):
+        values = sorted_salary[bounds[t]:bounds[t + 1]]
+        if len(values):
+            quantiles[t] = np.quantile(values, [0, 0.25, 0.5, 0.75, 1.0])
+    skill = (np.nan_to_num(avg_exp) / len(EXPERIENCE_LEVELS) + np.nan_to_num(avg_edu) / len(EDUCATION_LEVELS)) * 50
+    present = (records > 0) & np.array([name is not None for name in titles], dtype=bool)
+    skill_levels = dict(zip(np.flatnonzero(present), _tertile_labels(skill[present], ['初级', '中级', '高级'])))
+    spreads = dict(zip(np.flatnonzero(present), _tertile_labels(title_entropy[present], ['集中', '中等', '分散'])))
+    demands = dict(zip(np.flatnonzero(present), _tertile_labels(records[present], ['冷门', '普通', '热门'])))
+    medians = np.nan_to_num(quantiles[:, 2])
+    salary_levels = dict(zip(np.flatnonzero(present), _tertile_labels(medians[present], ['低', '中低', '中高', '高'])))
+
+    by_title, summary = [], []
+    max_records = int(records[present].max()) if present.any() else 1
+    for t in np.flatnonzero(present):
+        by_title.append((
+            titles[t], int(records[t]), *[rounded(q) for q in quantiles[t]],
+            rounded(avg_exp[t]), rounded(avg_edu[t]), rounded(skill[t]), rounded(title_entropy[t], 4),
+            skill_levels[t], spreads[t], demands[t], salary_levels[t],
+        ))
+        summary.append((titles[t], int(records[t]), rounded(records[t] / max_records, 6),
+                        rounded(avg_exp[t]), rounded(avg_edu[t])))
+
+    # 全国行业统计
+    industry_count = np.bincount(industry, minlength=n_industries)
+    industry_salary = grouped_mean(industry, annual, n_industries)
+    industry_exp = grouped_mean(industry, exp_rank, n_industries)
+    industry_edu = grouped_mean(industry, edu_rank, n_industries)
+    national = sorted((
+        (industries[i], int(industry_count[i]), rounded(industry_salary[i]),
+         rounded(industry_exp[i]), rounded(industry_edu[i]))
+        for i in np.flatnonzero(industry_count) if industries[i] is not None
+    ), key=lambda row: -row[1])
+
+    # 职位城市分布：占该职位招聘数的百分比
+    key_title = city_title_keys % n_titles
+    key_city = city_title_keys // n_titles
+    distribution = [
+        (titles[t], cities[c], int(cnt), round(float(cnt) / records[t] * 100, 2))
+        for t, c, cnt in zip(key_title.tolist(), key_city.tolist(), city_title_counts.tolist())
+        if titles[t] is not None and cities[c] is not None
+    ]
+
+    # 映射表：平均年薪由数据统计
+    exp_salary = grouped_mean(experience.astype(np.int64), annual, len(EXPERIENCE_LEVELS) + 1)
+    edu_salary = grouped_mean(education.astype(np.int64), annual, len(EDUCATION_LEVELS) + 1)
+    experience_mapping = [(code, rank, label, rounded(exp_salary[rank], 4))
+                          for code, rank, label, _ in EXPERIENCE_LEVELS]
+    education_mapping = [(code, rank, label, rounded(edu_salary[rank], 4))
+                         for code, rank, label, _ in EDUCATION_LEVELS]
+
+    return {
+        'job_summary_by_title': by_title,
+        'job_summary': summary,
+        'national_industry_stats': national,
+        'job_city_distribution': distribution,
+        'experience_mapping': experience_mapping,
+        'education_mapping': education_mapping,
+    }
+
+
+def _create_table(connection, backend: Backend, table: str, replace: bool, name: Optional[str] = None) -> str:
+    """按 table 的结构建表（表名为 name，默认与 table 相同）并返回插入语句（MySQL 写法，由后端方言转换）"""
+    columns = SCHEMAS[table]
+    name = name or table
+    suffix = ' ENGINE=InnoDB DEFAULT CHARSET=utf8mb4' if backend.name == 'mysql' else ''
+    cursor = connection.cursor()
+    try:
+        if replace:
+            cursor.execute(f"DROP TABLE IF EXISTS {name}")
+        cursor.execute(f"CREATE TABLE {name} ({', '.join(f'{column} {kind}' for column, kind in columns)}){suffix}")
+    finally:
+        cursor.close()
+    return f"INSERT INTO {name} ({', '.join(column for column, _ in columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+
+
+def _insert(connection, backend: Backend, insert: str, rows: List[Tuple]) -> None:
+    cursor = connection.cursor()
+    try:
+        cursor.executemany(backend.dialect.translate(insert), rows)
+    finally:
+        cursor.close()
+    connection.commit()
+
+
+def load_dataset(dataset: SyntheticDataset, backend: Backend, replace: bool = False,
+                 batch_size: int = 10000) -> Dict[str, int]:
+    """
+    将合成数据集写入后端（MySQL 或嵌入式后端）
+
+    Args:
+        replace: 为 True 时先删除已存在的同名表，否则表已存在时报错
+        batch_size: 每批插入的行数
+
+    Returns:
+        {表名: 行数}
+    """
+    counts: Dict[str, int] = {}
+    connection = backend.connect()
+    try:
+        if backend.name == 'sqlite':
+            # 批量写入期间不等待落盘，写入完成后由 commit 持久化
+            connection.execute('PRAGMA synchronous = OFF')
+        started = time.perf_counter()
+        insert = _create_table(connection, backend, 'data', replace)
+        counts['data'] = 0
+        for rows in dataset.iter_data_rows(batch_size):
+            _insert(connection, backend, insert, rows)
+            counts['data'] += len(rows)
+        logger.info(f"已写入 data: {counts['data']} 行，耗时 {time.perf_counter() - started:.1f}s")
+
+        for table, rows in dataset.summary_tables().items():
+            insert = _create_table(connection, backend, table, replace)
+            for start in range(0, len(rows), batch_size):
+                _insert(connection, backend, insert, rows[start:start + batch_size])
+            counts[table] = len(rows)
+            logger.info(f"已写入 {table}: {len(rows)} 行")
+    finally:
+        connection.close()
+    return counts
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='合成数据集生成器')
+    parser.add_argument('--rows', type=int, default=100_000, help=f'data 表行数（{ROWS_MIN}-{ROWS_MAX}）')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子，相同种子生成相同数据')
+    parser.add_argument('--titles', type=int, default=600, help='职位名称数量')
+    parser.add_argument('--backend', choices=['mysql', 'sqlite', 'duckdb'], default='sqlite', help='写入的后端')
+    parser.add_argument('--path', default=None, help='嵌入式数据库文件路径，默认 EMBEDDED_DB_PATH')
+    parser.add_argument('--replace', action='store_true', help='删除并重建已存在的表')
+    parser.add_argument('--batch-size', type=int, default=10000, help='每批插入的行数')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    settings = config['default']
+    if args.backend == 'mysql':
+        backend = MySQLBackend(settings.get_db_config())
+    else:
+        path = args.path or settings.EMBEDDED_DB_PATH
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        backend = SQLiteBackend(path) if args.backend == 'sqlite' else DuckDBBackend(path, read_only=False)
+
+    started = time.perf_counter()
+    dataset = SyntheticDataset(args.rows, args.seed, args.titles).generate()
+    logger.info(f"已生成 {args.rows} 行，耗时 {time.perf_counter() - started:.1f}s")
+    for table, count in load_dataset(dataset, backend, args.replace, args.batch_size).items():
+        print(f"{table:<28} {count:>10} 行")
+    print(f"总耗时 {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
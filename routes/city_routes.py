@@ -10,9 +10,13 @@ from flask import Blueprint, request
 from datetime import datetime
 
 from services.city_service import CityService
-from utils.response import ResponseBuilder
+from utils.response import ResponseBuilder, cached_response
 from utils.validators import RequestValidator
 from database.Q3 import DatabaseManager
+from database.snapshot import SnapshotMissError
+from database.sketches import describe_distinct_counts
+from utils.precomputed import PrecomputedFile
+from config import config
 
 logger = logging.getLogger(__name__)
 
@@ -22,13 +26,20 @@ city_bp = Blueprint('city', __name__, url_prefix='/api')
 # 初始化服务
 db_manager = DatabaseManager('default')
 city_service = CityService(db_manager)
+# 全国城市分析结果（python data_analysis.py 生成）
+analysis_results = PrecomputedFile(config['default'].ANALYSIS_RESULTS_PATH)
 
 
 @city_bp.route('/overview', methods=['GET'])
+@cached_response()
 def get_overview():
     """获取数据概览"""
     try:
-        overview_data = city_service.get_overview_data()
+        approx_valid, approx = RequestValidator.validate_approx(request.args.get('approx'))
+        if not approx_valid:
+            return ResponseBuilder.bad_request(approx)
+        
+        overview_data = city_service.get_overview_data(approx)
         
         # 转换为字典格式
         overview_dict = {
@@ -39,14 +50,20 @@ def get_overview():
             "statistics": overview_data.statistics
         }
         
+        if approx:
+            overview_dict['distinct_counts'] = describe_distinct_counts(approx)
+        
         return ResponseBuilder.success("获取数据概览成功", overview_dict)
         
+    except SnapshotMissError:
+        raise
     except Exception as e:
         logger.error(f"获取数据概览失败: {e}")
         return ResponseBuilder.internal_error("服务器内部错误", {"type": "INTERNAL_ERROR", "details": str(e)})
 
 
 @city_bp.route('/charts/city', methods=['GET'])
+@cached_response()
 def get_city_analysis():
     """获取城市招聘分布数据"""
     try:
@@ -58,7 +75,11 @@ def get_city_analysis():
             return ResponseBuilder.bad_request("参数验证失败")
         
         # 获取城市统计数据
-        city_stats = city_service.get_city_statistics(limit, min_jobs)
+        approx_valid, approx = RequestValidator.validate_approx(request.args.get('approx'))
+        if not approx_valid:
+            return ResponseBuilder.bad_request(approx)
+        
+        city_stats = city_service.get_city_statistics(limit, min_jobs, approx)
         
         # 构建图表配置
         chart_config = {
@@ -87,20 +108,35 @@ def get_city_analysis():
             "last_updated": datetime.now().isoformat()
         }
         
+        if approx:
+            chart_config['distinct_counts'] = describe_distinct_counts(approx)
+        
         return ResponseBuilder.success("获取城市分析数据成功", {"chart_config": chart_config})
         
+    except SnapshotMissError:
+        raise
     except Exception as e:
         logger.error(f"获取城市分析数据失败: {e}")
         return ResponseBuilder.internal_error("服务器内部错误", {"type": "INTERNAL_ERROR", "details": str(e)})
 
 
 @city_bp.route('/charts/city/detail/<path:city_name>', methods=['GET'])
+@cached_response()
 def get_city_detail(city_name):
     """获取特定城市的详细分析数据"""
     try:
         # 解码URL编码的城市名
         city_name = unquote(city_name)
-        city_detail = city_service.get_city_detail(city_name)
+        bins_valid, salary_bins = RequestValidator.validate_salary_bins(
+            request.args.get('salary_bins'), request.args.get('salary_quantiles'))
+        if not bins_valid:
+            return ResponseBuilder.bad_request(salary_bins)
+        
+        approx_valid, approx = RequestValidator.validate_approx(request.args.get('approx'))
+        if not approx_valid:
+            return ResponseBuilder.bad_request(approx)
+        
+        city_detail = city_service.get_city_detail(city_name, approx, salary_bins)
         
         if not city_detail:
             return ResponseBuilder.not_found(f"未找到城市 {city_name} 的数据")
@@ -142,8 +178,13 @@ def get_city_detail(city_name):
             ]
         }
         
+        if approx:
+            city_detail_dict['distinct_counts'] = describe_distinct_counts(approx)
+        
         return ResponseBuilder.success(f"获取城市 {city_name} 详细数据成功", city_detail_dict)
         
+    except SnapshotMissError:
+        raise
     except Exception as e:
         logger.error(f"获取城市详细数据失败: {e}")
         return ResponseBuilder.internal_error("服务器内部错误", {"type": "INTERNAL_ERROR", "details": str(e)})
@@ -163,7 +204,11 @@ def compare_cities():
         cities = data['cities']
         
         # 获取城市比较数据
-        comparison_data = city_service.compare_cities(cities)
+        approx_valid, approx = RequestValidator.validate_approx(request.args.get('approx'))
+        if not approx_valid:
+            return ResponseBuilder.bad_request(approx)
+        
+        comparison_data = city_service.compare_cities(cities, approx)
         
         if not comparison_data:
             return ResponseBuilder.not_found("未找到指定城市的数据")
@@ -195,8 +240,54 @@ def compare_cities():
             "comparison_summary": comparison_summary
         }
         
+        if approx:
+            comparison_result['distinct_counts'] = describe_distinct_counts(approx)
+        
         return ResponseBuilder.success("城市比较数据获取成功", comparison_result)
         
+    except SnapshotMissError:
+        raise
     except Exception as e:
         logger.error(f"获取城市比较数据失败: {e}")
         return ResponseBuilder.internal_error("服务器内部错误", {"type": "INTERNAL_ERROR", "details": str(e)})
+
+
+@city_bp.route('/charts/city/analysis', methods=['GET'])
+def get_city_analysis_results():
+    """
+    获取预计算的全国城市分析结果（热门职位、薪资分布、主要行业）
+    结果由 python data_analysis.py [--incremental] 离线生成，接口只读取结果文件；参数 city 指定时只返回该城市
+    不使用响应缓存：解析结果已由 PrecomputedFile 按文件签名缓存，批处理替换文件后下次检查即返回新结果
+    """
+    try:
+        results = analysis_results.load()
+        if results is None:
+            return ResponseBuilder.not_found("尚未生成城市分析结果，请先运行 python data_analysis.py")
+        
+        city_analysis = results.get('city_analysis', {})
+        summary = {
+            "analysis_date": city_analysis.get('analysis_date'),
+            "file_modified_at": analysis_results.modified_at,
+            "total_cities_analyzed": city_analysis.get('total_cities_analyzed'),
+            "watermark": results.get('watermark')
+        }
+        
+        city_name = request.args.get('city')
+        if city_name:
+            city_result = city_analysis.get('cities', {}).get(city_name)
+            if city_result is None:
+                return ResponseBuilder.not_found(f"城市分析结果中没有城市 {city_name}")
+            return ResponseBuilder.success(f"获取城市 {city_name} 分析结果成功",
+                                           {**summary, "city": city_name, "analysis": city_result})
+        
+        return ResponseBuilder.success("获取城市分析结果成功", {
+            **summary,
+            "overall_statistics": results.get('overall_statistics'),
+            "cities": city_analysis.get('cities', {})
+        })
+        
+    except SnapshotMissError:
+        raise
+    except Exception as e:
+        logger.error(f"获取城市分析结果失败: {e}")
+        return ResponseBuilder.internal_error("服务器内部错误", {"type": "INTERNAL_ERROR", "details": str(e)})
@@ -9,9 +9,11 @@ from flask import Blueprint, request
 from datetime import datetime
 
 from services.experience_service import ExperienceService
-from utils.response import ResponseBuilder
+from utils.response import ResponseBuilder, cached_response
 from utils.validators import RequestValidator
 from database.Q3 import DatabaseManager
+from database.snapshot import SnapshotMissError
+from database.sketches import describe_distinct_counts
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +26,7 @@ experience_service = ExperienceService(db_manager)
 
 
 @experience_bp.route('/charts/experience', methods=['GET'])
+@cached_response()
 def get_experience_analysis():
     """获取经验招聘分布数据"""
     try:
@@ -35,7 +38,11 @@ def get_experience_analysis():
             return ResponseBuilder.bad_request("参数验证失败")
         
         # 获取经验统计数据
-        experience_stats = experience_service.get_experience_statistics(limit, min_jobs)
+        approx_valid, approx = RequestValidator.validate_approx(request.args.get('approx'))
+        if not approx_valid:
+            return ResponseBuilder.bad_request(approx)
+        
+        experience_stats = experience_service.get_experience_statistics(limit, min_jobs, approx)
         
         # 构建图表配置
         chart_config = {
@@ -64,18 +71,33 @@ def get_experience_analysis():
             "last_updated": datetime.now().isoformat()
         }
         
+        if approx:
+            chart_config['distinct_counts'] = describe_distinct_counts(approx)
+        
         return ResponseBuilder.success("获取经验分析数据成功", {"chart_config": chart_config})
         
+    except SnapshotMissError:
+        raise
     except Exception as e:
         logger.error(f"获取经验分析数据失败: {e}")
         return ResponseBuilder.internal_error("服务器内部错误", {"type": "INTERNAL_ERROR", "details": str(e)})
 
 
 @experience_bp.route('/charts/experience/detail/<experience_name>', methods=['GET'])
+@cached_response()
 def get_experience_detail(experience_name):
     """获取特定经验级别的详细分析数据"""
     try:
-        experience_detail = experience_service.get_experience_detail(experience_name)
+        bins_valid, salary_bins = RequestValidator.validate_salary_bins(
+            request.args.get('salary_bins'), request.args.get('salary_quantiles'))
+        if not bins_valid:
+            return ResponseBuilder.bad_request(salary_bins)
+        
+        approx_valid, approx = RequestValidator.validate_approx(request.args.get('approx'))
+        if not approx_valid:
+            return ResponseBuilder.bad_request(approx)
+        
+        experience_detail = experience_service.get_experience_detail(experience_name, approx, salary_bins)
         
         if not experience_detail:
             return ResponseBuilder.not_found(f"未找到经验级别 {experience_name} 的数据")
@@ -112,8 +134,13 @@ def get_experience_detail(experience_name):
             ]
         }
         
+        if approx:
+            experience_detail_dict['distinct_counts'] = describe_distinct_counts(approx)
+        
         return ResponseBuilder.success(f"获取经验级别 {experience_name} 详细数据成功", experience_detail_dict)
         
+    except SnapshotMissError:
+        raise
     except Exception as e:
         logger.error(f"获取经验详细数据失败: {e}")
         return ResponseBuilder.internal_error("服务器内部错误", {"type": "INTERNAL_ERROR", "details": str(e)})
@@ -133,7 +160,11 @@ def compare_experiences():
         experiences = data['experiences']
         
         # 获取经验比较数据
-        comparison_data = experience_service.compare_experiences(experiences)
+        approx_valid, approx = RequestValidator.validate_approx(request.args.get('approx'))
+        if not approx_valid:
+            return ResponseBuilder.bad_request(approx)
+        
+        comparison_data = experience_service.compare_experiences(experiences, approx)
         
         if not comparison_data:
             return ResponseBuilder.not_found("未找到指定经验级别的数据")
@@ -166,18 +197,29 @@ def compare_experiences():
             "comparison_summary": comparison_summary
         }
         
+        if approx:
+            comparison_result['distinct_counts'] = describe_distinct_counts(approx)
+        
         return ResponseBuilder.success("经验级别比较数据获取成功", comparison_result)
         
+    except SnapshotMissError:
+        raise
     except Exception as e:
         logger.error(f"获取经验比较数据失败: {e}")
         return ResponseBuilder.internal_error("服务器内部错误", {"type": "INTERNAL_ERROR", "details": str(e)})
 
 
 @experience_bp.route('/charts/experience/overview', methods=['GET'])
+@cached_response()
 def get_experience_overview():
     """获取经验概览数据"""
     try:
-        overview_data = experience_service.get_experience_overview()
+        bins_valid, salary_bins = RequestValidator.validate_salary_bins(
+            request.args.get('salary_bins'), request.args.get('salary_quantiles'))
+        if not bins_valid:
+            return ResponseBuilder.bad_request(salary_bins)
+        
+        overview_data = experience_service.get_experience_overview(salary_bins)
         
         # 转换为字典格式
         overview_dict = {
@@ -200,12 +242,15 @@ def get_experience_overview():
         
         return ResponseBuilder.success("获取经验概览数据成功", overview_dict)
         
+    except SnapshotMissError:
+        raise
     except Exception as e:
         logger.error(f"获取经验概览数据失败: {e}")
         return ResponseBuilder.internal_error("服务器内部错误", {"type": "INTERNAL_ERROR", "details": str(e)})
 
 
 @experience_bp.route('/charts/experience/salary', methods=['GET'])
+@cached_response()
 def get_experience_salary_analysis():
     """获取各经验级别平均薪资分析"""
     try:
@@ -261,6 +306,8 @@ def get_experience_salary_analysis():
         
         return ResponseBuilder.success("获取经验薪资分析数据成功", {"chart_config": salary_analysis})
         
+    except SnapshotMissError:
+        raise
     except Exception as e:
         logger.error(f"获取经验薪资分析数据失败: {e}")
         return ResponseBuilder.internal_error("服务器内部错误", {"type": "INTERNAL_ERROR", "details": str(e)})
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+原始记录导出相关路由
+"""
+
+import logging
+from flask import Blueprint, Response, request, stream_with_context
+
+from services.export_service import ExportService
+from utils import arrow
+from utils.response import ResponseBuilder
+from database.Q3 import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+# 创建蓝图
+export_bp = Blueprint('export', __name__, url_prefix='/api/export')
+
+# 初始化服务
+db_manager = DatabaseManager('default')
+export_service = ExportService(db_manager)
+
+# 导出格式对应的响应类型
+EXPORT_MIMETYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+    'arrow': arrow.ARROW_STREAM_MIMETYPE,
+}
+
+
+@export_bp.route('/records', methods=['GET'])
+def export_records():
+    """
+    流式导出 data 表原始记录
+    结果通过服务端游标分批读取并以生成器逐块写出，内存占用与结果集大小无关
+    参数:
+    - format: 导出格式，ndjson（默认）、csv 或 arrow（也可通过 Accept: application/vnd.apache.arrow.stream 指定）
+    - city / company_type / experience / education: 等值筛选（可选）
+    - salary_min / salary_max: 薪资中位数范围，单位K（可选）
+    - limit: 最多导出的记录数（可选）
+    """
+    try:
+        if db_manager.snapshot is not None:
+            return ResponseBuilder.error("离线快照模式下不支持导出原始记录", 503)
+
+        output_format = request.args.get('format') or ('arrow' if arrow.wants_arrow() else 'ndjson')
+        if output_format not in ExportService.SUPPORTED_FORMATS:
+            return ResponseBuilder.bad_request(
+                f"format 必须是以下之一: {', '.join(ExportService.SUPPORTED_FORMATS)}"
+            )
+
+        if output_format == 'arrow' and not arrow.is_available():
+            return ResponseBuilder.error("服务器未安装 pyarrow，无法输出 Arrow 格式", 406)
+
+        limit = request.args.get('limit', None, type=int)
+        if limit is not None and limit < 1:
+            return ResponseBuilder.bad_request("limit 必须是正整数")
+
+        salary_min = request.args.get('salary_min', None, type=float)
+        salary_max = request.args.get('salary_max', None, type=float)
+        if salary_min is not None and salary_max is not None and salary_min > salary_max:
+            return ResponseBuilder.bad_request("salary_min 不能大于 salary_max")
+
+        filters = {name: request.args.get(name) for name in ExportService.EQUALITY_FILTERS}
+        filters['salary_min'] = salary_min
+        filters['salary_max'] = salary_max
+
+        # WSGI 服务器在写完上一块后才会拉取下一块，客户端读取慢时游标读取也随之暂停
+        response = Response(
+            stream_with_context(export_service.iter_export(output_format, filters, limit)),
+            mimetype=EXPORT_MIMETYPES[output_format]
+        )
+        if output_format != 'arrow':
+            response.headers['Content-Disposition'] = f'attachment; filename=records.{output_format}'
+        return response
+
+    except Exception as e:
+        logger.error(f"导出原始记录失败: {e}")
+        return ResponseBuilder.internal_error("服务器内部错误", {"type": "INTERNAL_ERROR", "details": str(e)})
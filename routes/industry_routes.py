@@ -10,9 +10,11 @@ from datetime import datetime
 
 from services.industry_service import IndustryService
 from services.trend_service import TrendService
-from utils.response import ResponseBuilder
+from utils.response import ResponseBuilder, cached_response
 from utils.validators import RequestValidator
 from database.Q3 import DatabaseManager
+from database.snapshot import SnapshotMissError
+from database.sketches import describe_distinct_counts
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +28,7 @@ trend_service = TrendService(db_manager=db_manager)
 
 
 @industry_bp.route('/charts/industry', methods=['GET'])
+@cached_response()
 def get_industry_analysis():
     """获取行业招聘分布数据"""
     try:
@@ -37,7 +40,11 @@ def get_industry_analysis():
             return ResponseBuilder.bad_request("参数验证失败")
         
         # 获取行业统计数据
-        industry_stats = industry_service.get_industry_statistics(limit, min_jobs)
+        approx_valid, approx = RequestValidator.validate_approx(request.args.get('approx'))
+        if not approx_valid:
+            return ResponseBuilder.bad_request(approx)
+        
+        industry_stats = industry_service.get_industry_statistics(limit, min_jobs, approx)
         
         # 构建图表配置
         chart_config = {
@@ -66,18 +73,33 @@ def get_industry_analysis():
             "last_updated": datetime.now().isoformat()
         }
         
+        if approx:
+            chart_config['distinct_counts'] = describe_distinct_counts(approx)
+        
         return ResponseBuilder.success("获取行业分析数据成功", {"chart_config": chart_config})
         
+    except SnapshotMissError:
+        raise
     except Exception as e:
         logger.error(f"获取行业分析数据失败: {e}")
         return ResponseBuilder.internal_error("服务器内部错误", {"type": "INTERNAL_ERROR", "details": str(e)})
 
 
 @industry_bp.route('/charts/industry/detail/<industry_name>', methods=['GET'])
+@cached_response()
 def get_industry_detail(industry_name):
     """获取特定行业的详细分析数据"""
     try:
-        industry_detail = industry_service.get_industry_detail(industry_name)
+        bins_valid, salary_bins = RequestValidator.validate_salary_bins(
+            request.args.get('salary_bins'), request.args.get('salary_quantiles'))
+        if not bins_valid:
+            return ResponseBuilder.bad_request(salary_bins)
+        
+        approx_valid, approx = RequestValidator.validate_approx(request.args.get('approx'))
+        if not approx_valid:
+            return ResponseBuilder.bad_request(approx)
+        
+        industry_detail = industry_service.get_industry_detail(industry_name, approx, salary_bins)
         
         if not industry_detail:
             return ResponseBuilder.not_found(f"未找到行业 {industry_name} 的数据")
@@ -114,8 +136,13 @@ def get_industry_detail(industry_name):
             ]
         }
         
+        if approx:
+            industry_detail_dict['distinct_counts'] = describe_distinct_counts(approx)
+        
         return ResponseBuilder.success(f"获取行业 {industry_name} 详细数据成功", industry_detail_dict)
         
+    except SnapshotMissError:
+        raise
     except Exception as e:
         logger.error(f"获取行业详细数据失败: {e}")
         return ResponseBuilder.internal_error("服务器内部错误", {"type": "INTERNAL_ERROR", "details": str(e)})
@@ -135,7 +162,11 @@ def compare_industries():
         industries = data['industries']
         
         # 获取行业比较数据
-        comparison_data = industry_service.compare_industries(industries)
+        approx_valid, approx = RequestValidator.validate_approx(request.args.get('approx'))
+        if not approx_valid:
+            return ResponseBuilder.bad_request(approx)
+        
+        comparison_data = industry_service.compare_industries(industries, approx)
         
         if not comparison_data:
             return ResponseBuilder.not_found("未找到指定行业的数据")
@@ -167,18 +198,33 @@ def compare_industries():
             "comparison_summary": comparison_summary
         }
         
+        if approx:
+            comparison_result['distinct_counts'] = describe_distinct_counts(approx)
+        
         return ResponseBuilder.success("行业比较数据获取成功", comparison_result)
         
+    except SnapshotMissError:
+        raise
     except Exception as e:
         logger.error(f"获取行业比较数据失败: {e}")
         return ResponseBuilder.internal_error("服务器内部错误", {"type": "INTERNAL_ERROR", "details": str(e)})
 
 
 @industry_bp.route('/charts/industry/overview', methods=['GET'])
+@cached_response()
 def get_industry_overview():
     """获取行业概览数据"""
     try:
-        overview_data = industry_service.get_industry_overview()
+        bins_valid, salary_bins = RequestValidator.validate_salary_bins(
+            request.args.get('salary_bins'), request.args.get('salary_quantiles'))
+        if not bins_valid:
+            return ResponseBuilder.bad_request(salary_bins)
+        
+        approx_valid, approx = RequestValidator.validate_approx(request.args.get('approx'))
+        if not approx_valid:
+            return ResponseBuilder.bad_request(approx)
+        
+        overview_data = industry_service.get_industry_overview(approx, salary_bins)
         
         # 转换为字典格式
         overview_dict = {
@@ -198,14 +244,20 @@ def get_industry_overview():
             "last_updated": datetime.now().isoformat()
         }
         
+        if approx:
+            overview_dict['distinct_counts'] = describe_distinct_counts(approx)
+        
         return ResponseBuilder.success("获取行业概览数据成功", overview_dict)
         
+    except SnapshotMissError:
+        raise
     except Exception as e:
         logger.error(f"获取行业概览数据失败: {e}")
         return ResponseBuilder.internal_error("服务器内部错误", {"type": "INTERNAL_ERROR", "details": str(e)})
 
 
 @industry_bp.route('/charts/industry/salary', methods=['GET'])
+@cached_response()
 def get_industry_salary_analysis():
     """获取各行业平均薪资分析"""
     try:
@@ -261,12 +313,15 @@ def get_industry_salary_analysis():
         
         return ResponseBuilder.success("获取行业薪资分析数据成功", {"chart_config": salary_analysis})
         
+    except SnapshotMissError:
+        raise
     except Exception as e:
         logger.error(f"获取行业薪资分析数据失败: {e}")
         return ResponseBuilder.internal_error("服务器内部错误", {"type": "INTERNAL_ERROR", "details": str(e)})
 
 
 @industry_bp.route('/industry/ranking/jobs', methods=['GET'])
+@cached_response()
 def get_job_ranking():
     """获取职位综合排名柱状图数据"""
     try:
@@ -290,12 +345,15 @@ def get_job_ranking():
     except FileNotFoundError as e:
         logger.error(f"文件未找到: {e}")
         return ResponseBuilder.not_found(f"数据文件不存在: {str(e)}")
+    except SnapshotMissError:
+        raise
     except Exception as e:
         logger.error(f"获取职位综合排名数据失败: {e}")
         return ResponseBuilder.internal_error("服务器内部错误", {"type": "INTERNAL_ERROR", "details": str(e)})
 
 
 @industry_bp.route('/industry/trend/rose', methods=['GET'])
+@cached_response()
 def get_industry_trend_rose():
     """获取行业双环嵌套玫瑰图数据"""
     try:
@@ -330,6 +388,8 @@ def get_industry_trend_rose():
     except FileNotFoundError as e:
         logger.error(f"文件未找到: {e}")
         return ResponseBuilder.not_found(f"数据文件不存在: {str(e)}")
+    except SnapshotMissError:
+        raise
     except Exception as e:
         logger.error(f"获取行业趋势玫瑰图数据失败: {e}")
         return ResponseBuilder.internal_error("服务器内部错误", {"type": "INTERNAL_ERROR", "details": str(e)})
@@ -7,7 +7,8 @@
 import logging
 from flask import Blueprint
 from database.Q3 import DatabaseManager
-from utils.response import ResponseBuilder
+from database.snapshot import SnapshotMissError
+from utils.response import ResponseBuilder, cached_response
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +20,7 @@ db_manager = DatabaseManager('default')
 
 
 @industry_stats_bp.route('/industry-stats/national', methods=['GET'])
+@cached_response()
 def get_national_industry_stats():
     """获取全国行业统计数据"""
     try:
@@ -51,6 +53,8 @@ def get_national_industry_stats():
             "data": industry_stats
         })
         
+    except SnapshotMissError:
+        raise
     except Exception as e:
         logger.error(f"获取行业统计数据失败: {e}")
         return ResponseBuilder.internal_error("服务器内部错误", {"type": "INTERNAL_ERROR", "details": str(e)})
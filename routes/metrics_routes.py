@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Prometheus 指标路由
+输出接口耗时（按阶段拆分）、SQL 语句耗时、数据库连接、各级缓存命中率与请求合并统计
+"""
+
+import logging
+from flask import Blueprint, Response
+
+from database.Q3 import query_metrics
+from utils.cache import swr_stats
+from utils.metrics import PrometheusWriter, route_metrics
+from utils.response import ResponseBuilder, response_cache
+from utils.singleflight import all_stats
+
+logger = logging.getLogger(__name__)
+
+# 创建蓝图（Prometheus 约定的抓取路径，不加 /api 前缀）
+metrics_bp = Blueprint('metrics', __name__)
+
+
+def _write_route_metrics(writer: PrometheusWriter) -> None:
+    """接口请求数、耗时直方图与各阶段累计耗时"""
+    in_flight, routes = route_metrics.export()
+    writer.metric('http_requests_total', 'counter', '接口请求数', (
+        ({'endpoint': endpoint, 'method': method, 'status': status}, count)
+        for endpoint, statuses, _, _ in routes for (method, status), count in statuses.items()
+    ))
+    writer.metric('http_requests_in_flight', 'gauge', '处理中的请求数', [(None, in_flight)])
+    writer.histogram('http_request_duration_seconds', '接口端到端耗时',
+                     (({'endpoint': endpoint}, duration) for endpoint, _, duration, _ in routes))
+    writer.metric('http_request_phase_seconds_total', 'counter',
+                  '接口耗时按阶段（db / compute / serialize / compress）累计', (
+                      ({'endpoint': endpoint, 'phase': phase}, value / 1000)
+                      for endpoint, _, _, phases in routes for phase, value in phases.items()
+                  ))
+
+
+def _write_query_metrics(writer: PrometheusWriter) -> None:
+    """SQL 语句耗时、行数、字节数与数据库连接统计"""
+    statements = query_metrics.snapshot(limit=len(query_metrics.statements))
+    histograms = query_metrics.histograms()
+    labels = {item['id']: {'statement': item['id'], 'caller': next(iter(item['callers']), '?')}
+              for item in statements}
+    writer.histogram('db_query_duration_seconds', 'SQL 语句耗时（按语句指纹）',
+                     ((labels[statement_id], histogram) for statement_id, (_, histogram) in histograms.items()
+                      if statement_id in labels))
+    writer.metric('db_query_rows_total', 'counter', 'SQL 语句返回行数',
+                  ((labels[item['id']], item['rows']) for item in statements))
+    writer.metric('db_query_bytes_total', 'counter', 'SQL 语句传输字节数（估算）',
+                  ((labels[item['id']], item['bytes']) for item in statements))
+    writer.metric('db_query_errors_total', 'counter', 'SQL 语句执行失败次数',
+                  ((labels[item['id']], item['errors']) for item in statements))
+    writer.metric('db_slow_queries_total', 'counter', '慢查询次数',
+                  [(None, query_metrics.slow_log.recorded)])
+
+    connections = query_metrics.connections.to_dict()
+    writer.metric('db_connections_opened_total', 'counter', '已建立的数据库连接数',
+                  [(None, connections['opened'])])
+    writer.metric('db_connections_active', 'gauge', '当前占用的数据库连接数', [(None, connections['active'])])
+    writer.metric('db_connections_max_active', 'gauge', '同时占用的数据库连接数峰值',
+                  [(None, connections['max_active'])])
+    writer.metric('db_connect_failures_total', 'counter', '建立数据库连接失败次数',
+                  [(None, connections['failures'])])
+    writer.metric('db_connect_seconds_total', 'counter', '建立数据库连接累计耗时',
+                  [(None, query_metrics.connections.connect_ms / 1000)])
+
+
+def _write_cache_metrics(writer: PrometheusWriter) -> None:
+    """响应缓存、重查询缓存（SWR）与请求合并统计"""
+    caches = {'response': response_cache.stats()}
+    caches.update({f"query:{name}": stats for name, stats in swr_stats().items()})
+    writer.metric('cache_hits_total', 'counter', '缓存命中次数',
+                  (({'cache': name}, stats['hits']) for name, stats in caches.items()))
+    writer.metric('cache_stale_hits_total', 'counter', '缓存过期后仍返回旧值的次数',
+                  (({'cache': name}, stats.get('stale_hits', 0)) for name, stats in caches.items()))
+    writer.metric('cache_misses_total', 'counter', '缓存未命中次数',
+                  (({'cache': name}, stats['misses']) for name, stats in caches.items()))
+    writer.metric('cache_hit_ratio', 'gauge', '缓存命中率',
+                  (({'cache': name}, stats['hit_ratio']) for name, stats in caches.items()))
+    writer.metric('cache_entries', 'gauge', '缓存条目数',
+                  (({'cache': name}, stats['size']) for name, stats in caches.items()))
+
+    flights = all_stats()
+    writer.metric('singleflight_calls_total', 'counter', '请求合并调用次数',
+                  (({'name': name}, stats['calls']) for name, stats in flights.items()))
+    writer.metric('singleflight_coalesced_total', 'counter', '被合并（共享结果）的调用次数',
+                  (({'name': name}, stats['coalesced']) for name, stats in flights.items()))
+    writer.metric('singleflight_in_flight', 'gauge', '进行中的合并计算数',
+                  (({'name': name}, stats['in_flight']) for name, stats in flights.items()))
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """以 Prometheus 文本格式输出运行指标"""
+    try:
+        writer = PrometheusWriter()
+        _write_route_metrics(writer)
+        _write_query_metrics(writer)
+        _write_cache_metrics(writer)
+        return Response(writer.render(), mimetype=None, content_type=PrometheusWriter.CONTENT_TYPE)
+
+    except Exception as e:
+        logger.error(f"获取运行指标失败: {e}")
+        return ResponseBuilder.internal_error("服务器内部错误", {"type": "INTERNAL_ERROR", "details": str(e)})
@@ -7,8 +7,9 @@
 import logging
 from flask import Blueprint, request
 from services.position_service import PositionService
-from utils.response import ResponseBuilder
+from utils.response import ResponseBuilder, cached_response
 from database.Q3 import DatabaseManager
+from database.snapshot import SnapshotMissError
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +22,7 @@ position_service = PositionService(db_manager)
 
 
 @position_bp.route('/parallel', methods=['GET'])
+@cached_response()
 def get_parallel_coordinates():
     """
     获取平行坐标图数据
@@ -45,6 +47,8 @@ def get_parallel_coordinates():
     except ValueError as e:
         logger.warning(f"参数错误: {e}")
         return ResponseBuilder.bad_request(str(e))
+    except SnapshotMissError:
+        raise
     except Exception as e:
         logger.error(f"获取平行坐标数据失败: {e}")
         return ResponseBuilder.internal_error("服务器内部错误", {
@@ -54,6 +58,7 @@ def get_parallel_coordinates():
 
 
 @position_bp.route('/nested_bar', methods=['GET'])
+@cached_response()
 def get_nested_bar():
     """
     获取多维度嵌套柱状图数据
@@ -81,6 +86,8 @@ def get_nested_bar():
     except ValueError as e:
         logger.warning(f"参数错误: {e}")
         return ResponseBuilder.bad_request(str(e))
+    except SnapshotMissError:
+        raise
     except Exception as e:
         logger.error(f"获取嵌套柱状图数据失败: {e}")
         return ResponseBuilder.internal_error("服务器内部错误", {
@@ -90,6 +97,7 @@ def get_nested_bar():
 
 
 @position_bp.route('/sankey', methods=['GET'])
+@cached_response()
 def get_sankey():
     """
     获取桑基图数据
@@ -132,6 +140,8 @@ def get_sankey():
     except ValueError as e:
         logger.warning(f"参数错误: {e}")
         return ResponseBuilder.bad_request(str(e))
+    except SnapshotMissError:
+        raise
     except Exception as e:
         logger.error(f"获取桑基图数据失败: {e}")
         return ResponseBuilder.internal_error("服务器内部错误", {
@@ -9,8 +9,10 @@ from flask import Blueprint, request
 from datetime import datetime
 
 from services.q1_service import Q1Service
-from utils.response import ResponseBuilder
+from utils.response import ResponseBuilder, cached_response
+from utils.validators import RequestValidator
 from database.Q3 import DatabaseManager
+from database.snapshot import SnapshotMissError
 
 logger = logging.getLogger(__name__)
 
@@ -23,22 +25,27 @@ q1_service = Q1Service(db_manager)
 
 
 @q1_bp.route('/cities', methods=['GET'])
+@cached_response()
 def get_representative_cities():
     """获取20个代表性城市列表"""
     try:
         cities = q1_service.get_representative_cities()
         return ResponseBuilder.success("获取代表性城市成功", {"cities": cities})
+    except SnapshotMissError:
+        raise
     except Exception as e:
         logger.error(f"获取代表性城市失败: {e}")
         return ResponseBuilder.internal_error("服务器内部错误", {"type": "INTERNAL_ERROR", "details": str(e)})
 
 
 @q1_bp.route('/scatter', methods=['GET'])
+@cached_response()
 def get_scatter_data():
     """
     获取散点气泡图数据
     参数:
     - city: 城市名称（必选）
+    - format: 返回格式，rows（默认）或 columnar（可选）
     """
     try:
         city = request.args.get('city')
@@ -46,37 +53,49 @@ def get_scatter_data():
         if not city:
             return ResponseBuilder.bad_request("缺少参数: city")
         
+        format_valid, output_format = RequestValidator.validate_format(request.args.get('format'))
+        if not format_valid:
+            return ResponseBuilder.bad_request(output_format)
+        
         # 获取散点图数据
-        scatter_data = q1_service.get_scatter_data(city)
+        scatter_data = q1_service.get_scatter_data(city, output_format)
         
         if not scatter_data:
             return ResponseBuilder.not_found(f"未找到城市 {city} 的数据")
         
         return ResponseBuilder.success(f"获取城市 {city} 散点图数据成功", scatter_data)
         
+    except SnapshotMissError:
+        raise
     except Exception as e:
         logger.error(f"获取散点图数据失败: {e}")
         return ResponseBuilder.internal_error("服务器内部错误", {"type": "INTERNAL_ERROR", "details": str(e)})
 
 
 @q1_bp.route('/job-levels', methods=['GET'])
+@cached_response()
 def get_job_levels():
     """获取所有职位层级（聚类类别）"""
     try:
         job_levels = q1_service.get_job_levels()
         return ResponseBuilder.success("获取职位层级成功", {"job_levels": job_levels})
+    except SnapshotMissError:
+        raise
     except Exception as e:
         logger.error(f"获取职位层级失败: {e}")
         return ResponseBuilder.internal_error("服务器内部错误", {"type": "INTERNAL_ERROR", "details": str(e)})
 
 
 @q1_bp.route('/industries', methods=['GET'])
+@cached_response()
 def get_industries():
     """获取所有行业类别"""
     try:
         city = request.args.get('city')
         industries = q1_service.get_industries(city)
         return ResponseBuilder.success("获取行业类别成功", {"industries": industries})
+    except SnapshotMissError:
+        raise
     except Exception as e:
         logger.error(f"获取行业类别失败: {e}")
         return ResponseBuilder.internal_error("服务器内部错误", {"type": "INTERNAL_ERROR", "details": str(e)})
@@ -8,7 +8,9 @@
 import logging
 from flask import Blueprint, request
 from database.Q3 import DatabaseManager
-from utils.response import ResponseBuilder
+from database.snapshot import SnapshotMissError
+from utils.response import ResponseBuilder, cached_response
+from utils.validators import RequestValidator
 from services.salary_3d_service import Salary3DService
 from services.radar_bubble_service import RadarBubbleService
 
@@ -24,6 +26,7 @@ radar_bubble_service = RadarBubbleService(db_manager)
 
 
 @salary_3d_bp.route('/charts/3d/experience-education-salary', methods=['GET'])
+@cached_response()
 def get_experience_education_salary_3d():
     """获取经验-学历-薪资三维柱状图数据"""
     try:
@@ -95,12 +98,15 @@ def get_experience_education_salary_3d():
         
         return ResponseBuilder.success("获取三维柱状图数据成功", chart_data)
         
+    except SnapshotMissError:
+        raise
     except Exception as e:
         logger.error(f"获取三维柱状图数据失败: {e}")
         return ResponseBuilder.internal_error("服务器内部错误", {"type": "INTERNAL_ERROR", "details": str(e)})
 
 
 @salary_3d_bp.route('/charts/boxplot/salary-distribution', methods=['GET'])
+@cached_response()
 def get_boxplot_data():
     """获取箱线图数据"""
     try:
@@ -110,6 +116,10 @@ def get_boxplot_data():
         city = request.args.get('city', None)
         company_type = request.args.get('company_type', None)
         
+        format_valid, output_format = RequestValidator.validate_format(request.args.get('format'))
+        if not format_valid:
+            return ResponseBuilder.bad_request(output_format)
+        
         # 参数验证：至少需要指定experience和education
         if not experience or not education:
             return ResponseBuilder.bad_request(
@@ -122,17 +132,21 @@ def get_boxplot_data():
             experience=experience,
             education=education,
             city=city,
-            company_type=company_type
+            company_type=company_type,
+            output_format=output_format
         )
         
         return ResponseBuilder.success("获取箱线图数据成功", boxplot_data)
         
+    except SnapshotMissError:
+        raise
     except Exception as e:
         logger.error(f"获取箱线图数据失败: {e}", exc_info=True)
         return ResponseBuilder.internal_error("服务器内部错误", {"type": "INTERNAL_ERROR", "details": str(e)})
 
 
 @salary_3d_bp.route('/charts/radar-bubble', methods=['GET'])
+@cached_response()
 def get_radar_bubble_data():
     """获取雷达气泡图数据"""
     try:
@@ -141,20 +155,29 @@ def get_radar_bubble_data():
         
         return ResponseBuilder.success("获取雷达气泡图数据成功", radar_data)
         
+    except SnapshotMissError:
+        raise
     except Exception as e:
         logger.error(f"获取雷达气泡图数据失败: {e}", exc_info=True)
         return ResponseBuilder.internal_error("服务器内部错误", {"type": "INTERNAL_ERROR", "details": str(e)})
 
 
 @salary_3d_bp.route('/charts/parallel-coordinates', methods=['GET'])
+@cached_response()
 def get_parallel_coordinates_data():
     """获取平行坐标图数据"""
     try:
+        format_valid, output_format = RequestValidator.validate_format(request.args.get('format'))
+        if not format_valid:
+            return ResponseBuilder.bad_request(output_format)
+        
         # 获取平行坐标图统计数据
-        parallel_data = radar_bubble_service.get_parallel_coordinates_statistics()
+        parallel_data = radar_bubble_service.get_parallel_coordinates_statistics(output_format)
         
         return ResponseBuilder.success("获取平行坐标图数据成功", parallel_data)
         
+    except SnapshotMissError:
+        raise
     except Exception as e:
         logger.error(f"获取平行坐标图数据失败: {e}", exc_info=True)
         return ResponseBuilder.internal_error("服务器内部错误", {"type": "INTERNAL_ERROR", "details": str(e)})
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+系统运行状态相关路由
+"""
+
+import logging
+from flask import Blueprint, Response, request
+
+from database.Q3 import query_metrics
+from utils import profiling
+from utils.cache import swr_stats
+from utils.response import ResponseBuilder, response_cache
+from utils.singleflight import all_stats
+from utils.warmup import settings, warmup_state
+
+logger = logging.getLogger(__name__)
+
+# 创建蓝图
+system_bp = Blueprint('system', __name__, url_prefix='/api/system')
+
+
+@system_bp.route('/stats', methods=['GET'])
+def get_system_stats():
+    """
+    获取运行时统计信息
+    包括响应缓存命中率、重查询缓存（stale-while-revalidate）命中与刷新次数、请求合并（single-flight）次数
+    """
+    try:
+        return ResponseBuilder.success("获取运行统计成功", {
+            'response_cache': response_cache.stats(),
+            'query_cache': swr_stats(),
+            'single_flight': all_stats()
+        })
+
+    except Exception as e:
+        logger.error(f"获取运行统计失败: {e}")
+        return ResponseBuilder.internal_error("服务器内部错误", {"type": "INTERNAL_ERROR", "details": str(e)})
+
+
+@system_bp.route('/queries', methods=['GET'])
+def get_query_stats():
+    """
+    获取查询埋点统计
+    按语句指纹汇总调用方、各阶段耗时、行数与字节数，并返回最近的慢查询（含 EXPLAIN）
+    参数：sort（total_ms / avg_ms / p95_ms / calls / rows / bytes，默认 total_ms）、limit（默认 20）、histogram（true 时附带直方图）
+    """
+    try:
+        sort_by = request.args.get('sort', 'total_ms')
+        if sort_by not in ('total_ms', 'avg_ms', 'p95_ms', 'calls', 'rows', 'bytes'):
+            return ResponseBuilder.bad_request(f"不支持的排序字段: {sort_by}")
+        limit = request.args.get('limit', 20, type=int)
+        include_histogram = request.args.get('histogram', 'false').lower() == 'true'
+        return ResponseBuilder.success("获取查询统计成功", {
+            'enabled': query_metrics.enabled,
+            'slow_query_threshold_ms': query_metrics.slow_log.threshold_ms,
+            'statements': query_metrics.snapshot(limit, sort_by, include_histogram),
+            'slow_queries': query_metrics.slow_log.recent(limit)
+        })
+
+    except Exception as e:
+        logger.error(f"获取查询统计失败: {e}")
+        return ResponseBuilder.internal_error("服务器内部错误", {"type": "INTERNAL_ERROR", "details": str(e)})
+
+
+@system_bp.route('/profiles', methods=['GET'])
+def get_profiles():
+    """获取已保存的请求剖析结果列表（需开启 PROFILING_ENABLED）"""
+    if not settings.PROFILING_ENABLED:
+        return ResponseBuilder.not_found("未开启请求剖析")
+    try:
+        return ResponseBuilder.success("获取剖析结果列表成功", {'profiles': profiling.list_profiles()})
+
+    except Exception as e:
+        logger.error(f"获取剖析结果列表失败: {e}")
+        return ResponseBuilder.internal_error("服务器内部错误", {"type": "INTERNAL_ERROR", "details": str(e)})
+
+
+@system_bp.route('/profiles/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    """
+    获取一次请求的剖析结果
+    参数：format=collapsed 时返回火焰图用的折叠栈文本，否则返回完整报告
+    """
+    if not settings.PROFILING_ENABLED:
+        return ResponseBuilder.not_found("未开启请求剖析")
+    try:
+        collapsed = request.args.get('format') == 'collapsed'
+        profile = profiling.load_profile(profile_id, collapsed)
+        if profile is None:
+            return ResponseBuilder.not_found(f"剖析结果不存在: {profile_id}")
+        if collapsed:
+            return Response(profile, mimetype='text/plain')
+        return ResponseBuilder.success("获取剖析结果成功", profile)
+
+    except Exception as e:
+        logger.error(f"获取剖析结果失败: {e}")
+        return ResponseBuilder.internal_error("服务器内部错误", {"type": "INTERNAL_ERROR", "details": str(e)})
+
+
+@system_bp.route('/ready', methods=['GET'])
+def get_readiness():
+    """
+    就绪检查
+    启动预热完成（或未启用预热）时返回200，预热进行中返回503
+    """
+    state = warmup_state.to_dict()
+    if warmup_state.ready or not settings.WARMUP_ENABLED:
+        return ResponseBuilder.success("服务已就绪", state)
+    return ResponseBuilder.error("服务预热中", 503, state)
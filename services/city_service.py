@@ -13,6 +13,7 @@ from models.city import (
     OverviewData
 )
 from database.Q3 import DatabaseManager
+from utils.histogram import HistogramSpec
 
 logger = logging.getLogger(__name__)
 
@@ -23,10 +24,10 @@ class CityService:
     def __init__(self, db_manager: DatabaseManager):
         self.db_manager = db_manager
     
-    def get_overview_data(self) -> OverviewData:
-        """获取数据概览"""
+    def get_overview_data(self, approx: bool = False) -> OverviewData:
+        """获取数据概览（approx 为 True 时城市数、公司数由聚合快照得出）"""
         try:
-            stats = self.db_manager.get_overview_statistics()
+            stats = self.db_manager.get_overview_statistics(approx)
             
             total_records = stats['total_records'][0]
             total_cities = stats['total_cities'][0]
@@ -60,10 +61,10 @@ class CityService:
             logger.error(f"获取数据概览失败: {e}")
             raise
     
-    def get_city_statistics(self, limit: int = 20, min_jobs: int = 0) -> List[CityStatistics]:
-        """获取城市统计数据"""
+    def get_city_statistics(self, limit: int = 20, min_jobs: int = 0, approx: bool = False) -> List[CityStatistics]:
+        """获取城市统计数据（approx 为 True 时公司数为估计值）"""
         try:
-            results = self.db_manager.get_city_statistics(limit, min_jobs)
+            results = self.db_manager.get_city_statistics(limit, min_jobs, approx)
             total_jobs = self.db_manager.execute_query(
                 "SELECT COUNT(*) FROM data WHERE city IS NOT NULL", 
                 fetch_one=True
@@ -87,10 +88,11 @@ class CityService:
             logger.error(f"获取城市统计数据失败: {e}")
             raise
     
-    def get_city_detail(self, city_name: str) -> Optional[CityDetail]:
-        """获取城市详细信息"""
+    def get_city_detail(self, city_name: str, approx: bool = False,
+                        salary_bins: Optional[HistogramSpec] = None) -> Optional[CityDetail]:
+        """获取城市详细信息（approx 为 True 时公司数为估计值，salary_bins 为薪资分布的分桶方式）"""
         try:
-            city_data = self.db_manager.get_city_detail(city_name)
+            city_data = self.db_manager.get_city_detail(city_name, approx, salary_bins)
             
             basic_info = city_data['basic']
             if not basic_info or basic_info[0] == 0:
@@ -147,10 +149,10 @@ class CityService:
             logger.error(f"获取城市详细数据失败: {e}")
             raise
     
-    def compare_cities(self, cities: List[str]) -> List[CityComparison]:
-        """比较多个城市的数据"""
+    def compare_cities(self, cities: List[str], approx: bool = False) -> List[CityComparison]:
+        """比较多个城市的数据（approx 为 True 时公司数为估计值）"""
         try:
-            results = self.db_manager.get_city_comparison(cities)
+            results = self.db_manager.get_city_comparison(cities, approx)
             
             if not results:
                 return []
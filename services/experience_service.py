@@ -13,6 +13,7 @@ from models.experience import (
     ExperienceOverview
 )
 from database.Q3 import DatabaseManager
+from utils.histogram import HistogramSpec
 
 logger = logging.getLogger(__name__)
 
@@ -23,10 +24,11 @@ class ExperienceService:
     def __init__(self, db_manager: DatabaseManager):
         self.db_manager = db_manager
     
-    def get_experience_statistics(self, limit: int = 1000, min_jobs: int = 0) -> List[ExperienceStatistics]:
-        """获取经验统计数据"""
+    def get_experience_statistics(self, limit: int = 1000, min_jobs: int = 0,
+                                  approx: bool = False) -> List[ExperienceStatistics]:
+        """获取经验统计数据（approx 为 True 时公司数为估计值）"""
         try:
-            results = self.db_manager.get_experience_statistics(limit, min_jobs)
+            results = self.db_manager.get_experience_statistics(limit, min_jobs, approx)
             total_jobs = self.db_manager.execute_query(
                 "SELECT COUNT(*) FROM data WHERE experience IS NOT NULL", 
                 fetch_one=True
@@ -50,10 +52,11 @@ class ExperienceService:
             logger.error(f"获取经验统计数据失败: {e}")
             raise
     
-    def get_experience_detail(self, experience_name: str) -> Optional[ExperienceDetail]:
-        """获取经验详细信息"""
+    def get_experience_detail(self, experience_name: str, approx: bool = False,
+                              salary_bins: Optional[HistogramSpec] = None) -> Optional[ExperienceDetail]:
+        """获取经验详细信息（approx 为 True 时公司数为估计值，salary_bins 为薪资分布的分桶方式）"""
         try:
-            experience_data = self.db_manager.get_experience_detail(experience_name)
+            experience_data = self.db_manager.get_experience_detail(experience_name, approx, salary_bins)
             
             basic_info = experience_data['basic']
             if not basic_info or basic_info[0] == 0:
@@ -111,10 +114,10 @@ class ExperienceService:
             logger.error(f"获取经验详细数据失败: {e}")
             raise
     
-    def compare_experiences(self, experiences: List[str]) -> List[ExperienceComparison]:
-        """比较多个经验级别的数据"""
+    def compare_experiences(self, experiences: List[str], approx: bool = False) -> List[ExperienceComparison]:
+        """比较多个经验级别的数据（approx 为 True 时公司数为估计值）"""
         try:
-            results = self.db_manager.get_experience_comparison(experiences)
+            results = self.db_manager.get_experience_comparison(experiences, approx)
             
             if not results:
                 return []
@@ -147,8 +150,8 @@ class ExperienceService:
             logger.error(f"获取经验比较数据失败: {e}")
             raise
     
-    def get_experience_overview(self) -> ExperienceOverview:
-        """获取经验概览数据"""
+    def get_experience_overview(self, salary_bins: Optional[HistogramSpec] = None) -> ExperienceOverview:
+        """获取经验概览数据（salary_bins 为薪资范围分布的分桶方式）"""
         try:
             overview_data = self.db_manager.get_experience_overview()
             
@@ -171,7 +174,7 @@ class ExperienceService:
                 ))
             
             # 计算薪资范围分布
-            salary_ranges = self._calculate_salary_ranges()
+            salary_ranges = self._calculate_salary_ranges(salary_bins)
             
             # 构建经验分布
             experience_distribution = {row[0]: row[1] for row in experience_distribution_data}
@@ -188,42 +191,10 @@ class ExperienceService:
             logger.error(f"获取经验概览数据失败: {e}")
             raise
     
-    def _calculate_salary_ranges(self) -> Dict[str, int]:
-        """计算薪资范围分布"""
+    def _calculate_salary_ranges(self, salary_bins: Optional[HistogramSpec] = None) -> Dict[str, int]:
+        """计算薪资范围分布（见 DatabaseManager.get_salary_histogram，salary_bins 为分桶方式）"""
         try:
-            query = """
-                SELECT 
-                    CASE 
-                        WHEN (CAST(SUBSTRING_INDEX(salary, '-', 1) AS UNSIGNED) + 
-                              CAST(SUBSTRING_INDEX(SUBSTRING_INDEX(salary, '-', 2), '-', -1) AS UNSIGNED)) / 2 < 5 THEN '0-5K'
-                        WHEN (CAST(SUBSTRING_INDEX(salary, '-', 1) AS UNSIGNED) + 
-                              CAST(SUBSTRING_INDEX(SUBSTRING_INDEX(salary, '-', 2), '-', -1) AS UNSIGNED)) / 2 < 10 THEN '5-10K'
-                        WHEN (CAST(SUBSTRING_INDEX(salary, '-', 1) AS UNSIGNED) + 
-                              CAST(SUBSTRING_INDEX(SUBSTRING_INDEX(salary, '-', 2), '-', -1) AS UNSIGNED)) / 2 < 15 THEN '10-15K'
-                        WHEN (CAST(SUBSTRING_INDEX(salary, '-', 1) AS UNSIGNED) + 
-                              CAST(SUBSTRING_INDEX(SUBSTRING_INDEX(salary, '-', 2), '-', -1) AS UNSIGNED)) / 2 < 25 THEN '15-25K'
-                        WHEN (CAST(SUBSTRING_INDEX(salary, '-', 1) AS UNSIGNED) + 
-                              CAST(SUBSTRING_INDEX(SUBSTRING_INDEX(salary, '-', 2), '-', -1) AS UNSIGNED)) / 2 < 35 THEN '25-35K'
-                        ELSE '35K+'
-                    END as salary_range,
-                    COUNT(*) as count
-                FROM data 
-                WHERE experience IS NOT NULL 
-                AND salary IS NOT NULL 
-                AND salary REGEXP '^[0-9]+-[0-9]+'
-                GROUP BY salary_range
-                ORDER BY 
-                    CASE salary_range
-                        WHEN '0-5K' THEN 1
-                        WHEN '5-10K' THEN 2
-                        WHEN '10-15K' THEN 3
-                        WHEN '15-25K' THEN 4
-                        WHEN '25-35K' THEN 5
-                        WHEN '35K+' THEN 6
-                    END
-            """
-            
-            results = self.db_manager.execute_query(query)
+            results = self.db_manager.get_salary_histogram('experience', spec=salary_bins)
             return {row[0]: row[1] for row in results}
         except Exception as e:
             logger.error(f"计算薪资范围分布失败: {e}")
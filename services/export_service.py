@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+原始记录导出服务
+通过服务端游标按批次读取 data 表记录，直接编码为 NDJSON / CSV / Arrow 数据块
+"""
+
+import csv
+import io
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from database.Q3 import DatabaseManager
+from utils import arrow
+from utils.response import dumps
+
+logger = logging.getLogger(__name__)
+
+# 薪资中位数表达式（单位K），与统计查询保持一致
+SALARY_MID_EXPR = """(CAST(SUBSTRING_INDEX(salary, '-', 1) AS UNSIGNED) +
+                     CAST(SUBSTRING_INDEX(SUBSTRING_INDEX(salary, '-', 2), '-', -1) AS UNSIGNED)) / 2"""
+
+
+class ExportService:
+    """原始记录导出服务"""
+
+    # 导出列及其类型（string/int/float）
+    EXPORT_COLUMNS: List[Tuple[str, str]] = [
+        ('city', 'string'),
+        ('company', 'string'),
+        ('company_type', 'string'),
+        ('job_title', 'string'),
+        ('experience', 'string'),
+        ('education', 'string'),
+        ('salary', 'string'),
+        ('median_annual_salary', 'float'),
+        ('job_level', 'string'),
+        ('city_level', 'string'),
+    ]
+
+    # 支持等值筛选的列
+    EQUALITY_FILTERS = ('city', 'company_type', 'experience', 'education')
+
+    SUPPORTED_FORMATS = ('ndjson', 'csv', 'arrow')
+
+    def __init__(self, db_manager: DatabaseManager, batch_size: int = 5000):
+        self.db_manager = db_manager
+        self.batch_size = batch_size
+
+    def build_query(self, filters: Optional[Dict[str, Any]] = None,
+                    limit: Optional[int] = None) -> Tuple[str, Optional[Tuple]]:
+        """
+        构建导出查询语句
+
+        Args:
+            filters: 筛选条件，支持 city、company_type、experience、education 等值筛选，
+                     以及 salary_min、salary_max（薪资中位数，单位K）范围筛选
+            limit: 最多导出的记录数
+        """
+        filters = filters or {}
+        conditions = []
+        params: List[Any] = []
+
+        for name in self.EQUALITY_FILTERS:
+            if filters.get(name):
+                conditions.append(f"{name} = %s")
+                params.append(filters[name])
+
+        salary_min = filters.get('salary_min')
+        salary_max = filters.get('salary_max')
+        if salary_min is not None or salary_max is not None:
+            conditions.append("salary IS NOT NULL AND salary REGEXP '^[0-9]+-[0-9]+'")
+            if salary_min is not None:
+                conditions.append(f"{SALARY_MID_EXPR} >= %s")
+                params.append(salary_min)
+            if salary_max is not None:
+                conditions.append(f"{SALARY_MID_EXPR} <= %s")
+                params.append(salary_max)
+
+        columns = ', '.join(name for name, _ in self.EXPORT_COLUMNS)
+        query = f"SELECT {columns} FROM data"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        if limit:
+            query += " LIMIT %s"
+            params.append(limit)
+
+        return query, tuple(params) if params else None
+
+    def iter_batches(self, filters: Optional[Dict[str, Any]] = None,
+                     limit: Optional[int] = None) -> Iterator[List[Tuple]]:
+        """按批次返回原始记录（行元组列表）"""
+        query, params = self.build_query(filters, limit)
+        return self.db_manager.fetch_batches(query, params, self.batch_size)
+
+    def iter_ndjson(self, filters: Optional[Dict[str, Any]] = None,
+                    limit: Optional[int] = None) -> Iterator[bytes]:
+        """以 NDJSON 格式逐批输出，每行一个JSON对象"""
+        names = [name for name, _ in self.EXPORT_COLUMNS]
+        for rows in self.iter_batches(filters, limit):
+            yield b''.join(dumps(dict(zip(names, row))) + b'\n' for row in rows)
+
+    def iter_csv(self, filters: Optional[Dict[str, Any]] = None,
+                 limit: Optional[int] = None) -> Iterator[bytes]:
+        """以 CSV 格式逐批输出，首个数据块带 UTF-8 BOM 与表头（便于 Excel 识别中文）"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow([name for name, _ in self.EXPORT_COLUMNS])
+        yield ('\ufeff' + buffer.getvalue()).encode('utf-8')
+        for rows in self.iter_batches(filters, limit):
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(rows)
+            yield buffer.getvalue().encode('utf-8')
+
+    def iter_arrow(self, filters: Optional[Dict[str, Any]] = None,
+                   limit: Optional[int] = None) -> Iterator[bytes]:
+        """以 Arrow IPC 流格式逐批输出原始记录（每批按列读取为 numpy 数组后构建 RecordBatch）"""
+        query, params = self.build_query(filters, limit)
+        batches = self.db_manager.iter_query(
+            query, params, self.batch_size,
+            column_types=[arrow.COLUMN_TYPES[kind] for _, kind in self.EXPORT_COLUMNS], as_numpy=True
+        )
+        return arrow.iter_ipc_stream(arrow.build_schema(self.EXPORT_COLUMNS), batches, {'source': 'data'})
+
+    def iter_export(self, output_format: str, filters: Optional[Dict[str, Any]] = None,
+                    limit: Optional[int] = None) -> Iterator[bytes]:
+        """按指定格式输出导出数据块"""
+        if output_format == 'csv':
+            chunks = self.iter_csv(filters, limit)
+        elif output_format == 'arrow':
+            chunks = self.iter_arrow(filters, limit)
+        else:
+            chunks = self.iter_ndjson(filters, limit)
+        return self._abort_on_error(chunks, output_format)
+
+    @staticmethod
+    def _abort_on_error(chunks: Iterator[bytes], output_format: str) -> Iterator[bytes]:
+        """
+        导出中途读取失败时记录错误并中止响应：响应头（200）已经发出，无法再改为错误状态码，
+        NDJSON 先追加一行 {"error": {...}} 尾记录，然后各格式都重新抛出异常，
+        由 WSGI 服务器断开连接（不发送分块传输的结束块），客户端可据此判断导出不完整
+        """
+        try:
+            yield from chunks
+        except Exception as e:
+            logger.error(f"导出原始记录中途失败，已中止响应: {e}")
+            if output_format == 'ndjson':
+                yield dumps({"error": {"type": "EXPORT_FAILED", "details": str(e)}}) + b'\n'
+            raise
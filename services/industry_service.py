@@ -13,6 +13,7 @@ from models.industry import (
     IndustryOverview
 )
 from database.Q3 import DatabaseManager
+from utils.histogram import HistogramSpec
 
 logger = logging.getLogger(__name__)
 
@@ -23,10 +24,11 @@ class IndustryService:
     def __init__(self, db_manager: DatabaseManager):
         self.db_manager = db_manager
     
-    def get_industry_statistics(self, limit: int = 20, min_jobs: int = 0) -> List[IndustryStatistics]:
-        """获取行业统计数据"""
+    def get_industry_statistics(self, limit: int = 20, min_jobs: int = 0,
+                                approx: bool = False) -> List[IndustryStatistics]:
+        """获取行业统计数据（approx 为 True 时公司数为估计值）"""
         try:
-            results = self.db_manager.get_industry_statistics(limit, min_jobs)
+            results = self.db_manager.get_industry_statistics(limit, min_jobs, approx)
             total_jobs = self.db_manager.execute_query(
                 "SELECT COUNT(*) FROM data WHERE company_type IS NOT NULL", 
                 fetch_one=True
@@ -50,10 +52,11 @@ class IndustryService:
             logger.error(f"获取行业统计数据失败: {e}")
             raise
     
-    def get_industry_detail(self, industry_name: str) -> Optional[IndustryDetail]:
-        """获取行业详细信息"""
+    def get_industry_detail(self, industry_name: str, approx: bool = False,
+                            salary_bins: Optional[HistogramSpec] = None) -> Optional[IndustryDetail]:
+        """获取行业详细信息（approx 为 True 时公司数为估计值，salary_bins 为薪资分布的分桶方式）"""
         try:
-            industry_data = self.db_manager.get_industry_detail(industry_name)
+            industry_data = self.db_manager.get_industry_detail(industry_name, approx, salary_bins)
             
             basic_info = industry_data['basic']
             if not basic_info or basic_info[0] == 0:
@@ -110,10 +113,10 @@ class IndustryService:
             logger.error(f"获取行业详细数据失败: {e}")
             raise
     
-    def compare_industries(self, industries: List[str]) -> List[IndustryComparison]:
-        """比较多个行业的数据"""
+    def compare_industries(self, industries: List[str], approx: bool = False) -> List[IndustryComparison]:
+        """比较多个行业的数据（approx 为 True 时公司数为估计值）"""
         try:
-            results = self.db_manager.get_industry_comparison(industries)
+            results = self.db_manager.get_industry_comparison(industries, approx)
             
             if not results:
                 return []
@@ -145,10 +148,11 @@ class IndustryService:
             logger.error(f"获取行业比较数据失败: {e}")
             raise
     
-    def get_industry_overview(self) -> IndustryOverview:
-        """获取行业概览数据"""
+    def get_industry_overview(self, approx: bool = False,
+                              salary_bins: Optional[HistogramSpec] = None) -> IndustryOverview:
+        """获取行业概览数据（approx 为 True 时行业数由聚合快照得出，salary_bins 为薪资范围分布的分桶方式）"""
         try:
-            overview_data = self.db_manager.get_industry_overview()
+            overview_data = self.db_manager.get_industry_overview(approx)
             
             total_industries = overview_data['total_industries'][0]
             total_jobs = overview_data['total_jobs'][0]
@@ -168,7 +172,7 @@ class IndustryService:
                 ))
             
             # 计算薪资范围分布
-            salary_ranges = self._calculate_salary_ranges()
+            salary_ranges = self._calculate_salary_ranges(salary_bins)
             
             return IndustryOverview(
                 total_industries=total_industries,
@@ -181,42 +185,10 @@ class IndustryService:
             logger.error(f"获取行业概览数据失败: {e}")
             raise
     
-    def _calculate_salary_ranges(self) -> Dict[str, int]:
-        """计算薪资范围分布"""
+    def _calculate_salary_ranges(self, salary_bins: Optional[HistogramSpec] = None) -> Dict[str, int]:
+        """计算薪资范围分布（见 DatabaseManager.get_salary_histogram，salary_bins 为分桶方式）"""
         try:
-            query = """
-                SELECT 
-                    CASE 
-                        WHEN (CAST(SUBSTRING_INDEX(salary, '-', 1) AS UNSIGNED) + 
-                              CAST(SUBSTRING_INDEX(SUBSTRING_INDEX(salary, '-', 2), '-', -1) AS UNSIGNED)) / 2 < 5 THEN '0-5K'
-                        WHEN (CAST(SUBSTRING_INDEX(salary, '-', 1) AS UNSIGNED) + 
-                              CAST(SUBSTRING_INDEX(SUBSTRING_INDEX(salary, '-', 2), '-', -1) AS UNSIGNED)) / 2 < 10 THEN '5-10K'
-                        WHEN (CAST(SUBSTRING_INDEX(salary, '-', 1) AS UNSIGNED) + 
-                              CAST(SUBSTRING_INDEX(SUBSTRING_INDEX(salary, '-', 2), '-', -1) AS UNSIGNED)) / 2 < 15 THEN '10-15K'
-                        WHEN (CAST(SUBSTRING_INDEX(salary, '-', 1) AS UNSIGNED) + 
-                              CAST(SUBSTRING_INDEX(SUBSTRING_INDEX(salary, '-', 2), '-', -1) AS UNSIGNED)) / 2 < 25 THEN '15-25K'
-                        WHEN (CAST(SUBSTRING_INDEX(salary, '-', 1) AS UNSIGNED) + 
-                              CAST(SUBSTRING_INDEX(SUBSTRING_INDEX(salary, '-', 2), '-', -1) AS UNSIGNED)) / 2 < 35 THEN '25-35K'
-                        ELSE '35K+'
-                    END as salary_range,
-                    COUNT(*) as count
-                FROM data 
-                WHERE company_type IS NOT NULL 
-                AND salary IS NOT NULL 
-                AND salary REGEXP '^[0-9]+-[0-9]+'
-                GROUP BY salary_range
-                ORDER BY 
-                    CASE salary_range
-                        WHEN '0-5K' THEN 1
-                        WHEN '5-10K' THEN 2
-                        WHEN '10-15K' THEN 3
-                        WHEN '15-25K' THEN 4
-                        WHEN '25-35K' THEN 5
-                        WHEN '35K+' THEN 6
-                    END
-            """
-            
-            results = self.db_manager.execute_query(query)
+            results = self.db_manager.get_salary_histogram('company_type', spec=salary_bins)
             return {row[0]: row[1] for row in results}
         except Exception as e:
             logger.error(f"计算薪资范围分布失败: {e}")
@@ -7,6 +7,7 @@ Q1 职位差异度分析服务
 import logging
 from typing import List, Dict, Any, Optional
 from database.Q3 import DatabaseManager
+from utils.columnar import to_columnar, COLUMNAR_FORMAT, ROWS_FORMAT
 
 logger = logging.getLogger(__name__)
 
@@ -27,7 +28,7 @@ class Q1Service:
             FROM data
             WHERE city IS NOT NULL
             GROUP BY city
-            ORDER BY COUNT(*) DESC
+            ORDER BY COUNT(*) DESC, city
             LIMIT %s
         """
         
@@ -85,10 +86,22 @@ class Q1Service:
         
         return 0
     
-    def get_scatter_data(self, city: str) -> Dict[str, Any]:
+    # 散点图中取值重复度高、适合字典编码的列
+    SCATTER_CATEGORICAL_COLUMNS = (
+        'job_title', 'experience', 'education', 'salary',
+        'job_level', 'company_type', 'city_level'
+    )
+    
+    def get_scatter_data(self, city: str, output_format: str = ROWS_FORMAT) -> Dict[str, Any]:
         """
         获取指定城市的散点气泡图数据
         返回招聘人数前200的职位
+        output_format 为 columnar 时 data 以列式结构返回
+        
+        查询由覆盖索引 idx_data_q1_scatter (city, is_in_top200, job_in_city_cnt, ...) 应答
+        （python -m database.indexes apply）：按索引顺序读取前 200 行，不排序、不回表。
+        MySQL 中索引各列须为 VARCHAR（TEXT 列只能建前缀索引，无法覆盖查询），TEXT 列先按 plan 输出迁移；
+        修改返回列或过滤条件时需同步调整该索引的列
         """
         query = """
             SELECT 
@@ -173,6 +186,13 @@ class Q1Service:
                 # 映射到合理的气泡大小范围（10-50）
                 point["normalized_size"] = 10 + normalized * 40
         
+        if output_format == COLUMNAR_FORMAT:
+            return {
+                "city": city,
+                "total_jobs": len(scatter_points),
+                "data": to_columnar(scatter_points, self.SCATTER_CATEGORICAL_COLUMNS)
+            }
+        
         return {
             "city": city,
             "total_jobs": len(scatter_points),
@@ -9,7 +9,9 @@ import math
 from typing import List, Dict, Any
 from collections import Counter
 
-from database.Q3 import DatabaseManager
+from database.Q3 import DatabaseManager, query_cache
+from utils.columnar import to_columnar, COLUMNAR_FORMAT, ROWS_FORMAT
+from utils.cache import stale_while_revalidate
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +22,10 @@ class RadarBubbleService:
     def __init__(self, db_manager: DatabaseManager):
         self.db_manager = db_manager
     
+    def cache_identity(self) -> tuple:
+        """服务层缓存与所用数据库共用数据源标识"""
+        return self.db_manager.cache_identity()
+    
     def calculate_shannon_entropy(self, job_titles: str) -> float:
         """
         计算香农熵
@@ -130,47 +136,54 @@ class RadarBubbleService:
             logger.error(f"获取雷达气泡图数据失败: {e}", exc_info=True)
             raise
     
-    def get_parallel_coordinates_statistics(self) -> Dict[str, Any]:
+    # 平行坐标图中需要字典编码的分类维度
+    PARALLEL_CATEGORICAL_COLUMNS = ('city', 'experience', 'education', 'company_type')
+    
+    # 平行坐标数据按批流式读取、不经过 get_parallel_coordinates_data，在服务层缓存统计结果
+    @stale_while_revalidate(query_cache)
+    def get_parallel_coordinates_statistics(self, output_format: str = ROWS_FORMAT) -> Dict[str, Any]:
         """
         获取平行坐标图统计数据
         返回包含所有维度的扁平数据，用于绘制平行坐标图
         
+        Args:
+            output_format: 返回格式，columnar 时 data 为列式结构
+        
         Returns:
             包含城市、经验、学历、薪资、公司类型、岗位多样性等信息的列表
         """
         try:
-            # 获取原始数据
-            raw_data = self.db_manager.get_parallel_coordinates_data()
+            # 分批读取聚合结果，数值列已在数据库层转换为 float/int
+            result_data = []
+            for rows in self.db_manager.iter_parallel_coordinates_data():
+                for city, experience, education, company_type, avg_salary, avg_shannon_entropy, job_count in rows:
+                    if not city or not experience:
+                        continue
+                    
+                    # 直接使用数据库中的香农熵值（已聚合为平均值）
+                    shannon_entropy = avg_shannon_entropy or 0.0
+                    avg_salary_value = avg_salary or 0.0
+                    job_count_value = job_count or 0
+                    
+                    result_data.append({
+                        'city': city,
+                        'experience': experience,
+                        'education': education if education else '未知',
+                        'company_type': company_type if company_type else '未知',
+                        'salary': round(avg_salary_value, 2),
+                        'entropy': round(shannon_entropy, 4),
+                        'job_count': job_count_value
+                    })
             
-            if not raw_data:
+            if not result_data:
                 return {
                     'data': []
                 }
             
-            # 转换为字典格式
-            result_data = []
-            for row in raw_data:
-                city, experience, education, company_type, avg_salary, avg_shannon_entropy, job_count = row
-                
-                if not city or not experience:
-                    continue
-                
-                # 直接使用数据库中的香农熵值（已聚合为平均值）
-                shannon_entropy = float(avg_shannon_entropy) if avg_shannon_entropy else 0.0
-                
-                # 处理数据
-                avg_salary_value = float(avg_salary) if avg_salary else 0.0
-                job_count_value = int(job_count) if job_count else 0
-                
-                result_data.append({
-                    'city': city,
-                    'experience': experience,
-                    'education': education if education else '未知',
-                    'company_type': company_type if company_type else '未知',
-                    'salary': round(avg_salary_value, 2),
-                    'entropy': round(shannon_entropy, 4),
-                    'job_count': job_count_value
-                })
+            if output_format == COLUMNAR_FORMAT:
+                return {
+                    'data': to_columnar(result_data, self.PARALLEL_CATEGORICAL_COLUMNS)
+                }
             
             return {
                 'data': result_data
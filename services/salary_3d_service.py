@@ -5,13 +5,24 @@
 用于处理三维柱状图和箱线图相关的业务逻辑
 """
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 import statistics
 
+import numpy as np
+
 from database.Q3 import DatabaseManager
+from database.column_store import get_column_store
+from utils.columnar import to_columnar, COLUMNAR_FORMAT, ROWS_FORMAT
+from utils.singleflight import coalesce, get_flight
 
 logger = logging.getLogger(__name__)
 
+# 分批流式聚合的统计方法不经过 execute_query，在服务层合并相同的并发调用
+service_flight = get_flight('service')
+
+# 逐元素判断对象数组的真值（None、空字符串为假）
+_truthy = np.frompyfunc(bool, 1, 1)
+
 
 class Salary3DService:
     """三维薪资分析业务逻辑服务"""
@@ -19,8 +30,10 @@ class Salary3DService:
     def __init__(self, db_manager: DatabaseManager):
         self.db_manager = db_manager
     
+    @coalesce(service_flight)
     def get_boxplot_statistics(self, experience: str = None, education: str = None,
-                               city: str = None, company_type: str = None) -> Dict[str, Any]:
+                               city: str = None, company_type: str = None,
+                               output_format: str = ROWS_FORMAT) -> Dict[str, Any]:
         """
         获取箱线图统计数据
         返回按城市和公司类型分组的薪资分布统计量
@@ -30,20 +43,30 @@ class Salary3DService:
             education: 学历筛选条件
             city: 城市筛选条件
             company_type: 公司类型筛选条件
+            output_format: 返回格式，columnar 时分组数据为列式结构
         
         Returns:
             包含城市和公司类型分组统计数据的字典
         """
         try:
-            # 获取原始数据
-            raw_data = self.db_manager.get_boxplot_data(
-                experience=experience,
-                education=education,
-                city=city,
-                company_type=company_type
-            )
+            # 存在聚合快照时直接使用其中预排序的薪资数组，否则从数据库分批读取
+            store = get_column_store()
+            if store is not None:
+                city_groups, company_type_groups = store.boxplot_groups(
+                    experience=experience,
+                    education=education,
+                    city=city,
+                    company_type=company_type
+                )
+            else:
+                city_groups, company_type_groups = self._collect_boxplot_groups(
+                    experience=experience,
+                    education=education,
+                    city=city,
+                    company_type=company_type
+                )
             
-            if not raw_data:
+            if not city_groups:
                 return {
                     'city_data': [],
                     'company_type_data': [],
@@ -51,26 +74,10 @@ class Salary3DService:
                     'company_types': []
                 }
             
-            # 按城市分组
-            city_salaries = {}
-            company_type_salaries = {}
-            cities_set = set()
-            company_types_set = set()
-            
-            for row in raw_data:
-                city_val, company_type_val, salary = row
-                if city_val and company_type_val and salary:
-                    # 按城市分组
-                    if city_val not in city_salaries:
-                        city_salaries[city_val] = []
-                    city_salaries[city_val].append(float(salary))
-                    cities_set.add(city_val)
-                    
-                    # 按公司类型分组
-                    if company_type_val not in company_type_salaries:
-                        company_type_salaries[company_type_val] = []
-                    company_type_salaries[company_type_val].append(float(salary))
-                    company_types_set.add(company_type_val)
+            city_salaries = {name: salaries.tolist() for name, salaries in city_groups.items()}
+            company_type_salaries = {name: salaries.tolist() for name, salaries in company_type_groups.items()}
+            cities_set = set(city_salaries)
+            company_types_set = set(company_type_salaries)
             
             # 计算统计量：按城市
             city_data = []
@@ -94,6 +101,10 @@ class Salary3DService:
                         'count': len(salaries)
                     })
             
+            if output_format == COLUMNAR_FORMAT:
+                city_data = self._to_columnar_groups(city_data)
+                company_type_data = self._to_columnar_groups(company_type_data)
+            
             return {
                 'city_data': city_data,
                 'company_type_data': company_type_data,
@@ -105,6 +116,46 @@ class Salary3DService:
             logger.error(f"获取箱线图统计数据失败: {e}", exc_info=True)
             raise
     
+    def _collect_boxplot_groups(self, experience: str = None, education: str = None,
+                                city: str = None, company_type: str = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """分批读取原始数据并增量分组，返回 (城市 -> 薪资数组, 公司类型 -> 薪资数组)"""
+        city_chunks: Dict[str, List[Any]] = {}
+        company_type_chunks: Dict[str, List[Any]] = {}
+        
+        for cities, company_types, salaries in self.db_manager.iter_boxplot_data(
+            experience=experience,
+            education=education,
+            city=city,
+            company_type=company_type
+        ):
+            # 城市、公司类型非空且薪资有效（非NULL、非0）
+            valid = (_truthy(cities).astype(bool) & _truthy(company_types).astype(bool)
+                     & ~np.isnan(salaries) & (salaries != 0))
+            if not valid.any():
+                continue
+            salaries = salaries[valid]
+            self._append_groups(city_chunks, cities[valid], salaries)
+            self._append_groups(company_type_chunks, company_types[valid], salaries)
+        
+        return (
+            {name: np.concatenate(chunks) for name, chunks in city_chunks.items()},
+            {name: np.concatenate(chunks) for name, chunks in company_type_chunks.items()}
+        )
+    
+    @staticmethod
+    def _append_groups(groups: Dict[str, List[Any]], keys: Any, values: Any) -> None:
+        """按键将一批薪资数组切分后追加到各分组（保持批内原有顺序）"""
+        names, inverse = np.unique(keys.astype(str), return_inverse=True)
+        order = np.argsort(inverse, kind='stable')
+        bounds = np.cumsum(np.bincount(inverse, minlength=len(names)))[:-1]
+        for name, part in zip(names.tolist(), np.split(values[order], bounds)):
+            groups.setdefault(name, []).append(part)
+    
+    def _to_columnar_groups(self, groups: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """将分组统计量展开为列式结构：name, min, q1, median, q3, max, count"""
+        rows = [{'name': group['name'], **group['stats']} for group in groups]
+        return to_columnar(rows, columns=['name', 'min', 'q1', 'median', 'q3', 'max', 'count'])
+    
     def _calculate_statistics(self, salaries: List[float]) -> Dict[str, float]:
         """
         计算箱线图统计量
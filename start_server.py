@@ -32,7 +32,7 @@ def check_dependencies():
 def check_database_connection():
     """检查数据库连接"""
     try:
-        from database import DatabaseManager
+        from database.Q3 import DatabaseManager
         db_manager = DatabaseManager('default')
         
         # 尝试执行简单查询
@@ -77,10 +77,14 @@ def main():
     if not check_dependencies():
         sys.exit(1)
     
-    # 检查数据库连接
-    print("检查数据库连接...")
-    if not check_database_connection():
-        sys.exit(1)
+    # 检查数据库连接（离线快照模式下不连接数据库）
+    from config import config
+    if config['default'].SNAPSHOT_ONLY:
+        print(f"📦 离线快照模式: {config['default'].SNAPSHOT_PATH}")
+    else:
+        print("检查数据库连接...")
+        if not check_database_connection():
+            sys.exit(1)
     
     # 检查前端页面
     frontend_index = os.path.join("fronted", "index.html")
@@ -101,8 +105,10 @@ def main():
     print("=" * 50)
     
     try:
-        # 启动Flask应用
+        # 启动Flask应用（监听端口前先预热缓存，预热完成后 /api/system/ready 返回就绪）
         from app import app
+        from utils.warmup import warm_up_before_serving
+        warm_up_before_serving(app, use_reloader=True)
         app.run(debug=True, host='0.0.0.0', port=5001)
     except KeyboardInterrupt:
         print("\n👋 服务器已停止，感谢使用！")
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+后端结果对比测试
+- 小数据集上的统计、详情与对比查询结果与手工计算的 MySQL 结果一致
+- 合成数据集上 DatabaseManager 与各服务的全部对比查询：原生改写的语句与调用 MySQL 函数 Python 实现
+  （语义见 tests/test_dialect.py）的语句结果一致，且不再逐行调用 Python 函数
+- SQLite 与 DuckDB 的结果一致（duckdb 见 requirements-test.txt）
+"""
+
+import re
+import shutil
+
+import pytest
+
+from database import Q3
+from database.backends import DuckDBBackend, SQLiteBackend, compare_backends, duckdb
+from database.dialect import SQLiteDialect
+from database.Q3 import DatabaseManager
+from database.synthetic import SyntheticDataset, load_dataset
+
+# 转换后仍残留的 MySQL 写法（SQLite 原生接受 CAST(x AS UNSIGNED) 等语句但语义不同，遗漏改写不会报错）
+UNTRANSLATED_RE = re.compile(r'\bGROUP_CONCAT\b|\bSEPARATOR\b|\bAS\s+(?:UNSIGNED|SIGNED|DECIMAL)\b|%s', re.IGNORECASE)
+# 逐行执行的 Python 函数（GROUP_CONCAT 的自定义聚合除外：SQLite 3.44 之前的聚合函数不支持 ORDER BY）
+PYTHON_FUNCTION_RE = re.compile(r'\b(?:substring_index|regexp|mysql_unsigned|mysql_signed|mysql_decimal)\b',
+                                re.IGNORECASE)
+
+# (city, company, company_type, experience, education, salary)
+HAND_ROWS = [
+    ('北京', 'A公司', '互联网', '1-3年', '本科', '10-20K'),
+    ('北京', 'B公司', '互联网', '3-5年', '本科', '20-30K·13薪'),
+    ('北京', 'A公司', '金融', '1-3年', '硕士', '15-25K'),
+    ('北京', 'C公司', '金融', '1-3年', '本科', '面议'),
+    ('上海', 'D公司', '互联网', '3-5年', '本科', '8-12K'),
+    ('上海', 'D公司', '互联网', '1-3年', '大专', '12-18K'),
+    ('上海', 'E公司', '教育', '3-5年', '本科', '6-8K'),
+    ('广州', 'F公司', '教育', '1-3年', '本科', '5-7-9K'),
+    ('广州', 'F公司', '教育', '1-3年', '本科', None),
+    ('广州', 'G公司', '教育', '1-3年', '本科', 'K10-20'),
+    ('广州', 'G公司', '教育', '1-3年', '本科', '10-K'),
+]
+
+
+@pytest.fixture(scope='module')
+def dataset():
+    return SyntheticDataset(rows=10_000, seed=11, titles=200).generate()
+
+
+@pytest.fixture(scope='module')
+def sqlite_path(dataset, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('backends') / 'synthetic.sqlite3')
+    load_dataset(dataset, SQLiteBackend(path))
+    return path
+
+
+@pytest.fixture
+def hand_manager(tmp_path):
+    path = str(tmp_path / 'hand.sqlite3')
+    load_dataset(SyntheticDataset(rows=10_000, seed=1, titles=10).generate(), SQLiteBackend(path))
+    manager = DatabaseManager('default', backend=SQLiteBackend(path))
+    with manager.get_connection() as connection:
+        connection.execute('DELETE FROM data')
+        connection.executemany(
+            'INSERT INTO data (city, company, company_type, experience, education, salary) VALUES (?, ?, ?, ?, ?, ?)',
+            HAND_ROWS)
+        connection.commit()
+    return manager
+
+
+def _rounded(rows):
+    return [tuple(round(value, 4) if isinstance(value, float) else value for value in row) for row in rows]
+
+
+def test_statistics_match_hand_computed(hand_manager):
+    # 薪资为区间格式的记录，月薪取前两段数字的均值：'20-30K·13薪' -> 25，'5-7-9K' -> 6；
+    # '面议'、NULL、'K10-20'、'10-K' 不计入
+    assert _rounded(hand_manager.get_city_statistics(20, 0)) == [
+        ('上海', 3, 10.6667, 2), ('北京', 3, 20.0, 2), ('广州', 1, 6.0, 1)]
+    assert _rounded(hand_manager.get_industry_statistics(20, 0)) == [
+        ('互联网', 4, 16.25, 3), ('教育', 2, 6.5, 2), ('金融', 1, 20.0, 1)]
+    assert _rounded(hand_manager.get_city_comparison(['北京', '广州'])) == [
+        ('北京', 3, 20.0, 2, 2), ('广州', 1, 6.0, 1, 1)]
+
+    detail = hand_manager.get_city_detail('北京')
+    assert _rounded([detail['basic']]) == [(3, 20.0, 2, 2)]
+    assert _rounded(detail['industry']) == [('互联网', 2, 20.0), ('金融', 1, 20.0)]
+    assert _rounded(detail['experience']) == [('1-3年', 2, 17.5), ('3-5年', 1, 25.0)]
+
+
+def test_native_translation_matches_mysql_functions(sqlite_path, tmp_path, monkeypatch):
+    reference_path = str(tmp_path / 'reference.sqlite3')
+    shutil.copyfile(sqlite_path, reference_path)
+    reference_backend = SQLiteBackend(reference_path)
+    reference_backend.dialect = SQLiteDialect(native_functions=False)
+    reference = DatabaseManager('default', backend=reference_backend)
+    candidate = DatabaseManager('default', backend=SQLiteBackend(sqlite_path))
+    executed = []
+    translate = candidate._translate
+
+    def recording_translate(query, params):
+        translated = translate(query, params)
+        executed.append(translated[0])
+        return translated
+
+    monkeypatch.setattr(candidate, '_translate', recording_translate)
+    report = compare_backends(reference, candidate)
+
+    assert [entry for entry in report if not entry['equivalent']] == []
+    assert {entry['method'].split('.')[0] for entry in report} >= {
+        'CityService', 'IndustryService', 'ExperienceService',
+        'PositionService', 'Q1Service', 'TrendService', 'RadarBubbleService'}
+    assert executed
+    assert [query for query in executed if UNTRANSLATED_RE.search(query)] == []
+    assert [query for query in executed if PYTHON_FUNCTION_RE.search(query)] == []
+
+
+def test_sqlite_matches_duckdb(dataset, sqlite_path, tmp_path):
+    if duckdb is None:
+        pytest.skip('未安装 duckdb')
+    duckdb_path = str(tmp_path / 'synthetic.duckdb')
+    load_dataset(dataset, DuckDBBackend(duckdb_path, read_only=False))
+    reference = DatabaseManager('default', backend=SQLiteBackend(sqlite_path))
+    candidate = DatabaseManager('default', backend=DuckDBBackend(duckdb_path))
+
+    report = compare_backends(reference, candidate)
+    assert [entry for entry in report if not entry['equivalent']] == []
+
+
+def test_compare_bypasses_query_cache(sqlite_path, tmp_path, monkeypatch):
+    monkeypatch.setattr(Q3.query_cache, 'ttl', 300)
+    monkeypatch.setattr(Q3.query_cache, 'shared', None)
+    copy_path = str(tmp_path / 'copy.sqlite3')
+    shutil.copyfile(sqlite_path, copy_path)
+    reference = DatabaseManager('default', backend=SQLiteBackend(sqlite_path))
+    candidate = DatabaseManager('default', backend=SQLiteBackend(copy_path))
+    calls = [('get_experience_education_salary', ())]
+    # 候选库修改前的结果已在缓存中
+    candidate.get_experience_education_salary()
+
+    connection = candidate.backend.connect()
+    connection.execute('DELETE FROM data WHERE rowid % 2 = 0')
+    connection.commit()
+    connection.close()
+
+    assert not compare_backends(reference, candidate, calls, service_calls=[])[0]['equivalent']
+    Q3.query_cache.invalidate()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+聚合快照过期检测测试
+快照记录构建时 data 表的数据签名，数据库导入新数据后 get_column_store 不再返回该快照
+"""
+
+import pytest
+
+from database import column_store
+from database.backends import SQLiteBackend
+from database.Q3 import DatabaseManager
+from database.synthetic import SyntheticDataset, load_dataset
+
+
+@pytest.fixture(scope='module')
+def dataset():
+    return SyntheticDataset(rows=10_000, seed=5, titles=100).generate()
+
+
+@pytest.fixture
+def manager(dataset, tmp_path):
+    path = str(tmp_path / 'synthetic.sqlite3')
+    load_dataset(dataset, SQLiteBackend(path))
+    return DatabaseManager('default', backend=SQLiteBackend(path))
+
+
+@pytest.fixture
+def store_path(manager, tmp_path, monkeypatch):
+    path = str(tmp_path / 'aggregates.vcol')
+    column_store.build_column_store(manager, path)
+    monkeypatch.setattr(column_store.settings, 'COLUMN_STORE_ENABLED', True)
+    monkeypatch.setattr(column_store.settings, 'COLUMN_STORE_PATH', path)
+    monkeypatch.setattr(column_store, '_source_manager', manager)
+    monkeypatch.setattr(column_store, '_store', None)
+    monkeypatch.setattr(column_store, '_store_stat', None)
+    monkeypatch.setattr(column_store, '_checked_at', float('-inf'))
+    return path
+
+
+def _recheck(monkeypatch):
+    monkeypatch.setattr(column_store, '_checked_at', float('-inf'))
+    monkeypatch.setattr(column_store, '_verified_at', float('-inf'))
+    return column_store.get_column_store()
+
+
+def test_fresh_store_is_used(store_path, manager):
+    store = column_store.get_column_store()
+    assert store is not None
+    assert store.source_signature == column_store.source_signature(manager)
+
+
+def test_store_is_ignored_after_data_changes(store_path, manager, monkeypatch):
+    assert column_store.get_column_store() is not None
+    with manager.get_connection() as connection:
+        connection.execute("DELETE FROM data WHERE rowid IN (SELECT rowid FROM data LIMIT 10)")
+        connection.commit()
+    assert _recheck(monkeypatch) is None
+
+    column_store.build_column_store(manager, store_path)
+    assert _recheck(monkeypatch) is not None
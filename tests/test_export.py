@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+原始记录导出测试
+Arrow 流由查询结果的列数组直接构建，内容与 NDJSON 导出一致（NULL 保持为 null）；
+导出中途读取失败时响应被中止（异常传给 WSGI 服务器），NDJSON 先输出错误尾记录
+"""
+
+import json
+
+import pytest
+
+from database.backends import SQLiteBackend
+from database.Q3 import DatabaseManager
+from database.synthetic import SyntheticDataset, load_dataset
+from services.export_service import ExportService
+
+pa = pytest.importorskip('pyarrow')
+
+
+@pytest.fixture(scope='module')
+def service(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('export') / 'synthetic.sqlite3')
+    load_dataset(SyntheticDataset(rows=10_000, seed=3, titles=50).generate(), SQLiteBackend(path))
+    return ExportService(DatabaseManager('default', backend=SQLiteBackend(path)), batch_size=3000)
+
+
+def test_arrow_matches_ndjson(service):
+    table = pa.ipc.open_stream(b''.join(service.iter_export('arrow'))).read_all()
+    records = [json.loads(line) for line in b''.join(service.iter_export('ndjson')).splitlines()]
+    assert table.num_rows == len(records) == 10_000
+    assert table.column_names == [name for name, _ in ExportService.EXPORT_COLUMNS]
+    assert table.to_pylist() == records
+    assert table.column('median_annual_salary').null_count > 0
+
+
+@pytest.mark.parametrize('output_format', ['ndjson', 'csv', 'arrow'])
+def test_failure_mid_stream_aborts(service, monkeypatch, output_format):
+    fetch_batches = service.db_manager.fetch_batches
+
+    def failing(query, params=None, batch_size=5000):
+        batches = fetch_batches(query, params, batch_size)
+        yield next(batches)
+        batches.close()
+        raise RuntimeError('连接中断')
+
+    monkeypatch.setattr(service.db_manager, 'fetch_batches', failing)
+    chunks = []
+    with pytest.raises(RuntimeError, match='连接中断'):
+        for chunk in service.iter_export(output_format):
+            chunks.append(chunk)
+    assert chunks
+    if output_format == 'ndjson':
+        lines = b''.join(chunks).splitlines()
+        assert len(lines) == service.batch_size + 1
+        assert json.loads(lines[-1]) == {"error": {"type": "EXPORT_FAILED", "details": "连接中断"}}
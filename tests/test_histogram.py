@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+薪资分布直方图测试
+固定边界在数据库中按桶序号计数，结果与对该组薪资数组用 searchsorted 分桶一致（包括恰好落在边界上的取值）
+"""
+
+import pytest
+
+from database.backends import SQLiteBackend
+from database.Q3 import DatabaseManager
+from database.synthetic import SyntheticDataset, load_dataset
+from utils.histogram import DEFAULT_SPEC, HistogramSpec, histogram
+
+
+@pytest.fixture(scope='module')
+def manager(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('histogram') / 'synthetic.sqlite3')
+    load_dataset(SyntheticDataset(rows=10_000, seed=11, titles=50).generate(), SQLiteBackend(path))
+    return DatabaseManager('default', backend=SQLiteBackend(path))
+
+
+@pytest.mark.parametrize('spec', [DEFAULT_SPEC, HistogramSpec(edges=(7.5, 12, 30))])
+@pytest.mark.parametrize('column', ['city', 'company_type', 'experience'])
+def test_bucket_counts_match_sorted_values(manager, column, spec):
+    value = manager.execute_query(f"SELECT {column} FROM data WHERE {column} IS NOT NULL LIMIT 1",
+                                  fetch_one=True)[0]
+    for group in (None, value):
+        expected = histogram(manager.get_salary_values(column, group), spec)
+        assert manager.get_salary_histogram(column, group, spec) == expected
+        assert sum(count for _, count in expected) > 0
+
+
+def test_quantile_buckets_read_values(manager):
+    values = manager.get_salary_values('city')
+    assert manager.get_salary_histogram('city', spec=HistogramSpec(quantiles=4)) == \
+        histogram(values, HistogramSpec(quantiles=4))
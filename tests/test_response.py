@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+响应缓存测试
+缓存的响应体在多个请求间共用，每个响应仍带有各自的 timestamp 与 request_id，
+压缩版本只在末尾追加这两个字段，解压后与未压缩的响应体一致
+"""
+
+import gzip
+import json
+
+import pytest
+from flask import Flask
+
+from utils import response as response_module
+from utils.response import ResponseBuilder, cached_response
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(response_module.settings, 'RESPONSE_CACHE_TTL', 60)
+    response_module.response_cache.clear()
+    calls = []
+    app = Flask(__name__)
+
+    @app.route('/rows')
+    @cached_response(ttl=60)
+    def rows():
+        calls.append(1)
+        return ResponseBuilder.success("ok", {"rows": [{"city": f"城市{i}", "count": i} for i in range(500)]})
+
+    yield app.test_client(), calls
+    response_module.response_cache.clear()
+
+
+def _decode(response):
+    body = response.get_data()
+    encoding = response.headers.get('Content-Encoding')
+    if encoding == 'gzip':
+        body = gzip.decompress(body)
+    elif encoding == 'br':
+        body = response_module.brotli.decompress(body)
+    return json.loads(body)
+
+
+@pytest.mark.parametrize('encoding', [None, 'gzip', 'br'])
+def test_cached_body_is_stamped_per_request(client, encoding):
+    if encoding == 'br' and response_module.brotli is None:
+        pytest.skip('brotli 未安装')
+    client, calls = client
+    headers = {'Accept-Encoding': encoding} if encoding else {'Accept-Encoding': 'identity'}
+    first, second = client.get('/rows', headers=headers), client.get('/rows', headers=headers)
+    assert len(calls) == 1
+    assert first.headers.get('Content-Encoding') == encoding
+    first, second = _decode(first), _decode(second)
+    assert first['data'] == second['data']
+    assert first['status'] == 'success' and first['message'] == 'ok'
+    assert first['timestamp'] and second['timestamp']
+    assert first['request_id'] != second['request_id']
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+近似统计（approx=true）与精确统计的一致性测试
+测试数据只保留少量公司名，每组的公司数远小于草图寄存器数（测试使用 2^20 个寄存器），
+寄存器不发生碰撞，线性计数的估计值取整后与精确值相同；
+聚合快照只统计薪资为区间格式的记录，与精确查询的过滤条件一致
+"""
+
+import pytest
+
+from database import column_store
+from database.backends import SQLiteBackend
+from database.Q3 import DatabaseManager
+from database.synthetic import SyntheticDataset, load_dataset
+
+
+@pytest.fixture(scope='module')
+def manager(tmp_path_factory, monkeypatch_module):
+    directory = tmp_path_factory.mktemp('sketches')
+    path = str(directory / 'synthetic.sqlite3')
+    load_dataset(SyntheticDataset(rows=10_000, seed=5, titles=100).generate(), SQLiteBackend(path))
+    manager = DatabaseManager('default', backend=SQLiteBackend(path))
+    # 有年薪中位数但薪资不是区间格式的记录：精确查询不统计，快照也不应统计其公司
+    with manager.get_connection() as connection:
+        connection.execute("UPDATE data SET company = '公司' || (rowid % 60)")
+        connection.executemany(
+            "INSERT INTO data (city, company, company_type, experience, education, salary, median_annual_salary)"
+            " SELECT city, ?, company_type, experience, education, '面议', 15.0 FROM data LIMIT 1",
+            [(f'面议公司{index}',) for index in range(20)]
+        )
+        connection.commit()
+
+    store_path = str(directory / 'aggregates.vcol')
+    monkeypatch_module.setattr(column_store.settings, 'HLL_PRECISION', 20)
+    column_store.build_column_store(manager, store_path)
+    monkeypatch_module.setattr(column_store.settings, 'COLUMN_STORE_ENABLED', True)
+    monkeypatch_module.setattr(column_store.settings, 'COLUMN_STORE_PATH', store_path)
+    monkeypatch_module.setattr(column_store, '_source_manager', manager)
+    monkeypatch_module.setattr(column_store, '_store', None)
+    monkeypatch_module.setattr(column_store, '_store_stat', None)
+    monkeypatch_module.setattr(column_store, '_checked_at', float('-inf'))
+    monkeypatch_module.setattr(column_store, '_verified_at', float('-inf'))
+    return manager
+
+
+@pytest.fixture(scope='module')
+def monkeypatch_module():
+    patch = pytest.MonkeyPatch()
+    yield patch
+    patch.undo()
+
+
+def _same_rows(exact, approx):
+    exact, approx = sorted(exact), sorted(approx)
+    assert [row[0] for row in approx] == [row[0] for row in exact]
+    for exact_row, approx_row in zip(exact, approx):
+        assert approx_row[1] == exact_row[1]
+        assert approx_row[2] == pytest.approx(float(exact_row[2]))
+        assert approx_row[3:] == tuple(exact_row[3:])
+
+
+def test_city_statistics_match_exact(manager):
+    _same_rows(manager.get_city_statistics(10_000, 0), manager.get_city_statistics(10_000, 0, approx=True))
+
+
+def test_city_detail_and_comparison_match_exact(manager):
+    cities = [row[0] for row in manager.get_city_statistics(3, 0)]
+    _same_rows(manager.get_city_comparison(cities), manager.get_city_comparison(cities, approx=True))
+    exact = manager.get_city_detail(cities[0])['basic']
+    approx = manager.get_city_detail(cities[0], approx=True)['basic']
+    assert approx[0] == exact[0] and approx[2:] == tuple(exact[2:])
+    assert approx[1] == pytest.approx(float(exact[1]))
+
+
+def test_approx_statistics_do_not_query_data(manager, monkeypatch):
+    queries = []
+    execute = manager.execute_query
+    monkeypatch.setattr(manager, 'execute_query', lambda query, *args, **kwargs: (
+        queries.append(query), execute(query, *args, **kwargs))[1])
+    manager.get_city_statistics(20, 0, approx=True)
+    manager.get_industry_comparison(['A', 'B'], approx=True)
+    assert [query for query in queries if 'FROM data' in query] == []
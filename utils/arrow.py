@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Apache Arrow IPC 输出工具
+请求头 Accept 为 application/vnd.apache.arrow.stream 时，图表接口与导出接口以 Arrow 流格式返回：
+- 导出接口由查询结果直接构建：iter_query(as_numpy=True) 返回的每批列数组转换为 RecordBatch；
+- 图表接口由服务层返回的负载构建（payload_to_table）：负载是经映射、补全标签后的聚合结果（通常只有数十行），
+  与 JSON 响应内容一致并共用响应缓存；从查询结果直接构建需要在 Arrow 路径重复各服务的加工逻辑
+"""
+
+import json
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from flask import has_request_context, request
+
+try:
+    import pyarrow as pa
+except ImportError:  # pyarrow 为可选依赖，缺失时不提供 Arrow 输出
+    pa = None
+
+ARROW_STREAM_MIMETYPE = 'application/vnd.apache.arrow.stream'
+JSON_MIMETYPE = 'application/json'
+
+# 导出列类型声明 -> Arrow 类型
+_ARROW_TYPES = {
+    'string': lambda: pa.string(),
+    'int': lambda: pa.int64(),
+    'float': lambda: pa.float64(),
+}
+
+# 导出列类型声明 -> DatabaseManager.iter_query 的列类型
+COLUMN_TYPES = {'string': None, 'int': int, 'float': float}
+
+
+def is_available() -> bool:
+    """当前环境是否可以输出 Arrow"""
+    return pa is not None
+
+
+def wants_arrow() -> bool:
+    """客户端是否请求 Arrow 流格式（与JSON同等优先级时返回JSON）"""
+    if not has_request_context():
+        return False
+    best = request.accept_mimetypes.best_match([JSON_MIMETYPE, ARROW_STREAM_MIMETYPE])
+    return best == ARROW_STREAM_MIMETYPE
+
+
+def _scalar(value: Any) -> Any:
+    """将 Decimal 等数据库类型转换为 Arrow 可推断的Python类型"""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, dict):
+        return {k: _scalar(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_scalar(v) for v in value]
+    return value
+
+
+def _is_records(value: Any) -> bool:
+    return isinstance(value, list) and len(value) > 0 and all(isinstance(item, dict) for item in value)
+
+
+def _is_columnar(value: Any) -> bool:
+    return isinstance(value, dict) and value.get('format') == 'columnar' and 'columns' in value
+
+
+def _columnar_to_table(payload: Dict[str, Any]) -> "pa.Table":
+    """列式结构直接转换为 Arrow 表，字典编码列转换为 DictionaryArray"""
+    arrays, names = [], []
+    dictionaries = payload.get('dictionaries', {})
+    for name, values in payload['columns'].items():
+        if name in dictionaries:
+            arrays.append(pa.DictionaryArray.from_arrays(
+                pa.array(values, type=pa.int32()), pa.array(_scalar(dictionaries[name]))
+            ))
+        else:
+            arrays.append(pa.array(_scalar(values)))
+        names.append(name)
+    return pa.Table.from_arrays(arrays, names=names)
+
+
+def _records_to_table(records: List[Dict[str, Any]]) -> "pa.Table":
+    """字典数组按列转置后构建 Arrow 表，列为所有记录键的并集（按首次出现顺序），缺失值为 null"""
+    columns: Dict[str, List[Any]] = {}
+    for index, record in enumerate(records):
+        for key in record:
+            if key not in columns:
+                columns[key] = [None] * index
+        for key, values in columns.items():
+            values.append(_scalar(record.get(key)))
+    return pa.table({name: pa.array(values) for name, values in columns.items()})
+
+
+def _collect_tables(value: Any, path: str, tables: List[Tuple[str, Any]]) -> None:
+    """递归查找负载中的表格节点（字典数组或列式结构）"""
+    if _is_columnar(value):
+        tables.append((path, _columnar_to_table(value)))
+    elif _is_records(value):
+        tables.append((path, _records_to_table(value)))
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            _collect_tables(item, f"{path}.{key}" if path else key, tables)
+
+
+def payload_to_table(data: Any, message: str = '') -> "pa.Table":
+    """
+    将图表接口的响应数据转换为一张 Arrow 表
+    负载中只有一个表格节点时直接使用；有多个时纵向合并并增加 section 列标明来源路径
+    其余标量信息以JSON形式写入 schema 元数据的 meta 字段
+    """
+    tables: List[Tuple[str, Any]] = []
+    _collect_tables(data, '', tables)
+
+    if not tables:
+        table = pa.table({})
+    elif len(tables) == 1:
+        table = tables[0][1]
+    else:
+        table = pa.concat_tables(
+            [t.append_column('section', pa.array([path] * t.num_rows, type=pa.string()))
+             for path, t in tables],
+            promote_options='default'
+        ).unify_dictionaries()
+
+    meta = {}
+    if isinstance(data, dict):
+        meta = {
+            key: _scalar(value) for key, value in data.items()
+            if not (_is_records(value) or _is_columnar(value) or isinstance(value, dict))
+        }
+    return table.replace_schema_metadata({
+        'message': message,
+        'meta': json.dumps(meta, ensure_ascii=False, default=str)
+    })
+
+
+def table_to_ipc(table: "pa.Table") -> bytes:
+    """序列化为 Arrow IPC 流格式字节串"""
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def build_schema(columns: Sequence[Tuple[str, str]]) -> "pa.Schema":
+    """由 (列名, 类型) 声明构建 Arrow schema，类型为 string/int/float"""
+    return pa.schema([(name, _ARROW_TYPES[kind]()) for name, kind in columns])
+
+
+class _ChunkSink:
+    """收集 Arrow 写出的字节块，供生成器逐块输出"""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.closed = False
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def iter_ipc_stream(schema: "pa.Schema", batches: Iterable[Sequence[Any]],
+                    metadata: Optional[Dict[str, str]] = None) -> Iterator[bytes]:
+    """
+    将 iter_query(as_numpy=True) 返回的列数组批次直接编码为 Arrow IPC 流
+    数值列由 numpy 数组转换（NULL 读出为 nan，转换为 Arrow 的 null），字符串列由对象数组转换，不经过行元组或字典
+    """
+    if metadata:
+        schema = schema.with_metadata(metadata)
+    sink = _ChunkSink()
+    writer = pa.ipc.new_stream(pa.PythonFile(sink, mode='w'), schema)
+    yield sink.drain()
+    try:
+        for columns in batches:
+            if not columns or not len(columns[0]):
+                continue
+            arrays = [pa.array(values, type=field.type, from_pandas=True) for values, field in zip(columns, schema)]
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
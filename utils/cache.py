@@ -0,0 +1,604 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+缓存工具类
+包括进程内 LRU 缓存、跨进程共享缓存后端（SQLite / Redis）以及 stale-while-revalidate 缓存
+"""
+
+import hashlib
+import inspect
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from config import config
+from utils.singleflight import get_flight
+
+try:
+    import redis
+except ImportError:  # redis 为可选依赖，仅 CACHE_BACKEND=redis 时需要
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+settings = config['default']
+
+
+class TTLCache:
+    """线程安全的LRU缓存，条目带有过期时间"""
+
+    def __init__(self, maxsize: int = 256, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """读取缓存，过期或不存在时返回default"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """写入缓存，ttl为None时使用默认过期时间，ttl<=0表示不过期"""
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl and ttl > 0 else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        """删除缓存条目"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / total, 4) if total else 0.0
+            }
+
+
+def _storage_key(namespace: str, key: Hashable) -> str:
+    """将缓存键转换为跨进程稳定的字符串（键由字符串、数字、元组等组成，repr 在进程间一致）"""
+    return f"{namespace}:{hashlib.sha1(repr(key).encode('utf-8')).hexdigest()}"
+
+
+class SQLiteCache:
+    """
+    基于 SQLite 文件的跨进程缓存，接口与 TTLCache 相同
+    同一台机器上的多个 WSGI 工作进程共享缓存文件；写入与淘汰在同一事务中完成，
+    超出条目数或字节数上限时按最近访问时间淘汰
+    """
+
+    # 读取时距上次记录访问时间超过该秒数才更新，减少读操作引起的写锁
+    ACCESS_RESOLUTION = 1.0
+
+    def __init__(self, path: str, namespace: str = 'default', maxsize: int = 256,
+                 ttl: float = 300, max_bytes: int = 256 * 1024 * 1024):
+        self.path = path
+        self.namespace = namespace
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self.hits = 0
+        self.misses = 0
+        with self._transaction() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    key TEXT PRIMARY KEY,
+                    namespace TEXT NOT NULL,
+                    value BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    expires_at REAL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_namespace_accessed "
+                         "ON cache_entries (namespace, accessed_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        """每个线程（及 fork 后的每个进程）使用独立连接，自动提交模式"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _transaction(self) -> "_Transaction":
+        return _Transaction(self._connection())
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """读取缓存，过期或不存在时返回default"""
+        storage_key = _storage_key(self.namespace, key)
+        now = time.time()
+        # 读取不开启写事务（WAL 模式下读写互不阻塞），过期删除与访问时间更新为单条自动提交语句
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT value, expires_at, accessed_at FROM cache_entries WHERE key = ?",
+            (storage_key,)
+        ).fetchone()
+        if row is not None and row[1] is not None and row[1] <= now:
+            conn.execute("DELETE FROM cache_entries WHERE key = ? AND expires_at <= ?", (storage_key, now))
+            row = None
+        if row is not None and now - row[2] > self.ACCESS_RESOLUTION:
+            conn.execute("UPDATE cache_entries SET accessed_at = ? WHERE key = ?", (now, storage_key))
+        if row is None:
+            self.misses += 1
+            return default
+        try:
+            value = pickle.loads(row[0])
+        except Exception as e:
+            logger.warning(f"缓存 {self.namespace} 条目反序列化失败: {e}")
+            self.delete(key)
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """写入缓存并在同一事务中淘汰过期及超出上限的条目，ttl<=0表示不过期"""
+        ttl = self.ttl if ttl is None else ttl
+        now = time.time()
+        expires_at = now + ttl if ttl and ttl > 0 else None
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(blob) > self.max_bytes:
+            return
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (key, namespace, value, size, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (_storage_key(self.namespace, key), self.namespace, blob, len(blob), expires_at, now)
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM cache_entries WHERE namespace = ? AND expires_at <= ?",
+                     (self.namespace, now))
+        count, total = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries WHERE namespace = ?",
+            (self.namespace,)
+        ).fetchone()
+        if count <= self.maxsize and total <= self.max_bytes:
+            return
+        # 按最近访问时间从旧到新淘汰，直到条目数与字节数均回到上限内
+        evicted_keys = []
+        for key, size in conn.execute(
+            "SELECT key, size FROM cache_entries WHERE namespace = ? ORDER BY accessed_at",
+            (self.namespace,)
+        ).fetchall():
+            if count <= self.maxsize and total <= self.max_bytes:
+                break
+            evicted_keys.append((key,))
+            count -= 1
+            total -= size
+        conn.executemany("DELETE FROM cache_entries WHERE key = ?", evicted_keys)
+
+    def delete(self, key: Hashable) -> None:
+        """删除缓存条目"""
+        self._connection().execute("DELETE FROM cache_entries WHERE key = ?",
+                                   (_storage_key(self.namespace, key),))
+
+    def clear(self) -> None:
+        """清空当前命名空间的缓存"""
+        self._connection().execute("DELETE FROM cache_entries WHERE namespace = ?", (self.namespace,))
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM cache_entries WHERE namespace = ?",
+                                          (self.namespace,)).fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息（命中次数为当前进程的计数）"""
+        count, total = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries WHERE namespace = ?",
+            (self.namespace,)
+        ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            'backend': 'sqlite',
+            'size': count,
+            'maxsize': self.maxsize,
+            'bytes': total,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+class _Transaction:
+    """以 BEGIN IMMEDIATE 开启写事务的上下文管理器，保证写入与淘汰的原子性"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+class RedisCache:
+    """
+    基于 Redis（或兼容协议的本地服务，如 KeyDB、Dragonfly）的跨进程缓存，接口与 TTLCache 相同
+    过期由服务端 TTL 处理，容量上限通过服务端 maxmemory 与淘汰策略（如 allkeys-lru）配置
+    """
+
+    def __init__(self, url: str, namespace: str = 'default', maxsize: int = 256, ttl: float = 300):
+        if redis is None:
+            raise RuntimeError("CACHE_BACKEND=redis 需要安装 redis 包")
+        self.client = redis.Redis.from_url(url)
+        self.namespace = namespace
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """读取缓存，过期或不存在时返回default"""
+        blob = self.client.get(_storage_key(self.namespace, key))
+        if blob is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return pickle.loads(blob)
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """写入缓存，ttl<=0表示不过期"""
+        ttl = self.ttl if ttl is None else ttl
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        self.client.set(_storage_key(self.namespace, key), blob,
+                        px=int(ttl * 1000) if ttl and ttl > 0 else None)
+
+    def delete(self, key: Hashable) -> None:
+        """删除缓存条目"""
+        self.client.delete(_storage_key(self.namespace, key))
+
+    def clear(self) -> None:
+        """清空当前命名空间的缓存"""
+        keys = list(self.client.scan_iter(match=f"{self.namespace}:*"))
+        if keys:
+            self.client.delete(*keys)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.client.scan_iter(match=f"{self.namespace}:*"))
+
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息（命中次数为当前进程的计数）"""
+        lookups = self.hits + self.misses
+        return {
+            'backend': 'redis',
+            'size': len(self),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+def create_cache(namespace: str, maxsize: int = 256, ttl: float = 300, backend: Optional[str] = None):
+    """
+    按 CACHE_BACKEND 配置创建缓存：memory（进程内，默认）、sqlite（本机跨进程）或 redis
+    返回的对象均提供 get / set / delete / clear / stats 接口
+    """
+    backend = backend or settings.CACHE_BACKEND
+    if backend == 'sqlite':
+        return SQLiteCache(settings.CACHE_SQLITE_PATH, namespace, maxsize, ttl, settings.CACHE_MAX_BYTES)
+    if backend == 'redis':
+        return RedisCache(settings.CACHE_REDIS_URL, namespace, maxsize, ttl)
+    if backend == 'memory':
+        return TTLCache(maxsize, ttl)
+    raise ValueError(f"未知的缓存后端: {backend}")
+
+
+class _SWREntry:
+    """过期后仍可在宽限期内返回的缓存条目"""
+
+    __slots__ = ('value', 'fresh_until', 'stale_until', 'loaded_at', 'loader', 'score')
+
+    def __init__(self, value: Any, fresh_until: float, stale_until: float, loaded_at: float,
+                 loader: Callable[[], Any]):
+        self.value = value
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+        self.loaded_at = loaded_at  # 计算完成的时间（time.time()，跨进程可比较）
+        self.loader = loader
+        self.score = 0.0
+
+
+class StaleWhileRevalidateCache:
+    """
+    stale-while-revalidate 缓存
+    - 新鲜期内直接返回；
+    - 过期但仍在宽限期（stale）内时返回旧值，并交给后台刷新调度器重新计算；
+    - 超出宽限期或不存在时同步加载，相同键的并发加载合并为一次。
+    每次访问累加条目热度，调度器定期衰减热度，并在过期前主动刷新最热的 top-N 个键。
+    配置 shared（create_cache 返回的跨进程缓存）后，计算结果同时写入共享缓存，
+    其他工作进程加载或刷新时优先采用共享缓存中较新的结果。
+    """
+
+    def __init__(self, name: str = 'default', maxsize: int = 128, ttl: float = 300,
+                 stale_ttl: float = 600, refresh_interval: float = 30, hot_keys: int = 10,
+                 workers: int = 2, shared: Any = None):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.refresh_interval = refresh_interval
+        self.hot_keys = hot_keys
+        self.workers = workers
+        self.shared = shared
+        self._data: "OrderedDict[Hashable, _SWREntry]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._flight = get_flight(f'swr:{name}')
+        self._refreshing: set = set()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._scheduler: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """读取缓存，必要时同步加载或安排后台刷新"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and now < entry.stale_until:
+                self._data.move_to_end(key)
+                entry.score += 1
+                if now < entry.fresh_until:
+                    self.hits += 1
+                    return entry.value
+                self.stale_hits += 1
+                self._schedule_refresh(key)
+                return entry.value
+            self.misses += 1
+
+        value, _ = self._flight.do(key, self._load, key, loader)
+        return value
+
+    def _load(self, key: Hashable, loader: Callable[[], Any], known_at: float = 0.0) -> Any:
+        """加载条目：共享缓存中有晚于 known_at 且仍新鲜的结果时直接采用，否则调用 loader 计算"""
+        if self.shared is not None:
+            cached = self.shared.get(key)
+            if cached is not None:
+                loaded_at, value = cached
+                if loaded_at > known_at and time.time() - loaded_at < self.ttl:
+                    self._store(key, value, loader, loaded_at)
+                    return value
+        value = loader()
+        loaded_at = time.time()
+        self._store(key, value, loader, loaded_at)
+        if self.shared is not None:
+            try:
+                self.shared.set(key, (loaded_at, value), self.ttl + self.stale_ttl)
+            except Exception as e:
+                logger.warning(f"缓存 {self.name} 写入共享缓存失败: {e}")
+        return value
+
+    def _store(self, key: Hashable, value: Any, loader: Callable[[], Any], loaded_at: float) -> None:
+        now = time.monotonic()
+        age = max(0.0, time.time() - loaded_at)
+        with self._lock:
+            previous = self._data.get(key)
+            entry = _SWREntry(value, now + self.ttl - age, now + self.ttl + self.stale_ttl - age,
+                              loaded_at, loader)
+            if previous is not None:
+                entry.score = previous.score
+            self._data[key] = entry
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        self._ensure_scheduler()
+
+    def _schedule_refresh(self, key: Hashable) -> None:
+        """提交后台刷新任务（同一键同时只刷新一次），调用方需持有锁"""
+        if key in self._refreshing or key not in self._data:
+            return
+        self._refreshing.add(key)
+        self._ensure_scheduler()
+        entry = self._data[key]
+        self._executor.submit(self._refresh, key, entry.loader, entry.loaded_at)
+
+    def _refresh(self, key: Hashable, loader: Callable[[], Any], known_at: float) -> None:
+        try:
+            self._flight.do(key, self._load, key, loader, known_at)
+            with self._lock:
+                self.refreshes += 1
+        except Exception as e:
+            with self._lock:
+                self.refresh_errors += 1
+            logger.warning(f"缓存 {self.name} 后台刷新失败 {key!r}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _ensure_scheduler(self) -> None:
+        """首次写入时启动刷新线程池与调度线程（refresh_interval<=0 时不主动刷新热点）"""
+        if self._executor is not None:
+            return
+        with self._lock:
+            if self._executor is not None:
+                return
+            if self.refresh_interval > 0:
+                self._scheduler = threading.Thread(target=self._run_scheduler,
+                                                   name=f'swr-scheduler-{self.name}', daemon=True)
+                self._scheduler.start()
+            self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                thread_name_prefix=f'swr-{self.name}')
+
+    def _run_scheduler(self) -> None:
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self.refresh_hot_keys()
+            except Exception as e:
+                logger.warning(f"缓存 {self.name} 热点刷新调度失败: {e}")
+
+    def refresh_hot_keys(self) -> List[Hashable]:
+        """
+        主动刷新热度最高的 top-N 个键中即将过期（下个调度周期前过期）的条目
+        调用后所有条目热度减半，使热度反映近期访问频率
+        """
+        deadline = time.monotonic() + self.refresh_interval * 2
+        with self._lock:
+            hottest = sorted(self._data.items(), key=lambda item: item[1].score, reverse=True)
+            due = [key for key, entry in hottest[:self.hot_keys]
+                   if entry.score > 0 and entry.fresh_until <= deadline]
+            for key in due:
+                self._schedule_refresh(key)
+            for entry in self._data.values():
+                entry.score /= 2
+        return due
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """删除指定条目，key 为 None 时清空"""
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+    def shutdown(self) -> None:
+        """停止调度线程与刷新线程池"""
+        self._stop.set()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        with self._lock:
+            total = self.hits + self.stale_hits + self.misses
+            return {
+                'name': self.name,
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'hit_ratio': round((self.hits + self.stale_hits) / total, 4) if total else 0.0,
+                'refreshes': self.refreshes,
+                'refresh_errors': self.refresh_errors,
+                'refreshing': len(self._refreshing),
+                'shared': self.shared.stats() if self.shared is not None else None
+            }
+
+
+# 已创建的 SWR 缓存，供统计接口汇总
+_swr_caches: Dict[str, StaleWhileRevalidateCache] = {}
+_swr_lock = threading.Lock()
+
+
+def get_swr_cache(name: str, **options) -> StaleWhileRevalidateCache:
+    """按名称获取（不存在时创建）共享的 SWR 缓存"""
+    with _swr_lock:
+        cache = _swr_caches.get(name)
+        if cache is None:
+            cache = _swr_caches[name] = StaleWhileRevalidateCache(name, **options)
+        return cache
+
+
+def swr_stats() -> Dict[str, Dict[str, Any]]:
+    """所有 SWR 缓存的统计信息"""
+    with _swr_lock:
+        caches = list(_swr_caches.values())
+    return {cache.name: cache.stats() for cache in caches}
+
+
+# 为 True 时被装饰函数直接执行，不读写 SWR 缓存
+_bypass: ContextVar[bool] = ContextVar('swr_bypass', default=False)
+
+
+@contextmanager
+def bypass_swr_cache():
+    """上下文管理器：其中调用的 SWR 缓存函数直接执行（用于需要真实查询结果的后端对比、性能剖析）"""
+    token = _bypass.set(True)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+def instance_identity(instance: Any) -> Hashable:
+    """方法缓存键中的实例标识：实例提供 cache_identity() 时使用其返回值，否则为对象 id（仅进程内有效）"""
+    identity = getattr(instance, 'cache_identity', None)
+    return identity() if callable(identity) else ('object', id(instance))
+
+
+def stale_while_revalidate(cache: StaleWhileRevalidateCache,
+                           key_func: Optional[Callable[..., Hashable]] = None):
+    """
+    装饰器：通过 SWR 缓存读取被装饰函数的结果
+    默认以 (函数限定名, 实例标识, 位置参数, 排序后的关键字参数) 为键，参数需可哈希；
+    用于方法时以实例的 cache_identity()（如数据库后端与库名）代替 self：指向同一数据源的实例
+    （及共享缓存下的各进程）共用结果，指向不同数据源的实例互不影响；实例没有 cache_identity 时按对象区分。
+    缓存关闭（ttl <= 0）或处于 bypass_swr_cache() 中时直接执行被装饰函数。
+    缓存的结果会在调用方之间共享，调用方不应修改返回值
+    """
+    def decorator(func):
+        is_method = next(iter(inspect.signature(func).parameters), None) == 'self'
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if cache.ttl <= 0 or _bypass.get():
+                return func(*args, **kwargs)
+            if key_func is not None:
+                key = key_func(*args, **kwargs)
+            elif is_method:
+                key = (func.__qualname__, instance_identity(args[0]), args[1:], tuple(sorted(kwargs.items())))
+            else:
+                key = (func.__qualname__, None, args, tuple(sorted(kwargs.items())))
+            return cache.get_or_load(key, lambda: func(*args, **kwargs))
+        return wrapper
+    return decorator
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+列式（struct-of-arrays）响应格式工具
+将"字典数组"转换为"平行数组"，分类列使用字典编码（整数编码 + 取值表）
+"""
+
+from typing import Any, Dict, Iterable, List, Optional
+
+ROWS_FORMAT = 'rows'
+COLUMNAR_FORMAT = 'columnar'
+SUPPORTED_FORMATS = (ROWS_FORMAT, COLUMNAR_FORMAT)
+
+
+def to_columnar(rows: List[Dict[str, Any]], categorical: Iterable[str] = (),
+                columns: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    将字典数组转换为列式结构
+
+    Args:
+        rows: 字典数组，每个字典的键相同
+        categorical: 需要字典编码的列名
+        columns: 输出列及顺序，默认取第一行的键
+
+    Returns:
+        {
+            "format": "columnar",
+            "length": 行数,
+            "columns": {列名: 值数组（分类列为整数编码数组）},
+            "dictionaries": {分类列名: 取值表}
+        }
+    """
+    if columns is None:
+        columns = list(rows[0].keys()) if rows else []
+    categorical = set(categorical)
+
+    column_values: Dict[str, List[Any]] = {}
+    dictionaries: Dict[str, List[Any]] = {}
+    for name in columns:
+        values = [row.get(name) for row in rows]
+        if name in categorical:
+            codes: Dict[Any, int] = {}
+            encoded = []
+            for value in values:
+                code = codes.get(value)
+                if code is None:
+                    code = codes[value] = len(codes)
+                encoded.append(code)
+            column_values[name] = encoded
+            dictionaries[name] = list(codes.keys())
+        else:
+            column_values[name] = values
+
+    return {
+        "format": COLUMNAR_FORMAT,
+        "length": len(rows),
+        "columns": column_values,
+        "dictionaries": dictionaries
+    }
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+薪资分布直方图
+分桶边界可为默认的 0-5K … 35K+、请求指定的任意边界，或按分位数等频划分：
+固定边界在数据库中按桶序号 GROUP BY 计数（bucket_expression / bucket_counts），
+分位数边界取决于全部取值，对按组预排序的月薪中位数数组（单位K）用 searchsorted 分桶（histogram）
+"""
+
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# 默认分桶的内部边界：0-5K、5-10K、10-15K、15-25K、25-35K、35K+
+DEFAULT_EDGES: Tuple[float, ...] = (5, 10, 15, 25, 35)
+
+# 请求可指定的边界数与分位数桶数上限
+MAX_EDGES = 50
+MAX_QUANTILES = 20
+
+
+@dataclass(frozen=True)
+class HistogramSpec:
+    """分桶方式：edges 为升序的内部边界；quantiles 非空时按分位数划分为该数量的等频桶"""
+    edges: Tuple[float, ...] = DEFAULT_EDGES
+    quantiles: Optional[int] = None
+
+    def resolve(self, sorted_values: np.ndarray) -> Tuple[float, ...]:
+        """本次分桶实际使用的内部边界"""
+        if self.quantiles is None:
+            return self.edges
+        return quantile_edges(sorted_values, self.quantiles)
+
+
+DEFAULT_SPEC = HistogramSpec()
+
+
+def _format_edge(edge: float) -> str:
+    return f"{edge:g}"
+
+
+def bin_labels(edges: Sequence[float]) -> List[str]:
+    """各桶的标签（与原 CASE 表达式一致）：0-5K、5-10K、…、35K+"""
+    bounds = [0] + list(edges)
+    labels = [f"{_format_edge(low)}-{_format_edge(high)}K" for low, high in zip(bounds, bounds[1:])]
+    labels.append(f"{_format_edge(bounds[-1])}K+")
+    return labels
+
+
+def quantile_edges(sorted_values: np.ndarray, quantiles: int) -> Tuple[float, ...]:
+    """等频分桶的内部边界（保留一位小数并去重，取值集中时桶数可能少于 quantiles）"""
+    if len(sorted_values) == 0 or quantiles <= 1:
+        return ()
+    points = np.quantile(sorted_values, np.linspace(0, 1, quantiles + 1)[1:-1])
+    edges = sorted({round(float(point), 1) for point in points})
+    return tuple(edge for edge in edges if edge > 0)
+
+
+def bucket_expression(value: str, edges: Sequence[float]) -> str:
+    """
+    value（SQL 表达式）所在桶序号的 CASE 表达式，边界以 %s 占位，参数依次为 edges；
+    取值小于边界的记录落入其左侧的桶，与 histogram 一致
+    """
+    if not edges:
+        return '0'
+    whens = ' '.join(f"WHEN {value} < %s THEN {index}" for index in range(len(edges)))
+    return f"CASE {whens} ELSE {len(edges)} END"
+
+
+def bucket_counts(rows: Sequence[Tuple[int, int]], edges: Sequence[float],
+                  include_empty: bool = False) -> List[Tuple[str, int]]:
+    """将 [(桶序号, 数量)] 转换为 [(标签, 数量)]，默认省略空桶"""
+    counts = [0] * (len(edges) + 1)
+    for bucket, count in rows:
+        counts[int(bucket)] = int(count)
+    return [(label, count) for label, count in zip(bin_labels(edges), counts) if count or include_empty]
+
+
+def histogram(sorted_values: np.ndarray, spec: HistogramSpec = DEFAULT_SPEC,
+              include_empty: bool = False) -> List[Tuple[str, int]]:
+    """
+    对升序数组分桶计数，返回 [(标签, 数量)]
+    取值小于边界的记录落入其左侧的桶（与 CASE WHEN mid < 5 … 一致）；默认省略空桶（与 GROUP BY 一致）
+    """
+    edges = spec.resolve(sorted_values)
+    positions = np.searchsorted(sorted_values, edges, side='left')
+    counts = np.diff(np.concatenate(([0], positions, [len(sorted_values)])))
+    return [(label, int(count)) for label, count in zip(bin_labels(edges), counts)
+            if count or include_empty]
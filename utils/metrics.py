@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+接口耗时统计
+请求前后钩子为每个蓝图接口计时，并将耗时拆分为 db（数据库）、serialize（序列化）、
+compress（压缩）与 compute（其余的服务计算）四个阶段；结果记入进程内直方图与计数器，
+由 /metrics 以 Prometheus 文本格式输出
+"""
+
+import copy
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from flask import request
+
+# 直方图桶上界（毫秒），最后一个桶为 +Inf
+LATENCY_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# 请求中单独计时的阶段，compute 为总耗时减去这些阶段
+MEASURED_PHASES = ('db', 'serialize', 'compress')
+PHASES = ('db', 'compute', 'serialize', 'compress')
+
+# 当前请求各阶段的累计耗时（毫秒），不在请求中时为 None
+_request_phases: ContextVar[Optional[Dict[str, float]]] = ContextVar('request_phases', default=None)
+
+
+class Histogram:
+    """固定桶的累计直方图（与 Prometheus histogram 语义一致）"""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        index = 0
+        while index < len(self.buckets) and value > self.buckets[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """按桶线性插值估算分位数"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        cumulative = 0
+        lower = 0.0
+        for index, count in enumerate(self.counts):
+            upper = self.buckets[index] if index < len(self.buckets) else self.buckets[-1] * 2
+            if count and cumulative + count >= target:
+                return lower + (upper - lower) * (target - cumulative) / count
+            cumulative += count
+            lower = upper
+        return lower
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """[(桶上界, 累计计数)]，最后一项为 +Inf"""
+        result, total = [], 0
+        for bound, count in zip(list(self.buckets) + ['+Inf'], self.counts):
+            total += count
+            result.append((str(bound), total))
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'count': self.count, 'sum_ms': round(self.sum, 3), 'buckets': dict(self.cumulative())}
+
+
+def add_phase(phase: str, elapsed_ms: float) -> None:
+    """将耗时计入当前请求的某个阶段（不在请求中时忽略）"""
+    phases = _request_phases.get()
+    if phases is not None:
+        phases[phase] = phases.get(phase, 0.0) + elapsed_ms
+
+
+@contextmanager
+def timed_phase(phase: str) -> Iterator[None]:
+    """上下文管理器：将代码块的耗时计入当前请求的 phase 阶段"""
+    if _request_phases.get() is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_phase(phase, (time.perf_counter() - started) * 1000)
+
+
+class RouteStats:
+    """一个接口的请求计数与耗时直方图"""
+
+    def __init__(self):
+        self.statuses: Dict[Tuple[str, int], int] = {}
+        self.duration = Histogram()
+        self.phases = {phase: 0.0 for phase in PHASES}
+
+    def observe(self, method: str, status: int, total_ms: float, phases: Dict[str, float]) -> None:
+        key = (method, status)
+        self.statuses[key] = self.statuses.get(key, 0) + 1
+        self.duration.observe(total_ms)
+        measured = 0.0
+        for phase in MEASURED_PHASES:
+            value = phases.get(phase, 0.0)
+            self.phases[phase] += value
+            measured += value
+        self.phases['compute'] += max(total_ms - measured, 0.0)
+
+
+class RouteMetrics:
+    """按接口（Flask endpoint）汇总的请求统计"""
+
+    def __init__(self):
+        self.routes: Dict[str, RouteStats] = {}
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+
+    def observe(self, endpoint: str, method: str, status: int, total_ms: float,
+                phases: Dict[str, float]) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            stats = self.routes.get(endpoint)
+            if stats is None:
+                stats = self.routes[endpoint] = RouteStats()
+            stats.observe(method, status, total_ms, phases)
+
+    def abandon(self) -> None:
+        """请求未产生响应（处理中抛出未捕获的异常）"""
+        with self._lock:
+            self.in_flight -= 1
+
+    def export(self) -> Tuple[int, List[Tuple[str, Dict[Tuple[str, int], int], Histogram, Dict[str, float]]]]:
+        """(处理中的请求数, [(接口, {(方法, 状态码): 次数}, 耗时直方图, 各阶段累计耗时)])，供指标输出使用"""
+        with self._lock:
+            return self.in_flight, [
+                (endpoint, dict(stats.statuses), copy.deepcopy(stats.duration), dict(stats.phases))
+                for endpoint, stats in sorted(self.routes.items())
+            ]
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                endpoint: {
+                    'requests': sum(stats.statuses.values()),
+                    'statuses': {f"{method} {status}": count for (method, status), count in stats.statuses.items()},
+                    'p50_ms': round(stats.duration.quantile(0.5), 3),
+                    'p95_ms': round(stats.duration.quantile(0.95), 3),
+                    'phases_ms': {phase: round(value, 3) for phase, value in stats.phases.items()},
+                    'histogram': stats.duration.to_dict(),
+                }
+                for endpoint, stats in sorted(self.routes.items())
+            }
+
+
+route_metrics = RouteMetrics()
+
+
+def init_app(app, metrics: RouteMetrics = route_metrics) -> None:
+    """注册请求前后钩子，为每个请求计时并记入 metrics"""
+
+    @app.before_request
+    def _start_timer():
+        request.environ['metrics.started'] = time.perf_counter()
+        request.environ['metrics.token'] = _request_phases.set({})
+        metrics.start()
+
+    @app.after_request
+    def _record(response):
+        started = request.environ.pop('metrics.started', None)
+        if started is not None:
+            total_ms = (time.perf_counter() - started) * 1000
+            metrics.observe(request.endpoint or 'unmatched', request.method, response.status_code,
+                            total_ms, _request_phases.get() or {})
+        return response
+
+    @app.teardown_request
+    def _reset(error=None):
+        if request.environ.pop('metrics.started', None) is not None:
+            metrics.abandon()
+        token = request.environ.pop('metrics.token', None)
+        if token is not None:
+            _request_phases.reset(token)
+
+
+class PrometheusWriter:
+    """按 Prometheus 文本格式（0.0.4）输出指标"""
+
+    CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+    def __init__(self, prefix: str = 'visual'):
+        self.prefix = prefix
+        self.lines: List[str] = []
+
+    @staticmethod
+    def _labels(labels: Optional[Dict[str, Any]]) -> str:
+        if not labels:
+            return ''
+        escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+                   for value in labels.values())
+        return '{' + ','.join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + '}'
+
+    def declare(self, name: str, metric_type: str, help_text: str) -> str:
+        full_name = f"{self.prefix}_{name}"
+        self.lines.append(f"# HELP {full_name} {help_text}")
+        self.lines.append(f"# TYPE {full_name} {metric_type}")
+        return full_name
+
+    def sample(self, name: str, value: float, labels: Optional[Dict[str, Any]] = None) -> None:
+        value = int(value) if float(value).is_integer() else round(float(value), 6)
+        self.lines.append(f"{name}{self._labels(labels)} {value}")
+
+    def metric(self, name: str, metric_type: str, help_text: str,
+               samples: Iterable[Tuple[Optional[Dict[str, Any]], float]]) -> None:
+        """输出一个 counter / gauge 指标，samples 为 (标签, 值) 序列"""
+        full_name = self.declare(name, metric_type, help_text)
+        for labels, value in samples:
+            self.sample(full_name, value, labels)
+
+    def histogram(self, name: str, help_text: str,
+                  histograms: Iterable[Tuple[Dict[str, Any], Histogram]], scale: float = 0.001) -> None:
+        """输出 histogram 指标；Histogram 以毫秒记录，scale 将其换算为秒"""
+        full_name = self.declare(name, 'histogram', help_text)
+        for labels, hist in histograms:
+            for bound, count in hist.cumulative():
+                le = bound if bound == '+Inf' else f"{float(bound) * scale:g}"
+                self.sample(f"{full_name}_bucket", count, {**labels, 'le': le})
+            self.sample(f"{full_name}_sum", hist.sum * scale, labels)
+            self.sample(f"{full_name}_count", hist.count, labels)
+
+    def render(self) -> str:
+        return '\n'.join(self.lines) + '\n'
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+预计算结果文件
+批处理（如 python data_analysis.py）生成的 JSON 结果由接口直接提供：解析结果按文件签名（inode, mtime）缓存，
+批处理原子替换文件后在下次访问时重新加载，请求中不再执行分析查询
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 检查文件是否更新的最小间隔（秒）
+CHECK_INTERVAL = 5.0
+
+
+class PrecomputedFile:
+    """按需加载并缓存的预计算 JSON 文件"""
+
+    def __init__(self, path: str, check_interval: float = CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self._content: Optional[Dict[str, Any]] = None
+        self._signature: Optional[Tuple[int, int]] = None
+        self._checked_at = float('-inf')
+        self._lock = threading.Lock()
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """文件内容，文件不存在或无法解析时返回 None（解析失败时继续提供上次成功加载的内容）"""
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return self._content
+        with self._lock:
+            if now - self._checked_at < self.check_interval:
+                return self._content
+            self._checked_at = now
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                self._content, self._signature = None, None
+                return None
+            signature = (stat.st_ino, stat.st_mtime_ns)
+            if signature != self._signature:
+                try:
+                    with open(self.path, 'r', encoding='utf-8') as f:
+                        self._content = json.load(f)
+                    self._signature = signature
+                    logger.info(f"已加载预计算结果 {self.path}")
+                except (OSError, ValueError) as e:
+                    logger.error(f"加载预计算结果 {self.path} 失败: {e}")
+            return self._content
+
+    @property
+    def modified_at(self) -> Optional[str]:
+        """当前加载内容对应的文件修改时间"""
+        if self._signature is None:
+            return None
+        return datetime.fromtimestamp(self._signature[1] / 1e9).isoformat()
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按需请求剖析
+PROFILING_ENABLED 开启后，带 X-Profile 请求头的请求在剖析器下执行：
+    X-Profile: sampling       采样剖析（后台线程按间隔采集请求线程的调用栈，开销小）
+    X-Profile: deterministic  确定性剖析（cProfile，函数级耗时精确，开销大）
+剖析的请求不读写响应缓存与查询缓存、不与其他请求合并，测量的是接口自身的完整执行。
+同时用 tracemalloc 记录该请求的内存分配增量。剖析结果（火焰图用的折叠栈、耗时最多的函数、
+分配最多的代码行，以及 PROFILING_FOCUS 中服务模块的函数）保存在 PROFILING_DIR，
+响应头 X-Profile-Id 给出结果编号，可通过 /api/system/profiles/<编号> 查看
+"""
+
+import cProfile
+import json
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from contextlib import ExitStack
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from flask import g, request
+
+from config import config
+from utils.cache import bypass_swr_cache
+from utils.singleflight import bypass_coalescing
+
+logger = logging.getLogger(__name__)
+
+settings = config['default']
+
+PROFILE_MODES = ('sampling', 'deterministic')
+
+# 折叠栈从视图函数开始，省略 WSGI 服务器与 Flask 分发的外层调用
+STACK_ROOT_FUNCTION = 'dispatch_request'
+
+# tracemalloc 记录的调用栈深度
+TRACEMALLOC_FRAMES = 10
+
+# 同一时刻只剖析一个请求：tracemalloc 为进程级，并发剖析会相互污染分配统计
+_profile_lock = threading.Lock()
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{frame.f_globals.get('__name__', '?')}.{getattr(code, 'co_qualname', code.co_name)}"
+
+
+class StackSampler(threading.Thread):
+    """按固定间隔采集目标线程的调用栈，累计各调用栈出现的次数"""
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(name='profile-sampler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                if frame.f_code.co_name == STACK_ROOT_FUNCTION:
+                    break
+                frame = frame.f_back
+            self.stacks[tuple(reversed(stack))] += 1
+            self.samples += 1
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+
+def collapse(stacks: Counter) -> List[str]:
+    """折叠栈格式（flamegraph.pl / speedscope 可直接读取）：每行为 “根;...;叶 次数”"""
+    return [f"{';'.join(stack)} {count}" for stack, count in stacks.most_common()]
+
+
+def _sampled_top_functions(stacks: Counter, interval_ms: float, limit: int) -> List[Dict[str, Any]]:
+    """由采样结果统计各函数的自身耗时（位于栈顶）与累计耗时（出现在栈中）"""
+    own: Counter = Counter()
+    inclusive: Counter = Counter()
+    for stack, count in stacks.items():
+        own[stack[-1]] += count
+        for function in set(stack):
+            inclusive[function] += count
+    return [
+        {'function': function, 'self_ms': round(own[function] * interval_ms, 3),
+         'cumulative_ms': round(samples * interval_ms, 3), 'samples': samples}
+        for function, samples in sorted(inclusive.items(), key=lambda item: (-own[item[0]], -item[1]))[:limit]
+    ]
+
+
+def _cprofile_top_functions(profiler: cProfile.Profile, limit: int) -> List[Dict[str, Any]]:
+    """cProfile 结果中自身耗时最多的函数"""
+    stats = pstats.Stats(profiler).stats
+    rows = []
+    for (filename, line, name), (_, calls, own, cumulative, _) in stats.items():
+        rows.append({
+            'function': f"{os.path.relpath(filename) if os.path.isabs(filename) else filename}:{line}({name})",
+            'calls': calls,
+            'self_ms': round(own * 1000, 3),
+            'cumulative_ms': round(cumulative * 1000, 3),
+        })
+    rows.sort(key=lambda row: row['self_ms'], reverse=True)
+    return rows[:limit]
+
+
+def _cprofile_stacks(profiler: cProfile.Profile) -> Counter:
+    """
+    由 cProfile 的调用关系近似生成折叠栈（确定性模式下没有采样栈）：
+    每条 “调用方;被调用方” 边按该边上的自身耗时（微秒）计数
+    """
+    stacks: Counter = Counter()
+    for (filename, line, name), (_, _, own, _, callers) in pstats.Stats(profiler).stats.items():
+        callee = f"{os.path.basename(filename)}:{name}"
+        for (caller_file, _, caller_name), caller_stats in callers.items():
+            stacks[(f"{os.path.basename(caller_file)}:{caller_name}", callee)] += max(int(caller_stats[2] * 1e6), 1)
+    return stacks
+
+
+def _allocation_deltas(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot,
+                       limit: int) -> List[Dict[str, Any]]:
+    """两次快照之间分配增量最大的代码行"""
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+    deltas = after.filter_traces(filters).compare_to(before.filter_traces(filters), 'lineno')
+    return [
+        {'location': f"{os.path.relpath(stat.traceback[0].filename)}:{stat.traceback[0].lineno}",
+         'size_diff_kb': round(stat.size_diff / 1024, 2), 'count_diff': stat.count_diff}
+        for stat in deltas[:limit] if stat.size_diff
+    ]
+
+
+class RequestProfile:
+    """一次请求的剖析过程"""
+
+    def __init__(self, mode: str):
+        self.id = f"{datetime.now().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.mode = mode
+        self.interval = settings.PROFILING_INTERVAL_MS / 1000
+        self.profiler: Optional[cProfile.Profile] = None
+        self.sampler: Optional[StackSampler] = None
+        self.started_tracemalloc = False
+        self.before: Optional[tracemalloc.Snapshot] = None
+        self.started = 0.0
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            self.started_tracemalloc = True
+        tracemalloc.reset_peak()
+        self.before = tracemalloc.take_snapshot()
+        self.started = time.perf_counter()
+        if self.mode == 'deterministic':
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        else:
+            self.sampler = StackSampler(threading.get_ident(), self.interval)
+            self.sampler.start()
+
+    def stop(self, endpoint: str, status: int) -> Dict[str, Any]:
+        """停止剖析并生成报告"""
+        if self.profiler is not None:
+            self.profiler.disable()
+        if self.sampler is not None:
+            self.sampler.stop()
+        elapsed_ms = (time.perf_counter() - self.started) * 1000
+        after = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        if self.started_tracemalloc:
+            tracemalloc.stop()
+
+        limit = settings.PROFILING_TOP_N
+        if self.profiler is not None:
+            stacks = _cprofile_stacks(self.profiler)
+            top_functions = _cprofile_top_functions(self.profiler, limit * 5)
+        else:
+            stacks = self.sampler.stacks
+            # 采样线程与请求线程竞争 GIL，实际间隔通常大于设定值，按请求耗时折算每个样本代表的时长
+            sample_ms = elapsed_ms / self.sampler.samples if self.sampler.samples else self.interval * 1000
+            top_functions = _sampled_top_functions(stacks, sample_ms, limit * 5)
+        focus = [row for row in top_functions
+                 if any(module in row['function'].replace(os.sep, '.') for module in settings.PROFILING_FOCUS)]
+        return {
+            'id': self.id,
+            'mode': self.mode,
+            'created_at': datetime.now().isoformat(),
+            'method': request.method,
+            'path': request.full_path.rstrip('?'),
+            'endpoint': endpoint,
+            'status': status,
+            'duration_ms': round(elapsed_ms, 3),
+            'samples': self.sampler.samples if self.sampler is not None else None,
+            'top_functions': top_functions[:limit],
+            'focus_functions': focus[:limit],
+            'allocations': {
+                'peak_kb': round(peak / 1024, 2),
+                'retained_kb': round(current / 1024, 2),
+                'top_lines': _allocation_deltas(self.before, after, limit),
+            },
+            'collapsed': collapse(stacks),
+        }
+
+
+def save_profile(report: Dict[str, Any]) -> str:
+    """将剖析结果保存为 JSON 与折叠栈文本，超过 PROFILING_KEEP 份时删除最旧的结果"""
+    directory = settings.PROFILING_DIR
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{report['id']}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    with open(os.path.join(directory, f"{report['id']}.collapsed"), 'w', encoding='utf-8') as f:
+        f.write('\n'.join(report['collapsed']) + '\n')
+    profiles = sorted(name[:-5] for name in os.listdir(directory) if name.endswith('.json'))
+    for stale in profiles[:-settings.PROFILING_KEEP]:
+        for suffix in ('.json', '.collapsed'):
+            try:
+                os.remove(os.path.join(directory, stale + suffix))
+            except OSError:
+                pass
+    return path
+
+
+def list_profiles() -> List[Dict[str, Any]]:
+    """已保存的剖析结果摘要（最新的在前）"""
+    directory = settings.PROFILING_DIR
+    if not os.path.isdir(directory):
+        return []
+    summaries = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directory, name), encoding='utf-8') as f:
+                report = json.load(f)
+        except (OSError, ValueError):
+            continue
+        summaries.append({key: report.get(key) for key in ('id', 'mode', 'created_at', 'path', 'status', 'duration_ms')})
+    return summaries
+
+
+def load_profile(profile_id: str, collapsed: bool = False) -> Optional[Any]:
+    """读取剖析结果：collapsed 为 True 时返回折叠栈文本，否则返回报告字典；不存在时返回 None"""
+    if not profile_id or os.path.basename(profile_id) != profile_id:
+        return None
+    path = os.path.join(settings.PROFILING_DIR, profile_id + ('.collapsed' if collapsed else '.json'))
+    if not os.path.isfile(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return f.read() if collapsed else json.load(f)
+
+
+def _requested_mode() -> Tuple[Optional[str], Optional[str]]:
+    """解析请求头，返回 (剖析模式, 未剖析的原因)"""
+    value = request.headers.get(settings.PROFILING_HEADER)
+    if not value:
+        return None, None
+    if settings.PROFILING_TOKEN and request.headers.get('X-Profile-Token') != settings.PROFILING_TOKEN:
+        return None, 'forbidden'
+    mode = value.strip().lower()
+    if mode in ('1', 'true', 'on'):
+        mode = settings.PROFILING_MODE
+    if mode not in PROFILE_MODES:
+        return None, 'unknown-mode'
+    return mode, None
+
+
+def init_app(app) -> None:
+    """注册请求前后钩子，对带剖析请求头的请求执行剖析"""
+
+    @app.before_request
+    def _start_profile():
+        mode, reason = _requested_mode()
+        if mode is None:
+            if reason:
+                g.profile_status = reason
+            return
+        if not _profile_lock.acquire(blocking=False):
+            g.profile_status = 'busy'
+            return
+        profile = RequestProfile(mode)
+        try:
+            profile.start()
+        except Exception as e:
+            _profile_lock.release()
+            logger.error(f"启动请求剖析失败: {e}")
+            g.profile_status = 'error'
+            return
+        g.profile = profile
+        # 响应缓存由 cached_response 按 g.profile 跳过
+        bypass = ExitStack()
+        bypass.enter_context(bypass_swr_cache())
+        bypass.enter_context(bypass_coalescing())
+        g.profile_bypass = bypass
+
+    def _end_bypass():
+        bypass = g.pop('profile_bypass', None)
+        if bypass is not None:
+            bypass.close()
+
+    @app.after_request
+    def _finish_profile(response):
+        _end_bypass()
+        profile = g.pop('profile', None)
+        if profile is not None:
+            try:
+                report = profile.stop(request.endpoint or 'unmatched', response.status_code)
+                save_profile(report)
+                response.headers['X-Profile-Id'] = report['id']
+                response.headers['X-Profile-Duration-Ms'] = str(report['duration_ms'])
+                g.profile_status = 'ok'
+            except Exception as e:
+                logger.error(f"保存请求剖析结果失败: {e}")
+                g.profile_status = 'error'
+            finally:
+                _profile_lock.release()
+        status = g.pop('profile_status', None)
+        if status:
+            response.headers['X-Profile-Status'] = status
+        return response
+
+    @app.teardown_request
+    def _abort_profile(error=None):
+        # 请求未产生响应时停止剖析并释放锁
+        _end_bypass()
+        profile = g.pop('profile', None)
+        if profile is not None:
+            if profile.profiler is not None:
+                profile.profiler.disable()
+            if profile.sampler is not None:
+                profile.sampler.stop()
+            if profile.started_tracemalloc:
+                tracemalloc.stop()
+            _profile_lock.release()
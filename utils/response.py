@@ -2,33 +2,321 @@
 # -*- coding: utf-8 -*-
 """
 API响应工具类
+负责响应体的JSON/Arrow序列化、按 Accept-Encoding 协商压缩以及热点响应的字节级缓存
 """
 
-from flask import jsonify
-from datetime import datetime
+import gzip
+import json
+import struct
+import threading
 import uuid
-from typing import Any, Dict, Optional
+import zlib
+from dataclasses import asdict, is_dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from functools import wraps
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+from flask import Response, g, has_request_context, request
+
+from config import config
+from utils import arrow
+from utils.cache import TTLCache, create_cache
+from utils.metrics import timed_phase
+from utils.singleflight import get_flight
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖，缺失时退回标准库 json
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖，缺失时只提供 gzip
+    brotli = None
+
+settings = config['default']
+
+
+def json_default(obj: Any) -> Any:
+    """处理标准JSON不支持的类型（Decimal、datetime、numpy标量等）"""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if is_dataclass(obj) and not isinstance(obj, type):
+        return asdict(obj)
+    # numpy 标量与数组（不强依赖 numpy）
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    if hasattr(obj, 'item'):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _dumps_stdlib(payload: Any) -> bytes:
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':'),
+                      default=json_default).encode('utf-8')
+
+
+def _dumps_orjson(payload: Any) -> bytes:
+    return orjson.dumps(payload, default=json_default,
+                        option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+# 可用的JSON编码器，可通过 register_json_encoder 扩展
+JSON_ENCODERS: Dict[str, Callable[[Any], bytes]] = {'json': _dumps_stdlib}
+if orjson is not None:
+    JSON_ENCODERS['orjson'] = _dumps_orjson
+
+_json_encoder: Callable[[Any], bytes] = _dumps_stdlib
+
+
+def register_json_encoder(name: str, encoder: Callable[[Any], bytes]) -> None:
+    """注册自定义JSON编码器，encoder 接收Python对象并返回UTF-8字节串"""
+    JSON_ENCODERS[name] = encoder
+
+
+def set_json_encoder(encoder: Union[str, Callable[[Any], bytes]]) -> None:
+    """切换当前使用的JSON编码器，'auto' 表示优先使用 orjson"""
+    global _json_encoder
+    if callable(encoder):
+        _json_encoder = encoder
+    elif encoder == 'auto':
+        _json_encoder = JSON_ENCODERS.get('orjson', _dumps_stdlib)
+    elif encoder in JSON_ENCODERS:
+        _json_encoder = JSON_ENCODERS[encoder]
+    else:
+        raise ValueError(f"未知的JSON编码器: {encoder}")
+
+
+def dumps(payload: Any) -> bytes:
+    """使用当前编码器序列化为UTF-8字节串"""
+    return _json_encoder(payload)
+
+
+set_json_encoder(settings.JSON_ENCODER)
+
+
+# 压缩算法，按优先级排列（协商时靠前者优先）
+COMPRESSORS: Dict[str, Callable[[bytes], bytes]] = {}
+if brotli is not None:
+    COMPRESSORS['br'] = lambda raw: brotli.compress(raw, quality=min(settings.COMPRESSION_LEVEL, 11))
+COMPRESSORS['gzip'] = lambda raw: gzip.compress(raw, compresslevel=settings.COMPRESSION_LEVEL, mtime=0)
+
+# gzip 头：deflate、无标志位、mtime 为 0、未知操作系统
+GZIP_HEADER = b'\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff'
+
+
+def _gzip_prefix(raw: bytes) -> bytes:
+    """gzip 头与以同步刷新结束的 deflate 数据（未终止、按字节对齐，可在其后追加数据块）"""
+    compressor = zlib.compressobj(settings.COMPRESSION_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return GZIP_HEADER + compressor.compress(raw) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+
+def _gzip_suffix(tail: bytes, crc: int, size: int) -> bytes:
+    """以未压缩的末尾数据块追加 tail，并写入整个响应体的 CRC32 与长度"""
+    block = struct.pack('<BHH', 1, len(tail), len(tail) ^ 0xFFFF) + tail
+    return block + struct.pack('<II', zlib.crc32(tail, crc), (size + len(tail)) & 0xFFFFFFFF)
+
+
+def _brotli_prefix(raw: bytes) -> bytes:
+    """以刷新结束的 brotli 流（未终止、按字节对齐，可在其后追加元块）"""
+    compressor = brotli.Compressor(quality=min(settings.COMPRESSION_LEVEL, 11))
+    return compressor.process(raw) + compressor.flush()
+
+
+def _brotli_suffix(tail: bytes, crc: int, size: int) -> bytes:
+    """以未压缩元块追加 tail（ISLAST=0、4 个半字节的 MLEN-1、ISUNCOMPRESSED=1），再以空的末尾元块结束"""
+    header = (len(tail) - 1) << 3 | 1 << 19
+    return header.to_bytes(3, 'little') + tail + b'\x03'
+
+
+# 响应体末尾逐个请求追加字段时使用的压缩方式：(压缩固定前缀, 追加末尾)，与 COMPRESSORS 一一对应
+SPLICERS: Dict[str, Tuple[Callable[[bytes], bytes], Callable[[bytes, int, int], bytes]]] = {}
+if brotli is not None:
+    SPLICERS['br'] = (_brotli_prefix, _brotli_suffix)
+SPLICERS['gzip'] = (_gzip_prefix, _gzip_suffix)
+
+
+def negotiate_encoding() -> Optional[str]:
+    """根据请求头 Accept-Encoding 选择压缩算法，不支持压缩时返回None"""
+    if not has_request_context():
+        return None
+    accept = request.accept_encodings
+    best, best_quality = None, 0
+    for name in COMPRESSORS:
+        quality = accept.quality(name)
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+class EncodedBody:
+    """
+    已序列化的响应体，按压缩算法惰性生成并保存各个压缩版本
+    stamped 为 True 时 raw 是去掉末尾 '}' 的 JSON 对象：缓存的字节在多个请求间共用，
+    每次响应时再追加本次请求的 timestamp 与 request_id（压缩版本同样只在末尾追加，不重新压缩）
+    """
+
+    __slots__ = ('raw', 'code', 'mimetype', 'stamped', '_crc', '_variants', '_lock')
+
+    def __init__(self, raw: bytes, code: int = 200, mimetype: str = arrow.JSON_MIMETYPE,
+                 stamped: bool = False):
+        self.raw = raw
+        self.code = code
+        self.mimetype = mimetype
+        self.stamped = stamped
+        self._crc: Optional[int] = None
+        self._variants: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        return self.raw, self.code, self.mimetype, self.stamped, self._crc, dict(self._variants)
+
+    def __setstate__(self, state):
+        self.raw, self.code, self.mimetype, self.stamped, self._crc, self._variants = state
+        self._lock = threading.Lock()
+
+    def get(self, encoding: Optional[str]) -> bytes:
+        """获取指定压缩算法的字节串，None 表示不压缩（stamped 时为未终止的压缩前缀）"""
+        if encoding is None:
+            return self.raw
+        variant = self._variants.get(encoding)
+        if variant is None:
+            with self._lock:
+                variant = self._variants.get(encoding)
+                if variant is None:
+                    with timed_phase('compress'):
+                        if self.stamped:
+                            variant = SPLICERS[encoding][0](self.raw)
+                            if self._crc is None:
+                                self._crc = zlib.crc32(self.raw)
+                        else:
+                            variant = COMPRESSORS[encoding](self.raw)
+                    self._variants[encoding] = variant
+        return variant
+
+    def _stamp(self, encoding: Optional[str]) -> bytes:
+        """本次请求追加在响应体末尾的 timestamp 与 request_id（按压缩算法编码）"""
+        fields = dumps({"timestamp": datetime.now().isoformat(), "request_id": str(uuid.uuid4())})
+        tail = b',' + fields[1:]
+        if encoding is None:
+            return tail
+        return SPLICERS[encoding][1](tail, self._crc, len(self.raw))
+
+    def compress_all(self) -> 'EncodedBody':
+        """
+        生成全部压缩版本（写入跨进程共享缓存前调用）：共享缓存保存的是序列化副本，
+        命中后惰性生成的压缩版本不会写回，预先生成才能让各进程的命中都直接返回压缩字节
+        """
+        if len(self.raw) >= settings.COMPRESSION_MIN_SIZE:
+            for encoding in COMPRESSORS:
+                self.get(encoding)
+        return self
+
+    def to_response(self) -> Response:
+        """构建Flask响应对象，超过阈值时按协商结果压缩"""
+        encoding = negotiate_encoding() if len(self.raw) >= settings.COMPRESSION_MIN_SIZE else None
+        content = self.get(encoding)
+        if self.stamped:
+            content += self._stamp(encoding)
+        response = Response(content, status=self.code, mimetype=self.mimetype)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        response.vary.add('Accept')
+        return response
+
+
+# 热点响应缓存：保存序列化和压缩后的字节，命中时既不重新查询也不重新编码
+# CACHE_BACKEND 为 sqlite/redis 时由各工作进程共享
+response_cache = create_cache('response', maxsize=settings.RESPONSE_CACHE_SIZE, ttl=settings.RESPONSE_CACHE_TTL)
+
+# 缓存未命中时，相同请求的并发调用只执行一次视图函数
+response_flight = get_flight('response')
+
+
+def _request_cache_key() -> tuple:
+    """由请求路径、排序后的查询参数和响应格式构成缓存键"""
+    return (request.path, tuple(sorted(request.args.items(multi=True))), arrow.wants_arrow())
+
+
+def cached_response(ttl: Optional[float] = None):
+    """
+    路由装饰器：缓存成功响应的序列化结果
+    命中时返回缓存的字节，末尾追加本次请求的 timestamp 与 request_id（见 EncodedBody）；
+    未命中时相同请求只执行一次视图函数，其余并发请求等待后读取其写入的缓存；
+    正在剖析的请求（g.profile）直接执行视图函数，不读写缓存
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if settings.RESPONSE_CACHE_TTL <= 0 or g.get('profile') is not None:
+                return view(*args, **kwargs)
+            key = _request_cache_key()
+            body = response_cache.get(key)
+            if body is not None:
+                return body.to_response(), body.code
+            g.response_cache_key = (key, ttl)
+            try:
+                result, shared = response_flight.do(key, view, *args, **kwargs)
+                if not shared:
+                    return result
+                body = response_cache.get(key)
+                if body is not None:
+                    return body.to_response(), body.code
+                # 执行方未得到可缓存的成功响应，由当前请求自行处理
+                return view(*args, **kwargs)
+            finally:
+                g.pop('response_cache_key', None)
+        return wrapper
+    return decorator
 
 
 class ResponseBuilder:
     """响应构建器"""
-    
+
+    @staticmethod
+    def _build(response: Dict[str, Any], code: int) -> tuple:
+        """
+        序列化响应体并构建响应，处于缓存路由中的成功响应会被写入缓存
+        response 不含 timestamp 与 request_id，JSON 响应体在每次响应时追加这两个字段
+        """
+        if arrow.wants_arrow():
+            if not arrow.is_available():
+                return ResponseBuilder.error("服务器未安装 pyarrow，无法输出 Arrow 格式", 406)
+            with timed_phase('serialize'):
+                table = arrow.payload_to_table(response.get("data"), response["message"])
+                body = EncodedBody(arrow.table_to_ipc(table), code, arrow.ARROW_STREAM_MIMETYPE)
+        else:
+            with timed_phase('serialize'):
+                body = EncodedBody(dumps(response)[:-1], code, stamped=True)
+        if code == 200 and has_request_context():
+            cache_entry = g.get('response_cache_key')
+            if cache_entry is not None:
+                key, ttl = cache_entry
+                if not isinstance(response_cache, TTLCache):
+                    body.compress_all()
+                response_cache.set(key, body, ttl)
+        return body.to_response(), code
+
     @staticmethod
     def success(message: str, data: Any = None, code: int = 200) -> tuple:
-        """创建成功响应"""
+        """创建成功响应（timestamp 与 request_id 在响应时追加）"""
         response = {
             "status": "success",
             "code": code,
-            "message": message,
-            "timestamp": datetime.now().isoformat(),
-            "request_id": str(uuid.uuid4())
+            "message": message
         }
-        
+
         if data is not None:
             response["data"] = data
-        
-        return jsonify(response), code
-    
+
+        return ResponseBuilder._build(response, code)
+
     @staticmethod
     def error(message: str, code: int = 500, error_details: Optional[Dict] = None) -> tuple:
         """创建错误响应"""
@@ -39,22 +327,24 @@ class ResponseBuilder:
             "timestamp": datetime.now().isoformat(),
             "request_id": str(uuid.uuid4())
         }
-        
+
         if error_details:
             response["error"] = error_details
-        
-        return jsonify(response), code
-    
+
+        with timed_phase('serialize'):
+            body = EncodedBody(dumps(response), code)
+        return body.to_response(), code
+
     @staticmethod
     def not_found(message: str = "资源不存在") -> tuple:
         """创建404响应"""
         return ResponseBuilder.error(message, 404)
-    
+
     @staticmethod
     def bad_request(message: str = "请求参数错误") -> tuple:
         """创建400响应"""
         return ResponseBuilder.error(message, 400)
-    
+
     @staticmethod
     def internal_error(message: str = "服务器内部错误", error_details: Optional[Dict] = None) -> tuple:
         """创建500响应"""
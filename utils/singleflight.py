@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+请求合并（single-flight）工具类
+相同键的并发调用只执行一次，其余调用等待并共享该次执行的结果
+"""
+
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+# 为 True 时调用不参与合并，直接执行
+_bypass: ContextVar[bool] = ContextVar('singleflight_bypass', default=False)
+
+
+@contextmanager
+def bypass_coalescing():
+    """上下文管理器：其中的调用既不等待也不共享其他调用的结果（用于需要测量自身执行的性能剖析）"""
+    token = _bypass.set(True)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+class _Call:
+    """一次进行中的计算"""
+
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """按键合并并发调用，计算结束即移除，不缓存结果"""
+
+    def __init__(self, name: str = 'default'):
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Tuple[Any, bool]:
+        """
+        执行 fn(*args, **kwargs)，同键已有计算进行中时等待其结果
+
+        Returns:
+            (结果, 是否为共享结果)；执行方抛出的异常会同样抛给所有等待方
+        """
+        if _bypass.get():
+            return fn(*args, **kwargs), False
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executions += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self) -> int:
+        """当前进行中的计算数量"""
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> Dict[str, Any]:
+        """获取合并统计信息"""
+        with self._lock:
+            return {
+                'name': self.name,
+                'calls': self.calls,
+                'executions': self.executions,
+                'coalesced': self.coalesced,
+                'errors': self.errors,
+                'in_flight': len(self._calls),
+                'coalesced_ratio': round(self.coalesced / self.calls, 4) if self.calls else 0.0
+            }
+
+
+def coalesce(flight: SingleFlight, key_func: Optional[Callable[..., Hashable]] = None):
+    """
+    装饰器：合并对被装饰函数的相同并发调用
+    默认以 (函数限定名, 位置参数, 排序后的关键字参数) 为键，参数需可哈希
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if key_func is not None:
+                key = key_func(*args, **kwargs)
+            else:
+                key = (func.__qualname__, args, tuple(sorted(kwargs.items())))
+            result, _ = flight.do(key, func, *args, **kwargs)
+            return result
+        return wrapper
+    return decorator
+
+
+# 注册的合并器，供统计接口汇总
+_registry: Dict[str, SingleFlight] = {}
+_registry_lock = threading.Lock()
+
+
+def get_flight(name: str) -> SingleFlight:
+    """按名称获取（不存在时创建）共享的合并器"""
+    with _registry_lock:
+        flight = _registry.get(name)
+        if flight is None:
+            flight = _registry[name] = SingleFlight(name)
+        return flight
+
+
+def all_stats() -> Dict[str, Dict[str, Any]]:
+    """所有合并器的统计信息"""
+    with _registry_lock:
+        flights = list(_registry.values())
+    return {flight.name: flight.stats() for flight in flights}
@@ -6,6 +6,9 @@
 
 from typing import List, Any, Optional
 
+from utils.columnar import SUPPORTED_FORMATS, ROWS_FORMAT
+from utils.histogram import DEFAULT_SPEC, MAX_EDGES, MAX_QUANTILES, HistogramSpec
+
 
 class RequestValidator:
     """请求验证器"""
@@ -52,3 +55,58 @@ class RequestValidator:
             return True, max(0, min_jobs_int)  # 确保非负数
         except (ValueError, TypeError):
             return False, 0
+    
+    @staticmethod
+    def validate_format(output_format: Any) -> tuple[bool, str]:
+        """验证format参数（rows 或 columnar）"""
+        if output_format is None or output_format == '':
+            return True, ROWS_FORMAT
+        
+        if output_format not in SUPPORTED_FORMATS:
+            return False, f"format 必须是以下之一: {', '.join(SUPPORTED_FORMATS)}"
+        
+        return True, output_format
+    
+    @staticmethod
+    def validate_approx(approx: Any) -> tuple[bool, Any]:
+        """验证approx参数（true 或 false，不区分大小写），返回 (是否有效, 布尔值或错误信息)"""
+        if approx is None or approx == '':
+            return True, False
+        
+        value = str(approx).lower()
+        if value not in ('true', 'false'):
+            return False, "approx 必须是 true 或 false"
+        
+        return True, value == 'true'
+    
+    @staticmethod
+    def validate_salary_bins(bins: Any, quantiles: Any) -> tuple[bool, Any]:
+        """
+        验证薪资分布分桶参数，返回 (是否有效, HistogramSpec 或错误信息)
+        bins 为逗号分隔的升序内部边界（单位K，如 "5,10,20"），quantiles 为等频分桶的桶数，均未指定时使用默认分桶
+        """
+        if bins and quantiles:
+            return False, "salary_bins 与 salary_quantiles 不能同时指定"
+        
+        if quantiles:
+            try:
+                quantiles_int = int(quantiles)
+            except (ValueError, TypeError):
+                return False, "salary_quantiles 必须是整数"
+            if not 2 <= quantiles_int <= MAX_QUANTILES:
+                return False, f"salary_quantiles 必须在 2 到 {MAX_QUANTILES} 之间"
+            return True, HistogramSpec(quantiles=quantiles_int)
+        
+        if bins:
+            try:
+                edges = tuple(float(edge) for edge in str(bins).split(','))
+            except ValueError:
+                return False, "salary_bins 必须是逗号分隔的数字"
+            if len(edges) > MAX_EDGES:
+                return False, f"salary_bins 最多包含 {MAX_EDGES} 个边界"
+            if not all(0 < edge < float('inf') for edge in edges) or \
+                    any(high <= low for low, high in zip(edges, edges[1:])):
+                return False, "salary_bins 必须是严格递增的正数"
+            return True, HistogramSpec(edges=edges)
+        
+        return True, DEFAULT_SPEC
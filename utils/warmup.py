@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+启动缓存预热
+按声明式预热计划并行请求各图表接口，填充响应缓存与查询缓存，完成后就绪状态置为 ready
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from urllib.parse import quote, urlencode
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+settings = config['default']
+
+# 预热计划：每一步请求一个接口
+# - path / params: 请求路径与查询参数，{value} 会被替换为展开值
+# - expand: 从另一个接口的响应中取值展开为多次请求
+#   from 为来源接口，field 为 data 下的字段路径，key 为列表元素中的取值字段，top 为取前N个；
+#   key 为多个字段时，路径与参数中的 {字段名} 分别替换为对应取值
+WARMUP_PLAN: List[Dict[str, Any]] = [
+    # 概览与列表接口
+    {'name': '数据概览', 'path': '/api/overview'},
+    {'name': '城市分布', 'path': '/api/charts/city'},
+    {'name': '行业分布', 'path': '/api/charts/industry'},
+    {'name': '经验分布', 'path': '/api/charts/experience'},
+    {'name': '行业概览', 'path': '/api/charts/industry/overview'},
+    {'name': '经验概览', 'path': '/api/charts/experience/overview'},
+    {'name': '行业薪资', 'path': '/api/charts/industry/salary'},
+    {'name': '经验薪资', 'path': '/api/charts/experience/salary'},
+    {'name': '行业岗位排行', 'path': '/api/industry/ranking/jobs'},
+    {'name': '全国行业统计', 'path': '/api/industry-stats/national'},
+    {'name': 'Q1代表性城市', 'path': '/api/q1/cities'},
+    {'name': 'Q1职位等级', 'path': '/api/q1/job-levels'},
+    {'name': 'Q1行业', 'path': '/api/q1/industries'},
+    # 三维柱状图、玫瑰图及其他重查询图表
+    {'name': '三维柱状图', 'path': '/api/charts/3d/experience-education-salary'},
+    {'name': '行业玫瑰图', 'path': '/api/industry/trend/rose'},
+    {'name': '雷达气泡图', 'path': '/api/charts/radar-bubble'},
+    {'name': '平行坐标图', 'path': '/api/charts/parallel-coordinates'},
+    # 依赖列表接口结果展开的接口
+    {
+        'name': '薪资箱线图',
+        'path': '/api/charts/boxplot/salary-distribution',
+        'params': {'experience': '{experience}', 'education': '{education}'},
+        'expand': {'from': '/api/charts/3d/experience-education-salary', 'field': 'data_detail',
+                   'key': ['experience', 'education'], 'top': settings.WARMUP_TOP_N}
+    },
+    {
+        'name': 'Q1散点图',
+        'path': '/api/q1/scatter',
+        'params': {'city': '{value}'},
+        'expand': {'from': '/api/q1/cities', 'field': 'cities'}
+    },
+    {
+        'name': '城市详情',
+        'path': '/api/charts/city/detail/{value}',
+        'expand': {'from': '/api/charts/city', 'field': 'chart_config.data', 'key': 'city',
+                   'top': settings.WARMUP_TOP_N}
+    },
+    {
+        'name': '行业详情',
+        'path': '/api/charts/industry/detail/{value}',
+        'expand': {'from': '/api/charts/industry', 'field': 'chart_config.data', 'key': 'industry',
+                   'top': settings.WARMUP_TOP_N}
+    },
+    {
+        'name': '经验详情',
+        'path': '/api/charts/experience/detail/{value}',
+        'expand': {'from': '/api/charts/experience', 'field': 'chart_config.data', 'key': 'experience',
+                   'top': settings.WARMUP_TOP_N}
+    },
+]
+
+
+class WarmupState:
+    """预热状态，供就绪检查接口读取"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.status = 'pending'  # pending / running / ready
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self.report: Optional[Dict[str, Any]] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.status == 'ready'
+
+    def start(self) -> None:
+        with self._lock:
+            self.status = 'running'
+            self.started_at = datetime.now().isoformat()
+            self.finished_at = None
+            self.report = None
+
+    def finish(self, report: Dict[str, Any]) -> None:
+        with self._lock:
+            self.status = 'ready'
+            self.finished_at = datetime.now().isoformat()
+            self.report = report
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'status': self.status,
+                'ready': self.status == 'ready',
+                'started_at': self.started_at,
+                'finished_at': self.finished_at,
+                'report': self.report
+            }
+
+
+warmup_state = WarmupState()
+
+
+def _lookup(data: Any, field: str) -> Any:
+    """按点分路径读取嵌套字段"""
+    for part in field.split('.'):
+        if not isinstance(data, dict):
+            return None
+        data = data.get(part)
+    return data
+
+
+def _fill(template: str, value: Any, quote_value: bool) -> str:
+    values = value if isinstance(value, dict) else {'value': value}
+    for name, item in values.items():
+        text = str(item)
+        template = template.replace(f'{{{name}}}', quote(text, safe='') if quote_value else text)
+    return template
+
+
+def _build_url(step: Dict[str, Any], value: Any = None) -> str:
+    path = step['path']
+    params = step.get('params') or {}
+    if value is not None:
+        path = _fill(path, value, quote_value=True)
+        params = {name: _fill(v, value, quote_value=False) for name, v in params.items()}
+    return f"{path}?{urlencode(params)}" if params else path
+
+
+def _request(client, url: str) -> Dict[str, Any]:
+    """请求一个接口并记录耗时"""
+    started = time.perf_counter()
+    try:
+        response = client.get(url)
+        status = response.status_code
+        error = None if status == 200 else response.get_data(as_text=True)[:200]
+    except Exception as e:
+        status, error = None, str(e)
+    return {
+        'url': url,
+        'status': status,
+        'ok': status == 200,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+        'error': error
+    }
+
+
+def _expand_values(client, step: Dict[str, Any]) -> List[Any]:
+    """读取来源接口（已预热，命中缓存）并取出展开值"""
+    expand = step['expand']
+    response = client.get(expand['from'])
+    if response.status_code != 200:
+        logger.warning(f"预热步骤 {step['name']} 的来源接口 {expand['from']} 返回 {response.status_code}")
+        return []
+    items = _lookup((response.get_json() or {}).get('data'), expand['field']) or []
+    key = expand.get('key')
+    if isinstance(key, (list, tuple)):
+        items = [{name: item.get(name) for name in key} for item in items if isinstance(item, dict)]
+        items = [item for item in items if all(value not in (None, '') for value in item.values())]
+    elif key:
+        items = [item.get(key) for item in items if isinstance(item, dict)]
+    items = [item for item in items if item not in (None, '')]
+    top = expand.get('top')
+    return items[:top] if top else items
+
+
+def run_warmup(app, plan: Optional[List[Dict[str, Any]]] = None,
+               workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    执行预热计划并返回耗时报告
+    先并行请求不依赖其他接口的步骤，再并行请求由列表接口结果展开的步骤
+
+    Args:
+        app: Flask 应用实例，通过测试客户端在进程内请求接口
+        plan: 预热计划，默认 WARMUP_PLAN
+        workers: 并行线程数，默认 WARMUP_WORKERS
+    """
+    plan = WARMUP_PLAN if plan is None else plan
+    workers = workers or settings.WARMUP_WORKERS
+    warmup_state.start()
+    started = time.perf_counter()
+    logger.info(f"开始缓存预热：{len(plan)} 个步骤，并行度 {workers}")
+
+    steps: Dict[str, List[Dict[str, Any]]] = {step['name']: [] for step in plan}
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='warmup') as executor:
+            def submit_all(tasks):
+                futures = [(name, executor.submit(_request, app.test_client(), url)) for name, url in tasks]
+                for name, future in futures:
+                    steps[name].append(future.result())
+
+            submit_all([(step['name'], _build_url(step)) for step in plan if 'expand' not in step])
+
+            client = app.test_client()
+            expanded = []
+            for step in plan:
+                if 'expand' in step:
+                    expanded.extend((step['name'], _build_url(step, value))
+                                    for value in _expand_values(client, step))
+            submit_all(expanded)
+    except Exception as e:
+        # 预热失败不阻止服务启动，未预热的接口在首次请求时计算
+        logger.error(f"缓存预热失败: {e}", exc_info=True)
+
+    results = [result for step_results in steps.values() for result in step_results]
+    report = {
+        'total_ms': round((time.perf_counter() - started) * 1000, 1),
+        'requests': len(results),
+        'failed': sum(1 for result in results if not result['ok']),
+        'steps': [
+            {
+                'name': name,
+                'requests': len(step_results),
+                'failed': sum(1 for result in step_results if not result['ok']),
+                'elapsed_ms': round(sum(result['elapsed_ms'] for result in step_results), 1),
+                'max_ms': max((result['elapsed_ms'] for result in step_results), default=0.0),
+                'errors': [result for result in step_results if not result['ok']]
+            }
+            for name, step_results in steps.items()
+        ]
+    }
+    warmup_state.finish(report)
+    logger.info(f"缓存预热完成：{report['requests']} 个请求，失败 {report['failed']} 个，耗时 {report['total_ms']}ms")
+    return report
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """将预热报告格式化为便于终端阅读的文本"""
+    lines = [f"缓存预热完成：{report['requests']} 个请求，失败 {report['failed']} 个，总耗时 {report['total_ms']:.0f}ms"]
+    for step in sorted(report['steps'], key=lambda s: s['elapsed_ms'], reverse=True):
+        mark = '✓' if not step['failed'] else '✗'
+        lines.append(f"  {mark} {step['name']:<12} {step['requests']:>3} 个请求  "
+                     f"累计 {step['elapsed_ms']:>8.0f}ms  最慢 {step['max_ms']:>7.0f}ms")
+    return '\n'.join(lines)
+
+
+def warm_up_before_serving(app, use_reloader: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    在开始监听端口前执行预热（WARMUP_ENABLED 为 False 时直接标记就绪）
+    使用调试重载器时只在实际提供服务的子进程中执行，避免监控进程重复预热
+    """
+    if use_reloader and os.environ.get('WERKZEUG_RUN_MAIN') != 'true':
+        return None
+    if not settings.WARMUP_ENABLED:
+        warmup_state.finish({'skipped': True})
+        return None
+    report = run_warmup(app)
+    logger.info(format_report(report))
+    return report
+
+
+_background_lock = threading.Lock()
+
+
+def start_background_warmup(app) -> Optional[threading.Thread]:
+    """
+    在后台线程中预热，适用于由 WSGI 服务器直接加载应用的部署方式
+    预热已开始或已完成时不再重复启动，返回 None
+    """
+    with _background_lock:
+        if warmup_state.status != 'pending':
+            return None
+        warmup_state.start()
+    thread = threading.Thread(target=run_warmup, args=(app,), name='warmup', daemon=True)
+    thread.start()
+    return thread
+
+
+def init_app(app) -> None:
+    """
+    注册请求钩子：首个请求到达时在后台启动预热（WARMUP_ENABLED 为 False 时不注册）
+    由 WSGI 服务器（如 gunicorn wsgi:app）加载应用时没有 warm_up_before_serving 的调用点，
+    就绪检查接口在预热完成前返回 503，完成后返回 200
+    """
+    if not settings.WARMUP_ENABLED:
+        return
+
+    @app.before_request
+    def _start_warmup():
+        if warmup_state.status == 'pending':
+            start_background_warmup(app)
@@ -0,0 +1,11 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+WSGI 入口
+由 WSGI 服务器加载（gunicorn wsgi:app），首个请求到达后在后台预热缓存（WARMUP_ENABLED 为 False 时不预热）；
+开发时直接运行 app.py，在监听端口前预热
+"""
+
+from app import create_app
+
+app = create_app(background_warmup=True)